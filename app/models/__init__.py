@@ -7,7 +7,13 @@ from .requests import (
     ExamenRequest,
     SituacionAprendizajeRequest,
     InformeFamiliaRequest,
-    IdeasRequest
+    AlumnoInforme,
+    InformeFamiliaLoteRequest,
+    IdeasRequest,
+    ExportarWordRequest,
+    ExportarPdfRequest,
+    ExportarExamenRequest,
+    RegenerarSeccionRequest
 )
 
 from .responses import (
@@ -22,7 +28,13 @@ __all__ = [
     "ExamenRequest",
     "SituacionAprendizajeRequest",
     "InformeFamiliaRequest",
+    "AlumnoInforme",
+    "InformeFamiliaLoteRequest",
     "IdeasRequest",
+    "ExportarWordRequest",
+    "ExportarPdfRequest",
+    "ExportarExamenRequest",
+    "RegenerarSeccionRequest",
     # Responses
     "GeneracionResponse",
     "DocumentoGenerado"
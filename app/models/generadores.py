@@ -0,0 +1,83 @@
+"""
+Modelos Pydantic de los generadores rápidos (endpoints /generar/* del frontend)
+"""
+from pydantic import BaseModel
+from typing import Optional
+
+
+class BotonEmergenciaRequest(BaseModel):
+    """Petición del Botón de Emergencia"""
+    nivel: str
+    curso: str
+    asignatura: str
+    situacion: str
+    duracion: str
+
+
+class ExamenRequest(BaseModel):
+    """Petición de Examen"""
+    nivel: str
+    curso: str
+    asignatura: str
+    tema: str
+    tipo_preguntas: str
+    num_preguntas: int
+
+
+class ProblemasMatematicasRequest(BaseModel):
+    """Petición de Problemas de Matemáticas"""
+    nivel: str
+    curso: str
+    tema: str
+    num_problemas: int
+    dificultad: str
+    con_soluciones: bool = True
+
+
+class RubricaRequest(BaseModel):
+    """Petición de Rúbrica"""
+    nivel: str
+    curso: str
+    asignatura: str
+    actividad: str
+    criterios: Optional[list[str]] = None
+    niveles_logro: int = 4  # Insuficiente, Suficiente, Notable, Sobresaliente
+
+
+class UnidadDidacticaRequest(BaseModel):
+    """Petición de Unidad Didáctica"""
+    nivel: str
+    curso: str
+    asignatura: str
+    titulo: str
+    num_sesiones: int
+    trimestre: str
+
+
+class SituacionAprendizajeRequest(BaseModel):
+    """Petición de Situación de Aprendizaje"""
+    nivel: str
+    curso: str
+    asignatura: str
+    tema: str
+    duracion_sesiones: int
+    competencias_clave: Optional[list[str]] = None
+
+
+class ProgramacionDidacticaRequest(BaseModel):
+    """Petición de Programación Didáctica"""
+    nivel: str
+    curso: str
+    asignatura: str
+    centro: str
+    curso_academico: str
+
+
+class AdaptacionCurricularRequest(BaseModel):
+    """Petición de Adaptación Curricular"""
+    nivel: str
+    curso: str
+    asignatura: str
+    tipo_adaptacion: str  # ACI, ACIS, Enriquecimiento
+    necesidad: str
+    medidas: Optional[list[str]] = None
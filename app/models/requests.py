@@ -2,7 +2,7 @@
 Modelos Pydantic para las peticiones (requests) a la API
 """
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Optional, List, Dict, Any, Literal
 
 
 class UnidadDidacticaRequest(BaseModel):
@@ -117,6 +117,57 @@ class InformeFamiliaRequest(BaseModel):
         }
 
 
+class AlumnoInforme(BaseModel):
+    """Datos de un alumno dentro de un lote de informes"""
+    nombre_alumno: str = Field(..., description="Nombre del alumno")
+    aspectos_positivos: str = Field(..., description="Aspectos positivos del alumno")
+    aspectos_mejora: str = Field(..., description="Aspectos a mejorar")
+    tono: Optional[str] = Field(None, description="Tono específico para este alumno (si no, el del lote)")
+
+
+class InformeFamiliaLoteRequest(BaseModel):
+    """Modelo para solicitar los Informes a Familias de toda una clase"""
+    nivel: str = Field(..., description="Nivel educativo")
+    curso: str = Field(..., description="Curso")
+    asignatura: str = Field(..., description="Asignatura")
+    tono: str = Field(..., description="Tono de los informes (Formal, Cercano, Motivador)")
+    alumnos: List[AlumnoInforme] = Field(..., min_length=1, max_length=100, description="Lista de la clase")
+    
+    def informe(self, alumno: AlumnoInforme) -> InformeFamiliaRequest:
+        """Petición individual de un alumno del lote"""
+        return InformeFamiliaRequest(
+            nivel=self.nivel,
+            curso=self.curso,
+            asignatura=self.asignatura,
+            nombre_alumno=alumno.nombre_alumno,
+            aspectos_positivos=alumno.aspectos_positivos,
+            aspectos_mejora=alumno.aspectos_mejora,
+            tono=alumno.tono or self.tono
+        )
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "nivel": "Primaria",
+                "curso": "4º de Primaria",
+                "asignatura": "Matemáticas",
+                "tono": "Cercano",
+                "alumnos": [
+                    {
+                        "nombre_alumno": "Ana García",
+                        "aspectos_positivos": "Participa activamente",
+                        "aspectos_mejora": "Atención en problemas largos"
+                    },
+                    {
+                        "nombre_alumno": "Luis Pérez",
+                        "aspectos_positivos": "Muy ordenado en sus cuadernos",
+                        "aspectos_mejora": "Cálculo mental"
+                    }
+                ]
+            }
+        }
+
+
 class IdeasRequest(BaseModel):
     """Modelo para solicitar generación de Ideas didácticas"""
     nivel: str = Field(..., description="Nivel educativo")
@@ -134,4 +185,77 @@ class IdeasRequest(BaseModel):
                 "tema": "La Edad Media",
                 "tipo_actividad": "Actividad práctica o juego"
             }
-        }
\ No newline at end of file
+        }
+
+
+class ExportarWordRequest(BaseModel):
+    """Modelo para exportar un documento generado a Word"""
+    contenido: str = Field(..., min_length=1, description="Contenido en Markdown")
+    titulo: str = Field("Documento DocentIA", max_length=200, description="Título del documento")
+    metadatos: Optional[Dict[str, Any]] = Field(None, description="Metadatos adicionales (autor, etc.)")
+    plantilla: Optional[str] = Field(
+        None,
+        pattern=r"^[A-Za-z0-9_-]{1,64}$",
+        description="Plantilla Word del centro (fichero <plantilla>.docx en PLANTILLAS_DOCX_DIR)"
+    )
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "contenido": "# Unidad Didáctica\n\n## 1. DATOS IDENTIFICATIVOS\n\n- **Curso:** 3º de Primaria",
+                "titulo": "Unidad Didáctica - El Ciclo del Agua"
+            }
+        }
+
+
+class ExportarPdfRequest(BaseModel):
+    """Modelo para exportar un documento generado a PDF"""
+    contenido: str = Field(..., min_length=1, description="Contenido en Markdown")
+    titulo: str = Field("Documento DocentIA", max_length=200, description="Título del documento")
+    metadatos: Optional[Dict[str, Any]] = Field(None, description="Metadatos adicionales (autor, etc.)")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "contenido": "# Examen de Matemáticas\n\n1. Calcula 3/4 + 1/2",
+                "titulo": "Examen - Fracciones"
+            }
+        }
+
+
+class ExportarExamenRequest(BaseModel):
+    """Modelo para exportar un examen como paquete ZIP (examen, hoja de respuestas y soluciones)"""
+    contenido: str = Field(..., min_length=1, description="Examen generado en Markdown")
+    titulo: str = Field("Examen", max_length=200, description="Título del examen")
+    metadatos: Optional[Dict[str, Any]] = Field(None, description="Metadatos adicionales (autor, etc.)")
+    plantilla: Optional[str] = Field(
+        None,
+        pattern=r"^[A-Za-z0-9_-]{1,64}$",
+        description="Plantilla Word del centro (fichero <plantilla>.docx en PLANTILLAS_DOCX_DIR)"
+    )
+    formatos: List[Literal["docx", "pdf"]] = Field(
+        ["docx", "pdf"], min_length=1, description="Formatos de cada sección"
+    )
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "contenido": "# Examen de Matemáticas\n\n1. Calcula 3/4 + 1/2\n\n## HOJA DE RESPUESTAS\n\n1. ____\n\n## SOLUCIONES\n\n1. 5/4",
+                "titulo": "Examen - Fracciones",
+                "formatos": ["docx", "pdf"]
+            }
+        }
+
+
+class RegenerarSeccionRequest(BaseModel):
+    """Modelo para regenerar una sección de un documento ya generado"""
+    encabezado: str = Field(..., min_length=1, max_length=200, description="Título de la sección (sin numeración ni #)")
+    instrucciones: Optional[str] = Field(None, max_length=2000, description="Qué debe cambiar en la sección")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "encabezado": "EVALUACIÓN",
+                "instrucciones": "Más peso a la evaluación formativa y una rúbrica para el proyecto final"
+            }
+        }
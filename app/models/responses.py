@@ -13,6 +13,8 @@ class DocumentoGenerado(BaseModel):
     modelo: str = Field(..., description="Modelo específico utilizado")
     tiempo_generacion: float = Field(..., description="Tiempo de generación en segundos")
     tokens_usados: Optional[int] = Field(None, description="Tokens consumidos (si está disponible)")
+    cache_read_input_tokens: Optional[int] = Field(None, description="Tokens de entrada leídos de la caché de prompt (Claude)")
+    cache_creation_input_tokens: Optional[int] = Field(None, description="Tokens de entrada escritos en la caché de prompt (Claude)")
 
 
 class GeneracionResponse(BaseModel):
@@ -31,7 +33,9 @@ class GeneracionResponse(BaseModel):
                     "proveedor": "claude",
                     "modelo": "claude-sonnet-4-20250514",
                     "tiempo_generacion": 15.3,
-                    "tokens_usados": 2500
+                    "tokens_usados": 2500,
+                    "cache_read_input_tokens": 1800,
+                    "cache_creation_input_tokens": 0
                 },
                 "message": "Documento generado correctamente",
                 "timestamp": "2025-12-06T10:30:00"
@@ -1,19 +1,49 @@
 """
 Prompts de IA para DocentIA
-Prompts optimizados para cada tipo de generación
+Prompts optimizados para cada tipo de generación, como plantillas compiladas
+y versionadas (ver plantillas.py)
 """
-from .unidades import PROMPT_UNIDAD_DIDACTICA
-from .rubricas import PROMPT_RUBRICA
-from .examenes import PROMPT_EXAMEN
-from .situaciones import PROMPT_SITUACION_APRENDIZAJE
-from .informes import PROMPT_INFORME_FAMILIA
-from .ideas import PROMPT_GENERADOR_IDEAS
+from .plantillas import (
+    PlantillaPrompt,
+    RegistroPlantillas,
+    registro_plantillas,
+    SeccionDocumento,
+    DocumentoPorSecciones
+)
+from .unidades import PROMPT_UNIDAD_DIDACTICA, PLANTILLA_UNIDAD_DIDACTICA, prompt_unidad_didactica_lomloe
+from .rubricas import PROMPT_RUBRICA, PLANTILLA_RUBRICA, prompt_rubrica_lomloe
+from .examenes import PROMPT_EXAMEN, PLANTILLA_EXAMEN, prompt_examen_lomloe
+from .situaciones import PROMPT_SITUACION_APRENDIZAJE, PLANTILLA_SITUACION_APRENDIZAJE, prompt_situacion_aprendizaje_lomloe
+from .informes import PROMPT_INFORME_FAMILIA, PLANTILLA_INFORME_FAMILIA, prompt_informe_familia
+from .ideas import PROMPT_GENERADOR_IDEAS, PLANTILLA_IDEAS, prompt_ideas
+from .revision import PLANTILLA_REVISION_CONTEXTO, PLANTILLA_REVISION_SECCION
 
 __all__ = [
+    "PlantillaPrompt",
+    "RegistroPlantillas",
+    "registro_plantillas",
+    "SeccionDocumento",
+    "DocumentoPorSecciones",
     "PROMPT_UNIDAD_DIDACTICA",
     "PROMPT_RUBRICA",
     "PROMPT_EXAMEN",
     "PROMPT_SITUACION_APRENDIZAJE",
     "PROMPT_INFORME_FAMILIA",
-    "PROMPT_GENERADOR_IDEAS"
+    "PROMPT_GENERADOR_IDEAS",
+    # Plantillas (sistema + prompt de usuario)
+    "PLANTILLA_UNIDAD_DIDACTICA",
+    "PLANTILLA_RUBRICA",
+    "PLANTILLA_EXAMEN",
+    "PLANTILLA_SITUACION_APRENDIZAJE",
+    "PLANTILLA_INFORME_FAMILIA",
+    "PLANTILLA_IDEAS",
+    "PLANTILLA_REVISION_CONTEXTO",
+    "PLANTILLA_REVISION_SECCION",
+    # Prompts de usuario
+    "prompt_unidad_didactica_lomloe",
+    "prompt_rubrica_lomloe",
+    "prompt_examen_lomloe",
+    "prompt_situacion_aprendizaje_lomloe",
+    "prompt_informe_familia",
+    "prompt_ideas"
 ]
\ No newline at end of file
@@ -1,6 +1,8 @@
 """
 Prompt para generación de Exámenes
 """
+from app.models.requests import ExamenRequest
+from app.prompts.plantillas import plantilla
 
 PROMPT_EXAMEN = """Eres un experto en evaluación educativa que crea exámenes adaptados al nivel del alumnado y alineados con el currículo de Extremadura.
 
@@ -92,4 +94,32 @@ Documento separado con:
 - Especifica claramente la puntuación de cada pregunta
 - El examen debe sumar exactamente 10 puntos
 - Revisa que el tiempo sea realista para el número y tipo de preguntas
-"""
\ No newline at end of file
+"""
+
+
+PLANTILLA_EXAMEN = plantilla(
+    "examen-lomloe",
+    sistema=PROMPT_EXAMEN,
+    prefijo="""
+Genera un Examen con estos datos:
+
+""",
+    sufijo="""- **Nivel:** {nivel}
+- **Curso:** {curso}
+- **Asignatura:** {asignatura}
+- **Tema:** {tema}
+- **Tipo de examen:** {tipo_examen}
+- **Dificultad:** {dificultad}
+- **Duración:** {duracion}
+
+IMPORTANTE: 
+- Adapta el lenguaje y la complejidad al nivel educativo ({curso})
+- Incluye la hoja de respuestas separada
+- Las preguntas deben poder responderse en {duracion}
+"""
+)
+
+
+def prompt_examen_lomloe(request: ExamenRequest) -> str:
+    """Prompt de usuario: un Examen completo"""
+    return PLANTILLA_EXAMEN.renderizar(request)
@@ -0,0 +1,480 @@
+"""
+Prompts de los generadores rápidos (endpoints /generar/* del frontend)
+Cada generador es una plantilla: primero las instrucciones, iguales para
+todas las peticiones, y al final los DATOS de la petición
+"""
+from app.models.generadores import (
+    BotonEmergenciaRequest,
+    ExamenRequest,
+    ProblemasMatematicasRequest,
+    RubricaRequest,
+    UnidadDidacticaRequest,
+    SituacionAprendizajeRequest,
+    ProgramacionDidacticaRequest,
+    AdaptacionCurricularRequest
+)
+from app.prompts.plantillas import (
+    plantilla,
+    lista_markdown,
+    indice_secciones,
+    SeccionDocumento,
+    DocumentoPorSecciones
+)
+
+
+PLANTILLA_BOTON_EMERGENCIA = plantilla(
+    "boton-emergencia",
+    prefijo="""Eres un asistente experto en educación española que ayuda a docentes de Extremadura.
+
+TAREA: Generar una actividad de emergencia completa para la situación indicada en DATOS.
+
+INSTRUCCIONES:
+1. Crea una actividad COMPLETA lista para usar INMEDIATAMENTE
+2. Debe ser apropiada para el curso y el nivel indicados
+3. Ajusta la actividad exactamente a la duración indicada
+4. Incluye:
+   - Título de la actividad
+   - Objetivos de aprendizaje (2-3)
+   - Desarrollo paso a paso (con tiempos)
+   - Materiales necesarios
+   - Criterios de evaluación
+5. Cumple con LOMLOE 2024
+6. Formato claro y profesional
+7. Debe resolver la situación urgente indicada
+""",
+    sufijo="""
+DATOS:
+- Nivel: {nivel}
+- Curso: {curso}
+- Asignatura: {asignatura}
+- Situación urgente: {situacion}
+- Duración: {duracion}
+
+GENERA LA ACTIVIDAD:"""
+)
+
+
+PLANTILLA_EXAMEN = plantilla(
+    "examen",
+    prefijo="""Eres un experto en evaluación educativa española que crea exámenes para docentes.
+
+TAREA: Generar un examen completo con los DATOS indicados.
+
+INSTRUCCIONES:
+1. Crea un examen PROFESIONAL listo para imprimir
+2. Apropiado para el curso y el nivel indicados
+3. Incluye:
+   - Encabezado (nombre, fecha, curso)
+   - El número de preguntas y el tipo de preguntas indicados
+   - Criterios de evaluación por pregunta
+   - Puntuación total (sobre 10)
+   - Rúbrica de corrección
+4. Cumple con criterios LOMLOE 2024
+5. Formato claro y profesional
+6. Dificultad progresiva (fácil → media → difícil)
+
+Si tipo es "test": 4 opciones por pregunta (A, B, C, D)
+Si tipo es "desarrollo": preguntas abiertas con criterios detallados
+Si tipo es "mixto": combina ambos tipos
+""",
+    sufijo="""
+DATOS:
+- Nivel: {nivel}
+- Curso: {curso}
+- Asignatura: {asignatura}
+- Tema: {tema}
+- Tipo de preguntas: {tipo_preguntas}
+- Número de preguntas: {num_preguntas}
+
+GENERA EL EXAMEN:"""
+)
+
+
+PLANTILLA_PROBLEMAS_MATEMATICAS = plantilla(
+    "problemas-matematicas",
+    prefijo="""Eres un profesor experto en matemáticas que crea problemas para docentes españoles.
+
+TAREA: Generar problemas de matemáticas con los DATOS indicados.
+
+INSTRUCCIONES:
+1. Crea el número de problemas indicado, con la dificultad indicada
+2. Apropiados para el curso y el nivel indicados
+3. Céntrate en el tema indicado
+4. Cada problema debe incluir:
+   - Enunciado claro y contextualizado
+   - Datos necesarios
+   - Pregunta específica
+   - Si se piden soluciones: solución paso a paso con explicaciones y resultado final
+5. Contextos variados (vida real, cotidianos, interesantes para alumnos)
+6. Cumple con currículo LOMLOE 2024
+7. Formato claro y profesional
+""",
+    sufijo="""
+DATOS:
+- Nivel: {nivel}
+- Curso: {curso}
+- Tema: {tema}
+- Número de problemas: {num_problemas}
+- Dificultad: {dificultad}
+- Con soluciones: {con_soluciones}
+
+GENERA LOS PROBLEMAS:""",
+    valores=lambda datos: {"con_soluciones": "Sí" if datos.con_soluciones else "No"}
+)
+
+
+PLANTILLA_RUBRICA = plantilla(
+    "rubrica",
+    prefijo="""Eres un experto en evaluación educativa española que crea rúbricas profesionales.
+
+TAREA: Generar una rúbrica de evaluación completa con los DATOS indicados.
+
+INSTRUCCIONES:
+1. Crea una rúbrica PROFESIONAL lista para usar
+2. Apropiada para el curso y el nivel indicados
+3. Incluye:
+   - Título de la rúbrica
+   - Criterios de evaluación (mínimo 5; incluye los criterios específicos si se indican)
+   - El número de niveles de logro indicado para cada criterio
+   - Descriptores claros y específicos por nivel
+   - Puntuación asociada a cada nivel
+   - Ponderación de criterios
+4. Niveles típicos: Insuficiente, Suficiente, Notable, Sobresaliente
+5. Cumple con LOMLOE 2024
+6. Formato tabla clara y profesional
+7. Incluye instrucciones de uso
+""",
+    sufijo="""
+DATOS:
+- Nivel: {nivel}
+- Curso: {curso}
+- Asignatura: {asignatura}
+- Actividad/Tarea: {actividad}
+- Niveles de logro: {niveles_logro}
+{criterios}
+
+GENERA LA RÚBRICA:""",
+    valores=lambda datos: {"criterios": lista_markdown("Criterios específicos a evaluar", datos.criterios)}
+)
+
+
+PLANTILLA_UNIDAD_DIDACTICA = plantilla(
+    "unidad-didactica",
+    prefijo="""Eres un experto en programación didáctica española que crea unidades completas.
+
+TAREA: Generar una unidad didáctica completa con los DATOS indicados.
+
+INSTRUCCIONES:
+1. Crea una unidad didáctica COMPLETA lista para implementar
+2. Apropiada para el curso y el nivel indicados
+3. Incluye:
+   - Justificación y contextualización
+   - Objetivos didácticos (5-7)
+   - Competencias clave LOMLOE
+   - Saberes básicos / Contenidos
+   - Metodología
+   - Temporalización (todas las sesiones indicadas, detalladas)
+   - Recursos y materiales
+   - Evaluación (criterios, instrumentos)
+   - Atención a la diversidad
+   - Bibliografía
+4. Cada sesión debe incluir:
+   - Objetivos específicos
+   - Actividades (inicio, desarrollo, cierre)
+   - Tiempo estimado
+   - Recursos necesarios
+5. Cumple con LOMLOE 2024 y currículo de Extremadura
+6. Formato profesional y estructurado
+""",
+    sufijo="""
+DATOS:
+- Nivel: {nivel}
+- Curso: {curso}
+- Asignatura: {asignatura}
+- Título: {titulo}
+- Número de sesiones: {num_sesiones}
+- Trimestre: {trimestre}
+
+GENERA LA UNIDAD DIDÁCTICA:"""
+)
+
+
+PLANTILLA_SITUACION_APRENDIZAJE = plantilla(
+    "situacion-aprendizaje",
+    prefijo="""Eres un experto en diseño de situaciones de aprendizaje competenciales según LOMLOE.
+
+TAREA: Generar una situación de aprendizaje completa con los DATOS indicados.
+
+INSTRUCCIONES:
+1. Crea una situación de aprendizaje COMPETENCIAL completa
+2. Apropiada para el curso y el nivel indicados
+3. Debe incluir:
+   - Identificación de la SA
+   - Justificación (¿Por qué es relevante?)
+   - Descripción del reto/problema
+   - Objetivos de aprendizaje
+   - Competencias específicas y clave (incluye las competencias clave indicadas)
+   - Saberes básicos
+   - Metodología (ABP, cooperativo, etc.)
+   - Secuencia didáctica (todas las sesiones indicadas, detalladas)
+   - Producto final
+   - Evaluación (criterios, instrumentos, rúbrica)
+   - Recursos y materiales
+   - Atención a la diversidad
+4. Debe ser contextualizada, significativa y motivadora
+5. Enfoque competencial (aprender haciendo)
+6. Cumple con LOMLOE 2024
+7. Formato profesional
+""",
+    sufijo="""
+DATOS:
+- Nivel: {nivel}
+- Curso: {curso}
+- Asignatura: {asignatura}
+- Tema/Reto: {tema}
+- Duración: {duracion_sesiones} sesiones
+{competencias}
+
+GENERA LA SITUACIÓN DE APRENDIZAJE:""",
+    valores=lambda datos: {"competencias": lista_markdown("Competencias clave a trabajar", datos.competencias_clave)}
+)
+
+
+# Apartados A–I de la programación: el índice del prompt completo y, en la
+# generación por secciones, una llamada cada uno con su max_tokens (el
+# limitador reserva solo su salida estimada contra CLAUDE_OTPM, así que los
+# apartados se admiten a la vez sin bloquear al resto de generadores)
+SECCIONES_PROGRAMACION_DIDACTICA = (
+    SeccionDocumento("A", "INTRODUCCIÓN Y CONTEXTUALIZACIÓN", (
+        "Características del centro educativo indicado",
+        "Características del alumnado",
+        "Marco legal (LOMLOE, LOE, decretos autonómicos)"
+    ), max_tokens=640),
+    SeccionDocumento("B", "OBJETIVOS", (
+        "Objetivos de etapa",
+        "Objetivos de la asignatura",
+        "Contribución a competencias clave"
+    ), max_tokens=640),
+    SeccionDocumento("C", "COMPETENCIAS", (
+        "Competencias clave (CCL, CP, STEM, CD, CPSAA, CC, CE, CCEC)",
+        "Competencias específicas de la asignatura",
+        "Descriptores operativos"
+    ), max_tokens=768),
+    SeccionDocumento("D", "SABERES BÁSICOS / CONTENIDOS", (
+        "Organizados por trimestres",
+        "Bloques temáticos",
+        "Secuenciación y temporalización"
+    ), max_tokens=896),
+    SeccionDocumento("E", "UNIDADES DIDÁCTICAS", (
+        "Mínimo 9 unidades (3 por trimestre)",
+        "Título, temporalización, objetivos"
+    ), max_tokens=1280),
+    SeccionDocumento("F", "METODOLOGÍA", (
+        "Principios metodológicos",
+        "Estrategias didácticas",
+        "Organización espacios y tiempos",
+        "Materiales y recursos"
+    ), max_tokens=768),
+    SeccionDocumento("G", "EVALUACIÓN", (
+        "Criterios de evaluación",
+        "Instrumentos de evaluación",
+        "Criterios de calificación",
+        "Recuperación"
+    ), max_tokens=896),
+    SeccionDocumento("H", "ATENCIÓN A LA DIVERSIDAD", (
+        "Medidas ordinarias",
+        "Medidas específicas",
+        "Adaptaciones"
+    ), max_tokens=640),
+    SeccionDocumento("I", "ACTIVIDADES COMPLEMENTARIAS", max_tokens=384)
+)
+
+_DATOS_PROGRAMACION = """
+DATOS:
+- Nivel: {nivel}
+- Curso: {curso}
+- Asignatura: {asignatura}
+- Centro educativo: {centro}
+- Curso académico: {curso_academico}
+"""
+
+PLANTILLA_PROGRAMACION_DIDACTICA = plantilla(
+    "programacion-didactica",
+    prefijo=f"""Eres un experto en programación didáctica española que crea programaciones anuales completas.
+
+TAREA: Generar una programación didáctica anual con los DATOS indicados.
+
+INSTRUCCIONES:
+1. Crea una programación didáctica COMPLETA para el curso completo
+2. Apropiada para el curso y el nivel indicados
+3. Debe incluir:
+
+{indice_secciones(SECCIONES_PROGRAMACION_DIDACTICA)}
+
+4. Cumple con LOMLOE 2024 y Decreto de Extremadura
+5. Formato profesional y estructurado
+6. Listo para entregar a inspección
+""",
+    sufijo=_DATOS_PROGRAMACION + """
+GENERA LA PROGRAMACIÓN DIDÁCTICA:"""
+)
+
+PROGRAMACION_DIDACTICA_POR_SECCIONES = DocumentoPorSecciones(
+    contexto=plantilla(
+        "programacion-didactica-contexto",
+        prefijo=f"""Eres un experto en programación didáctica española que crea programaciones anuales completas.
+
+TAREA: Generar, apartado a apartado, una programación didáctica anual con los DATOS indicados.
+
+ESTRUCTURA DE LA PROGRAMACIÓN:
+
+{indice_secciones(SECCIONES_PROGRAMACION_DIDACTICA)}
+
+NORMAS:
+1. Apropiada para el curso y el nivel indicados
+2. Cumple con LOMLOE 2024 y Decreto de Extremadura
+3. Formato profesional y estructurado, listo para entregar a inspección
+4. Todos los apartados usan las mismas unidades, competencias y criterios (los del guion)
+""",
+        sufijo=_DATOS_PROGRAMACION
+    ),
+    guion=plantilla(
+        "programacion-didactica-guion",
+        sufijo="""Elabora el GUION de la programación, que seguirán todos los apartados:
+- Título de cada unidad didáctica, con su trimestre y número de sesiones
+- Competencias específicas y criterios de evaluación de la asignatura (con su numeración)
+- Para cada apartado (A–I), 2-4 líneas con las decisiones que lo concretan
+
+Sé breve: solo el guion, sin desarrollar los apartados.
+
+GENERA EL GUION:"""
+    ),
+    seccion=plantilla(
+        "programacion-didactica-seccion",
+        sufijo="""Redacta ÚNICAMENTE el apartado {clave}. {titulo}, completo y coherente con el guion.
+Debe incluir:
+{puntos}
+
+Empieza con el encabezado "## {clave}. {titulo}" y no escribas ningún otro apartado.
+
+GENERA EL APARTADO {clave}:"""
+    ),
+    secciones=SECCIONES_PROGRAMACION_DIDACTICA,
+    titulo_guion="GUION DE LA PROGRAMACIÓN"
+)
+
+
+PLANTILLA_ADAPTACION_CURRICULAR = plantilla(
+    "adaptacion-curricular",
+    prefijo="""Eres un experto en atención a la diversidad que crea adaptaciones curriculares.
+
+TAREA: Generar una adaptación curricular con los DATOS indicados.
+
+INSTRUCCIONES:
+1. Crea una adaptación curricular COMPLETA y profesional
+2. Apropiada para el curso y el nivel indicados
+3. Debe incluir:
+
+   A. DATOS DE IDENTIFICACIÓN
+   - Alumno/a (datos anónimos)
+   - Curso y grupo
+   - Asignatura
+   - Tipo de adaptación indicado
+
+   B. INFORMACIÓN RELEVANTE
+   - Necesidad específica indicada
+   - Nivel de competencia curricular
+   - Estilo de aprendizaje
+   - Intereses y motivación
+
+   C. OBJETIVOS
+   - Objetivos generales adaptados
+   - Objetivos específicos
+   - Priorización de objetivos
+
+   D. COMPETENCIAS
+   - Competencias a desarrollar
+   - Nivel de logro esperado
+
+   E. CONTENIDOS
+   - Contenidos priorizados
+   - Contenidos modificados
+   - Contenidos ampliados (si enriquecimiento)
+
+   F. METODOLOGÍA
+   - Estrategias específicas
+   - Recursos adaptados
+   - Apoyo necesario
+   - Organización del aula
+
+   G. EVALUACIÓN
+   - Criterios de evaluación adaptados
+   - Instrumentos específicos
+   - Procedimientos
+
+   H. MEDIDAS Y RECURSOS
+   - Medidas organizativas
+   - Recursos personales
+   - Recursos materiales
+   - Apoyos necesarios
+
+   I. COLABORACIÓN CON LA FAMILIA
+
+   J. SEGUIMIENTO Y REVISIÓN
+
+4. Cumple con normativa de atención a la diversidad (considera las medidas específicas si se indican)
+5. Formato profesional
+6. Lenguaje claro y específico
+""",
+    sufijo="""
+DATOS:
+- Nivel: {nivel}
+- Curso: {curso}
+- Asignatura: {asignatura}
+- Tipo de adaptación: {tipo_adaptacion}
+- Necesidad específica: {necesidad}
+{medidas}
+
+GENERA LA ADAPTACIÓN CURRICULAR:""",
+    valores=lambda datos: {"medidas": lista_markdown("Medidas específicas a considerar", datos.medidas)}
+)
+
+
+def prompt_boton_emergencia(datos: BotonEmergenciaRequest) -> str:
+    """Prompt de actividad de emergencia"""
+    return PLANTILLA_BOTON_EMERGENCIA.renderizar(datos)
+
+
+def prompt_examen(datos: ExamenRequest) -> str:
+    """Prompt de examen"""
+    return PLANTILLA_EXAMEN.renderizar(datos)
+
+
+def prompt_problemas_matematicas(datos: ProblemasMatematicasRequest) -> str:
+    """Prompt de problemas de matemáticas"""
+    return PLANTILLA_PROBLEMAS_MATEMATICAS.renderizar(datos)
+
+
+def prompt_rubrica(datos: RubricaRequest) -> str:
+    """Prompt de rúbrica de evaluación"""
+    return PLANTILLA_RUBRICA.renderizar(datos)
+
+
+def prompt_unidad_didactica(datos: UnidadDidacticaRequest) -> str:
+    """Prompt de unidad didáctica"""
+    return PLANTILLA_UNIDAD_DIDACTICA.renderizar(datos)
+
+
+def prompt_situacion_aprendizaje(datos: SituacionAprendizajeRequest) -> str:
+    """Prompt de situación de aprendizaje"""
+    return PLANTILLA_SITUACION_APRENDIZAJE.renderizar(datos)
+
+
+def prompt_programacion_didactica(datos: ProgramacionDidacticaRequest) -> str:
+    """Prompt de programación didáctica anual"""
+    return PLANTILLA_PROGRAMACION_DIDACTICA.renderizar(datos)
+
+
+def prompt_adaptacion_curricular(datos: AdaptacionCurricularRequest) -> str:
+    """Prompt de adaptación curricular"""
+    return PLANTILLA_ADAPTACION_CURRICULAR.renderizar(datos)
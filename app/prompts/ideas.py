@@ -1,6 +1,8 @@
 """
 Prompt para generación de Ideas Didácticas
 """
+from app.models.requests import IdeasRequest
+from app.prompts.plantillas import plantilla
 
 PROMPT_GENERADOR_IDEAS = """Eres un docente creativo e innovador que constantemente genera ideas originales para hacer el aprendizaje más interesante, motivador y efectivo.
 
@@ -113,4 +115,30 @@ El escape room combina retos físicos (sobres cerrados con candados de combinaci
 - Todas las ideas deben fomentar el aprendizaje activo
 - Evita actividades que solo sean "copiar y colorear"
 - Prioriza actividades que desarrollen pensamiento crítico, creatividad y colaboración
-"""
\ No newline at end of file
+"""
+
+
+PLANTILLA_IDEAS = plantilla(
+    "ideas",
+    sistema=PROMPT_GENERADOR_IDEAS,
+    prefijo="""
+Genera ideas didácticas creativas con estos datos:
+
+""",
+    sufijo="""- **Nivel:** {nivel}
+- **Curso:** {curso}
+- **Asignatura:** {asignatura}
+- **Tema:** {tema}
+- **Tipo de actividad deseada:** {tipo_actividad}
+
+IMPORTANTE: 
+- Proporciona 5 ideas diferentes
+- Cada idea debe ser original y práctica
+- Adaptadas al nivel y al contexto actual
+"""
+)
+
+
+def prompt_ideas(request: IdeasRequest) -> str:
+    """Prompt de usuario: Ideas didácticas creativas"""
+    return PLANTILLA_IDEAS.renderizar(request)
@@ -1,6 +1,8 @@
 """
 Prompt para generación de Informes a Familias
 """
+from app.models.requests import InformeFamiliaRequest
+from app.prompts.plantillas import plantilla
 
 PROMPT_INFORME_FAMILIA = """Eres un docente experimentado que sabe comunicarse eficazmente con las familias, transmitiendo información clara, constructiva y útil sobre el progreso del alumnado.
 
@@ -121,4 +123,32 @@ Según el **TONO** solicitado:
 - Incluye siempre una invitación al diálogo
 - El tono debe ser coherente en todo el documento
 - Adapta el registro al nivel educativo (más cercano en Primaria, más formal en ESO)
-"""
\ No newline at end of file
+"""
+
+
+PLANTILLA_INFORME_FAMILIA = plantilla(
+    "informe-familia",
+    sistema=PROMPT_INFORME_FAMILIA,
+    prefijo="""
+Genera un Informe a Familias con estos datos:
+
+""",
+    sufijo="""- **Nivel:** {nivel}
+- **Curso:** {curso}
+- **Asignatura:** {asignatura}
+- **Nombre del alumno:** {nombre_alumno}
+- **Aspectos positivos:** {aspectos_positivos}
+- **Aspectos a mejorar:** {aspectos_mejora}
+- **Tono deseado:** {tono}
+
+IMPORTANTE: 
+- Usa un lenguaje {tono}
+- Sé específico pero constructivo
+- Incluye recomendaciones para las familias
+"""
+)
+
+
+def prompt_informe_familia(request: InformeFamiliaRequest) -> str:
+    """Prompt de usuario: un Informe a Familias"""
+    return PLANTILLA_INFORME_FAMILIA.renderizar(request)
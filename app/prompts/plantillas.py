@@ -0,0 +1,190 @@
+"""
+Plantillas de Prompt Compiladas
+Cada plantilla se compila una vez al importar: un prefijo estático (prompt de
+sistema + instrucciones) idéntico en todas las peticiones, que es lo que
+reutiliza la caché de prefijos del proveedor, y un sufijo variable con los
+datos de la petición. Su versión es el hash del contenido, así que cambiar
+el texto de un prompt invalida solo las entradas de caché de esa plantilla.
+"""
+import hashlib
+from string import Formatter
+from typing import Dict, Any, List, Optional, Callable, NamedTuple, Tuple
+from pydantic import BaseModel
+
+
+class PlantillaPrompt:
+    """
+    Prompt de un generador: sistema + prefijo (estáticos) + sufijo (variable)
+
+    El sufijo usa campos {campo} (con formato opcional, {campo:>3}) que se
+    resuelven primero en `valores(datos)`, para los campos derivados, y si no
+    en los atributos de la petición. El prefijo no admite campos: cualquier
+    dato de la petición en él rompería la reutilización del prefijo.
+    """
+
+    def __init__(
+        self,
+        nombre: str,
+        sufijo: str,
+        prefijo: str = "",
+        sistema: str = "",
+        valores: Optional[Callable[[Any], Dict[str, Any]]] = None
+    ):
+        self.nombre = nombre
+        self.sistema = sistema
+        self.prefijo = prefijo
+        self.sufijo = sufijo
+        self.valores = valores
+        if any(campo is not None for _, campo, _, _ in Formatter().parse(prefijo)):
+            raise ValueError(f"El prefijo de la plantilla {nombre} no puede tener campos")
+        self._partes = self._compilar(sufijo)
+        self.campos = tuple(dict.fromkeys(campo for _, campo, _ in self._partes if campo))
+        self.version = hashlib.sha256(
+            "\0".join((sistema, prefijo, sufijo)).encode("utf-8")
+        ).hexdigest()[:12]
+
+    @staticmethod
+    def _compilar(sufijo: str) -> List[Tuple[str, Optional[str], str]]:
+        """(texto literal, campo, formato) de cada tramo del sufijo"""
+        partes = []
+        for literal, campo, formato, conversion in Formatter().parse(sufijo):
+            if conversion:
+                raise ValueError(f"Conversión !{conversion} no soportada en {{{campo}}}")
+            if campo is not None and not campo.isidentifier():
+                raise ValueError(f"Campo no válido en la plantilla: {{{campo}}}")
+            partes.append((literal, campo, formato or ""))
+        return partes
+
+    def renderizar(self, datos: BaseModel) -> str:
+        """Prompt de usuario (prefijo + sufijo con los datos de la petición)"""
+        derivados = self.valores(datos) if self.valores else {}
+        trozos = [self.prefijo]
+        for literal, campo, formato in self._partes:
+            trozos.append(literal)
+            if campo:
+                valor = derivados[campo] if campo in derivados else getattr(datos, campo)
+                trozos.append(format(valor, formato) if formato else str(valor))
+        return "".join(trozos)
+
+    __call__ = renderizar
+
+    @property
+    def estatico(self) -> str:
+        """Texto común a todas las peticiones, en el orden en que se envía"""
+        return self.sistema + self.prefijo
+
+    def descripcion(self) -> Dict[str, Any]:
+        # Importación local: app.services importa los prompts al cargarse
+        from app.services.tokens import contar_tokens as estimar_tokens
+        return {
+            "nombre": self.nombre,
+            "version": self.version,
+            "campos": list(self.campos),
+            "tokens_sistema": estimar_tokens(self.sistema),
+            "tokens_prefijo": estimar_tokens(self.prefijo),
+            "tokens_sufijo_minimo": estimar_tokens("".join(literal for literal, _, _ in self._partes)),
+            "fraccion_estatica": round(len(self.estatico) / max(1, len(self.estatico) + len(self.sufijo)), 3)
+        }
+
+
+class RegistroPlantillas:
+    """Plantillas de prompt por nombre (únicas), para listarlas con su versión"""
+
+    def __init__(self):
+        self._plantillas: Dict[str, PlantillaPrompt] = {}
+
+    def registrar(self, plantilla: PlantillaPrompt) -> PlantillaPrompt:
+        if plantilla.nombre in self._plantillas:
+            raise ValueError(f"Plantilla ya registrada: {plantilla.nombre}")
+        self._plantillas[plantilla.nombre] = plantilla
+        return plantilla
+
+    def obtener(self, nombre: str) -> PlantillaPrompt:
+        try:
+            return self._plantillas[nombre]
+        except KeyError:
+            raise ValueError(f"Plantilla no encontrada: {nombre}")
+
+    def listar(self) -> List[Dict[str, Any]]:
+        return [plantilla.descripcion() for plantilla in self._plantillas.values()]
+
+    def versiones(self) -> Dict[str, str]:
+        return {nombre: plantilla.version for nombre, plantilla in self._plantillas.items()}
+
+
+# Registro global
+registro_plantillas = RegistroPlantillas()
+
+
+class SeccionDocumento(NamedTuple):
+    """Apartado de un documento generado por secciones"""
+    clave: str                      # "A", "B"... (ordena el documento)
+    titulo: str
+    puntos: Tuple[str, ...] = ()    # Lo que debe incluir el apartado
+    max_tokens: int = 1024          # Declarado; el adaptativo lo sustituye con datos suficientes
+
+    @property
+    def encabezado(self) -> str:
+        return f"{self.clave}. {self.titulo}"
+
+
+def indice_secciones(secciones: Tuple[SeccionDocumento, ...], sangria: str = "   ") -> str:
+    """Índice de apartados con sus puntos, como aparece en los prompts"""
+    return "\n\n".join(
+        "\n".join([f"{sangria}{seccion.encabezado}"] + [f"{sangria}- {punto}" for punto in seccion.puntos])
+        for seccion in secciones
+    )
+
+
+class DocumentoPorSecciones:
+    """
+    Generación de un documento apartado a apartado
+
+    `contexto` es el prompt de sistema del guion (instrucciones y datos de la
+    petición). `guion` pide el esquema del documento y `seccion` redacta un
+    apartado (campos {clave}, {titulo} y {puntos}). Los apartados comparten
+    como prompt de sistema el contexto seguido del guion (`sistema_secciones`),
+    para que el proveedor cachee ese prefijo común.
+    """
+
+    def __init__(
+        self,
+        contexto: PlantillaPrompt,
+        guion: PlantillaPrompt,
+        seccion: PlantillaPrompt,
+        secciones: Tuple[SeccionDocumento, ...],
+        max_tokens_guion: int = 1024,
+        titulo_guion: str = "GUION"
+    ):
+        self.contexto = contexto
+        self.guion = guion
+        self.seccion = seccion
+        self.secciones = secciones
+        self.max_tokens_guion = max_tokens_guion
+        self.titulo_guion = titulo_guion
+        self.version = hashlib.sha256("\0".join(
+            [contexto.version, guion.version, seccion.version, titulo_guion]
+            + [f"{s.encabezado}\0{'|'.join(s.puntos)}" for s in secciones]
+        ).encode("utf-8")).hexdigest()[:12]
+
+    def sistema_secciones(self, contexto: str, guion: str) -> str:
+        """Prompt de sistema común a todos los apartados de un documento"""
+        return f"{contexto}\n\n{self.titulo_guion}:\n{guion}"
+
+    def descripcion(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "secciones": [seccion.encabezado for seccion in self.secciones]
+        }
+
+
+def plantilla(nombre: str, sufijo: str, prefijo: str = "", sistema: str = "", valores=None) -> PlantillaPrompt:
+    """Crea y registra una plantilla"""
+    return registro_plantillas.registrar(PlantillaPrompt(nombre, sufijo, prefijo, sistema, valores))
+
+
+def lista_markdown(titulo: str, elementos: Optional[List[str]]) -> str:
+    """Bloque opcional "\\nTítulo:\\n- a\\n- b" (vacío si no hay elementos)"""
+    if not elementos:
+        return ""
+    return f"\n{titulo}:\n" + "\n".join(f"- {elemento}" for elemento in elementos)
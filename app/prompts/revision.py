@@ -0,0 +1,36 @@
+"""
+Prompts de revisión de documentos ya generados
+Regeneran una sola sección: el contexto (petición original y documento
+completo) va en el prompt de sistema y la sección a reescribir en el prompt
+de usuario
+"""
+from app.prompts.plantillas import plantilla
+
+PLANTILLA_REVISION_CONTEXTO = plantilla(
+    "revision-contexto",
+    prefijo="""Estás revisando un documento docente ya generado. El docente quiere cambiar solo una de sus secciones: el resto del documento se conserva tal cual.
+
+NORMAS:
+1. Reescribe únicamente la sección indicada, completa, sin resumir
+2. Mantén la coherencia con el resto del documento (unidades, competencias, criterios, temporalización)
+3. Conserva el formato Markdown y el nivel de los encabezados del documento
+4. No repitas ni comentes otras secciones
+""",
+    sufijo="""
+PETICIÓN ORIGINAL:
+{peticion}
+
+DOCUMENTO ACTUAL:
+{documento}
+"""
+)
+
+PLANTILLA_REVISION_SECCION = plantilla(
+    "revision-seccion",
+    sufijo="""Reescribe la sección "{titulo}" del DOCUMENTO ACTUAL, con sus subsecciones.
+{indicaciones}
+Empieza exactamente por la línea:
+{encabezado}
+
+GENERA LA SECCIÓN:"""
+)
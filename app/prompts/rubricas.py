@@ -1,6 +1,8 @@
 """
 Prompt para generación de Rúbricas de Evaluación
 """
+from app.models.requests import RubricaRequest
+from app.prompts.plantillas import plantilla
 
 PROMPT_RUBRICA = """Eres un experto en evaluación educativa bajo el marco de la LOMLOE y la legislación de Extremadura.
 
@@ -51,4 +53,27 @@ Breve guía para el docente sobre cómo usar esta rúbrica
 - Usa verbos de acción y resultados medibles
 - Adapta el lenguaje al nivel educativo
 - La rúbrica debe poder usarse directamente en el aula
-"""
\ No newline at end of file
+"""
+
+
+PLANTILLA_RUBRICA = plantilla(
+    "rubrica-lomloe",
+    sistema=PROMPT_RUBRICA,
+    prefijo="""
+Genera una Rúbrica de Evaluación con estos datos:
+
+""",
+    sufijo="""- **Nivel:** {nivel}
+- **Curso:** {curso}
+- **Asignatura:** {asignatura}
+- **Tema a evaluar:** {tema}
+- **Tipo de evaluación:** {tipo_evaluacion}
+
+Usa los criterios de evaluación del currículo de Extremadura.
+"""
+)
+
+
+def prompt_rubrica_lomloe(request: RubricaRequest) -> str:
+    """Prompt de usuario: una Rúbrica de Evaluación"""
+    return PLANTILLA_RUBRICA.renderizar(request)
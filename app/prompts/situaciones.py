@@ -1,6 +1,8 @@
 """
 Prompt para generación de Situaciones de Aprendizaje
 """
+from app.models.requests import SituacionAprendizajeRequest
+from app.prompts.plantillas import plantilla
 
 PROMPT_SITUACION_APRENDIZAJE = """Eres un experto en diseño de Situaciones de Aprendizaje bajo el marco LOMLOE y la legislación de Extremadura.
 
@@ -124,4 +126,30 @@ Lista completa de:
 - Usa metodologías activas (no solo explicación magistral)
 - Integra tecnología cuando sea pertinente y añada valor
 - Alineada con el currículo de Extremadura
-"""
\ No newline at end of file
+"""
+
+
+PLANTILLA_SITUACION_APRENDIZAJE = plantilla(
+    "situacion-aprendizaje-lomloe",
+    sistema=PROMPT_SITUACION_APRENDIZAJE,
+    prefijo="""
+Genera una Situación de Aprendizaje con estos datos:
+
+""",
+    sufijo="""- **Nivel:** {nivel}
+- **Curso:** {curso}
+- **Asignatura:** {asignatura}
+- **Contexto/Situación real:** {contexto}
+- **Metodología:** {metodologia}
+- **Duración:** {duracion_sesiones} sesiones
+- **Competencias clave a trabajar:** {competencias}
+
+IMPORTANTE: Usa la legislación de Extremadura y enfoque LOMLOE.
+""",
+    valores=lambda request: {"competencias": ", ".join(request.competencias_clave)}
+)
+
+
+def prompt_situacion_aprendizaje_lomloe(request: SituacionAprendizajeRequest) -> str:
+    """Prompt de usuario: una Situación de Aprendizaje LOMLOE"""
+    return PLANTILLA_SITUACION_APRENDIZAJE.renderizar(request)
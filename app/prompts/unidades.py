@@ -1,6 +1,8 @@
 """
 Prompt para generación de Unidades Didácticas
 """
+from app.models.requests import UnidadDidacticaRequest
+from app.prompts.plantillas import plantilla
 
 PROMPT_UNIDAD_DIDACTICA = """Eres un experto en educación y diseño curricular, especializado en la legislación educativa de Extremadura.
 
@@ -84,4 +86,28 @@ Lista de recursos necesarios
 - Incluye actividades variadas (individuales, grupales, digitales, manipulativas)
 - Considera la atención a la diversidad
 - Los criterios de evaluación deben corresponder al currículo oficial de Extremadura
-"""
\ No newline at end of file
+"""
+
+
+PLANTILLA_UNIDAD_DIDACTICA = plantilla(
+    "unidad-didactica-lomloe",
+    sistema=PROMPT_UNIDAD_DIDACTICA,
+    prefijo="""
+Genera una Unidad Didáctica con estos datos:
+
+""",
+    sufijo="""- **Nivel:** {nivel}
+- **Curso:** {curso}
+- **Asignatura:** {asignatura}
+- **Tema:** {tema}
+- **Características del grupo:** {caracteristicas_grupo}
+
+Importante: Usa la legislación de Extremadura (Decreto 107/2022 para Primaria o 110/2022 para ESO según corresponda).
+""",
+    valores=lambda request: {"caracteristicas_grupo": request.caracteristicas_grupo or "Grupo estándar"}
+)
+
+
+def prompt_unidad_didactica_lomloe(request: UnidadDidacticaRequest) -> str:
+    """Prompt de usuario: una Unidad Didáctica completa"""
+    return PLANTILLA_UNIDAD_DIDACTICA.renderizar(request)
@@ -3,14 +3,37 @@ Servicios de DocentIA
 Lógica de negocio de la aplicación
 """
 from .ia_service import IAService, ia_service
+from .generador_service import GeneradorService, GeneradorSpec, generador_service
 from .document_service import DocumentService, document_service
 from .export_service import ExportService, export_service
+from .cache_service import CacheService, cache_service
+from .lote_service import LoteService, lote_service
+from .trabajo_service import TrabajoService, TrabajoStore, trabajo_service
+from .pdf_service import PdfService, pdf_service
+from .paquete_service import PaqueteService, paquete_service
+from .cache_exportacion_service import CacheExportacionService, cache_exportacion_service
 
 __all__ = [
     "IAService",
     "ia_service",
+    "GeneradorService",
+    "GeneradorSpec",
+    "generador_service",
     "DocumentService",
     "document_service",
     "ExportService",
-    "export_service"
+    "export_service",
+    "CacheService",
+    "cache_service",
+    "LoteService",
+    "lote_service",
+    "TrabajoService",
+    "TrabajoStore",
+    "trabajo_service",
+    "PdfService",
+    "pdf_service",
+    "PaqueteService",
+    "paquete_service",
+    "CacheExportacionService",
+    "cache_exportacion_service"
 ]
\ No newline at end of file
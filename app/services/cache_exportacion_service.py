@@ -0,0 +1,194 @@
+"""
+Servicio de Caché de Exportaciones
+Guarda los ficheros exportados (Word, PDF) por el hash de su contenido para
+que las descargas repetidas no vuelvan a maquetar el documento
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+from config import settings
+from app.services.metricas import CACHE_CONSULTAS_TOTAL
+
+
+class CacheExportacionService:
+    """
+    Caché de dos niveles direccionada por contenido.
+
+    La clave es el SHA-256 del formato, el Markdown, el título, los metadatos
+    y la versión de la maquetación, así que una entrada nunca queda obsoleta:
+    solo se desaloja por tamaño. La memoria guarda los ficheros pequeños
+    (LRU por bytes); el disco, compartido entre workers, guarda todos. Los
+    aciertos de disco se leen enteros en `obtener`, porque otro worker puede
+    desalojar el fichero en cuanto se suelta.
+    """
+
+    def __init__(self, directorio: str, max_memoria_bytes: int, max_disco_bytes: int, activa: bool = True):
+        self.directorio = directorio
+        self.max_memoria_bytes = max_memoria_bytes
+        self.max_disco_bytes = max_disco_bytes
+        self.activa = activa
+        self._memoria: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes_memoria = 0
+        self._bytes_disco: Optional[int] = None
+        self._lock = threading.Lock()
+        self.aciertos_memoria = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+        self.precondiciones_fallidas = 0
+
+    @staticmethod
+    def clave(
+        formato: str,
+        contenido: str,
+        titulo: str,
+        metadatos: Optional[Dict[str, Any]],
+        version: str
+    ) -> str:
+        """SHA-256 de todo lo que determina el fichero exportado (sirve también de ETag)"""
+        huella = hashlib.sha256()
+        cabecera = json.dumps(
+            {"formato": formato, "titulo": titulo, "metadatos": metadatos or {}, "version": version},
+            sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str
+        )
+        huella.update(cabecera.encode("utf-8"))
+        huella.update(b"\0")
+        huella.update(contenido.encode("utf-8"))
+        return huella.hexdigest()
+
+    def _ruta(self, clave: str, extension: str) -> str:
+        return os.path.join(self.directorio, f"{clave}.{extension}")
+
+    def obtener(self, clave: str, extension: str) -> Tuple[Optional[bytes], str]:
+        """
+        Busca una exportación. Bloqueante si tiene que leer del disco
+
+        Returns:
+            (bytes o None, nivel) con nivel "memoria", "disco" o "fallo"
+        """
+        if not self.activa:
+            return None, "fallo"
+        nombre = f"{clave}.{extension}"
+        with self._lock:
+            datos = self._memoria.get(nombre)
+            if datos is not None:
+                self._memoria.move_to_end(nombre)
+                self.aciertos_memoria += 1
+                CACHE_CONSULTAS_TOTAL.labels("exportaciones", "memoria").inc()
+                return datos, "memoria"
+
+        ruta = self._ruta(clave, extension)
+        try:
+            # Se lee aquí y no al enviar la respuesta: el desalojo de otro
+            # worker puede borrar el fichero en cualquier momento
+            with open(ruta, "rb") as archivo:
+                datos = archivo.read()
+            # Se renueva la fecha para que el desalojo del disco sea LRU
+            os.utime(ruta)
+        except OSError:
+            if datos is None:
+                self.fallos += 1
+                CACHE_CONSULTAS_TOTAL.labels("exportaciones", "fallo").inc()
+                return None, "fallo"
+        self.aciertos_disco += 1
+        CACHE_CONSULTAS_TOTAL.labels("exportaciones", "disco").inc()
+        return datos, "disco"
+
+    def guardar(self, clave: str, extension: str, datos: bytes):
+        """Guarda una exportación en memoria (si cabe) y en disco. Bloqueante"""
+        if not self.activa:
+            return
+        nombre = f"{clave}.{extension}"
+
+        # Un fichero que ocupa más de un cuarto de la memoria solo va a disco
+        if len(datos) <= self.max_memoria_bytes // 4:
+            with self._lock:
+                if nombre not in self._memoria:
+                    self._memoria[nombre] = datos
+                    self._bytes_memoria += len(datos)
+                while self._bytes_memoria > self.max_memoria_bytes:
+                    _, desalojado = self._memoria.popitem(last=False)
+                    self._bytes_memoria -= len(desalojado)
+
+        if self.max_disco_bytes <= 0 or len(datos) > self.max_disco_bytes:
+            return
+        os.makedirs(self.directorio, exist_ok=True)
+        # Escritura atómica: otro worker nunca sirve un fichero a medias
+        fd, temporal = tempfile.mkstemp(dir=self.directorio, suffix=".tmp")
+        with os.fdopen(fd, "wb") as archivo:
+            archivo.write(datos)
+        os.replace(temporal, self._ruta(clave, extension))
+
+        with self._lock:
+            if self._bytes_disco is None:
+                self._bytes_disco = self._medir_disco()
+            else:
+                self._bytes_disco += len(datos)
+            if self._bytes_disco > self.max_disco_bytes:
+                self._bytes_disco = self._desalojar_disco()
+
+    def _ficheros_disco(self) -> list:
+        """(modificado, tamaño, ruta) de cada fichero de la caché en disco"""
+        ficheros = []
+        with os.scandir(self.directorio) as entradas:
+            for entrada in entradas:
+                if entrada.is_file() and not entrada.name.endswith(".tmp"):
+                    estado = entrada.stat()
+                    ficheros.append((estado.st_mtime, estado.st_size, entrada.path))
+        return ficheros
+
+    def _medir_disco(self) -> int:
+        return sum(tamaño for _, tamaño, _ in self._ficheros_disco())
+
+    def _desalojar_disco(self) -> int:
+        """
+        Borra los ficheros menos usados hasta quedar en el 90% del límite
+
+        Vuelve a medir el directorio porque otros workers también escriben en él.
+        """
+        ficheros = sorted(self._ficheros_disco())
+        total = sum(tamaño for _, tamaño, _ in ficheros)
+        for _, tamaño, ruta in ficheros:
+            if total <= self.max_disco_bytes * 0.9:
+                break
+            try:
+                os.remove(ruta)
+                total -= tamaño
+            except OSError:
+                pass
+        return total
+
+    def limpiar(self):
+        with self._lock:
+            self._memoria.clear()
+            self._bytes_memoria = 0
+            if os.path.isdir(self.directorio):
+                for _, _, ruta in self._ficheros_disco():
+                    os.remove(ruta)
+            self._bytes_disco = 0
+
+    def estadisticas(self) -> Dict[str, Any]:
+        consultas = self.aciertos_memoria + self.aciertos_disco + self.fallos
+        return {
+            "activa": self.activa,
+            "entradas_memoria": len(self._memoria),
+            "bytes_memoria": self._bytes_memoria,
+            "bytes_disco": self._bytes_disco,
+            "aciertos_memoria": self.aciertos_memoria,
+            "aciertos_disco": self.aciertos_disco,
+            "fallos": self.fallos,
+            "precondiciones_fallidas": self.precondiciones_fallidas,
+            "tasa_aciertos": round((consultas - self.fallos) / consultas, 3) if consultas else 0.0
+        }
+
+
+# Instancia global del servicio
+cache_exportacion_service = CacheExportacionService(
+    settings.EXPORT_CACHE_DIR,
+    settings.EXPORT_CACHE_MEMORIA_MB * 1024 * 1024,
+    settings.EXPORT_CACHE_DISCO_MB * 1024 * 1024,
+    settings.EXPORT_CACHE_ACTIVA
+)
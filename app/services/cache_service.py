@@ -0,0 +1,301 @@
+"""
+Servicio de Caché de Generaciones
+Evita repetir llamadas a la IA para peticiones idénticas (mismo payload,
+misma versión de prompt, mismo modelo y temperatura)
+"""
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, Callable, Awaitable
+from pydantic import BaseModel
+from config import settings
+from app.services.metricas import CACHE_CONSULTAS_TOTAL
+
+
+# Campos de las peticiones con valores de una lista cerrada, en los que
+# "ESO" y "eso" piden el mismo documento
+CAMPOS_SIN_MAYUSCULAS = frozenset({
+    "nivel", "curso", "asignatura", "tono", "dificultad",
+    "tipo_examen", "tipo_evaluacion", "tipo_actividad"
+})
+
+
+class CacheBackend(ABC):
+    """Interfaz común de los backends de caché (un backend incompleto no se puede instanciar)"""
+
+    nombre = "base"
+
+    @abstractmethod
+    def obtener(self, clave: str) -> Optional[Dict[str, Any]]:
+        """Valor guardado para `clave`, o None si no está o ha caducado"""
+
+    @abstractmethod
+    def guardar(self, clave: str, valor: Dict[str, Any]):
+        """Guarda `valor` en `clave`, expulsando entradas si se supera el máximo"""
+
+    @abstractmethod
+    def limpiar(self):
+        """Vacía la caché"""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Número de entradas guardadas"""
+
+
+class MemoriaLRUCache(CacheBackend):
+    """Caché en memoria con expiración (TTL) y desalojo LRU"""
+
+    nombre = "memoria"
+
+    def __init__(self, ttl_segundos: int, max_entradas: int):
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas = max_entradas
+        self._entradas: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                return None
+            creado, valor = entrada
+            if time.time() - creado > self.ttl_segundos:
+                del self._entradas[clave]
+                return None
+            self._entradas.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave: str, valor: Dict[str, Any]):
+        with self._lock:
+            self._entradas[clave] = (time.time(), valor)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self.max_entradas:
+                self._entradas.popitem(last=False)
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+
+    def __len__(self) -> int:
+        return len(self._entradas)
+
+
+class SQLiteCache(CacheBackend):
+    """Caché en disco (SQLite) con expiración (TTL) y desalojo por último acceso"""
+
+    nombre = "sqlite"
+
+    def __init__(self, ruta: str, ttl_segundos: int, max_entradas: int):
+        self.ruta = ruta
+        self.ttl_segundos = ttl_segundos
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._preparada = False
+
+    def _preparar(self, conn: sqlite3.Connection):
+        """Crea la tabla en la primera conexión (en un hilo), no al importar"""
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS generaciones (
+                clave TEXT PRIMARY KEY,
+                valor TEXT NOT NULL,
+                creado REAL NOT NULL,
+                accedido REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_generaciones_accedido ON generaciones(accedido)")
+        self._preparada = True
+
+    @contextmanager
+    def _conectar(self):
+        """Conexión de corta duración: confirma la transacción y se cierra al salir"""
+        conn = sqlite3.connect(self.ruta, timeout=10)
+        try:
+            with conn:
+                if not self._preparada:
+                    self._preparar(conn)
+                yield conn
+        finally:
+            conn.close()
+
+    def obtener(self, clave: str) -> Optional[Dict[str, Any]]:
+        ahora = time.time()
+        with self._lock, self._conectar() as conn:
+            fila = conn.execute(
+                "SELECT valor, creado FROM generaciones WHERE clave = ?", (clave,)
+            ).fetchone()
+            if fila is None:
+                return None
+            valor, creado = fila
+            if ahora - creado > self.ttl_segundos:
+                conn.execute("DELETE FROM generaciones WHERE clave = ?", (clave,))
+                return None
+            conn.execute("UPDATE generaciones SET accedido = ? WHERE clave = ?", (ahora, clave))
+            return json.loads(valor)
+
+    def guardar(self, clave: str, valor: Dict[str, Any]):
+        ahora = time.time()
+        with self._lock, self._conectar() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO generaciones (clave, valor, creado, accedido) VALUES (?, ?, ?, ?)",
+                (clave, json.dumps(valor, ensure_ascii=False), ahora, ahora)
+            )
+            conn.execute("DELETE FROM generaciones WHERE creado < ?", (ahora - self.ttl_segundos,))
+            conn.execute("""
+                DELETE FROM generaciones WHERE clave IN (
+                    SELECT clave FROM generaciones ORDER BY accedido DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entradas,))
+
+    def limpiar(self):
+        with self._lock, self._conectar() as conn:
+            conn.execute("DELETE FROM generaciones")
+
+    def __len__(self) -> int:
+        with self._conectar() as conn:
+            return conn.execute("SELECT COUNT(*) FROM generaciones").fetchone()[0]
+
+
+class CacheService:
+    """Caché de resultados de generación delante de DocumentService y los endpoints"""
+
+    def __init__(self, backend: Optional[CacheBackend]):
+        self.backend = backend
+        self.aciertos = 0
+        self.fallos = 0
+        self.omitidos = 0
+
+    @staticmethod
+    def normalizar(valor: Any, campo: Optional[str] = None) -> Any:
+        """
+        Normaliza el payload: espacios colapsados en todos los textos, y sin
+        distinguir mayúsculas solo en los campos de CAMPOS_SIN_MAYUSCULAS (en
+        el resto, como el tema o las indicaciones, cambian el documento)
+        """
+        if isinstance(valor, str):
+            valor = re.sub(r"\s+", " ", valor).strip()
+            return valor.casefold() if campo in CAMPOS_SIN_MAYUSCULAS else valor
+        if isinstance(valor, dict):
+            return {k: CacheService.normalizar(v, k) for k, v in valor.items()}
+        if isinstance(valor, (list, tuple)):
+            return [CacheService.normalizar(v, campo) for v in valor]
+        return valor
+
+    @staticmethod
+    def version_prompt(prompt: str) -> str:
+        """Identificador corto de la versión de un prompt (hash de su contenido normalizado)"""
+        return hashlib.sha256(CacheService.normalizar(prompt).encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def clave(
+        tipo: str,
+        datos: BaseModel,
+        prompt_version: str,
+        modelo: str,
+        temperature: float,
+        max_tokens: Optional[int] = None
+    ) -> str:
+        """
+        Clave canónica de una generación
+
+        Args:
+            tipo: Tipo de documento
+            datos: Petición Pydantic del usuario
+            prompt_version: Versión del prompt (la de su plantilla, o `version_prompt` de un texto libre)
+            modelo: Modelo de IA utilizado
+            temperature: Temperatura de la generación
+            max_tokens: Límite de tokens de salida
+        """
+        canonico = json.dumps({
+            "tipo": tipo,
+            "datos": CacheService.normalizar(datos.model_dump(mode="json")),
+            "prompt": prompt_version,
+            "modelo": modelo,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(canonico.encode("utf-8")).hexdigest()
+
+    async def obtener(self, clave: str, forzar: bool = False) -> Optional[Dict[str, Any]]:
+        """Busca una generación en caché y actualiza las estadísticas (forzar: se omite la caché)"""
+        if forzar:
+            self.omitidos += 1
+            return None
+        if self.backend is None:
+            return None
+        valor = await asyncio.to_thread(self.backend.obtener, clave)
+        if valor is None:
+            self.fallos += 1
+        else:
+            self.aciertos += 1
+        CACHE_CONSULTAS_TOTAL.labels("generaciones", "fallo" if valor is None else "acierto").inc()
+        return valor
+
+    async def guardar(self, clave: str, valor: Dict[str, Any]):
+        """Guarda una generación en caché"""
+        if self.backend is not None:
+            await asyncio.to_thread(self.backend.guardar, clave, valor)
+
+    async def obtener_o_generar(
+        self,
+        clave: str,
+        generar: Callable[[], Awaitable[Dict[str, Any]]],
+        forzar: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Devuelve la generación cacheada o la genera y la guarda
+
+        Args:
+            clave: Clave calculada con `clave`
+            generar: Corrutina que realiza la generación real
+            forzar: Ignora la caché (force_regenerate) pero guarda el nuevo resultado
+
+        Returns:
+            Dict de resultado, con "desde_cache" indicando si venía de caché
+        """
+        cacheado = await self.obtener(clave, forzar=forzar)
+        if cacheado is not None:
+            return {**cacheado, "desde_cache": True}
+
+        resultado = await generar()
+        # Lo generado por un proveedor de respaldo no se guarda con la clave del modelo
+        # configurado, ni un documento cortado por max_tokens
+        if not resultado.get("respaldo") and not resultado.get("truncado"):
+            await self.guardar(clave, resultado)
+        return {**resultado, "desde_cache": False}
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Estadísticas de aciertos/fallos de la caché"""
+        consultas = self.aciertos + self.fallos
+        return {
+            "backend": self.backend.nombre if self.backend else None,
+            "entradas": len(self.backend) if self.backend else 0,
+            "aciertos": self.aciertos,
+            "fallos": self.fallos,
+            "omitidos": self.omitidos,
+            "tasa_aciertos": round(self.aciertos / consultas, 3) if consultas else 0.0,
+            "ttl_segundos": settings.CACHE_TTL_SEGUNDOS,
+            "max_entradas": settings.CACHE_MAX_ENTRADAS
+        }
+
+
+def crear_backend() -> Optional[CacheBackend]:
+    """Crea el backend de caché según CACHE_BACKEND (memoria, sqlite o ninguno)"""
+    backend = settings.CACHE_BACKEND.lower()
+    if backend == "memoria":
+        return MemoriaLRUCache(settings.CACHE_TTL_SEGUNDOS, settings.CACHE_MAX_ENTRADAS)
+    if backend == "sqlite":
+        return SQLiteCache(settings.CACHE_SQLITE_RUTA, settings.CACHE_TTL_SEGUNDOS, settings.CACHE_MAX_ENTRADAS)
+    if backend == "ninguno":
+        return None
+    raise ValueError(f"Backend de caché no soportado: {backend}")
+
+
+# Instancia global del servicio
+cache_service = CacheService(crear_backend())
@@ -0,0 +1,183 @@
+"""
+Coalescedor de Peticiones (single-flight)
+Las llamadas concurrentes con las mismas entradas comparten una única llamada
+al proveedor de IA y su resultado
+"""
+import asyncio
+import copy
+import hashlib
+import json
+from typing import Dict, Any, List, Optional, Callable, Awaitable, AsyncIterator
+
+
+class TransmisionCompartida:
+    """
+    Stream de eventos compartido entre varios suscriptores.
+
+    Un único consumidor lee la fuente y guarda los eventos; cada suscriptor
+    recibe primero todo lo ya emitido (replay del prefijo) y después los
+    eventos nuevos según llegan.
+
+    Si se van todos los suscriptores antes del final se llama a `al_abandonar`
+    (para que nadie más se una) y se cancela la lectura de la fuente.
+    """
+
+    def __init__(self, fuente: AsyncIterator[Dict[str, Any]], al_abandonar: Optional[Callable[[], None]] = None):
+        self.eventos: List[Dict[str, Any]] = []
+        self.terminada = False
+        self.error: Optional[BaseException] = None
+        self.suscriptores = 0
+        self._al_abandonar = al_abandonar
+        self._cambio = asyncio.Condition()
+        self._tarea = asyncio.ensure_future(self._consumir(fuente))
+
+    async def _consumir(self, fuente: AsyncIterator[Dict[str, Any]]):
+        try:
+            async for evento in fuente:
+                async with self._cambio:
+                    self.eventos.append(evento)
+                    self._cambio.notify_all()
+        except Exception as e:
+            self.error = e
+        except asyncio.CancelledError:
+            # Un stream cortado no puede pasar por completo (sin "fin" ni error)
+            self.error = RuntimeError("La transmisión se canceló al quedarse sin suscriptores")
+            raise
+        finally:
+            self.terminada = True
+            async with self._cambio:
+                self._cambio.notify_all()
+
+    def add_done_callback(self, callback: Callable[[asyncio.Future], None]):
+        self._tarea.add_done_callback(callback)
+
+    async def suscribir(self) -> AsyncIterator[Dict[str, Any]]:
+        """Itera todos los eventos de la transmisión desde el principio"""
+        self.suscriptores += 1
+        leidos = 0
+        try:
+            while True:
+                async with self._cambio:
+                    await self._cambio.wait_for(lambda: leidos < len(self.eventos) or self.terminada)
+                    nuevos = self.eventos[leidos:]
+                    terminada = self.terminada
+
+                for evento in nuevos:
+                    yield copy.copy(evento)
+                leidos += len(nuevos)
+
+                if terminada and leidos >= len(self.eventos):
+                    if self.error is not None:
+                        raise self.error
+                    return
+        finally:
+            self.suscriptores -= 1
+            # Si ya no queda nadie escuchando no tiene sentido seguir pagando tokens
+            if self.suscriptores == 0 and not self.terminada:
+                if self._al_abandonar is not None:
+                    self._al_abandonar()
+                self._tarea.cancel()
+
+
+class CoalescedorPeticiones:
+    """Deduplicación en vuelo de generaciones idénticas (normales y en streaming)"""
+
+    def __init__(self, activo: bool = True):
+        self.activo = activo
+        self._en_vuelo: Dict[str, asyncio.Future] = {}
+        self._esperas: Dict[asyncio.Future, int] = {}
+        self._transmisiones: Dict[str, TransmisionCompartida] = {}
+        self.llamadas_upstream = 0
+        self.esperas_coalescidas = 0
+        self.streams_upstream = 0
+        self.streams_coalescidos = 0
+
+    @staticmethod
+    def clave(*partes: Any) -> str:
+        """Clave de deduplicación a partir de las entradas de la llamada"""
+        canonico = json.dumps(partes, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(canonico.encode("utf-8")).hexdigest()
+
+    async def ejecutar(self, clave: str, generar: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Ejecuta `generar` o se une a una ejecución idéntica ya en curso
+
+        La llamada real corre en su propia tarea, así que la desconexión de un
+        cliente (o la cancelación de un trabajo) no cancela la generación del
+        resto de esperas; cuando se cancela la última, se cancela también ella.
+        """
+        if not self.activo:
+            return await generar()
+
+        def retirar(tarea: asyncio.Future):
+            if self._en_vuelo.get(clave) is tarea:
+                del self._en_vuelo[clave]
+
+        tarea = self._en_vuelo.get(clave)
+        if tarea is None:
+            self.llamadas_upstream += 1
+            tarea = asyncio.ensure_future(generar())
+            self._en_vuelo[clave] = tarea
+            tarea.add_done_callback(retirar)
+        else:
+            self.esperas_coalescidas += 1
+
+        self._esperas[tarea] = self._esperas.get(tarea, 0) + 1
+        try:
+            return copy.copy(await asyncio.shield(tarea))
+        finally:
+            self._esperas[tarea] -= 1
+            if not self._esperas[tarea]:
+                del self._esperas[tarea]
+                # Ya nadie espera el resultado: no se sigue pagando la generación
+                if not tarea.done():
+                    retirar(tarea)
+                    tarea.cancel()
+
+    async def transmitir(
+        self,
+        clave: str,
+        crear_fuente: Callable[[], AsyncIterator[Dict[str, Any]]]
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Itera un stream de eventos compartido con otras peticiones idénticas
+
+        Quien llega tarde recibe primero el prefijo ya transmitido.
+        """
+        if not self.activo:
+            async for evento in crear_fuente():
+                yield evento
+            return
+
+        def retirar():
+            # Solo si sigue siendo la registrada: tras abandonarse puede haber otra nueva
+            if self._transmisiones.get(clave) is transmision:
+                del self._transmisiones[clave]
+
+        transmision = self._transmisiones.get(clave)
+        if transmision is None:
+            self.streams_upstream += 1
+            transmision = TransmisionCompartida(crear_fuente(), al_abandonar=retirar)
+            self._transmisiones[clave] = transmision
+            transmision.add_done_callback(lambda _: retirar())
+        else:
+            self.streams_coalescidos += 1
+
+        suscripcion = transmision.suscribir()
+        try:
+            async for evento in suscripcion:
+                yield evento
+        finally:
+            # Si este cliente se va, su suscripción se da de baja ya y no al recolectarla
+            await suscripcion.aclose()
+
+    def estadisticas(self) -> Dict[str, Any]:
+        """Métricas de coalescencia"""
+        return {
+            "activo": self.activo,
+            "llamadas_upstream": self.llamadas_upstream,
+            "esperas_coalescidas": self.esperas_coalescidas,
+            "streams_upstream": self.streams_upstream,
+            "streams_coalescidos": self.streams_coalescidos,
+            "en_vuelo": len(self._en_vuelo) + len(self._transmisiones)
+        }
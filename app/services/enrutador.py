@@ -0,0 +1,248 @@
+"""
+Enrutador de Proveedores de IA
+Failover ordenado (Claude -> OpenAI -> Gemini) y hedging: si el proveedor
+tarda más que su percentil de latencia habitual se lanza el siguiente y
+gana el primero que responda
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
+from app.services.limitador import ProveedorSaturadoError
+from app.services.trazas import trazador, CLIENTE
+from app.services.metricas import registrar_tokens
+
+
+def registrar_llamada(span, resultado: Dict[str, Any], duracion: float):
+    """Tokens y tiempos de una llamada correcta en su span, en el resumen de la petición y en las métricas"""
+    if span:
+        span.atributo("gen_ai.request.model", resultado.get("modelo"))
+        span.atributo("gen_ai.usage.input_tokens", resultado.get("input_tokens"))
+        span.atributo("gen_ai.usage.output_tokens", resultado.get("output_tokens"))
+        span.atributo("gen_ai.usage.cache_read_input_tokens", resultado.get("cache_read_input_tokens"))
+    trazador.registrar(
+        upstream_ms=duracion * 1000,
+        tokens_entrada=resultado.get("input_tokens"),
+        tokens_salida=resultado.get("output_tokens"),
+        tokens_cache=resultado.get("cache_read_input_tokens")
+    )
+    registrar_tokens(resultado)
+
+
+def error_final(errores: List[Tuple[str, Exception]]) -> Exception:
+    """
+    Error a devolver cuando fallan todos los proveedores: si todos estaban
+    saturados se conserva ProveedorSaturadoError (la API responde 429/503)
+    """
+    saturados = [e for _, e in errores if isinstance(e, ProveedorSaturadoError)]
+    if saturados and len(saturados) == len(errores):
+        return min(saturados, key=lambda e: e.reintentar_en)
+    return Exception("Todos los proveedores de IA fallaron. " + " | ".join(f"{p}: {e}" for p, e in errores))
+
+
+class HistogramaLatencia:
+    """Latencias recientes de un proveedor y generador (ventana deslizante) con percentiles"""
+
+    def __init__(self, ventana: int = 500):
+        self.muestras: deque = deque(maxlen=ventana)
+        self.total = 0
+
+    def registrar(self, segundos: float):
+        self.muestras.append(segundos)
+        self.total += 1
+
+    def percentil(self, p: float) -> Optional[float]:
+        """Percentil p (0-100) de la ventana, o None si no hay muestras"""
+        if not self.muestras:
+            return None
+        ordenadas = sorted(self.muestras)
+        indice = min(len(ordenadas) - 1, int(round(p / 100 * (len(ordenadas) - 1))))
+        return ordenadas[indice]
+
+    def resumen(self) -> Dict[str, Any]:
+        return {
+            "muestras": len(self.muestras),
+            "total": self.total,
+            "p50": self.percentil(50),
+            "p95": self.percentil(95),
+            "p99": self.percentil(99)
+        }
+
+
+class EnrutadorProveedores:
+    """
+    Elige y ejecuta el proveedor de cada llamada.
+
+    El orden es el proveedor configurado seguido del resto de `orden`, solo
+    con los clientes inicializados. Un proveedor que acaba de fallar pasa al
+    final durante `enfriamiento` segundos, para que un incidente no sume un
+    timeout a cada petición.
+
+    Las latencias se guardan por (proveedor, generador): una programación
+    anual y un botón de emergencia tardan órdenes de magnitud distintos, y
+    con un solo histograma las largas se duplicarían siempre y las cortas nunca.
+    El timeout de cada llamada lo aplica el limitador desde la admisión.
+    """
+
+    def __init__(
+        self,
+        orden: List[str],
+        failover: bool = True,
+        hedging: bool = False,
+        percentil_hedging: float = 95,
+        min_muestras_hedging: int = 20,
+        enfriamiento: float = 30
+    ):
+        self.orden_base = orden
+        self.failover = failover
+        self.hedging = hedging
+        self.percentil_hedging = percentil_hedging
+        self.min_muestras_hedging = min_muestras_hedging
+        self.enfriamiento = enfriamiento
+        self.latencias: Dict[Tuple[str, Optional[str]], HistogramaLatencia] = {}
+        self.errores: Dict[str, int] = {p: 0 for p in orden}
+        self._penalizado_hasta: Dict[str, float] = {}
+        self.respuestas_respaldo = 0
+        self.hedges = 0
+        self.hedges_ganados = 0
+
+    def candidatos(self, principal: str, disponibles: List[str]) -> List[str]:
+        """Proveedores a intentar, en orden"""
+        orden = [principal] + [p for p in self.orden_base if p != principal]
+        orden = [p for p in orden if p in disponibles]
+        if not self.failover:
+            return orden[:1]
+        ahora = time.monotonic()
+        sanos = [p for p in orden if self._penalizado_hasta.get(p, 0) <= ahora]
+        return sanos + [p for p in orden if p not in sanos]
+
+    def retardo_hedging(self, proveedor: str, generador: Optional[str] = None) -> Optional[float]:
+        """Cuánto esperar al proveedor antes de lanzar el siguiente (None: no hay hedging)"""
+        if not self.hedging:
+            return None
+        histograma = self.latencias.get((proveedor, generador))
+        if histograma is None or len(histograma.muestras) < self.min_muestras_hedging:
+            return None
+        return histograma.percentil(self.percentil_hedging)
+
+    def registrar_error(self, proveedor: str):
+        """Cuenta el fallo y manda al proveedor al final de la cola durante el enfriamiento"""
+        self.errores[proveedor] = self.errores.get(proveedor, 0) + 1
+        self._penalizado_hasta[proveedor] = time.monotonic() + self.enfriamiento
+
+    def registrar_latencia(self, proveedor: str, segundos: float, generador: Optional[str] = None):
+        """Añade una llamada correcta al histograma del proveedor y el generador"""
+        self.latencias.setdefault((proveedor, generador), HistogramaLatencia()).registrar(segundos)
+        self._penalizado_hasta.pop(proveedor, None)
+
+    async def _intentar(
+        self,
+        proveedor: str,
+        llamar: Callable[[str], Awaitable[Dict[str, Any]]],
+        generador: Optional[str]
+    ) -> Dict[str, Any]:
+        """Una llamada a un proveedor; alimenta su histograma"""
+        with trazador.span(f"llm {proveedor}", CLIENTE, **{"gen_ai.system": proveedor}) as span:
+            inicio = time.monotonic()
+            try:
+                resultado = await llamar(proveedor)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.registrar_error(proveedor)
+                raise
+            duracion = time.monotonic() - inicio
+            self.registrar_latencia(proveedor, duracion, generador)
+            registrar_llamada(span, resultado, duracion)
+            return resultado
+
+    async def ejecutar(
+        self,
+        principal: str,
+        disponibles: List[str],
+        llamar: Callable[[str], Awaitable[Dict[str, Any]]],
+        generador: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Ejecuta `llamar(proveedor)` con failover y, si está activo, hedging
+        según las latencias de `generador` en cada proveedor
+
+        Returns:
+            Resultado del primer proveedor que responde, con "respaldo" a True
+            si no es el proveedor configurado
+        """
+        candidatos = self.candidatos(principal, disponibles)
+        if not candidatos:
+            raise Exception(f"Ningún proveedor de IA inicializado (configurado: {principal})")
+
+        en_vuelo: Dict[asyncio.Task, str] = {}
+        de_hedging = set()
+        errores = []
+        lanzados = 0
+
+        def lanzar() -> asyncio.Task:
+            nonlocal lanzados
+            proveedor = candidatos[lanzados]
+            lanzados += 1
+            tarea = asyncio.create_task(self._intentar(proveedor, llamar, generador))
+            en_vuelo[tarea] = proveedor
+            return tarea
+
+        lanzar()
+        try:
+            while en_vuelo:
+                espera = None
+                if lanzados < len(candidatos):
+                    espera = self.retardo_hedging(candidatos[lanzados - 1], generador)
+
+                hechas, _ = await asyncio.wait(en_vuelo, timeout=espera, return_when=asyncio.FIRST_COMPLETED)
+                if not hechas:
+                    # El proveedor va más lento que su percentil: lanzamos el siguiente en paralelo
+                    self.hedges += 1
+                    print(f"   ⏱️ {candidatos[lanzados - 1]} supera su p{self.percentil_hedging:g}, lanzando {candidatos[lanzados]}")
+                    de_hedging.add(lanzar())
+                    continue
+
+                for tarea in hechas:
+                    proveedor = en_vuelo.pop(tarea)
+                    if tarea.exception() is None:
+                        resultado = tarea.result()
+                        resultado["respaldo"] = proveedor != principal
+                        if resultado["respaldo"]:
+                            self.respuestas_respaldo += 1
+                        if tarea in de_hedging:
+                            self.hedges_ganados += 1
+                        return resultado
+                    errores.append((proveedor, tarea.exception()))
+                    print(f"   ⚠️ Falla {proveedor}: {tarea.exception()}")
+
+                if not en_vuelo and lanzados < len(candidatos):
+                    lanzar()
+
+            raise error_final(errores)
+        finally:
+            for tarea in en_vuelo:
+                tarea.cancel()
+
+    def estadisticas(self) -> Dict[str, Any]:
+        ahora = time.monotonic()
+        return {
+            "failover": self.failover,
+            "hedging": self.hedging,
+            "percentil_hedging": self.percentil_hedging,
+            "respuestas_respaldo": self.respuestas_respaldo,
+            "hedges": self.hedges,
+            "hedges_ganados": self.hedges_ganados,
+            "proveedores": {
+                proveedor: {
+                    "errores": self.errores.get(proveedor, 0),
+                    "penalizado": self._penalizado_hasta.get(proveedor, 0) > ahora,
+                    "latencias": {
+                        generador or "sin_generador": histograma.resumen()
+                        for (nombre, generador), histograma in self.latencias.items()
+                        if nombre == proveedor
+                    }
+                }
+                for proveedor in dict.fromkeys(self.orden_base + [p for p, _ in self.latencias])
+            }
+        }
@@ -1,14 +1,525 @@
 """
 Servicio de Exportación de Documentos
-Convierte Markdown a Word (.docx) con formato profesional
+Convierte Markdown a Word (.docx) y PDF con formato profesional
 """
+import hashlib
+import io
 import re
-from typing import Dict, Any, Optional
+import shutil
+import subprocess
+import threading
+import unicodedata
+import zipfile
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional, List, Tuple
+from xml.sax.saxutils import escape
 from docx import Document
+from docx.oxml import parse_xml
+from docx.oxml.ns import nsdecls, qn
 from docx.shared import Pt, Inches, RGBColor
 from docx.enum.text import WD_ALIGN_PARAGRAPH
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.platypus import (
+    HRFlowable,
+    Paragraph,
+    Preformatted,
+    SimpleDocTemplate,
+    Spacer,
+    Table,
+    TableStyle
+)
 import tempfile
 import os
+from config import settings
+from app.services import markdown_ast
+from app.services.markdown_ast import (
+    analizar_markdown,
+    texto_plano,
+    Bloque,
+    Inline,
+    Fragmento,
+    Encabezado,
+    Parrafo,
+    Elemento,
+    Tabla,
+    Codigo,
+    Cita,
+    Separador,
+    NEGRITA,
+    CURSIVA,
+    CODIGO
+)
+
+
+# Versión del código de maquetación: cualquier cambio en este módulo o en el
+# analizador invalida las exportaciones cacheadas
+def _version_codigo() -> str:
+    huella = hashlib.sha256()
+    for modulo in (__file__, markdown_ast.__file__):
+        with open(modulo, "rb") as fuente:
+            huella.update(fuente.read())
+    return huella.hexdigest()[:16]
+
+
+# ============================================
+# ESCRITURA DEL AST EN WORDPROCESSINGML
+# ============================================
+
+# Caracteres de control que no admite XML 1.0
+_CONTROL_XML = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+# Ancho útil de la página en twips (plantilla por defecto: 6 pulgadas)
+_ANCHO_TEXTO = 8640
+
+_ESTILOS_VIÑETA = ("ListBullet", "ListBullet2", "ListBullet3")
+_ESTILOS_NUMERADA = ("ListContinue", "ListContinue2", "ListContinue3")
+
+# Estilos que usa la maquetación: styleId de la plantilla base -> nombre
+# interno (w:name) del estilo integrado de Word. El styleId cambia con el
+# idioma de Word ("Ttulo1", "Listaconvietas" en español) y el nombre no
+_NOMBRES_ESTILOS = {
+    **{f"Heading{nivel}": f"heading {nivel}" for nivel in range(1, 10)},
+    "Title": "title",
+    "Quote": "quote",
+    "NoSpacing": "no spacing",
+    "TableGrid": "table grid",
+    **{estilo: "list bullet" + (f" {n}" if n > 1 else "") for n, estilo in enumerate(_ESTILOS_VIÑETA, 1)},
+    **{estilo: "list continue" + (f" {n}" if n > 1 else "") for n, estilo in enumerate(_ESTILOS_NUMERADA, 1)},
+}
+
+_REFERENCIA_ESTILO = re.compile(r'(<w:(?:pStyle|tblStyle) w:val=")([^"]*)"')
+
+
+def _xml_texto(texto: str) -> str:
+    return escape(_CONTROL_XML.sub("", texto))
+
+
+def _xml_runs(contenido: Inline) -> str:
+    """Runs de un contenido en línea"""
+    runs = []
+    for fragmento in contenido:
+        propiedades = ""
+        if fragmento.formato & NEGRITA:
+            propiedades += "<w:b/>"
+        if fragmento.formato & CURSIVA:
+            propiedades += "<w:i/>"
+        if fragmento.formato & CODIGO:
+            propiedades += '<w:rFonts w:ascii="Consolas" w:hAnsi="Consolas"/>'
+        runs.append(
+            f'<w:r>{f"<w:rPr>{propiedades}</w:rPr>" if propiedades else ""}'
+            f'<w:t xml:space="preserve">{_xml_texto(fragmento.texto)}</w:t></w:r>'
+        )
+    return "".join(runs)
+
+
+def _xml_parrafo(contenido: str, estilo: str = "", propiedades: str = "") -> str:
+    estilo_xml = f'<w:pStyle w:val="{estilo}"/>' if estilo else ""
+    ppr = f"<w:pPr>{estilo_xml}{propiedades}</w:pPr>" if estilo_xml or propiedades else ""
+    return f"<w:p>{ppr}{contenido}</w:p>"
+
+
+def _docx_encabezado(bloque: Encabezado) -> str:
+    return _xml_parrafo(_xml_runs(bloque.contenido), f"Heading{min(bloque.nivel, 9)}")
+
+
+def _docx_parrafo(bloque: Parrafo) -> str:
+    return _xml_parrafo(_xml_runs(bloque.contenido))
+
+
+def _docx_elemento(bloque: Elemento) -> str:
+    nivel = min(bloque.nivel, 2)
+    if bloque.ordenada:
+        # Se conserva el número escrito por el modelo: la numeración automática
+        # de Word continuaría entre listas distintas del documento
+        marcador = f'<w:r><w:t xml:space="preserve">{_xml_texto(bloque.marcador)} </w:t></w:r>'
+        return _xml_parrafo(marcador + _xml_runs(bloque.contenido), _ESTILOS_NUMERADA[nivel])
+    return _xml_parrafo(_xml_runs(bloque.contenido), _ESTILOS_VIÑETA[nivel])
+
+
+def _docx_tabla(bloque: Tabla) -> str:
+    columnas = max(len(bloque.cabecera), 1)
+    ancho = _ANCHO_TEXTO // columnas
+
+    def fila(celdas, cabecera: bool) -> str:
+        trpr = "<w:trPr><w:tblHeader/></w:trPr>" if cabecera else ""
+        tcpr = f'<w:tcPr><w:tcW w:w="{ancho}" w:type="dxa"/>'
+        if cabecera:
+            tcpr += '<w:shd w:val="clear" w:color="auto" w:fill="D9E2F3"/>'
+        tcpr += "</w:tcPr>"
+        contenido = []
+        for celda in celdas:
+            if cabecera:
+                celda = tuple(f._replace(formato=f.formato | NEGRITA) for f in celda)
+            contenido.append(f"<w:tc>{tcpr}{_xml_parrafo(_xml_runs(celda))}</w:tc>")
+        return f"<w:tr>{trpr}{''.join(contenido)}</w:tr>"
+
+    rejilla = f'<w:gridCol w:w="{ancho}"/>' * columnas
+    return (
+        '<w:tbl><w:tblPr><w:tblStyle w:val="TableGrid"/><w:tblW w:w="0" w:type="auto"/></w:tblPr>'
+        f"<w:tblGrid>{rejilla}</w:tblGrid>"
+        f"{fila(bloque.cabecera, True)}{''.join(fila(f, False) for f in bloque.filas)}</w:tbl>"
+        # Word no admite dos tablas seguidas sin párrafo intermedio
+        "<w:p/>"
+    )
+
+
+def _docx_codigo(bloque: Codigo) -> str:
+    sombreado = '<w:shd w:val="clear" w:color="auto" w:fill="F2F2F2"/>'
+    fuente = '<w:rPr><w:rFonts w:ascii="Consolas" w:hAnsi="Consolas"/><w:sz w:val="18"/></w:rPr>'
+    return "".join(
+        _xml_parrafo(f'<w:r>{fuente}<w:t xml:space="preserve">{_xml_texto(linea)}</w:t></w:r>', "NoSpacing", sombreado)
+        for linea in bloque.texto.split("\n")
+    )
+
+
+def _docx_cita(bloque: Cita) -> str:
+    return _xml_parrafo(_xml_runs(bloque.contenido), "Quote")
+
+
+def _docx_separador(bloque: Separador) -> str:
+    return _xml_parrafo("", "", '<w:pBdr><w:bottom w:val="single" w:sz="6" w:space="1" w:color="auto"/></w:pBdr>')
+
+
+_ESCRITORES_DOCX = {
+    Encabezado: _docx_encabezado,
+    Parrafo: _docx_parrafo,
+    Elemento: _docx_elemento,
+    Tabla: _docx_tabla,
+    Codigo: _docx_codigo,
+    Cita: _docx_cita,
+    Separador: _docx_separador,
+}
+
+
+def _xml_cuerpo(bloques: List[Bloque]) -> str:
+    """WordprocessingML de una lista de bloques (contenido de <w:body>)"""
+    partes = []
+    for bloque in bloques:
+        escritor = _ESCRITORES_DOCX.get(type(bloque))
+        if escritor:
+            partes.append(escritor(bloque))
+    return "".join(partes)
+
+
+def _xml_titulo(titulo: str) -> str:
+    """Título principal centrado (equivale a add_heading(titulo, level=0))"""
+    return _xml_parrafo(_xml_runs((Fragmento(titulo),)), "Title", '<w:jc w:val="center"/>')
+
+
+# ============================================
+# PLANTILLAS PRECOMPILADAS
+# ============================================
+
+_PARTE_DOCUMENTO = "word/document.xml"
+_PARTE_PROPIEDADES = "docProps/core.xml"
+
+_PROPIEDADES_XML = (
+    "<?xml version='1.0' encoding='UTF-8' standalone='yes'?>\n"
+    '<cp:coreProperties xmlns:cp="http://schemas.openxmlformats.org/package/2006/metadata/core-properties" '
+    'xmlns:dc="http://purl.org/dc/elements/1.1/" xmlns:dcterms="http://purl.org/dc/terms/" '
+    'xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance">'
+    "<dc:title>{titulo}</dc:title><dc:creator>{autor}</dc:creator>"
+    "<cp:lastModifiedBy>{autor}</cp:lastModifiedBy><cp:revision>1</cp:revision>"
+    '<dcterms:created xsi:type="dcterms:W3CDTF">{fecha}</dcterms:created>'
+    '<dcterms:modified xsi:type="dcterms:W3CDTF">{fecha}</dcterms:modified>'
+    "</cp:coreProperties>"
+)
+
+
+class PlantillaDocx:
+    """
+    Plantilla .docx compilada una sola vez
+    
+    Guarda el paquete ya comprimido sin el cuerpo ni las propiedades, y el
+    document.xml partido alrededor del cuerpo. Cada exportación copia esos
+    bytes y añade solo las dos partes que cambian: estilos, tema, cabecera y
+    pie (cientos de KB) no se vuelven a parsear, serializar ni comprimir.
+    """
+    
+    def __init__(self, doc: Document, nombre: str = "base"):
+        self.nombre = nombre
+        self.estilos = self._resolver_estilos(doc)
+        
+        # El cuerpo de la plantilla se descarta; solo se conserva la sección
+        cuerpo = doc.element.body
+        for elemento in list(cuerpo):
+            if elemento is not cuerpo.sectPr:
+                cuerpo.remove(elemento)
+        
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        
+        estaticas = io.BytesIO()
+        with zipfile.ZipFile(io.BytesIO(buffer.getvalue())) as origen, \
+                zipfile.ZipFile(estaticas, "w", zipfile.ZIP_DEFLATED) as destino:
+            for info in origen.infolist():
+                if info.filename == _PARTE_DOCUMENTO:
+                    documento = origen.read(info).decode("utf-8")
+                elif info.filename != _PARTE_PROPIEDADES:
+                    destino.writestr(info, origen.read(info))
+        self._paquete = estaticas.getvalue()
+        
+        documento = documento.replace("<w:body/>", "<w:body></w:body>")
+        corte = documento.index("<w:body>") + len("<w:body>")
+        self._prefijo = documento[:corte]
+        self._sufijo = documento[corte:]
+        
+        # Cambia si cambia cualquier parte de la plantilla (clave de la caché de exportaciones)
+        huella = hashlib.sha256(self._paquete)
+        huella.update(documento.encode("utf-8"))
+        self.version = huella.hexdigest()[:16]
+    
+    @classmethod
+    def desde_fichero(cls, ruta: str) -> "PlantillaDocx":
+        return cls(Document(ruta), os.path.basename(ruta))
+    
+    @staticmethod
+    def _resolver_estilos(doc: Document) -> Dict[str, str]:
+        """
+        styleId que tiene en esta plantilla cada estilo de la maquetación,
+        buscado por su nombre interno; solo los que difieren de la base
+        """
+        por_nombre: Dict[str, str] = {}
+        for estilo in doc.styles.element.findall(qn("w:style")):
+            nombre = estilo.find(qn("w:name"))
+            if nombre is not None and estilo.get(qn("w:styleId")):
+                por_nombre.setdefault(nombre.get(qn("w:val"), "").lower(), estilo.get(qn("w:styleId")))
+        return {
+            estilo: por_nombre[nombre]
+            for estilo, nombre in _NOMBRES_ESTILOS.items()
+            if nombre in por_nombre and por_nombre[nombre] != estilo
+        }
+    
+    def renderizar(self, cuerpo_xml: str, titulo: str, autor: str) -> bytes:
+        """Paquete .docx completo con el cuerpo y las propiedades dados"""
+        cuerpo = f"{_xml_titulo(titulo)}{cuerpo_xml}"
+        if self.estilos:
+            cuerpo = _REFERENCIA_ESTILO.sub(
+                lambda m: f'{m.group(1)}{self.estilos.get(m.group(2), m.group(2))}"', cuerpo
+            )
+        buffer = io.BytesIO(self._paquete)
+        with zipfile.ZipFile(buffer, "a", zipfile.ZIP_DEFLATED) as paquete:
+            paquete.writestr(
+                _PARTE_DOCUMENTO,
+                f"{self._prefijo}{cuerpo}{self._sufijo}".encode("utf-8")
+            )
+            paquete.writestr(
+                _PARTE_PROPIEDADES,
+                _PROPIEDADES_XML.format(
+                    titulo=_xml_texto(titulo),
+                    autor=_xml_texto(autor),
+                    fecha=datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+                ).encode("utf-8")
+            )
+        return buffer.getvalue()
+
+
+class PlantillasDocx:
+    """
+    Plantilla base de DocentIA y plantillas propias de cada centro
+    
+    La base se compila en el primer uso. Las de centro se leen de
+    `<PLANTILLAS_DOCX_DIR>/<centro>.docx` y se guardan en un LRU; si el
+    fichero cambia en disco se vuelve a compilar.
+    """
+    
+    def __init__(self, directorio: str, max_plantillas: int = 16, logo: str = ""):
+        self.directorio = directorio
+        self.max_plantillas = max_plantillas
+        self.logo = logo
+        self._base: Optional[PlantillaDocx] = None
+        self._centros: "OrderedDict[str, tuple[float, PlantillaDocx]]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def _crear_base(self) -> PlantillaDocx:
+        doc = Document()
+        
+        # Hueco del logo del centro en la cabecera
+        cabecera = doc.sections[0].header.paragraphs[0]
+        cabecera.alignment = WD_ALIGN_PARAGRAPH.RIGHT
+        if self.logo and os.path.exists(self.logo):
+            cabecera.add_run().add_picture(self.logo, height=Inches(0.6))
+        
+        ExportService._añadir_pie_pagina(doc)
+        return PlantillaDocx(doc)
+    
+    def base(self) -> PlantillaDocx:
+        if self._base is None:
+            with self._lock:
+                if self._base is None:
+                    self._base = self._crear_base()
+        return self._base
+    
+    def obtener(self, centro: Optional[str] = None) -> PlantillaDocx:
+        """Plantilla del centro, o la base si no se indica o no existe"""
+        if not centro:
+            return self.base()
+        
+        ruta = os.path.join(self.directorio, f"{os.path.basename(centro)}.docx")
+        try:
+            modificado = os.path.getmtime(ruta)
+        except OSError:
+            print(f"⚠️ Plantilla de centro no encontrada: {ruta}. Se usa la base")
+            return self.base()
+        
+        with self._lock:
+            entrada = self._centros.get(centro)
+            if entrada and entrada[0] == modificado:
+                self._centros.move_to_end(centro)
+                return entrada[1]
+        
+        plantilla = PlantillaDocx.desde_fichero(ruta)
+        with self._lock:
+            self._centros[centro] = (modificado, plantilla)
+            self._centros.move_to_end(centro)
+            while len(self._centros) > self.max_plantillas:
+                self._centros.popitem(last=False)
+        return plantilla
+    
+    def estadisticas(self) -> Dict[str, Any]:
+        return {
+            "base_compilada": self._base is not None,
+            "centros": list(self._centros),
+            "max_plantillas": self.max_plantillas
+        }
+
+
+# ============================================
+# ESCRITURA DEL AST EN PDF (reportlab)
+# ============================================
+
+_PIE_PAGINA = "Generado con DocentIA - Recupera tu tiempo"
+_MARGEN_PDF = 2 * cm
+
+
+def _estilos_pdf() -> Dict[str, ParagraphStyle]:
+    """Estilos de reportlab equivalentes a los de la plantilla Word"""
+    base = getSampleStyleSheet()
+    estilos = {
+        "titulo": ParagraphStyle("Titulo", parent=base["Title"], textColor=colors.HexColor("#17365D")),
+        "parrafo": ParagraphStyle("Parrafo", parent=base["BodyText"], spaceAfter=4),
+        "celda": ParagraphStyle("Celda", parent=base["BodyText"], fontSize=9, leading=11),
+        "codigo": ParagraphStyle(
+            "Codigo", parent=base["Code"], fontSize=8, leading=10,
+            backColor=colors.HexColor("#F2F2F2"), borderPadding=4, leftIndent=4
+        ),
+        "cita": ParagraphStyle(
+            "Cita", parent=base["BodyText"], fontName="Helvetica-Oblique",
+            leftIndent=18, textColor=colors.HexColor("#404040")
+        ),
+    }
+    for nivel in range(1, 7):
+        estilos[f"h{nivel}"] = ParagraphStyle(
+            f"Encabezado{nivel}", parent=base[f"Heading{min(nivel, 6)}"], textColor=colors.HexColor("#365F91")
+        )
+    for nivel in range(3):
+        estilos[f"lista{nivel}"] = ParagraphStyle(
+            f"Lista{nivel}", parent=estilos["parrafo"], leftIndent=18 * (nivel + 1), bulletIndent=18 * nivel + 6,
+            spaceAfter=2
+        )
+    return estilos
+
+
+def _marcado_pdf(contenido: Inline) -> str:
+    """Fragmentos en línea como el mini-marcado de Paragraph"""
+    partes = []
+    for fragmento in contenido:
+        texto = _xml_texto(fragmento.texto)
+        if fragmento.formato & CODIGO:
+            texto = f'<font face="Courier">{texto}</font>'
+        if fragmento.formato & CURSIVA:
+            texto = f"<i>{texto}</i>"
+        if fragmento.formato & NEGRITA:
+            texto = f"<b>{texto}</b>"
+        partes.append(texto)
+    return "".join(partes)
+
+
+def _historia_pdf(bloques: List[Bloque], titulo: str, estilos: Dict[str, ParagraphStyle], ancho: float) -> list:
+    """Flowables de reportlab para el título y los bloques del AST"""
+    historia = [Paragraph(_xml_texto(titulo), estilos["titulo"])]
+    for bloque in bloques:
+        tipo = type(bloque)
+        if tipo is Encabezado:
+            historia.append(Paragraph(_marcado_pdf(bloque.contenido), estilos[f"h{min(bloque.nivel, 6)}"]))
+        elif tipo is Parrafo:
+            historia.append(Paragraph(_marcado_pdf(bloque.contenido), estilos["parrafo"]))
+        elif tipo is Elemento:
+            historia.append(Paragraph(
+                _marcado_pdf(bloque.contenido),
+                estilos[f"lista{min(bloque.nivel, 2)}"],
+                bulletText=bloque.marcador if bloque.ordenada else "•"
+            ))
+        elif tipo is Tabla:
+            columnas = max(len(bloque.cabecera), 1)
+            filas = [[Paragraph(f"<b>{_marcado_pdf(c)}</b>", estilos["celda"]) for c in bloque.cabecera]]
+            filas += [[Paragraph(_marcado_pdf(c), estilos["celda"]) for c in fila] for fila in bloque.filas]
+            tabla = Table(filas, colWidths=[ancho / columnas] * columnas, repeatRows=1)
+            tabla.setStyle(TableStyle([
+                ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+                ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#D9E2F3")),
+                ("VALIGN", (0, 0), (-1, -1), "TOP"),
+            ]))
+            historia.extend([tabla, Spacer(1, 6)])
+        elif tipo is Codigo:
+            historia.append(Preformatted(_CONTROL_XML.sub("", bloque.texto), estilos["codigo"]))
+        elif tipo is Cita:
+            historia.append(Paragraph(_marcado_pdf(bloque.contenido), estilos["cita"]))
+        elif tipo is Separador:
+            historia.append(HRFlowable(width="100%", thickness=0.5, color=colors.grey, spaceBefore=4, spaceAfter=4))
+    return historia
+
+
+def _pie_pdf(canvas, doc):
+    canvas.saveState()
+    canvas.setFont("Helvetica", 9)
+    canvas.setFillColor(colors.grey)
+    canvas.drawCentredString(A4[0] / 2, _MARGEN_PDF / 2, f"{_PIE_PAGINA} - {doc.page}")
+    canvas.restoreState()
+
+
+def _pdf_con_libreoffice(docx: bytes) -> bytes:
+    """Convierte un .docx con LibreOffice en modo headless"""
+    with tempfile.TemporaryDirectory(prefix="docentia_pdf_") as directorio:
+        entrada = os.path.join(directorio, "documento.docx")
+        with open(entrada, "wb") as archivo:
+            archivo.write(docx)
+        subprocess.run(
+            [settings.PDF_LIBREOFFICE, "--headless", "--convert-to", "pdf", "--outdir", directorio, entrada],
+            check=True, capture_output=True, timeout=120
+        )
+        with open(os.path.join(directorio, "documento.pdf"), "rb") as archivo:
+            return archivo.read()
+
+
+# ============================================
+# SECCIONES DEL EXAMEN
+# ============================================
+
+# El título entero ha de ser el de la sección ("PARTE 6: SOLUCIONES (Para el
+# profesor)", "5. Hoja de respuestas"): "Pregunta 2: Resolución de problemas" no lo es
+_SECCIONES_EXAMEN = re.compile(r"""
+    ^\W*(?:PARTE\s+\w+\s*[:.\-]\s*|\d+\s*[.):\-]\s*)?
+    (?:(?P<hoja_respuestas>HOJA\s+DE\s+RESPUESTAS)|(?P<soluciones>SOLUCION(?:ES|ARIO)?))
+    \s*(?:\([^)]*\))?\W*$
+""", re.VERBOSE)
+
+
+def _seccion_examen(bloque: Bloque) -> Optional[str]:
+    """Sección del examen que abre el bloque, o None si no abre ninguna"""
+    if type(bloque) is Encabezado:
+        contenido = bloque.contenido
+    elif type(bloque) is Parrafo and bloque.contenido and all(f.formato & NEGRITA for f in bloque.contenido):
+        contenido = bloque.contenido
+    else:
+        return None
+    texto = unicodedata.normalize("NFKD", texto_plano(contenido)).encode("ascii", "ignore").decode("ascii")
+    coincidencia = _SECCIONES_EXAMEN.match(texto.upper().strip())
+    return coincidencia.lastgroup if coincidencia else None
 
 
 class ExportService:
@@ -18,7 +529,8 @@ class ExportService:
     def markdown_to_docx(
         contenido_markdown: str,
         titulo: str = "Documento DocentIA",
-        metadatos: Optional[Dict[str, Any]] = None
+        metadatos: Optional[Dict[str, Any]] = None,
+        plantilla: Optional[str] = None
     ) -> Document:
         """
         Convierte contenido Markdown a documento Word con formato profesional
@@ -27,77 +539,37 @@ class ExportService:
             contenido_markdown: Contenido en formato Markdown
             titulo: Título del documento
             metadatos: Metadatos adicionales (autor, fecha, etc.)
+            plantilla: Identificador de la plantilla del centro (opcional)
         
         Returns:
             Objeto Document de python-docx
         """
-        doc = Document()
-        metadatos = metadatos or {}
-        
-        # Configurar propiedades del documento
-        doc.core_properties.title = titulo
-        doc.core_properties.author = metadatos.get('autor', 'DocentIA')
-        
-        # Añadir título principal
-        titulo_p = doc.add_heading(titulo, level=0)
-        titulo_p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        
-        # Procesar contenido Markdown
-        ExportService._procesar_markdown(doc, contenido_markdown)
-        
-        # Añadir pie de página
-        ExportService._añadir_pie_pagina(doc)
-        
-        return doc
+        return Document(io.BytesIO(
+            ExportService.exportar_word(contenido_markdown, titulo, metadatos, plantilla)
+        ))
     
     @staticmethod
     def _procesar_markdown(doc: Document, contenido: str):
         """Procesa contenido Markdown y lo añade al documento"""
+        ExportService._escribir_bloques(doc, analizar_markdown(contenido))
+    
+    @staticmethod
+    def _escribir_bloques(doc: Document, bloques: List[Bloque]):
+        """
+        Escribe el AST en el cuerpo de un Document ya abierto
         
-        lineas = contenido.split('\n')
-        i = 0
-        
-        while i < len(lineas):
-            linea = lineas[i].strip()
-            
-            # Saltar líneas vacías múltiples
-            if not linea:
-                i += 1
-                continue
-            
-            # Encabezados
-            if linea.startswith('# '):
-                doc.add_heading(linea[2:], level=1)
-            elif linea.startswith('## '):
-                doc.add_heading(linea[3:], level=2)
-            elif linea.startswith('### '):
-                doc.add_heading(linea[4:], level=3)
-            
-            # Listas con viñetas
-            elif linea.startswith('- ') or linea.startswith('* '):
-                texto = linea[2:]
-                p = doc.add_paragraph(texto, style='List Bullet')
-            
-            # Listas numeradas
-            elif re.match(r'^\d+\.', linea):
-                texto = re.sub(r'^\d+\.\s*', '', linea)
-                p = doc.add_paragraph(texto, style='List Number')
-            
-            # Texto en negrita
-            elif '**' in linea:
-                p = doc.add_paragraph()
-                partes = re.split(r'\*\*(.+?)\*\*', linea)
-                for idx, parte in enumerate(partes):
-                    if idx % 2 == 0:  # Texto normal
-                        p.add_run(parte)
-                    else:  # Texto en negrita
-                        p.add_run(parte).bold = True
-            
-            # Párrafo normal
+        Genera el WordprocessingML de todos los bloques como texto y lo inserta
+        con un único parseo, en lugar de crear párrafo a párrafo con la API de
+        python-docx (que resuelve el estilo por nombre en cada llamada).
+        """
+        cuerpo = doc.element.body
+        sect_pr = cuerpo.sectPr
+        xml = f'<w:body {nsdecls("w")}>{_xml_cuerpo(bloques)}</w:body>'
+        for elemento in list(parse_xml(xml)):
+            if sect_pr is not None:
+                sect_pr.addprevious(elemento)
             else:
-                doc.add_paragraph(linea)
-            
-            i += 1
+                cuerpo.append(elemento)
     
     @staticmethod
     def _añadir_pie_pagina(doc: Document):
@@ -113,23 +585,150 @@ class ExportService:
         footer_run.font.size = Pt(9)
         footer_run.font.color.rgb = RGBColor(128, 128, 128)
     
+    @staticmethod
+    def a_bytes(doc: Document) -> bytes:
+        """Serializa el documento en memoria (sin pasar por disco)"""
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        return buffer.getvalue()
+    
+    @staticmethod
+    def exportar_word(
+        contenido_markdown: str,
+        titulo: str = "Documento DocentIA",
+        metadatos: Optional[Dict[str, Any]] = None,
+        plantilla: Optional[str] = None
+    ) -> bytes:
+        """
+        Markdown -> .docx en memoria sobre la plantilla precompilada. Es CPU
+        puro y bloqueante: desde un endpoint async debe ejecutarse en el pool
+        de hilos
+        """
+        return ExportService.word_desde_bloques(
+            analizar_markdown(contenido_markdown), titulo, metadatos, plantilla
+        )
+    
+    @staticmethod
+    def word_desde_bloques(
+        bloques: List[Bloque],
+        titulo: str = "Documento DocentIA",
+        metadatos: Optional[Dict[str, Any]] = None,
+        plantilla: Optional[str] = None
+    ) -> bytes:
+        """.docx en memoria a partir de un AST ya analizado"""
+        metadatos = metadatos or {}
+        return plantillas_docx.obtener(plantilla).renderizar(
+            _xml_cuerpo(bloques),
+            titulo,
+            str(metadatos.get('autor', 'DocentIA'))
+        )
+    
+    @staticmethod
+    def exportar_pdf(
+        contenido_markdown: str,
+        titulo: str = "Documento DocentIA",
+        metadatos: Optional[Dict[str, Any]] = None
+    ) -> bytes:
+        """
+        Markdown -> PDF en memoria a partir del mismo AST que Word
+        
+        Maqueta con reportlab (Python puro). Con PDF_MOTOR=libreoffice y el
+        ejecutable disponible, convierte el .docx para que el PDF sea idéntico
+        al Word. Es CPU intensivo: la API lo ejecuta en el pool de procesos
+        de pdf_service.
+        """
+        return ExportService.pdf_desde_bloques(analizar_markdown(contenido_markdown), titulo, metadatos)
+    
+    @staticmethod
+    def pdf_desde_bloques(
+        bloques: List[Bloque],
+        titulo: str = "Documento DocentIA",
+        metadatos: Optional[Dict[str, Any]] = None
+    ) -> bytes:
+        """PDF en memoria a partir de un AST ya analizado"""
+        metadatos = metadatos or {}
+        if settings.PDF_MOTOR == "libreoffice" and shutil.which(settings.PDF_LIBREOFFICE):
+            return _pdf_con_libreoffice(ExportService.word_desde_bloques(bloques, titulo, metadatos))
+        
+        buffer = io.BytesIO()
+        doc = SimpleDocTemplate(
+            buffer,
+            pagesize=A4,
+            leftMargin=_MARGEN_PDF,
+            rightMargin=_MARGEN_PDF,
+            topMargin=_MARGEN_PDF,
+            bottomMargin=_MARGEN_PDF,
+            title=titulo,
+            author=str(metadatos.get('autor', 'DocentIA'))
+        )
+        doc.build(_historia_pdf(bloques, titulo, _estilos_pdf(), doc.width), onFirstPage=_pie_pdf, onLaterPages=_pie_pdf)
+        return buffer.getvalue()
+    
+    @staticmethod
+    def version_word(plantilla: Optional[str] = None) -> str:
+        """Versión del resultado de exportar_word: código de maquetación + plantilla"""
+        return f"{VERSION_CODIGO}:{plantillas_docx.obtener(plantilla).version}"
+    
+    @staticmethod
+    def version_pdf() -> str:
+        """Versión del resultado de exportar_pdf: código de maquetación + motor"""
+        return f"{VERSION_CODIGO}:{settings.PDF_MOTOR}"
+    
+    @staticmethod
+    def secciones_examen(contenido_markdown: str) -> List[Tuple[str, List[Bloque]]]:
+        """
+        Divide un examen generado en examen del alumno, hoja de respuestas y
+        soluciones (las partes que pide PROMPT_EXAMEN), con un solo análisis
+        
+        Una sección empieza en el encabezado (o párrafo solo en negrita) que
+        la nombra y llega hasta la siguiente. Se omiten las secciones vacías.
+        
+        Returns:
+            Lista de (sección, bloques) en orden de aparición
+        """
+        secciones: Dict[str, List[Bloque]] = {"examen": []}
+        actual = "examen"
+        for bloque in analizar_markdown(contenido_markdown):
+            siguiente = _seccion_examen(bloque)
+            if siguiente and siguiente != actual:
+                actual = siguiente
+                secciones.setdefault(actual, [])
+            secciones[actual].append(bloque)
+        return [(nombre, bloques) for nombre, bloques in secciones.items() if bloques]
+    
+    @staticmethod
+    def nombre_archivo(titulo: str, extension: str) -> str:
+        """Nombre de descarga ASCII seguro a partir del título"""
+        ascii_ = unicodedata.normalize("NFKD", titulo).encode("ascii", "ignore").decode("ascii")
+        base = re.sub(r"[^A-Za-z0-9]+", "_", ascii_).strip("_")[:80] or "documento"
+        return f"{base}.{extension}"
+    
     @staticmethod
     def guardar_temporal(doc: Document, nombre_archivo: str) -> str:
         """
         Guarda el documento en un archivo temporal
         
+        Para descargas usa `a_bytes`; esto queda para quien necesite un fichero.
+        
         Args:
             doc: Documento de python-docx
-            nombre_archivo: Nombre del archivo
+            nombre_archivo: Nombre del archivo (se le añade un sufijo único)
         
         Returns:
             Ruta del archivo temporal
         """
-        temp_dir = tempfile.gettempdir()
-        ruta_completa = os.path.join(temp_dir, nombre_archivo)
-        doc.save(ruta_completa)
+        base, extension = os.path.splitext(nombre_archivo)
+        fd, ruta_completa = tempfile.mkstemp(prefix=f"{base}_", suffix=extension or ".docx")
+        with os.fdopen(fd, "wb") as archivo:
+            doc.save(archivo)
         return ruta_completa
 
 
-# Instancia global del servicio
+# Instancias globales
+VERSION_CODIGO = _version_codigo()
+plantillas_docx = PlantillasDocx(
+    settings.PLANTILLAS_DOCX_DIR,
+    settings.PLANTILLAS_DOCX_CACHE_MAX,
+    settings.EXPORT_LOGO_RUTA
+)
 export_service = ExportService()
\ No newline at end of file
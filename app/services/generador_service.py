@@ -0,0 +1,457 @@
+"""
+Servicio de Generadores
+Registro declarativo de todos los tipos de documento y pipeline único de
+generación (caché -> coalescencia -> IAService)
+"""
+import time
+from functools import partial
+from dataclasses import dataclass
+from typing import Dict, Any, List, Optional, Tuple, Type, Callable, Awaitable, AsyncIterator
+from pydantic import BaseModel
+from config import settings
+from app.services.trazas import trazador
+from app.services.metricas import MedidorGeneracion
+from app.services.ia_service import ia_service
+from app.services.cache_service import cache_service, CacheService
+from app.services.tokens import estimador_tokens
+from app.services.secciones_service import secciones_service
+from app.models import generadores as modelos_rapidos
+from app.models.requests import (
+    UnidadDidacticaRequest,
+    RubricaRequest,
+    ExamenRequest,
+    SituacionAprendizajeRequest,
+    InformeFamiliaRequest,
+    IdeasRequest
+)
+from app.prompts import generadores as prompts_rapidos
+from app.prompts import (
+    PlantillaPrompt,
+    DocumentoPorSecciones,
+    PLANTILLA_UNIDAD_DIDACTICA,
+    PLANTILLA_RUBRICA,
+    PLANTILLA_EXAMEN,
+    PLANTILLA_SITUACION_APRENDIZAJE,
+    PLANTILLA_INFORME_FAMILIA,
+    PLANTILLA_IDEAS
+)
+
+
+@dataclass(frozen=True)
+class GeneradorSpec:
+    """Declaración de un tipo de documento generable"""
+    tipo: str                                   # Identificador y ruta (/generar/{tipo})
+    nombre: str                                 # Nombre legible (mensajes de error)
+    request_model: Type[BaseModel]              # Modelo Pydantic de la petición
+    plantilla: PlantillaPrompt                  # Prompt de sistema + prompt de usuario (versionados)
+    max_tokens: int                             # Declarado; el adaptativo lo sustituye con datos suficientes
+    temperature: float
+    campos_respuesta: Tuple[str, ...] = ("nivel", "curso", "asignatura")
+    descripcion: str = ""
+    prioridad: int = 5                          # 0 urgente .. 9 puede esperar (colas de IAService)
+    parametro_longitud: Optional[str] = None    # Campo numérico de la petición del que depende la longitud
+    max_tokens_techo: Optional[int] = None      # Tope del max_tokens adaptativo (por defecto, 2 × max_tokens)
+    secciones: Optional[DocumentoPorSecciones] = None  # Generación por apartados (GENERACION_POR_SECCIONES)
+
+    @property
+    def system_prompt(self) -> str:
+        return self.plantilla.sistema
+
+    @property
+    def construir_prompt(self) -> Callable[[Any], str]:
+        """Prompt de usuario a partir de la petición"""
+        return self.plantilla.renderizar
+
+
+class GeneradorService:
+    """Registro de generadores y punto único de ejecución de generaciones"""
+
+    def __init__(self):
+        self._generadores: Dict[str, GeneradorSpec] = {}
+
+    def registrar(self, spec: GeneradorSpec) -> GeneradorSpec:
+        """Registra un generador (el tipo debe ser único)"""
+        if spec.tipo in self._generadores:
+            raise ValueError(f"Generador ya registrado: {spec.tipo}")
+        self._generadores[spec.tipo] = spec
+        return spec
+
+    def obtener(self, tipo: str) -> GeneradorSpec:
+        """Devuelve la declaración de un generador"""
+        try:
+            return self._generadores[tipo]
+        except KeyError:
+            raise ValueError(f"Generador no soportado: {tipo}")
+
+    def listar(self) -> List[GeneradorSpec]:
+        """Generadores registrados, en orden de registro"""
+        return list(self._generadores.values())
+
+    @staticmethod
+    def metadatos(spec: GeneradorSpec, datos: BaseModel) -> Dict[str, Any]:
+        """Campos de la petición que se devuelven junto al resultado"""
+        return {
+            **{campo: getattr(datos, campo) for campo in spec.campos_respuesta},
+            "tipo": spec.tipo
+        }
+
+    @staticmethod
+    def construir_prompt(spec: GeneradorSpec, datos: BaseModel) -> str:
+        """Prompt de usuario de la petición (medido en la traza)"""
+        with trazador.span("prompt", **{"docentia.generador": spec.tipo}) as span:
+            inicio = time.perf_counter()
+            prompt = spec.construir_prompt(datos)
+            trazador.registrar(prompt_ms=(time.perf_counter() - inicio) * 1000)
+            if span:
+                span.atributo("docentia.prompt_caracteres", len(prompt))
+                span.atributo("docentia.prompt_version", spec.plantilla.version)
+            return prompt
+
+    @staticmethod
+    def por_secciones(spec: GeneradorSpec) -> bool:
+        """Si el generador se ejecuta apartado a apartado (SeccionesService)"""
+        return spec.secciones is not None and settings.GENERACION_POR_SECCIONES
+
+    @staticmethod
+    def version_prompt(spec: GeneradorSpec) -> str:
+        """Versión de los prompts con los que se genera (plantilla única o por secciones)"""
+        return spec.secciones.version if GeneradorService.por_secciones(spec) else spec.plantilla.version
+
+    @staticmethod
+    def clave_cache(spec: GeneradorSpec, datos: BaseModel) -> str:
+        """
+        Clave de la caché de generaciones para una petición
+
+        Con los datos de la petición en la clave, la versión de la plantilla
+        identifica el prompt exacto: no hace falta renderizarlo ni hashearlo.
+        Lleva el max_tokens declarado, no el adaptativo, que cambia con el uso.
+        """
+        return CacheService.clave(
+            spec.tipo,
+            datos,
+            GeneradorService.version_prompt(spec),
+            ia_service.modelo_actual(),
+            spec.temperature,
+            spec.max_tokens
+        )
+
+    @staticmethod
+    def parametro_longitud(spec: GeneradorSpec, datos: BaseModel) -> Optional[float]:
+        """Valor del parámetro de longitud de la petición (None si el generador no tiene)"""
+        if not spec.parametro_longitud:
+            return None
+        try:
+            return float(getattr(datos, spec.parametro_longitud))
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def max_tokens(spec: GeneradorSpec, datos: BaseModel) -> int:
+        """max_tokens de la llamada según la longitud observada para peticiones como esta"""
+        return estimador_tokens.max_tokens(
+            spec.tipo,
+            GeneradorService.parametro_longitud(spec, datos),
+            spec.max_tokens,
+            spec.max_tokens_techo or 2 * spec.max_tokens
+        )
+
+    @staticmethod
+    def salida_estimada(spec: GeneradorSpec, datos: BaseModel, max_tokens: int) -> int:
+        """Tokens de salida esperados, los que se reservan del presupuesto por minuto del proveedor"""
+        return estimador_tokens.salida(spec.tipo, GeneradorService.parametro_longitud(spec, datos), max_tokens)
+
+    @staticmethod
+    async def registrar_uso(spec: GeneradorSpec, datos: BaseModel, user_prompt: str, resultado: Dict[str, Any]):
+        """Alimenta el modelo de longitud y la calibración de entrada con el uso real"""
+        await estimador_tokens.observar(
+            spec.tipo,
+            GeneradorService.parametro_longitud(spec, datos),
+            (spec.system_prompt, user_prompt),
+            resultado
+        )
+
+    async def generar(self, tipo: str, datos: BaseModel, force_regenerate: bool = False) -> Dict[str, Any]:
+        """
+        Genera un documento del tipo indicado
+
+        Args:
+            tipo: Tipo de generador registrado
+            datos: Petición (instancia de spec.request_model)
+            force_regenerate: Ignora la caché de generaciones
+
+        Returns:
+            Dict de IAService (contenido, proveedor, modelo, tiempos, tokens) más "desde_cache"
+        """
+        spec = self.obtener(tipo)
+        with MedidorGeneracion(spec.tipo) as medidor:
+            if self.por_secciones(spec):
+                generar_y_registrar = partial(secciones_service.generar, spec, datos)
+            else:
+                generar_y_registrar = self._generador_unico(spec, datos)
+
+            resultado = await cache_service.obtener_o_generar(
+                self.clave_cache(spec, datos),
+                generar_y_registrar,
+                forzar=force_regenerate
+            )
+            medidor.terminar(resultado)
+        return resultado
+
+    def _generador_unico(self, spec: GeneradorSpec, datos: BaseModel) -> Callable[[], Awaitable[Dict[str, Any]]]:
+        """Generación en una sola llamada, para ejecutarla si la caché no tiene el resultado"""
+        user_prompt = self.construir_prompt(spec, datos)
+
+        async def generar_y_registrar():
+            # El max_tokens adaptativo puede quedar por debajo del declarado: si
+            # la salida se trunca se repite una vez con el techo del generador
+            techo = spec.max_tokens_techo or 2 * spec.max_tokens
+            max_tokens = self.max_tokens(spec, datos)
+            while True:
+                resultado = await ia_service.generate(
+                    system_prompt=spec.system_prompt,
+                    user_prompt=user_prompt,
+                    max_tokens=max_tokens,
+                    temperature=spec.temperature,
+                    generador=spec.tipo,
+                    prioridad=spec.prioridad,
+                    salida_estimada=self.salida_estimada(spec, datos, max_tokens)
+                )
+                await self.registrar_uso(spec, datos, user_prompt, resultado)
+                if not resultado.get("truncado") or max_tokens >= techo:
+                    return resultado
+                print(f"   ✂️  {spec.tipo} truncado con {max_tokens} tokens, se repite con {techo}")
+                max_tokens = techo
+
+        return generar_y_registrar
+
+    async def generar_stream(
+        self,
+        tipo: str,
+        datos: BaseModel,
+        force_regenerate: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Variante streaming de `generar` (eventos de IAService.generate_stream)
+
+        Un acierto de caché se emite como un único delta seguido de "fin"; por
+        secciones, cada apartado es un delta.
+        """
+        spec = self.obtener(tipo)
+        with MedidorGeneracion(spec.tipo) as medidor:
+            clave = self.clave_cache(spec, datos)
+
+            cacheado = await cache_service.obtener(clave, forzar=force_regenerate)
+            if cacheado is not None:
+                medidor.terminar({"desde_cache": True})
+                yield {"evento": "delta", "texto": cacheado["contenido"]}
+                yield {**{k: v for k, v in cacheado.items() if k != "contenido"}, "evento": "fin", "desde_cache": True}
+                return
+
+            por_secciones = self.por_secciones(spec)
+            if por_secciones:
+                eventos = secciones_service.generar_stream(spec, datos)
+            else:
+                user_prompt = self.construir_prompt(spec, datos)
+                # Un stream ya emitido no se puede repetir: nunca menos que el declarado
+                max_tokens = max(self.max_tokens(spec, datos), spec.max_tokens)
+                eventos = ia_service.generate_stream(
+                    system_prompt=spec.system_prompt,
+                    user_prompt=user_prompt,
+                    max_tokens=max_tokens,
+                    temperature=spec.temperature,
+                    generador=spec.tipo,
+                    prioridad=spec.prioridad,
+                    salida_estimada=self.salida_estimada(spec, datos, max_tokens)
+                )
+
+            partes = []
+            async for evento in eventos:
+                if evento["evento"] == "delta":
+                    partes.append(evento["texto"])
+                elif evento["evento"] == "fin":
+                    resumen = {k: v for k, v in evento.items() if k != "evento"}
+                    if not por_secciones:
+                        # SeccionesService registra el uso de cada llamada
+                        await self.registrar_uso(spec, datos, user_prompt, resumen)
+                    if not resumen.get("respaldo") and not resumen.get("truncado"):
+                        await cache_service.guardar(clave, {**resumen, "contenido": "".join(partes)})
+                    evento["desde_cache"] = False
+                    medidor.terminar(evento)
+                yield evento
+
+
+# Instancia global del servicio
+generador_service = GeneradorService()
+
+
+# ============================================
+# GENERADORES RÁPIDOS (frontend)
+# ============================================
+
+generador_service.registrar(GeneradorSpec(
+    tipo="boton-emergencia",
+    nombre="actividad",
+    request_model=modelos_rapidos.BotonEmergenciaRequest,
+    plantilla=prompts_rapidos.PLANTILLA_BOTON_EMERGENCIA,
+    max_tokens=2000,
+    temperature=0.7,
+    descripcion="Genera una actividad de emergencia para situaciones imprevistas. 30 segundos de generación.",
+    prioridad=0
+))
+
+generador_service.registrar(GeneradorSpec(
+    tipo="examen",
+    nombre="examen",
+    request_model=modelos_rapidos.ExamenRequest,
+    plantilla=prompts_rapidos.PLANTILLA_EXAMEN,
+    max_tokens=3000,
+    temperature=0.6,
+    campos_respuesta=("nivel", "curso", "asignatura", "tema"),
+    descripcion="Genera un examen profesional con criterios de evaluación y rúbricas.",
+    parametro_longitud="num_preguntas"
+))
+
+generador_service.registrar(GeneradorSpec(
+    tipo="problemas-matematicas",
+    nombre="problemas",
+    request_model=modelos_rapidos.ProblemasMatematicasRequest,
+    plantilla=prompts_rapidos.PLANTILLA_PROBLEMAS_MATEMATICAS,
+    max_tokens=2500,
+    temperature=0.7,
+    campos_respuesta=("nivel", "curso", "tema", "num_problemas"),
+    descripcion="Genera problemas de matemáticas adaptados a nivel con soluciones paso a paso.",
+    parametro_longitud="num_problemas"
+))
+
+generador_service.registrar(GeneradorSpec(
+    tipo="rubrica",
+    nombre="rúbrica",
+    request_model=modelos_rapidos.RubricaRequest,
+    plantilla=prompts_rapidos.PLANTILLA_RUBRICA,
+    max_tokens=2500,
+    temperature=0.5,
+    descripcion="Genera una rúbrica de evaluación profesional con niveles de logro.",
+    parametro_longitud="niveles_logro"
+))
+
+generador_service.registrar(GeneradorSpec(
+    tipo="unidad-didactica",
+    nombre="unidad didáctica",
+    request_model=modelos_rapidos.UnidadDidacticaRequest,
+    plantilla=prompts_rapidos.PLANTILLA_UNIDAD_DIDACTICA,
+    max_tokens=4000,
+    temperature=0.6,
+    campos_respuesta=("nivel", "curso", "asignatura", "titulo"),
+    descripcion="Genera una unidad didáctica completa con todas las sesiones.",
+    prioridad=7,
+    parametro_longitud="num_sesiones"
+))
+
+generador_service.registrar(GeneradorSpec(
+    tipo="situacion-aprendizaje",
+    nombre="situación de aprendizaje",
+    request_model=modelos_rapidos.SituacionAprendizajeRequest,
+    plantilla=prompts_rapidos.PLANTILLA_SITUACION_APRENDIZAJE,
+    max_tokens=3500,
+    temperature=0.7,
+    campos_respuesta=("nivel", "curso", "asignatura", "tema"),
+    descripcion="Genera una situación de aprendizaje competencial completa.",
+    parametro_longitud="duracion_sesiones"
+))
+
+generador_service.registrar(GeneradorSpec(
+    tipo="programacion-didactica",
+    nombre="programación didáctica",
+    request_model=modelos_rapidos.ProgramacionDidacticaRequest,
+    plantilla=prompts_rapidos.PLANTILLA_PROGRAMACION_DIDACTICA,
+    max_tokens=8192,
+    max_tokens_techo=16384,
+    temperature=0.5,
+    campos_respuesta=("nivel", "curso", "asignatura", "centro"),
+    descripcion="Genera una programación didáctica anual completa.",
+    prioridad=9,
+    secciones=prompts_rapidos.PROGRAMACION_DIDACTICA_POR_SECCIONES
+))
+
+generador_service.registrar(GeneradorSpec(
+    tipo="adaptacion-curricular",
+    nombre="adaptación curricular",
+    request_model=modelos_rapidos.AdaptacionCurricularRequest,
+    plantilla=prompts_rapidos.PLANTILLA_ADAPTACION_CURRICULAR,
+    max_tokens=3500,
+    temperature=0.6,
+    campos_respuesta=("nivel", "curso", "asignatura", "tipo_adaptacion"),
+    descripcion="Genera una adaptación curricular individualizada."
+))
+
+
+# ============================================
+# DOCUMENTOS LOMLOE (DocumentService)
+# ============================================
+
+generador_service.registrar(GeneradorSpec(
+    tipo="unidad-didactica-lomloe",
+    nombre="unidad didáctica",
+    request_model=UnidadDidacticaRequest,
+    plantilla=PLANTILLA_UNIDAD_DIDACTICA,
+    max_tokens=4096,
+    temperature=0.7,
+    campos_respuesta=("nivel", "curso", "asignatura", "tema"),
+    descripcion="Genera una Unidad Didáctica completa",
+    prioridad=7
+))
+
+generador_service.registrar(GeneradorSpec(
+    tipo="rubrica-lomloe",
+    nombre="rúbrica",
+    request_model=RubricaRequest,
+    plantilla=PLANTILLA_RUBRICA,
+    max_tokens=3000,
+    temperature=0.6,
+    campos_respuesta=("nivel", "curso", "asignatura", "tema"),
+    descripcion="Genera una Rúbrica de Evaluación"
+))
+
+generador_service.registrar(GeneradorSpec(
+    tipo="examen-lomloe",
+    nombre="examen",
+    request_model=ExamenRequest,
+    plantilla=PLANTILLA_EXAMEN,
+    max_tokens=4096,
+    temperature=0.6,
+    campos_respuesta=("nivel", "curso", "asignatura", "tema"),
+    descripcion="Genera un Examen completo"
+))
+
+generador_service.registrar(GeneradorSpec(
+    tipo="situacion-aprendizaje-lomloe",
+    nombre="situación de aprendizaje",
+    request_model=SituacionAprendizajeRequest,
+    plantilla=PLANTILLA_SITUACION_APRENDIZAJE,
+    max_tokens=4096,
+    temperature=0.7,
+    descripcion="Genera una Situación de Aprendizaje LOMLOE",
+    parametro_longitud="duracion_sesiones"
+))
+
+generador_service.registrar(GeneradorSpec(
+    tipo="informe-familia",
+    nombre="informe",
+    request_model=InformeFamiliaRequest,
+    plantilla=PLANTILLA_INFORME_FAMILIA,
+    max_tokens=2000,
+    temperature=0.7,
+    campos_respuesta=("nivel", "curso", "asignatura", "nombre_alumno"),
+    descripcion="Genera un Informe a Familias"
+))
+
+generador_service.registrar(GeneradorSpec(
+    tipo="ideas",
+    nombre="ideas",
+    request_model=IdeasRequest,
+    plantilla=PLANTILLA_IDEAS,
+    max_tokens=2500,
+    temperature=0.8,
+    campos_respuesta=("nivel", "curso", "asignatura", "tema"),
+    descripcion="Genera Ideas didácticas creativas"
+))
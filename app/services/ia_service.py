@@ -2,121 +2,546 @@
 Servicio de Inteligencia Artificial
 Gestiona las llamadas a diferentes proveedores de IA (Claude, OpenAI, Gemini)
 """
+import asyncio
 import time
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, AsyncIterator
 from config import settings
+from app.services.coalescedor import CoalescedorPeticiones
+from app.services.enrutador import EnrutadorProveedores, error_final, registrar_llamada
+from app.services.limitador import LimitadorPeticiones, SemaforoPrioridad, ProveedorSaturadoError, es_transitorio
+from app.services.trazas import trazador, CLIENTE
+from app.services.metricas import CACHE_CONSULTAS_TOTAL, estadisticas_vivas
+from app.services.transporte import transporte
+from app.services.proveedores import fabrica_proveedores
+from app.services.tokens import estimador_tokens, contar_tokens
 
 
 class IAService:
     """Servicio para gestionar llamadas a diferentes proveedores de IA"""
     
     def __init__(self):
-        self.claude_client = None
-        self.openai_client = None
-        self.gemini_client = None
-        self.initialize_clients()
-    
-    def initialize_clients(self):
-        """Inicializa los clientes de IA disponibles"""
-        print("\n🔄 Inicializando clientes de IA...")
-        
-        # Claude
-        if settings.ANTHROPIC_API_KEY:
-            try:
-                import anthropic
-                self.claude_client = anthropic.Anthropic(api_key=settings.ANTHROPIC_API_KEY)
-                print("  ✅ Claude inicializado")
-            except Exception as e:
-                print(f"  ⚠️ Error inicializando Claude: {e}")
-                self.claude_client = None
-        
-        # OpenAI (solo inicializar si está configurado)
-        if settings.OPENAI_API_KEY:
-            try:
-                from openai import OpenAI
-                self.openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
-                print("  ✅ OpenAI inicializado")
-            except Exception as e:
-                print(f"  ⚠️ Error inicializando OpenAI: {e}")
-                self.openai_client = None
-        
-        # Gemini (solo inicializar si está configurado)
-        if settings.GOOGLE_API_KEY:
-            try:
-                import google.generativeai as genai
-                genai.configure(api_key=settings.GOOGLE_API_KEY)
-                self.gemini_client = genai
-                print("  ✅ Gemini inicializado")
-            except Exception as e:
-                print(f"  ⚠️ Error inicializando Gemini: {e}")
-                self.gemini_client = None
+        # Los clientes se crean al usarlos por primera vez (ver `cliente`)
+        self.proveedores = fabrica_proveedores
+        # Techo de generaciones simultáneas contra los proveedores (compartido por todos los endpoints),
+        # atendido por prioridad: boton-emergencia pasa antes que una programación anual
+        self.limite_concurrencia = SemaforoPrioridad(
+            settings.MAX_GENERACIONES_CONCURRENTES, settings.COLA_SEGUNDOS_POR_PRIORIDAD
+        )
+        # Presupuesto RPM/ITPM/OTPM por proveedor y reintentos de 429/529
+        self.limitador = LimitadorPeticiones(
+            limites={
+                "claude": (settings.CLAUDE_RPM, settings.CLAUDE_ITPM, settings.CLAUDE_OTPM),
+                "openai": (settings.OPENAI_RPM, settings.OPENAI_TPM, 0),
+                "gemini": (settings.GEMINI_RPM, 0, 0)
+            },
+            segundos_por_prioridad=settings.COLA_SEGUNDOS_POR_PRIORIDAD,
+            max_reintentos=settings.REINTENTOS_MAX,
+            backoff_base=settings.REINTENTOS_BACKOFF_BASE,
+            backoff_max=settings.REINTENTOS_BACKOFF_MAX,
+            espera_max=settings.LIMITE_ESPERA_MAX_SEGUNDOS,
+            timeout=settings.TIMEOUT_PROVEEDOR_SEGUNDOS
+        )
+        # Contadores de prompt caching de Claude por generador
+        self.estadisticas_cache_prompt: Dict[str, Dict[str, int]] = {}
+        # Llamadas idénticas concurrentes comparten una única generación
+        self.coalescedor = CoalescedorPeticiones(activo=settings.COALESCENCIA_ACTIVA)
+        # Failover entre proveedores y hedging por percentil de latencia
+        self.enrutador = EnrutadorProveedores(
+            orden=settings.FAILOVER_ORDEN,
+            failover=settings.FAILOVER_ACTIVO,
+            hedging=settings.HEDGING_ACTIVO,
+            percentil_hedging=settings.HEDGING_PERCENTIL,
+            min_muestras_hedging=settings.HEDGING_MIN_MUESTRAS,
+            enfriamiento=settings.ENFRIAMIENTO_PROVEEDOR_SEGUNDOS
+        )
+    
+    async def cliente(self, proveedor: str) -> Optional[Any]:
+        """
+        Cliente del proveedor; None si no está configurado
+        
+        La primera vez importa el SDK, que bloquea, así que se crea en un hilo.
+        """
+        if self.proveedores.inicializado(proveedor):
+            return self.proveedores.obtener(proveedor)
+        return await asyncio.to_thread(self.proveedores.obtener, proveedor)
+    
+    async def calentar(self, proveedor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Inicializa un proveedor (por defecto, el configurado) y abre sus conexiones
+        
+        Importar el SDK bloquea, así que se hace en un hilo. Lo usan el arranque
+        y /warmup; sin llamarlo, el cliente se crea en la primera generación.
+        """
+        proveedor = proveedor or self._proveedor_configurado()
+        inicio = time.perf_counter()
+        cliente = await self.cliente(proveedor)
+        if cliente is not None and hasattr(cliente, "base_url"):
+            await transporte.precalentar([str(cliente.base_url)], settings.HTTP_CONEXIONES_PRECALENTADAS)
+        return {
+            "proveedor": proveedor,
+            "inicializado": cliente is not None,
+            "segundos": round(time.perf_counter() - inicio, 3)
+        }
     
     async def generate(
         self,
         system_prompt: str,
         user_prompt: str,
         max_tokens: int = 4096,
-        temperature: float = 0.7
+        temperature: float = 0.7,
+        generador: Optional[str] = None,
+        prioridad: int = 5,
+        salida_estimada: Optional[int] = None
     ) -> Dict[str, Any]:
         """
         Genera contenido usando el proveedor de IA configurado
         
+        Si falla o supera TIMEOUT_PROVEEDOR_SEGUNDOS (desde que el limitador la
+        admite) se reintenta con el resto de proveedores inicializados
+        (FAILOVER_ORDEN); con HEDGING_ACTIVO se lanza además el siguiente cuando
+        el primero supera su percentil de latencia para este generador.
+        
         Args:
             system_prompt: Instrucciones del sistema
             user_prompt: Prompt del usuario
             max_tokens: Máximo de tokens a generar
             temperature: Temperatura (creatividad) 0.0-1.0
+            generador: Tipo de documento (para las estadísticas de caché de prompt)
+            prioridad: 0 (urgente) a 9 (puede esperar) en las colas de concurrencia y rate limit
+            salida_estimada: Tokens de salida esperados, los que se reservan contra el
+                presupuesto por minuto (por defecto, la estimación del generador)
         
         Returns:
-            Dict con contenido, proveedor, modelo, tiempo, etc.
+            Dict con contenido, proveedor, modelo, tiempo, etc. ("respaldo" indica
+            que respondió un proveedor distinto del configurado)
         """
-        provider = settings.AI_PROVIDER.lower()
+        provider = self._proveedor_configurado()
+        salida_estimada = salida_estimada or estimador_tokens.salida(generador or "", None, max_tokens)
+        generadores = {
+            "claude": self._generate_claude,
+            "openai": self._generate_openai,
+            "gemini": self._generate_gemini
+        }
         
-        if provider == "claude":
-            return await self._generate_claude(system_prompt, user_prompt, max_tokens, temperature)
-        elif provider == "openai":
-            return await self._generate_openai(system_prompt, user_prompt, max_tokens, temperature)
-        elif provider == "gemini":
-            return await self._generate_gemini(system_prompt, user_prompt, max_tokens, temperature)
-        else:
-            raise ValueError(f"Proveedor no soportado: {provider}")
+        async def generar_limitado():
+            async with self.limite_concurrencia.turno(prioridad):
+                resultado = await self.enrutador.ejecutar(
+                    provider,
+                    self.proveedores_disponibles(),
+                    lambda proveedor: generadores[proveedor](system_prompt, user_prompt, max_tokens, temperature, prioridad, salida_estimada),
+                    generador
+                )
+            if resultado["proveedor"] == "claude":
+                self._registrar_cache_prompt(generador, resultado)
+            return resultado
+        
+        clave = self._clave_coalescencia(provider, system_prompt, user_prompt, max_tokens, temperature)
+        return await self.coalescedor.ejecutar(clave, generar_limitado)
     
-    async def _generate_claude(
+    async def generate_stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+        generador: Optional[str] = None,
+        prioridad: int = 5,
+        salida_estimada: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Genera contenido en streaming usando el proveedor de IA configurado
+        
+        Mismos argumentos que `generate`. Produce eventos:
+            {"evento": "delta", "texto": "..."}  por cada fragmento del modelo
+            {"evento": "fin", ...}               con el mismo resumen que `generate`
+                                                 (sin "contenido") más tiempo_primer_token
+        
+        Hay failover mientras no se haya emitido ningún fragmento; sin hedging.
+        """
+        provider = self._proveedor_configurado()
+        salida_estimada = salida_estimada or estimador_tokens.salida(generador or "", None, max_tokens)
+        transmisores = {
+            "claude": self._stream_claude,
+            "openai": self._stream_openai,
+            "gemini": self._stream_gemini
+        }
+        
+        async def transmitir_limitado():
+            async with self.limite_concurrencia.turno(prioridad):
+                candidatos = self.enrutador.candidatos(provider, self.proveedores_disponibles())
+                if not candidatos:
+                    raise Exception(f"Ningún proveedor de IA inicializado (configurado: {provider})")
+                errores = []
+                
+                # Reintentos y failover solo mientras no se haya emitido texto:
+                # después ya no se puede repetir ni cambiar de modelo
+                for proveedor in candidatos:
+                    for intento in range(settings.REINTENTOS_MAX + 1):
+                        inicio = time.time()
+                        tiempo_primer_token = None
+                        emitido = []
+                        try:
+                            with trazador.span(f"llm {proveedor}", CLIENTE, **{"gen_ai.system": proveedor, "docentia.intento": intento}) as span:
+                                try:
+                                    async for evento in transmisores[proveedor](system_prompt, user_prompt, max_tokens, temperature, prioridad, salida_estimada):
+                                        if evento["evento"] == "delta":
+                                            emitido.append(evento["texto"])
+                                            if tiempo_primer_token is None:
+                                                tiempo_primer_token = time.time() - inicio
+                                                trazador.fijar(primer_token_ms=tiempo_primer_token * 1000)
+                                        elif evento["evento"] == "fin":
+                                            evento["tiempo_generacion"] = time.time() - inicio
+                                            evento["tiempo_primer_token"] = tiempo_primer_token
+                                            evento["respaldo"] = proveedor != provider
+                                            self.enrutador.registrar_latencia(proveedor, evento["tiempo_generacion"], generador)
+                                            registrar_llamada(span, evento, evento["tiempo_generacion"])
+                                            if evento["proveedor"] == "claude":
+                                                self._registrar_cache_prompt(generador, evento)
+                                            print(f"   ✅ Stream completado en {evento['tiempo_generacion']:.2f}s "
+                                                  f"(primer token {tiempo_primer_token or 0:.2f}s)")
+                                        yield evento
+                                except (GeneratorExit, asyncio.CancelledError):
+                                    # El cliente cortó el stream: se contabiliza lo que llegó a generarse
+                                    # (la latencia no entra en el histograma de hedging, está incompleta)
+                                    if emitido:
+                                        registrar_llamada(span, {
+                                            "proveedor": proveedor,
+                                            "output_tokens": contar_tokens("".join(emitido))
+                                        }, time.time() - inicio)
+                                    raise
+                            return
+                        except Exception as e:
+                            if tiempo_primer_token is not None:
+                                self.enrutador.registrar_error(proveedor)
+                                raise
+                            reintentable = isinstance(e, ProveedorSaturadoError) or es_transitorio(e.__cause__ or e)
+                            if reintentable and intento < settings.REINTENTOS_MAX and getattr(e, "reintentar_en", 0) <= settings.LIMITE_ESPERA_MAX_SEGUNDOS:
+                                espera = max(getattr(e, "reintentar_en", 0), self.limitador.backoff(intento))
+                                print(f"   ⏳ {proveedor}: reintento {intento + 1} del stream en {espera:.1f}s")
+                                await asyncio.sleep(espera)
+                                continue
+                            self.enrutador.registrar_error(proveedor)
+                            if not settings.FAILOVER_ACTIVO:
+                                raise
+                            errores.append((proveedor, e))
+                            print(f"   ⚠️ Falla {proveedor}, probando el siguiente proveedor")
+                            break
+                
+                raise error_final(errores)
+        
+        # Las peticiones idénticas que llegan tarde reciben el prefijo ya emitido
+        clave = self._clave_coalescencia(provider, system_prompt, user_prompt, max_tokens, temperature)
+        async for evento in self.coalescedor.transmitir(clave, transmitir_limitado):
+            yield evento
+    
+    def _clave_coalescencia(
         self,
+        provider: str,
         system_prompt: str,
         user_prompt: str,
         max_tokens: int,
         temperature: float
+    ) -> str:
+        """
+        Clave single-flight: proveedor, modelo y el texto exacto de los prompts
+        
+        Sin normalizar: dos prompts que solo difieren en mayúsculas o saltos de
+        línea (p.ej. el documento de una revisión) piden salidas distintas.
+        """
+        return self.coalescedor.clave(
+            provider,
+            self.modelo_actual(),
+            system_prompt,
+            user_prompt,
+            max_tokens,
+            temperature
+        )
+    
+    async def _stream_claude(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        max_tokens: int,
+        temperature: float,
+        prioridad: int = 5,
+        salida_estimada: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Transmite contenido de Claude (Anthropic)"""
+        
+        cliente = await self.cliente("claude")
+        if not cliente:
+            raise Exception("Cliente de Claude no inicializado. Verifica ANTHROPIC_API_KEY")
+        
+        reserva = await self.limitador.admitir(
+            "claude", prioridad, self.limitador.estimar_tokens("claude", system_prompt, user_prompt), salida_estimada or max_tokens
+        )
+        
+        print("\n🤖 Generando con Claude (stream)...")
+        
+        uso = None
+        emitido = []
+        try:
+            async with cliente.messages.stream(
+                model=settings.CLAUDE_MODEL,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                messages=[
+                    {"role": "user", "content": user_prompt}
+                ],
+                **self.system_claude(system_prompt)
+            ) as stream:
+                self.limitador.actualizar("claude", stream.response.headers)
+                async for texto in stream.text_stream:
+                    emitido.append(texto)
+                    yield {"evento": "delta", "texto": texto}
+                
+                response = await stream.get_final_message()
+                uso = (response.usage.input_tokens, response.usage.output_tokens)
+        
+        except Exception as e:
+            saturado = self.limitador.saturado("claude", e)
+            if saturado:
+                raise saturado
+            print(f"   ❌ Error en Claude: {str(e)}")
+            raise Exception(f"Error al generar con Claude: {str(e)}") from e
+        
+        finally:
+            self._liquidar(reserva, uso, emitido)
+        
+        yield {
+            "evento": "fin",
+            "proveedor": "claude",
+            "modelo": settings.CLAUDE_MODEL,
+            "tokens_usados": response.usage.input_tokens + response.usage.output_tokens,
+            "input_tokens": response.usage.input_tokens,
+            "output_tokens": response.usage.output_tokens,
+            "cache_read_input_tokens": response.usage.cache_read_input_tokens or 0,
+            "cache_creation_input_tokens": response.usage.cache_creation_input_tokens or 0,
+            "truncado": response.stop_reason == "max_tokens"
+        }
+    
+    async def _stream_openai(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        max_tokens: int,
+        temperature: float,
+        prioridad: int = 5,
+        salida_estimada: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Transmite contenido de OpenAI"""
+        
+        cliente = await self.cliente("openai")
+        if not cliente:
+            raise Exception("Cliente de OpenAI no inicializado. Verifica OPENAI_API_KEY")
+        
+        reserva = await self.limitador.admitir(
+            "openai", prioridad, self.limitador.estimar_tokens("openai", system_prompt, user_prompt), salida_estimada or max_tokens
+        )
+        
+        print("\n🤖 Generando con OpenAI (stream)...")
+        
+        mensajes = [{"role": "user", "content": user_prompt}]
+        if system_prompt:
+            mensajes.insert(0, {"role": "system", "content": system_prompt})
+        
+        usage = None
+        fin = None
+        emitido = []
+        try:
+            stream = await cliente.chat.completions.create(
+                model=settings.OPENAI_MODEL,
+                max_tokens=max_tokens,
+                temperature=temperature,
+                messages=mensajes,
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+            self.limitador.actualizar("openai", stream.response.headers)
+            
+            async for chunk in stream:
+                if chunk.usage:
+                    usage = chunk.usage
+                if chunk.choices and chunk.choices[0].finish_reason:
+                    fin = chunk.choices[0].finish_reason
+                if chunk.choices and chunk.choices[0].delta.content:
+                    emitido.append(chunk.choices[0].delta.content)
+                    yield {"evento": "delta", "texto": chunk.choices[0].delta.content}
+        
+        except Exception as e:
+            saturado = self.limitador.saturado("openai", e)
+            if saturado:
+                raise saturado
+            print(f"   ❌ Error en OpenAI: {str(e)}")
+            raise Exception(f"Error al generar con OpenAI: {str(e)}") from e
+        
+        finally:
+            self._liquidar(reserva, (usage.prompt_tokens, usage.completion_tokens) if usage else None, emitido)
+        
+        yield {
+            "evento": "fin",
+            "proveedor": "openai",
+            "modelo": settings.OPENAI_MODEL,
+            "tokens_usados": usage.total_tokens if usage else None,
+            "input_tokens": usage.prompt_tokens if usage else None,
+            "output_tokens": usage.completion_tokens if usage else None,
+            "truncado": fin == "length"
+        }
+    
+    async def _stream_gemini(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        max_tokens: int,
+        temperature: float,
+        prioridad: int = 5,
+        salida_estimada: Optional[int] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Transmite contenido de Gemini"""
+        
+        cliente = await self.cliente("gemini")
+        if not cliente:
+            raise Exception("Cliente de Gemini no inicializado. Verifica GOOGLE_API_KEY")
+        
+        reserva = await self.limitador.admitir(
+            "gemini", prioridad, self.limitador.estimar_tokens("gemini", system_prompt, user_prompt), salida_estimada or max_tokens
+        )
+        
+        print("\n🤖 Generando con Gemini (stream)...")
+        
+        uso = None
+        emitido = []
+        try:
+            model = cliente.GenerativeModel(
+                model_name=settings.GEMINI_MODEL,
+                generation_config={
+                    "temperature": temperature,
+                    "max_output_tokens": max_tokens,
+                }
+            )
+            
+            prompt_completo = f"{system_prompt}\n\n{user_prompt}" if system_prompt else user_prompt
+            
+            response = await model.generate_content_async(prompt_completo, stream=True)
+            async for chunk in response:
+                if chunk.text:
+                    emitido.append(chunk.text)
+                    yield {"evento": "delta", "texto": chunk.text}
+            uso = self._uso_gemini(response)
+        
+        except Exception as e:
+            saturado = self.limitador.saturado("gemini", e)
+            if saturado:
+                raise saturado
+            print(f"   ❌ Error en Gemini: {str(e)}")
+            raise Exception(f"Error al generar con Gemini: {str(e)}") from e
+        
+        finally:
+            self._liquidar(reserva, uso, emitido)
+        
+        yield {
+            "evento": "fin",
+            "proveedor": "gemini",
+            "modelo": settings.GEMINI_MODEL,
+            "tokens_usados": uso[0] + uso[1] if None not in uso else None,
+            "input_tokens": uso[0],
+            "output_tokens": uso[1],
+            "truncado": self._truncado_gemini(response)
+        }
+    
+    def _liquidar(self, reserva: List[float], uso: Optional[tuple], emitido: List[str]):
+        """
+        Cierra la reserva de un stream con el uso real (entrada, salida) o, si
+        se cortó antes del final (error o cliente desconectado, que llega como
+        GeneratorExit/CancelledError), con los tokens que se llegaron a emitir
+        """
+        if uso is None:
+            uso = (None, contar_tokens("".join(emitido)) if emitido else 0)
+        self.limitador.ajustar(reserva, *uso)
+    
+    @staticmethod
+    def system_claude(system_prompt: str) -> Dict[str, Any]:
+        """
+        Parámetro `system` para Claude con el prompt marcado como cacheable.
+        
+        Los prompts de sistema de app/prompts son constantes, así que Anthropic
+        puede reutilizar el prefijo entre llamadas (prompts por debajo del mínimo
+        cacheable del modelo simplemente no se cachean).
+        """
+        if not system_prompt:
+            return {}
+        bloque = {"type": "text", "text": system_prompt}
+        if settings.CLAUDE_PROMPT_CACHE:
+            bloque["cache_control"] = {"type": "ephemeral"}
+        return {"system": [bloque]}
+    
+    def _registrar_cache_prompt(self, generador: Optional[str], resultado: Dict[str, Any]):
+        """Actualiza los contadores de caché de prompt del generador"""
+        stats = self.estadisticas_cache_prompt.setdefault(generador or "sin_generador", {
+            "llamadas": 0,
+            "aciertos": 0,
+            "tokens_leidos": 0,
+            "tokens_escritos": 0
+        })
+        stats["llamadas"] += 1
+        stats["aciertos"] += 1 if resultado.get("cache_read_input_tokens") else 0
+        stats["tokens_leidos"] += resultado.get("cache_read_input_tokens") or 0
+        stats["tokens_escritos"] += resultado.get("cache_creation_input_tokens") or 0
+        CACHE_CONSULTAS_TOTAL.labels("prompt", "acierto" if resultado.get("cache_read_input_tokens") else "fallo").inc()
+    
+    async def _generate_claude(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        max_tokens: int,
+        temperature: float,
+        prioridad: int = 5,
+        salida_estimada: Optional[int] = None
     ) -> Dict[str, Any]:
         """Genera contenido usando Claude (Anthropic)"""
         
-        if not self.claude_client:
+        cliente = await self.cliente("claude")
+        if not cliente:
             raise Exception("Cliente de Claude no inicializado. Verifica ANTHROPIC_API_KEY")
         
         inicio = time.time()
         
-        try:
-            print(f"\n🤖 Generando con Claude...")
-            print(f"   Max tokens: {max_tokens}")
-            print(f"   Temperature: {temperature}")
-            
-            response = self.claude_client.messages.create(
+        async def llamar():
+            raw = await cliente.messages.with_raw_response.create(
                 model=settings.CLAUDE_MODEL,
                 max_tokens=max_tokens,
                 temperature=temperature,
-                system=system_prompt,
                 messages=[
                     {"role": "user", "content": user_prompt}
-                ]
+                ],
+                **self.system_claude(system_prompt)
+            )
+            self.limitador.actualizar("claude", raw.headers)
+            return raw.parse()
+        
+        try:
+            print(f"\n🤖 Generando con Claude...")
+            print(f"   Max tokens: {max_tokens}")
+            print(f"   Temperature: {temperature}")
+            
+            response = await self.limitador.ejecutar(
+                "claude",
+                llamar,
+                prioridad,
+                self.limitador.estimar_tokens("claude", system_prompt, user_prompt),
+                salida_estimada or max_tokens,
+                uso=lambda r: (r.usage.input_tokens, r.usage.output_tokens)
             )
             
             tiempo_generacion = time.time() - inicio
             
             contenido = response.content[0].text
             tokens_usados = response.usage.input_tokens + response.usage.output_tokens
+            cache_leidos = response.usage.cache_read_input_tokens or 0
+            cache_escritos = response.usage.cache_creation_input_tokens or 0
             
             print(f"   ✅ Generado en {tiempo_generacion:.2f}s")
-            print(f"   📊 Tokens: {tokens_usados}")
+            print(f"   📊 Tokens: {tokens_usados} (caché: {cache_leidos} leídos, {cache_escritos} escritos)")
             
             return {
                 "contenido": contenido,
@@ -125,9 +550,14 @@ class IAService:
                 "tiempo_generacion": tiempo_generacion,
                 "tokens_usados": tokens_usados,
                 "input_tokens": response.usage.input_tokens,
-                "output_tokens": response.usage.output_tokens
+                "output_tokens": response.usage.output_tokens,
+                "cache_read_input_tokens": cache_leidos,
+                "cache_creation_input_tokens": cache_escritos,
+                "truncado": response.stop_reason == "max_tokens"
             }
             
+        except ProveedorSaturadoError:
+            raise
         except Exception as e:
             print(f"   ❌ Error en Claude: {str(e)}")
             raise Exception(f"Error al generar con Claude: {str(e)}")
@@ -137,19 +567,20 @@ class IAService:
         system_prompt: str,
         user_prompt: str,
         max_tokens: int,
-        temperature: float
+        temperature: float,
+        prioridad: int = 5,
+        salida_estimada: Optional[int] = None
     ) -> Dict[str, Any]:
         """Genera contenido usando OpenAI"""
         
-        if not self.openai_client:
+        cliente = await self.cliente("openai")
+        if not cliente:
             raise Exception("Cliente de OpenAI no inicializado. Verifica OPENAI_API_KEY")
         
         inicio = time.time()
         
-        try:
-            print(f"\n🤖 Generando con OpenAI...")
-            
-            response = self.openai_client.chat.completions.create(
+        async def llamar():
+            raw = await cliente.chat.completions.with_raw_response.create(
                 model=settings.OPENAI_MODEL,
                 max_tokens=max_tokens,
                 temperature=temperature,
@@ -158,6 +589,20 @@ class IAService:
                     {"role": "user", "content": user_prompt}
                 ]
             )
+            self.limitador.actualizar("openai", raw.headers)
+            return raw.parse()
+        
+        try:
+            print(f"\n🤖 Generando con OpenAI...")
+            
+            response = await self.limitador.ejecutar(
+                "openai",
+                llamar,
+                prioridad,
+                self.limitador.estimar_tokens("openai", system_prompt, user_prompt),
+                salida_estimada or max_tokens,
+                uso=lambda r: (r.usage.prompt_tokens, r.usage.completion_tokens)
+            )
             
             tiempo_generacion = time.time() - inicio
             
@@ -174,9 +619,12 @@ class IAService:
                 "tiempo_generacion": tiempo_generacion,
                 "tokens_usados": tokens_usados,
                 "input_tokens": response.usage.prompt_tokens,
-                "output_tokens": response.usage.completion_tokens
+                "output_tokens": response.usage.completion_tokens,
+                "truncado": response.choices[0].finish_reason == "length"
             }
             
+        except ProveedorSaturadoError:
+            raise
         except Exception as e:
             print(f"   ❌ Error en OpenAI: {str(e)}")
             raise Exception(f"Error al generar con OpenAI: {str(e)}")
@@ -186,11 +634,14 @@ class IAService:
         system_prompt: str,
         user_prompt: str,
         max_tokens: int,
-        temperature: float
+        temperature: float,
+        prioridad: int = 5,
+        salida_estimada: Optional[int] = None
     ) -> Dict[str, Any]:
         """Genera contenido usando Gemini"""
         
-        if not self.gemini_client:
+        cliente = await self.cliente("gemini")
+        if not cliente:
             raise Exception("Cliente de Gemini no inicializado. Verifica GOOGLE_API_KEY")
         
         inicio = time.time()
@@ -198,7 +649,7 @@ class IAService:
         try:
             print(f"\n🤖 Generando con Gemini...")
             
-            model = self.gemini_client.GenerativeModel(
+            model = cliente.GenerativeModel(
                 model_name=settings.GEMINI_MODEL,
                 generation_config={
                     "temperature": temperature,
@@ -209,7 +660,14 @@ class IAService:
             # Combinar system y user prompt para Gemini
             prompt_completo = f"{system_prompt}\n\n{user_prompt}"
             
-            response = model.generate_content(prompt_completo)
+            response = await self.limitador.ejecutar(
+                "gemini",
+                lambda: model.generate_content_async(prompt_completo),
+                prioridad,
+                self.limitador.estimar_tokens("gemini", prompt_completo),
+                salida_estimada or max_tokens,
+                uso=self._uso_gemini
+            )
             
             tiempo_generacion = time.time() - inicio
             
@@ -222,31 +680,72 @@ class IAService:
                 "proveedor": "gemini",
                 "modelo": settings.GEMINI_MODEL,
                 "tiempo_generacion": tiempo_generacion,
-                "tokens_usados": None  # Gemini no siempre proporciona esta info
+                "tokens_usados": None,  # Gemini no siempre proporciona esta info
+                "output_tokens": self._uso_gemini(response)[1],
+                "truncado": self._truncado_gemini(response)
             }
             
+        except ProveedorSaturadoError:
+            raise
         except Exception as e:
             print(f"   ❌ Error en Gemini: {str(e)}")
             raise Exception(f"Error al generar con Gemini: {str(e)}")
     
+    @staticmethod
+    def _uso_gemini(response) -> tuple:
+        """(tokens_entrada, tokens_salida) de Gemini si los informa"""
+        uso = getattr(response, "usage_metadata", None)
+        return (
+            getattr(uso, "prompt_token_count", None),
+            getattr(uso, "candidates_token_count", None)
+        )
+    
+    @staticmethod
+    def _truncado_gemini(response) -> bool:
+        """Gemini paró por max_output_tokens"""
+        try:
+            return response.candidates[0].finish_reason.name == "MAX_TOKENS"
+        except (AttributeError, IndexError):
+            return False
+    
+    def _proveedor_configurado(self) -> str:
+        provider = settings.AI_PROVIDER.lower()
+        if provider not in ("claude", "openai", "gemini"):
+            raise ValueError(f"Proveedor no soportado: {provider}")
+        return provider
+    
+    def proveedores_disponibles(self) -> List[str]:
+        """Proveedores con API key (su cliente se crea al usarlo)"""
+        return self.proveedores.configurados()
+    
+    def modelo_actual(self) -> str:
+        """Modelo del proveedor configurado (forma parte de la clave de caché)"""
+        return {
+            "claude": settings.CLAUDE_MODEL,
+            "openai": settings.OPENAI_MODEL,
+            "gemini": settings.GEMINI_MODEL
+        }.get(settings.AI_PROVIDER.lower(), settings.AI_PROVIDER)
+    
     def get_status(self) -> Dict[str, Any]:
-        """Retorna el estado de los clientes de IA"""
+        """Retorna el estado de los clientes de IA y las estadísticas recientes de este worker"""
+        modelos = {"claude": settings.CLAUDE_MODEL, "openai": settings.OPENAI_MODEL, "gemini": settings.GEMINI_MODEL}
         return {
             "provider_actual": settings.AI_PROVIDER,
-            "claude": {
-                "configurado": bool(settings.ANTHROPIC_API_KEY),
-                "inicializado": self.claude_client is not None,
-                "modelo": settings.CLAUDE_MODEL
-            },
-            "openai": {
-                "configurado": bool(settings.OPENAI_API_KEY),
-                "inicializado": self.openai_client is not None,
-                "modelo": settings.OPENAI_MODEL
+            "coalescencia": self.coalescedor.estadisticas(),
+            "enrutado": self.enrutador.estadisticas(),
+            "limites": self.limitador.estadisticas(),
+            "cache_prompt": {
+                generador: {
+                    **stats,
+                    "tasa_aciertos": round(stats["aciertos"] / stats["llamadas"], 3) if stats["llamadas"] else 0.0
+                }
+                for generador, stats in self.estadisticas_cache_prompt.items()
             },
-            "gemini": {
-                "configurado": bool(settings.GOOGLE_API_KEY),
-                "inicializado": self.gemini_client is not None,
-                "modelo": settings.GEMINI_MODEL
+            "en_vivo": estadisticas_vivas.resumen(),
+            "transporte": transporte.estadisticas(),
+            **{
+                proveedor: {**estado, "modelo": modelos[proveedor]}
+                for proveedor, estado in self.proveedores.estadisticas().items()
             }
         }
 
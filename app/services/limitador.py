@@ -0,0 +1,416 @@
+"""
+Limitador de Peticiones por Proveedor
+Presupuesto de peticiones/min y tokens/min (entrada y salida) de cada
+proveedor, ajustado con las cabeceras de rate limit de sus respuestas, con
+una cola justa por prioridades y reintentos con backoff exponencial + jitter
+"""
+import asyncio
+import heapq
+import itertools
+import random
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Callable, Awaitable, Tuple
+from app.services.trazas import trazador
+from app.services.tokens import estimador_tokens
+
+
+class ServicioSaturadoError(Exception):
+    """
+    Un recurso rechaza la petición por límite (429) o sobrecarga (503); la API
+    responde con ese código y Retry-After en lugar de un 500
+    """
+
+    def __init__(self, mensaje: str, status_code: int = 503, reintentar_en: float = 0):
+        self.status_code = status_code
+        self.reintentar_en = reintentar_en
+        super().__init__(mensaje)
+
+
+class ProveedorSaturadoError(ServicioSaturadoError):
+    """El proveedor de IA rechaza peticiones por límite (429) o sobrecarga (503/529)"""
+
+    def __init__(self, proveedor: str, status_code: int = 429, reintentar_en: float = 0):
+        self.proveedor = proveedor
+        motivo = "límite de peticiones" if status_code == 429 else "sobrecarga"
+        super().__init__(
+            f"{proveedor} rechaza peticiones por {motivo}; reintenta en {reintentar_en:.0f}s",
+            status_code,
+            reintentar_en
+        )
+
+
+class ColaJusta:
+    """
+    Cola de espera por prioridad con envejecimiento.
+
+    Cada petición se ordena por su llegada desplazada `prioridad * segundos_por_prioridad`:
+    las urgentes (prioridad 0) adelantan a las largas, pero una petición larga
+    acaba pasando delante de las urgentes que llegan mucho después (sin inanición).
+    """
+
+    def __init__(self, segundos_por_prioridad: float):
+        self.segundos_por_prioridad = segundos_por_prioridad
+        self._heap: List[Tuple[float, int]] = []
+        self._secuencia = itertools.count()
+        self._cambio = asyncio.Condition()
+
+    def __len__(self):
+        return len(self._heap)
+
+    async def esperar_turno(self, prioridad: int, puede_pasar: Callable[[], float], al_pasar: Callable[[], Any]) -> Any:
+        """
+        Espera a ser la primera de la cola y a que `puede_pasar()` devuelva 0
+
+        `puede_pasar` devuelve los segundos que faltan para poder pasar
+        (float("inf") si hay que esperar a que otra petición libere recursos).
+        `al_pasar` ocupa el recurso en el mismo instante en que se concede el
+        turno y su resultado se devuelve.
+        """
+        llegada = time.monotonic()
+        turno = (llegada + prioridad * self.segundos_por_prioridad, next(self._secuencia))
+        heapq.heappush(self._heap, turno)
+        try:
+            async with self._cambio:
+                while True:
+                    espera = puede_pasar() if self._heap[0] == turno else float("inf")
+                    if espera <= 0:
+                        trazador.registrar(espera_cola_ms=(time.monotonic() - llegada) * 1000)
+                        return al_pasar()
+                    try:
+                        await asyncio.wait_for(self._cambio.wait(), timeout=None if espera == float("inf") else espera)
+                    except asyncio.TimeoutError:
+                        pass
+        finally:
+            self._heap.remove(turno)
+            heapq.heapify(self._heap)
+            await self.avisar()
+
+    async def avisar(self):
+        """Despierta a la cola para que la primera vuelva a comprobar si puede pasar"""
+        async with self._cambio:
+            self._cambio.notify_all()
+
+
+class SemaforoPrioridad:
+    """Semáforo cuyas esperas se atienden según ColaJusta en lugar de FIFO"""
+
+    def __init__(self, capacidad: int, segundos_por_prioridad: float):
+        self.capacidad = capacidad
+        self.ocupados = 0
+        self.cola = ColaJusta(segundos_por_prioridad)
+
+    def turno(self, prioridad: int = 5) -> "_Turno":
+        return _Turno(self, prioridad)
+
+    async def adquirir(self, prioridad: int):
+        await self.cola.esperar_turno(
+            prioridad,
+            lambda: 0 if self.ocupados < self.capacidad else float("inf"),
+            self._ocupar
+        )
+
+    def _ocupar(self):
+        self.ocupados += 1
+
+    async def liberar(self):
+        self.ocupados -= 1
+        await self.cola.avisar()
+
+
+class _Turno:
+    def __init__(self, semaforo: SemaforoPrioridad, prioridad: int):
+        self.semaforo = semaforo
+        self.prioridad = prioridad
+
+    async def __aenter__(self):
+        await self.semaforo.adquirir(self.prioridad)
+
+    async def __aexit__(self, *exc):
+        await self.semaforo.liberar()
+
+
+class LimitadorProveedor:
+    """
+    Presupuesto por minuto de un proveedor: peticiones (RPM), tokens de
+    entrada (ITPM) y de salida (OTPM). 0 significa sin límite.
+
+    La salida se reserva con la estimación de la petición (no con su
+    max_tokens, que casi nunca se agota) y se corrige con el uso real al
+    terminar. Ninguna reserva pasa del presupuesto: una petición mayor que él
+    no cabría nunca y se admite cuando la ventana está libre.
+    """
+
+    VENTANA = 60.0
+
+    def __init__(self, nombre: str, rpm: int, itpm: int, otpm: int, segundos_por_prioridad: float, espera_max: float):
+        self.nombre = nombre
+        self.espera_max = espera_max
+        self.rpm = rpm
+        self.itpm = itpm
+        self.otpm = otpm
+        self.cola = ColaJusta(segundos_por_prioridad)
+        self._uso: deque = deque()        # [instante, tokens_entrada, tokens_salida]
+        self._bloqueado_hasta = 0.0
+        self.rechazos = 0
+        self.reintentos = 0
+
+    def _purgar(self, ahora: float):
+        while self._uso and self._uso[0][0] <= ahora - self.VENTANA:
+            self._uso.popleft()
+
+    def _espera(self, entrada: int, salida: int) -> float:
+        """Segundos hasta que una petición con estos tokens cabe en el presupuesto"""
+        ahora = time.monotonic()
+        if self._bloqueado_hasta > ahora:
+            return self._bloqueado_hasta - ahora
+        self._purgar(ahora)
+        if not self._uso:
+            return 0
+        usado_entrada = sum(u[1] for u in self._uso)
+        usado_salida = sum(u[2] for u in self._uso)
+        excede = (
+            (self.rpm and len(self._uso) >= self.rpm)
+            or (self.itpm and usado_entrada + entrada > self.itpm)
+            or (self.otpm and usado_salida + salida > self.otpm)
+        )
+        if not excede:
+            return 0
+        # La entrada más antigua sale de la ventana y se vuelve a comprobar
+        return max(self._uso[0][0] + self.VENTANA - ahora, 0.01)
+
+    async def admitir(self, prioridad: int, entrada: int, salida: int) -> List[float]:
+        """
+        Espera turno y presupuesto; devuelve la reserva para `ajustar`
+
+        Si el presupuesto no se libera antes de `espera_max` segundos falla con
+        ProveedorSaturadoError en vez de dejar la petición colgada.
+        """
+        if self.itpm:
+            entrada = min(entrada, self.itpm)
+        if self.otpm:
+            salida = min(salida, self.otpm)
+
+        def comprobar() -> float:
+            espera = self._espera(entrada, salida)
+            if espera > self.espera_max:
+                raise ProveedorSaturadoError(self.nombre, 429, espera)
+            return espera
+
+        def reservar() -> List[float]:
+            reserva = [time.monotonic(), entrada, salida]
+            self._uso.append(reserva)
+            return reserva
+
+        return await self.cola.esperar_turno(prioridad, comprobar, reservar)
+
+    @staticmethod
+    def ajustar(reserva: List[float], entrada: Optional[int], salida: Optional[int]):
+        """Sustituye la estimación de la reserva por el uso real"""
+        if entrada is not None:
+            reserva[1] = entrada
+        if salida is not None:
+            reserva[2] = salida
+
+    def bloquear(self, segundos: float):
+        self._bloqueado_hasta = max(self._bloqueado_hasta, time.monotonic() + segundos)
+
+    def actualizar(self, cabeceras: Any):
+        """
+        Aprende los límites reales y los bloqueos de las cabeceras de rate limit
+        (anthropic-ratelimit-* y x-ratelimit-* de OpenAI)
+        """
+        if not cabeceras:
+            return
+        limites = {
+            "rpm": ("anthropic-ratelimit-requests-limit", "x-ratelimit-limit-requests"),
+            "itpm": ("anthropic-ratelimit-input-tokens-limit", "x-ratelimit-limit-tokens"),
+            "otpm": ("anthropic-ratelimit-output-tokens-limit",),
+        }
+        for atributo, nombres in limites.items():
+            for nombre in nombres:
+                valor = cabeceras.get(nombre)
+                if valor and valor.isdigit():
+                    setattr(self, atributo, int(valor))
+
+        agotados = (
+            ("anthropic-ratelimit-requests-remaining", "anthropic-ratelimit-requests-reset"),
+            ("anthropic-ratelimit-input-tokens-remaining", "anthropic-ratelimit-input-tokens-reset"),
+            ("anthropic-ratelimit-output-tokens-remaining", "anthropic-ratelimit-output-tokens-reset"),
+            ("x-ratelimit-remaining-requests", "x-ratelimit-reset-requests"),
+            ("x-ratelimit-remaining-tokens", "x-ratelimit-reset-tokens"),
+        )
+        for restante, reinicio in agotados:
+            if cabeceras.get(restante) == "0":
+                self.bloquear(segundos_hasta(cabeceras.get(reinicio)))
+
+        if cabeceras.get("retry-after"):
+            self.bloquear(segundos_hasta(cabeceras.get("retry-after")))
+
+    def estadisticas(self) -> Dict[str, Any]:
+        ahora = time.monotonic()
+        self._purgar(ahora)
+        return {
+            "rpm": self.rpm,
+            "itpm": self.itpm,
+            "otpm": self.otpm,
+            "peticiones_ultimo_minuto": len(self._uso),
+            "tokens_entrada_ultimo_minuto": sum(u[1] for u in self._uso),
+            "tokens_salida_ultimo_minuto": sum(u[2] for u in self._uso),
+            "en_cola": len(self.cola),
+            "bloqueado_segundos": max(0.0, round(self._bloqueado_hasta - ahora, 2)),
+            "rechazos": self.rechazos,
+            "reintentos": self.reintentos
+        }
+
+
+def segundos_hasta(valor: Optional[str]) -> float:
+    """
+    Interpreta un reset de rate limit: segundos ("30"), duración de OpenAI
+    ("1m30s", "250ms") o fecha RFC 3339 de Anthropic
+    """
+    if not valor:
+        return 1.0
+    try:
+        return max(float(valor), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max((datetime.fromisoformat(valor.replace("Z", "+00:00")).timestamp() - time.time()), 0.0)
+    except ValueError:
+        pass
+    total, numero = 0.0, ""
+    unidades = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+    i = 0
+    while i < len(valor):
+        c = valor[i]
+        if c.isdigit() or c == ".":
+            numero += c
+        elif numero:
+            unidad = "ms" if valor[i:i + 2] == "ms" else c
+            total += float(numero) * unidades.get(unidad, 1)
+            numero = ""
+            i += len(unidad) - 1
+        i += 1
+    return total or 1.0
+
+
+def info_saturacion(error: Exception) -> Optional[Tuple[int, Any]]:
+    """(status, cabeceras) si el error del SDK es un 429/503/529, None en otro caso"""
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if status in (429, 503, 529):
+        respuesta = getattr(error, "response", None)
+        return status, getattr(respuesta, "headers", None)
+    return None
+
+
+def es_transitorio(error: Exception) -> bool:
+    """Errores de conexión o timeout del SDK (reintentables sin penalizar el presupuesto)"""
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+class LimitadorPeticiones:
+    """Limitadores de todos los proveedores y política de reintentos"""
+
+    def __init__(
+        self,
+        limites: Dict[str, Tuple[int, int, int]],
+        segundos_por_prioridad: float,
+        max_reintentos: int,
+        backoff_base: float,
+        backoff_max: float,
+        espera_max: float,
+        timeout: Optional[float] = None
+    ):
+        self.proveedores = {
+            nombre: LimitadorProveedor(nombre, rpm, itpm, otpm, segundos_por_prioridad, espera_max)
+            for nombre, (rpm, itpm, otpm) in limites.items()
+        }
+        self.espera_max = espera_max
+        self.max_reintentos = max_reintentos
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+
+    @staticmethod
+    def estimar_tokens(proveedor: str, *textos: str) -> int:
+        """Estimación local de tokens de entrada, calibrada con lo que factura el proveedor"""
+        return estimador_tokens.entrada(*textos, proveedor=proveedor)
+
+    def backoff(self, intento: int) -> float:
+        """Backoff exponencial con jitter completo"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** intento))
+
+    def saturado(self, proveedor: str, error: Exception) -> Optional[ProveedorSaturadoError]:
+        """Registra un 429/503/529 del proveedor y lo traduce a ProveedorSaturadoError"""
+        info = info_saturacion(error)
+        if info is None:
+            return None
+        status, cabeceras = info
+        limitador = self.proveedores[proveedor]
+        limitador.rechazos += 1
+        limitador.actualizar(cabeceras)
+        espera = segundos_hasta(cabeceras.get("retry-after")) if cabeceras and cabeceras.get("retry-after") else 0
+        limitador.bloquear(espera)
+        return ProveedorSaturadoError(proveedor, 429 if status == 429 else 503, espera)
+
+    async def ejecutar(
+        self,
+        proveedor: str,
+        llamar: Callable[[], Awaitable[Any]],
+        prioridad: int,
+        tokens_entrada: int,
+        tokens_salida: int,
+        uso: Callable[[Any], Tuple[Optional[int], Optional[int]]]
+    ) -> Any:
+        """
+        Ejecuta `llamar` dentro del presupuesto del proveedor, reintentando
+        los 429/503/529 y los errores de conexión con backoff y jitter
+
+        El timeout se aplica a cada intento desde su admisión: la espera en la
+        cola y los reintentos anteriores no lo consumen.
+
+        Args:
+            proveedor: claude, openai o gemini
+            llamar: Corrutina que hace la llamada (y pasa las cabeceras a `actualizar`)
+            prioridad: 0 (urgente) a 9 (puede esperar)
+            tokens_entrada: Estimación de tokens del prompt
+            tokens_salida: Salida estimada (se reserva hasta conocer la real)
+            uso: Extrae (tokens_entrada, tokens_salida) reales de la respuesta
+        """
+        limitador = self.proveedores[proveedor]
+        for intento in range(self.max_reintentos + 1):
+            reserva = await limitador.admitir(prioridad, tokens_entrada, tokens_salida)
+            try:
+                respuesta = await asyncio.wait_for(llamar(), timeout=self.timeout)
+            except asyncio.TimeoutError:
+                raise Exception(f"Timeout de {self.timeout:.0f}s con {proveedor}")
+            except Exception as e:
+                limitador.ajustar(reserva, None, 0)
+                saturado = self.saturado(proveedor, e)
+                if saturado is None and not es_transitorio(e):
+                    raise
+                if intento == self.max_reintentos or (saturado and saturado.reintentar_en > self.espera_max):
+                    raise saturado or e
+                limitador.reintentos += 1
+                espera = max(saturado.reintentar_en if saturado else 0, self.backoff(intento))
+                print(f"   ⏳ {proveedor}: {saturado or e} - reintento {intento + 1} en {espera:.1f}s")
+                await asyncio.sleep(espera)
+                continue
+            limitador.ajustar(reserva, *uso(respuesta))
+            return respuesta
+
+    async def admitir(self, proveedor: str, prioridad: int, tokens_entrada: int, tokens_salida: int) -> List[float]:
+        """Admisión sin reintentos (streaming): devuelve la reserva para `ajustar`"""
+        return await self.proveedores[proveedor].admitir(prioridad, tokens_entrada, tokens_salida)
+
+    @staticmethod
+    def ajustar(reserva: List[float], entrada: Optional[int], salida: Optional[int]):
+        LimitadorProveedor.ajustar(reserva, entrada, salida)
+
+    def actualizar(self, proveedor: str, cabeceras: Any):
+        self.proveedores[proveedor].actualizar(cabeceras)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return {nombre: limitador.estadisticas() for nombre, limitador in self.proveedores.items()}
@@ -0,0 +1,164 @@
+"""
+Servicio de Generación por Lotes
+Informes a familias de toda una clase: en paralelo con concurrencia acotada,
+o diferidos a través de la Message Batches API de Anthropic
+"""
+import asyncio
+import time
+from typing import Dict, Any, AsyncIterator
+from config import settings
+from app.models.requests import InformeFamiliaLoteRequest, AlumnoInforme
+from app.services.ia_service import ia_service
+from app.services.generador_service import generador_service
+
+
+class LoteService:
+    """Servicio para generar documentos de muchos alumnos en una sola petición"""
+
+    TIPO_INFORME = "informe-familia"
+
+    @staticmethod
+    async def generar_informes(
+        lote: InformeFamiliaLoteRequest,
+        force_regenerate: bool = False
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Genera los informes de la clase y los produce según van terminando
+
+        Produce un evento {"evento": "informe", ...} por alumno (correcto o
+        fallido, con su índice en la lista) y un evento final {"evento": "fin", ...}
+        con el resumen. Un fallo individual no interrumpe el resto del lote.
+        """
+        inicio = time.time()
+        semaforo = asyncio.Semaphore(settings.LOTE_MAX_CONCURRENCIA)
+
+        async def generar_uno(indice: int, alumno: AlumnoInforme) -> Dict[str, Any]:
+            async with semaforo:
+                try:
+                    resultado = await generador_service.generar(
+                        LoteService.TIPO_INFORME,
+                        lote.informe(alumno),
+                        force_regenerate
+                    )
+                    return {
+                        "evento": "informe",
+                        "indice": indice,
+                        "nombre_alumno": alumno.nombre_alumno,
+                        "success": True,
+                        "contenido": resultado["contenido"],
+                        "tiempo_generacion": resultado.get("tiempo_generacion"),
+                        "desde_cache": resultado.get("desde_cache", False)
+                    }
+                except Exception as e:
+                    return {
+                        "evento": "informe",
+                        "indice": indice,
+                        "nombre_alumno": alumno.nombre_alumno,
+                        "success": False,
+                        "error": str(e)
+                    }
+
+        tareas = [
+            asyncio.create_task(generar_uno(indice, alumno))
+            for indice, alumno in enumerate(lote.alumnos)
+        ]
+        fallidos = []
+
+        try:
+            for siguiente in asyncio.as_completed(tareas):
+                evento = await siguiente
+                if not evento["success"]:
+                    fallidos.append({"indice": evento["indice"], "nombre_alumno": evento["nombre_alumno"]})
+                yield evento
+        finally:
+            # Si el cliente se desconecta no seguimos generando
+            for tarea in tareas:
+                tarea.cancel()
+
+        yield {
+            "evento": "fin",
+            "total": len(tareas),
+            "correctos": len(tareas) - len(fallidos),
+            "fallidos": sorted(fallidos, key=lambda f: f["indice"]),
+            "tiempo_total": time.time() - inicio
+        }
+
+    @staticmethod
+    async def _cliente_batches():
+        """Cliente de Claude para la Message Batches API (solo disponible con Anthropic)"""
+        cliente = await ia_service.cliente("claude")
+        if not cliente:
+            raise Exception("La generación diferida requiere Claude. Verifica ANTHROPIC_API_KEY")
+        return cliente.messages.batches
+
+    @staticmethod
+    async def crear_batch_informes(lote: InformeFamiliaLoteRequest) -> Dict[str, Any]:
+        """
+        Envía el lote a la Message Batches API de Anthropic (más barata, resultados diferidos)
+
+        Returns:
+            Dict con el id del batch y su estado inicial
+        """
+        spec = generador_service.obtener(LoteService.TIPO_INFORME)
+        batches = await LoteService._cliente_batches()
+        batch = await batches.create(
+            requests=[
+                {
+                    "custom_id": f"alumno-{indice}",
+                    "params": {
+                        "model": settings.CLAUDE_MODEL,
+                        "max_tokens": generador_service.max_tokens(spec, lote.informe(alumno)),
+                        "temperature": spec.temperature,
+                        "messages": [
+                            {"role": "user", "content": spec.construir_prompt(lote.informe(alumno))}
+                        ],
+                        **ia_service.system_claude(spec.system_prompt)
+                    }
+                }
+                for indice, alumno in enumerate(lote.alumnos)
+            ]
+        )
+        return {
+            "batch_id": batch.id,
+            "estado": batch.processing_status,
+            "total": len(lote.alumnos)
+        }
+
+    @staticmethod
+    async def obtener_batch_informes(batch_id: str) -> Dict[str, Any]:
+        """
+        Consulta un batch de informes; cuando ha terminado incluye los resultados
+
+        Los resultados se identifican por el índice del alumno en el lote original.
+        """
+        batches = await LoteService._cliente_batches()
+        batch = await batches.retrieve(batch_id)
+        respuesta = {
+            "batch_id": batch.id,
+            "estado": batch.processing_status,
+            "contadores": batch.request_counts.model_dump()
+        }
+        if batch.processing_status != "ended":
+            return respuesta
+
+        informes = []
+        async for entrada in await batches.results(batch_id):
+            indice = int(entrada.custom_id.split("-", 1)[1])
+            if entrada.result.type == "succeeded":
+                informes.append({
+                    "indice": indice,
+                    "success": True,
+                    "contenido": entrada.result.message.content[0].text
+                })
+            else:
+                informes.append({
+                    "indice": indice,
+                    "success": False,
+                    "error": entrada.result.type
+                })
+        respuesta["informes"] = sorted(informes, key=lambda i: i["indice"])
+        return respuesta
+
+
+# Instancia global del servicio
+lote_service = LoteService()
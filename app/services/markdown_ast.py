@@ -0,0 +1,251 @@
+"""
+Analizador de Markdown
+Tokenizador de una sola pasada que convierte la salida de los generadores en
+un AST compacto de bloques y fragmentos en línea, común a todos los
+exportadores (Word, PDF)
+"""
+import re
+from typing import List, NamedTuple, Tuple, Union
+
+# Formato en línea (bits combinables)
+NEGRITA = 1
+CURSIVA = 2
+CODIGO = 4
+
+
+class Fragmento(NamedTuple):
+    """Texto con formato en línea homogéneo"""
+    texto: str
+    formato: int = 0
+
+
+Inline = Tuple[Fragmento, ...]
+
+
+class Encabezado(NamedTuple):
+    nivel: int
+    contenido: Inline
+
+
+class Parrafo(NamedTuple):
+    contenido: Inline
+
+
+class Elemento(NamedTuple):
+    """Elemento de lista; `nivel` 0 es el primer nivel de anidamiento"""
+    ordenada: bool
+    nivel: int
+    marcador: str
+    contenido: Inline
+
+
+class Tabla(NamedTuple):
+    cabecera: Tuple[Inline, ...]
+    filas: Tuple[Tuple[Inline, ...], ...]
+
+
+class Codigo(NamedTuple):
+    lenguaje: str
+    texto: str
+
+
+class Cita(NamedTuple):
+    contenido: Inline
+
+
+class Separador(NamedTuple):
+    pass
+
+
+Bloque = Union[Encabezado, Parrafo, Elemento, Tabla, Codigo, Cita, Separador]
+
+
+# Clasificación de líneas: un único patrón con alternativas nombradas
+_LINEA = re.compile(r"""
+    (?P<valla>\s*(?:```|~~~)\s*(?P<lenguaje>[\w+-]*)\s*$)
+  | (?P<encabezado>(?P<almohadillas>\#{1,6})\s+(?P<texto_encabezado>.*?)(?:\s+\#+)?\s*$)
+  | (?P<separador>\s*(?:(?:-\s*){3,}|(?:\*\s*){3,}|(?:_\s*){3,})$)
+  | (?P<elemento>(?P<sangria>[ \t]*)(?P<marcador>[-*+•]|\d{1,3}[.)])\s+(?P<texto_elemento>.*))
+  | (?P<tabla>\s*\|.*)
+  | (?P<cita>\s*>\s?(?P<texto_cita>.*))
+  | (?P<vacia>\s*$)
+""", re.VERBOSE)
+
+_FILA_SEPARADORA = re.compile(r"^\s*\|?\s*:?-{2,}:?\s*(?:\|\s*:?-{2,}:?\s*)*\|?\s*$")
+
+# Formato en línea: negrita+cursiva, negrita, cursiva y código
+_INLINE = re.compile(r"""
+    \*\*\*(?P<negrita_cursiva>[^*]+?)\*\*\*
+  | \*\*(?P<negrita>.+?)\*\*
+  | __(?P<negrita2>.+?)__
+  | (?<![\w*])\*(?P<cursiva>[^\s*](?:[^*]*?[^\s*])?)\*(?![\w*])
+  | (?<!\w)_(?P<cursiva2>[^\s_](?:[^_]*?[^\s_])?)_(?!\w)
+  | `(?P<codigo>[^`]+)`
+""", re.VERBOSE)
+
+_ESPECIALES = re.compile(r"[*_`]")
+
+
+def analizar_inline(texto: str, formato: int = 0) -> Inline:
+    """Divide un texto en fragmentos según su formato en línea"""
+    if not _ESPECIALES.search(texto):
+        return (Fragmento(texto, formato),) if texto else ()
+
+    fragmentos: List[Fragmento] = []
+    posicion = 0
+    for coincidencia in _INLINE.finditer(texto):
+        if coincidencia.start() > posicion:
+            fragmentos.append(Fragmento(texto[posicion:coincidencia.start()], formato))
+        grupo = coincidencia.lastgroup
+        interior = coincidencia.group(grupo)
+        if grupo == "codigo":
+            fragmentos.append(Fragmento(interior, formato | CODIGO))
+        elif grupo == "negrita_cursiva":
+            fragmentos.extend(analizar_inline(interior, formato | NEGRITA | CURSIVA))
+        elif grupo in ("negrita", "negrita2"):
+            fragmentos.extend(analizar_inline(interior, formato | NEGRITA))
+        else:
+            fragmentos.extend(analizar_inline(interior, formato | CURSIVA))
+        posicion = coincidencia.end()
+    if posicion < len(texto):
+        fragmentos.append(Fragmento(texto[posicion:], formato))
+    return tuple(fragmentos)
+
+
+def _celdas(linea: str) -> Tuple[Inline, ...]:
+    linea = linea.strip()
+    if linea.startswith("|"):
+        linea = linea[1:]
+    if linea.endswith("|"):
+        linea = linea[:-1]
+    return tuple(analizar_inline(celda.strip()) for celda in linea.split("|"))
+
+
+def _tabla(lineas: List[str]) -> Union[Tabla, None]:
+    """Tabla GFM (cabecera + fila separadora + filas); None si no lo es"""
+    if len(lineas) < 2 or not _FILA_SEPARADORA.match(lineas[1]):
+        return None
+    cabecera = _celdas(lineas[0])
+    columnas = len(cabecera)
+    filas = []
+    for linea in lineas[2:]:
+        celdas = _celdas(linea)
+        # Normalizar al número de columnas de la cabecera
+        filas.append(celdas[:columnas] + ((),) * (columnas - len(celdas)))
+    return Tabla(cabecera, tuple(filas))
+
+
+def analizar_markdown(contenido: str) -> List[Bloque]:
+    """
+    Convierte Markdown en una lista de bloques en una sola pasada
+
+    Cada línea de texto es un párrafo (los generadores no parten párrafos en
+    varias líneas). La sangría de las listas define su nivel de anidamiento.
+    """
+    bloques: List[Bloque] = []
+    lineas = contenido.replace("\r\n", "\n").split("\n")
+    total = len(lineas)
+    sangrias: List[int] = []
+    i = 0
+
+    while i < total:
+        linea = lineas[i]
+        m = _LINEA.match(linea)
+        # lastgroup es la alternativa exterior (se cierra después de sus subgrupos)
+        tipo = m.lastgroup if m else None
+
+        if tipo != "elemento" and tipo != "vacia":
+            sangrias = []
+
+        if tipo == "vacia":
+            i += 1
+        elif tipo == "valla":
+            lenguaje = m.group("lenguaje") or ""
+            valla = linea.strip()[:3]
+            codigo = []
+            i += 1
+            while i < total and not lineas[i].strip().startswith(valla):
+                codigo.append(lineas[i])
+                i += 1
+            bloques.append(Codigo(lenguaje, "\n".join(codigo)))
+            i += 1
+        elif tipo == "encabezado":
+            bloques.append(Encabezado(len(m.group("almohadillas")), analizar_inline(m.group("texto_encabezado"))))
+            i += 1
+        elif tipo == "separador":
+            bloques.append(Separador())
+            i += 1
+        elif tipo == "elemento":
+            sangria = len(m.group("sangria").expandtabs(4))
+            while sangrias and sangria < sangrias[-1]:
+                sangrias.pop()
+            if not sangrias or sangria > sangrias[-1]:
+                sangrias.append(sangria)
+            marcador = m.group("marcador")
+            bloques.append(Elemento(
+                marcador[0].isdigit(),
+                len(sangrias) - 1,
+                marcador,
+                analizar_inline(m.group("texto_elemento").strip())
+            ))
+            i += 1
+        elif tipo == "tabla":
+            inicio = i
+            while i < total and lineas[i].lstrip().startswith("|"):
+                i += 1
+            tabla = _tabla(lineas[inicio:i])
+            if tabla is not None:
+                bloques.append(tabla)
+            else:
+                bloques.extend(Parrafo(analizar_inline(l.strip())) for l in lineas[inicio:i])
+        elif tipo == "cita":
+            bloques.append(Cita(analizar_inline(m.group("texto_cita").strip())))
+            i += 1
+        else:
+            bloques.append(Parrafo(analizar_inline(linea.strip())))
+            i += 1
+
+    return bloques
+
+
+def texto_plano(contenido: Inline) -> str:
+    """Texto de una secuencia de fragmentos sin formato"""
+    return "".join(fragmento.texto for fragmento in contenido)
+
+
+class Seccion(NamedTuple):
+    """Encabezado de un documento y rango de líneas [inicio, fin) de su sección"""
+    nivel: int
+    titulo: str     # Texto del encabezado sin formato en línea
+    inicio: int     # Línea del encabezado
+    fin: int        # Siguiente encabezado de igual o mayor rango (o el final)
+
+
+def secciones_markdown(contenido: str) -> List[Seccion]:
+    """
+    Secciones de un documento según sus encabezados: los mismos que reconoce
+    `analizar_markdown` (y que se exportan como títulos), sin contar los que
+    están dentro de un bloque de código. Las líneas se numeran sobre el
+    contenido con saltos normalizados a "\\n".
+    """
+    lineas = contenido.replace("\r\n", "\n").split("\n")
+    encabezados: List[Tuple[int, int, str]] = []
+    valla = None
+    for i, linea in enumerate(lineas):
+        if valla is not None:
+            if linea.strip().startswith(valla):
+                valla = None
+            continue
+        m = _LINEA.match(linea)
+        tipo = m.lastgroup if m else None
+        if tipo == "valla":
+            valla = linea.strip()[:3]
+        elif tipo == "encabezado":
+            titulo = texto_plano(analizar_inline(m.group("texto_encabezado")))
+            encabezados.append((i, len(m.group("almohadillas")), titulo))
+
+    secciones = []
+    for orden, (inicio, nivel, titulo) in enumerate(encabezados):
+        fin = next((linea for linea, otro_nivel, _ in encabezados[orden + 1:] if otro_nivel <= nivel), len(lineas))
+        secciones.append(Seccion(nivel, titulo, inicio, fin))
+    return secciones
@@ -0,0 +1,204 @@
+"""
+Métricas de Prometheus
+Latencia por generador y proveedor, generaciones en curso, tokens y
+aciertos de las cachés. Con varios workers de uvicorn se agregan entre
+procesos si PROMETHEUS_MULTIPROC_DIR apunta a un directorio compartido
+(vacío al arrancar)
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Optional
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    REGISTRY,
+    generate_latest,
+    multiprocess
+)
+
+# Las generaciones tardan segundos o minutos: cubos acordes
+_CUBOS_GENERACION = (0.5, 1, 2, 5, 10, 20, 30, 45, 60, 90, 120, 180, 300)
+_CUBOS_PRIMER_TOKEN = (0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30)
+_CUBOS_EXPORTACION = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+GENERACION_SEGUNDOS = Histogram(
+    "docentia_generacion_segundos",
+    "Duración de las generaciones correctas (incluye cola y reintentos)",
+    ["generador", "proveedor"],
+    buckets=_CUBOS_GENERACION
+)
+PRIMER_TOKEN_SEGUNDOS = Histogram(
+    "docentia_primer_token_segundos",
+    "Tiempo hasta el primer fragmento en las generaciones en streaming",
+    ["generador", "proveedor"],
+    buckets=_CUBOS_PRIMER_TOKEN
+)
+GENERACIONES_TOTAL = Counter(
+    "docentia_generaciones_total",
+    "Generaciones terminadas por resultado (ok, cache, error, cancelada)",
+    ["generador", "resultado"]
+)
+GENERACIONES_EN_CURSO = Gauge(
+    "docentia_generaciones_en_curso",
+    "Generaciones en curso",
+    ["generador"],
+    multiprocess_mode="livesum"
+)
+GENERACIONES_TRUNCADAS_TOTAL = Counter(
+    "docentia_generaciones_truncadas_total",
+    "Generaciones cortadas por max_tokens",
+    ["generador"]
+)
+TOKENS_TOTAL = Counter(
+    "docentia_tokens_total",
+    "Tokens consumidos por proveedor y tipo (entrada, salida, cache_leidos, cache_escritos)",
+    ["proveedor", "tipo"]
+)
+CACHE_CONSULTAS_TOTAL = Counter(
+    "docentia_cache_consultas_total",
+    "Consultas a las cachés (generaciones, exportaciones, prompt) por resultado",
+    ["cache", "resultado"]
+)
+EXPORTACION_SEGUNDOS = Histogram(
+    "docentia_exportacion_segundos",
+    "Duración de las exportaciones que no salen de caché",
+    ["formato"],
+    buckets=_CUBOS_EXPORTACION
+)
+EXPORTACIONES_PDF_PENDIENTES = Gauge(
+    "docentia_exportaciones_pdf_pendientes",
+    "Exportaciones PDF en curso o en cola",
+    multiprocess_mode="livesum"
+)
+
+
+def exposicion() -> bytes:
+    """Texto de /metrics: agregado de todos los workers en modo multiproceso"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+        return generate_latest(registro)
+    return generate_latest(REGISTRY)
+
+
+def registrar_tokens(resultado: Dict[str, Any]):
+    """Suma los tokens de una llamada correcta a su proveedor"""
+    proveedor = resultado.get("proveedor", "desconocido")
+    for tipo, campo in (
+        ("entrada", "input_tokens"),
+        ("salida", "output_tokens"),
+        ("cache_leidos", "cache_read_input_tokens"),
+        ("cache_escritos", "cache_creation_input_tokens")
+    ):
+        if resultado.get(campo):
+            TOKENS_TOTAL.labels(proveedor, tipo).inc(resultado[campo])
+
+
+class EstadisticasVivas:
+    """
+    Ventana deslizante (últimos `ventana` segundos) de las generaciones de
+    este worker, para IAService.get_status: ritmo, errores y percentiles
+    """
+
+    def __init__(self, ventana: float = 300):
+        self.ventana = ventana
+        self._muestras: Dict[str, deque] = {}
+        self._en_curso: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def empezar(self, generador: str):
+        with self._lock:
+            self._en_curso[generador] = self._en_curso.get(generador, 0) + 1
+
+    def registrar(self, generador: str, segundos: float, resultado: str):
+        """Cierra una generación empezada con `empezar`"""
+        ahora = time.monotonic()
+        with self._lock:
+            self._en_curso[generador] -= 1
+            muestras = self._muestras.setdefault(generador, deque())
+            muestras.append((ahora, segundos, resultado))
+            while muestras and muestras[0][0] < ahora - self.ventana:
+                muestras.popleft()
+
+    def resumen(self) -> Dict[str, Any]:
+        limite = time.monotonic() - self.ventana
+        resumen = {}
+        with self._lock:
+            for generador in self._en_curso.keys() | self._muestras.keys():
+                muestras = self._muestras.get(generador, ())
+                while muestras and muestras[0][0] < limite:
+                    muestras.popleft()
+                if not muestras and not self._en_curso.get(generador):
+                    continue
+                duraciones = sorted(s for _, s, r in muestras if r != "error")
+                resumen[generador] = {
+                    "en_curso": self._en_curso.get(generador, 0),
+                    "por_minuto": round(len(muestras) * 60 / self.ventana, 2),
+                    "errores": sum(1 for _, _, r in muestras if r == "error"),
+                    "desde_cache": sum(1 for _, _, r in muestras if r == "cache"),
+                    "p50": _percentil(duraciones, 50),
+                    "p95": _percentil(duraciones, 95)
+                }
+        return {"ventana_segundos": self.ventana, "generadores": resumen}
+
+
+def _percentil(ordenadas: list, p: float) -> Optional[float]:
+    if not ordenadas:
+        return None
+    return round(ordenadas[min(len(ordenadas) - 1, int(round(p / 100 * (len(ordenadas) - 1))))], 3)
+
+
+class MedidorGeneracion:
+    """
+    Mide una generación de principio a fin: en curso, latencia por
+    proveedor, resultado y ventana viva
+
+        with MedidorGeneracion("examen") as medidor:
+            resultado = await ...
+            medidor.terminar(resultado)
+    """
+
+    def __init__(self, generador: str):
+        self.generador = generador
+        self.resultado: Optional[Dict[str, Any]] = None
+
+    def __enter__(self) -> "MedidorGeneracion":
+        self.inicio = time.perf_counter()
+        GENERACIONES_EN_CURSO.labels(self.generador).inc()
+        estadisticas_vivas.empezar(self.generador)
+        return self
+
+    def terminar(self, resultado: Dict[str, Any]):
+        self.resultado = resultado
+
+    def __exit__(self, tipo_error, error, traza):
+        GENERACIONES_EN_CURSO.labels(self.generador).dec()
+        segundos = time.perf_counter() - self.inicio
+        if isinstance(error, (GeneratorExit, asyncio.CancelledError)):
+            # El cliente cortó el stream o se canceló la tarea
+            estado = "cancelada"
+        elif error is not None or self.resultado is None:
+            estado = "error"
+        elif self.resultado.get("desde_cache"):
+            estado = "cache"
+        else:
+            estado = "ok"
+            proveedor = self.resultado.get("proveedor", "desconocido")
+            GENERACION_SEGUNDOS.labels(self.generador, proveedor).observe(segundos)
+            if self.resultado.get("tiempo_primer_token") is not None:
+                PRIMER_TOKEN_SEGUNDOS.labels(self.generador, proveedor).observe(self.resultado["tiempo_primer_token"])
+            if self.resultado.get("truncado"):
+                GENERACIONES_TRUNCADAS_TOTAL.labels(self.generador).inc()
+        GENERACIONES_TOTAL.labels(self.generador, estado).inc()
+        estadisticas_vivas.registrar(self.generador, segundos, estado)
+        return False
+
+
+# Instancia global
+estadisticas_vivas = EstadisticasVivas()
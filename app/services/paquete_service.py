@@ -0,0 +1,109 @@
+"""
+Servicio de Paquetes de Exportación
+Exporta varias partes de un documento en varios formatos a la vez y las
+entrega en un único ZIP cuyo contenedor se envía fichero a fichero
+"""
+import asyncio
+import zipfile
+from typing import Dict, Any, Optional, List, AsyncIterator
+from starlette.concurrency import run_in_threadpool
+from app.services.export_service import ExportService
+from app.services.pdf_service import pdf_service
+
+# Nombre y título de cada sección del examen dentro del ZIP
+SECCIONES_EXAMEN = {
+    "examen": ("01_examen", "Examen"),
+    "hoja_respuestas": ("02_hoja_de_respuestas", "Hoja de respuestas"),
+    "soluciones": ("03_soluciones", "Soluciones"),
+}
+
+
+class _SalidaZip:
+    """
+    Destino no posicionable para zipfile: acumula lo escrito hasta que se
+    vacía, así el ZIP sale por la red fichero a fichero
+    """
+
+    def __init__(self):
+        self._partes: List[bytes] = []
+        self._posicion = 0
+
+    def write(self, datos: bytes) -> int:
+        self._partes.append(bytes(datos))
+        self._posicion += len(datos)
+        return len(datos)
+
+    def tell(self) -> int:
+        return self._posicion
+
+    def flush(self):
+        pass
+
+    def vaciar(self) -> bytes:
+        datos = b"".join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+class PaqueteService:
+    """Paquetes ZIP de exportación (por ahora, el examen con sus anexos)"""
+
+    async def examen_zip(
+        self,
+        contenido_markdown: str,
+        titulo: str = "Examen",
+        metadatos: Optional[Dict[str, Any]] = None,
+        plantilla: Optional[str] = None,
+        formatos: tuple = ("docx", "pdf")
+    ) -> AsyncIterator[bytes]:
+        """
+        Divide el examen en sus secciones y exporta cada una en cada formato
+        en paralelo (Word en el pool de hilos, PDF en el de procesos)
+
+        Todos los ficheros se generan, y quedan en memoria, antes de devolver
+        el iterador: cualquier fallo (p.ej. cola de PDF llena) se convierte en
+        un error HTTP normal y nunca en un 200 con un ZIP truncado. Solo el
+        contenedor ZIP se escribe en la respuesta fichero a fichero.
+
+        Returns:
+            Al esperarla, el iterador asíncrono con los bytes del ZIP (la
+            corrutina no es un generador: hay que hacer await antes de iterar)
+        """
+        async def exportar(nombre: str, titulo_seccion: str, formato: str, bloques) -> tuple:
+            if formato == "pdf":
+                datos = await pdf_service.exportar_bloques(bloques, titulo_seccion, metadatos)
+            else:
+                datos = await run_in_threadpool(
+                    ExportService.word_desde_bloques, bloques, titulo_seccion, metadatos, plantilla
+                )
+            return f"{nombre}.{formato}", datos
+
+        tareas = []
+        for seccion, bloques in ExportService.secciones_examen(contenido_markdown):
+            nombre, etiqueta = SECCIONES_EXAMEN[seccion]
+            titulo_seccion = titulo if seccion == "examen" else f"{etiqueta} - {titulo}"
+            for formato in formatos:
+                tareas.append(asyncio.ensure_future(exportar(nombre, titulo_seccion, formato, bloques)))
+
+        try:
+            ficheros = await asyncio.gather(*tareas)
+        except BaseException:
+            # Si falla una parte (o el cliente se va) no seguimos exportando las demás
+            for tarea in tareas:
+                tarea.cancel()
+            raise
+
+        async def zip_en_streaming() -> AsyncIterator[bytes]:
+            salida = _SalidaZip()
+            # Word y PDF ya van comprimidos: se guardan sin volver a comprimir
+            with zipfile.ZipFile(salida, "w", zipfile.ZIP_STORED) as paquete:
+                for fichero in ficheros:
+                    paquete.writestr(*fichero)
+                    yield salida.vaciar()
+            yield salida.vaciar()
+
+        return zip_en_streaming()
+
+
+# Instancia global del servicio
+paquete_service = PaqueteService()
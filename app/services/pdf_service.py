@@ -0,0 +1,146 @@
+"""
+Servicio de Exportación a PDF
+Ejecuta la maquetación en un pool de procesos, para que no compita por el
+GIL con el event loop de la API, y acota la cola de exportaciones
+"""
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, Optional, List, Callable
+from starlette.concurrency import run_in_threadpool
+from config import settings
+from app.services.export_service import ExportService
+from app.services.markdown_ast import Bloque
+from app.services.limitador import ServicioSaturadoError
+from app.services.metricas import EXPORTACIONES_PDF_PENDIENTES
+
+
+class ExportacionSaturadaError(ServicioSaturadoError):
+    """La cola de exportaciones PDF está llena (503)"""
+
+    def __init__(self, reintentar_en: float):
+        super().__init__(
+            f"La exportación a PDF está saturada; reintenta en {reintentar_en:.0f}s",
+            503,
+            reintentar_en
+        )
+
+
+def _preparar_worker():
+    """Carga reportlab y sus fuentes antes de la primera exportación"""
+    ExportService.exportar_pdf("Calentamiento", "DocentIA")
+
+
+class PdfService:
+    """
+    Exportaciones PDF con concurrencia y cola acotadas.
+
+    Hay como mucho `max_cola` exportaciones entre en curso y en espera; la
+    siguiente se rechaza con ExportacionSaturadaError (503 + Retry-After), en
+    vez de acumular trabajo que el cliente acabará abandonando por timeout.
+    """
+
+    def __init__(self, workers: int = 2, max_cola: int = 16):
+        self.workers = workers
+        self.max_cola = max_cola
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pendientes = 0
+        self._duracion_media = 1.0
+        self.completadas = 0
+        self.rechazadas = 0
+        self.errores = 0
+
+    def iniciar(self):
+        """Arranca el pool de procesos (con PDF_WORKERS=0 se usa el pool de hilos)"""
+        if self.workers <= 0 or self._pool is not None:
+            return
+        # spawn: el servidor ya tiene hilos y un event loop, que no deben heredarse con fork
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_preparar_worker
+        )
+        print(f"📄 Pool de exportación PDF: {self.workers} procesos, cola máxima {self.max_cola}")
+
+    def detener(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _reintentar_en(self) -> float:
+        """Estimación de cuándo habrá hueco en la cola"""
+        return self._duracion_media * self._pendientes / max(1, self.workers)
+
+    async def exportar(
+        self,
+        contenido_markdown: str,
+        titulo: str = "Documento DocentIA",
+        metadatos: Optional[Dict[str, Any]] = None
+    ) -> bytes:
+        """
+        Genera el PDF fuera del event loop
+
+        Raises:
+            ExportacionSaturadaError: si la cola de exportaciones está llena
+        """
+        return await self._ejecutar(ExportService.exportar_pdf, contenido_markdown, titulo, metadatos)
+
+    async def exportar_bloques(
+        self,
+        bloques: List[Bloque],
+        titulo: str = "Documento DocentIA",
+        metadatos: Optional[Dict[str, Any]] = None
+    ) -> bytes:
+        """Como `exportar`, a partir de un AST ya analizado"""
+        return await self._ejecutar(ExportService.pdf_desde_bloques, bloques, titulo, metadatos)
+
+    async def _ejecutar(self, funcion: Callable[..., bytes], *args) -> bytes:
+        if self._pendientes >= self.max_cola:
+            self.rechazadas += 1
+            raise ExportacionSaturadaError(self._reintentar_en())
+
+        self._pendientes += 1
+        EXPORTACIONES_PDF_PENDIENTES.inc()
+        inicio = time.monotonic()
+        try:
+            if self._pool is None:
+                pdf = await run_in_threadpool(funcion, *args)
+            else:
+                loop = asyncio.get_running_loop()
+                pdf = await loop.run_in_executor(self._pool, funcion, *args)
+        except BrokenProcessPool:
+            # Un proceso murió (p.ej. por memoria): se recrea el pool para las siguientes
+            self.errores += 1
+            print("⚠️ Pool de exportación PDF roto, recreándolo")
+            self.detener()
+            self.iniciar()
+            raise Exception("El proceso de exportación a PDF terminó inesperadamente")
+        except Exception:
+            self.errores += 1
+            raise
+        finally:
+            self._pendientes -= 1
+            EXPORTACIONES_PDF_PENDIENTES.dec()
+
+        self.completadas += 1
+        self._duracion_media = 0.8 * self._duracion_media + 0.2 * (time.monotonic() - inicio)
+        return pdf
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return {
+            "motor": settings.PDF_MOTOR,
+            "workers": self.workers,
+            "procesos": self._pool is not None,
+            "pendientes": self._pendientes,
+            "max_cola": self.max_cola,
+            "completadas": self.completadas,
+            "rechazadas": self.rechazadas,
+            "errores": self.errores,
+            "duracion_media": round(self._duracion_media, 3)
+        }
+
+
+# Instancia global del servicio
+pdf_service = PdfService(settings.PDF_WORKERS, settings.PDF_COLA_MAX)
@@ -0,0 +1,107 @@
+"""
+Fábrica de Clientes de Proveedor
+Importa el SDK de cada proveedor y crea su cliente la primera vez que se
+usa, no al importar la aplicación: el arranque en frío no paga anthropic,
+openai ni google.generativeai, y solo se carga el que se utiliza.
+"""
+import threading
+import time
+from typing import Dict, Any, Optional, List
+from config import settings
+from app.services.transporte import transporte
+
+
+def _crear_claude():
+    import anthropic
+    return anthropic.AsyncAnthropic(
+        api_key=settings.ANTHROPIC_API_KEY,
+        max_retries=0,
+        http_client=transporte.cliente,
+        timeout=transporte.timeout
+    )
+
+
+def _crear_openai():
+    from openai import AsyncOpenAI
+    return AsyncOpenAI(
+        api_key=settings.OPENAI_API_KEY,
+        max_retries=0,
+        http_client=transporte.cliente,
+        timeout=transporte.timeout
+    )
+
+
+def _crear_gemini():
+    import google.generativeai as genai
+    genai.configure(api_key=settings.GOOGLE_API_KEY)
+    return genai
+
+
+# proveedor -> (nombre para los logs, ¿tiene API key?, constructor)
+_PROVEEDORES: Dict[str, tuple] = {
+    "claude": ("Claude", lambda: bool(settings.ANTHROPIC_API_KEY), _crear_claude),
+    "openai": ("OpenAI", lambda: bool(settings.OPENAI_API_KEY), _crear_openai),
+    "gemini": ("Gemini", lambda: bool(settings.GOOGLE_API_KEY), _crear_gemini),
+}
+
+
+class FabricaProveedores:
+    """
+    Clientes de IA creados bajo demanda, una sola vez por proceso.
+
+    Es segura entre hilos (el pool de hilos y el de trabajos pueden pedir el
+    mismo cliente a la vez): cada proveedor tiene su lock y se comprueba de
+    nuevo dentro de él. Si la creación falla se recuerda el error y no se
+    reintenta en cada petición.
+    """
+
+    def __init__(self, constructores: Optional[Dict[str, tuple]] = None):
+        self._constructores = constructores or _PROVEEDORES
+        self._clientes: Dict[str, Any] = {}
+        self._errores: Dict[str, str] = {}
+        self._segundos: Dict[str, float] = {}
+        self._locks = {nombre: threading.Lock() for nombre in self._constructores}
+
+    def configurado(self, proveedor: str) -> bool:
+        """Tiene API key (no importa el SDK)"""
+        return proveedor in self._constructores and self._constructores[proveedor][1]()
+
+    def configurados(self) -> List[str]:
+        return [proveedor for proveedor in self._constructores if self.configurado(proveedor)]
+
+    def inicializado(self, proveedor: str) -> bool:
+        return proveedor in self._clientes
+
+    def obtener(self, proveedor: str) -> Optional[Any]:
+        """Cliente del proveedor, creándolo si es la primera vez; None si no está disponible"""
+        cliente = self._clientes.get(proveedor)
+        if cliente is not None or proveedor in self._errores or not self.configurado(proveedor):
+            return cliente
+        with self._locks[proveedor]:
+            if proveedor in self._clientes or proveedor in self._errores:
+                return self._clientes.get(proveedor)
+            nombre, _, crear = self._constructores[proveedor]
+            inicio = time.perf_counter()
+            try:
+                self._clientes[proveedor] = crear()
+                self._segundos[proveedor] = time.perf_counter() - inicio
+                print(f"  ✅ {nombre} inicializado ({self._segundos[proveedor] * 1000:.0f} ms)")
+            except Exception as e:
+                self._errores[proveedor] = str(e)
+                print(f"  ⚠️ Error inicializando {nombre}: {e}")
+            return self._clientes.get(proveedor)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return {
+            proveedor: {
+                "configurado": self.configurado(proveedor),
+                "inicializado": self.inicializado(proveedor),
+                "ms_inicializacion": round(self._segundos[proveedor] * 1000, 1) if proveedor in self._segundos else None,
+                "error": self._errores.get(proveedor)
+            }
+            for proveedor in self._constructores
+        }
+
+
+# Instancia global
+fabrica_proveedores = FabricaProveedores()
@@ -0,0 +1,210 @@
+"""
+Servicio de Revisión de Documentos
+Regenera una sola sección de un documento ya generado (el resultado de un
+trabajo) y la empalma en su Markdown, en lugar de repetir la generación
+completa. Las secciones son las de los encabezados Markdown, los mismos que
+la exportación a Word y PDF convierte en títulos.
+"""
+import asyncio
+import math
+import re
+import time
+import unicodedata
+from typing import Dict, Any, List, NamedTuple, Optional
+from pydantic import ValidationError
+from app.prompts import PLANTILLA_REVISION_CONTEXTO, PLANTILLA_REVISION_SECCION
+from app.services.markdown_ast import Seccion, secciones_markdown
+from app.services.ia_service import ia_service
+from app.services.generador_service import generador_service, GeneradorSpec
+from app.services.tokens import estimador_tokens, contar_tokens
+from app.services.trabajo_service import trabajo_service
+
+# Numeración delante del título: "5.", "2.1", "G.", "A)", "IV -"
+_NUMERACION = re.compile(r"^\s*(?:(?:\d+(?:\.\d+)*|[A-Za-z]|[IVXLC]+)\s*[.)\-–]|\d+(?:\.\d+)+)\s+")
+
+
+class RevisionConflicto(Exception):
+    """El documento no se puede revisar en su estado actual"""
+
+
+class SeccionNoEncontrada(ValueError):
+    """El documento no tiene ninguna sección con ese encabezado"""
+
+
+class ContextoRevision(NamedTuple):
+    """Campos del prompt de sistema de la revisión (común a todas las secciones)"""
+    peticion: str
+    documento: str
+
+
+class PeticionRevision(NamedTuple):
+    """Campos del prompt de usuario de la revisión"""
+    titulo: str
+    encabezado: str
+    indicaciones: str
+
+
+class RevisionService:
+    """Regeneración de secciones de los documentos guardados en la cola de trabajos"""
+
+    @staticmethod
+    def normalizar(titulo: str) -> str:
+        """Título comparable: sin numeración, tildes, emojis, signos ni mayúsculas"""
+        titulo = _NUMERACION.sub("", titulo)
+        ascii_ = unicodedata.normalize("NFKD", titulo).encode("ascii", "ignore").decode("ascii")
+        return " ".join(re.sub(r"[^\w\s]", " ", ascii_).lower().split())
+
+    @staticmethod
+    def buscar(secciones: List[Seccion], encabezado: str) -> Seccion:
+        """
+        Sección cuyo título coincide con `encabezado` ("EVALUACIÓN" encuentra
+        "## 7. Evaluación"); si no hay coincidencia exacta, la que lo contiene.
+        Entre varias, la de mayor rango y, a igualdad, la primera.
+
+        Raises:
+            ValueError: El encabezado queda vacío al normalizarlo
+            SeccionNoEncontrada: Ninguna sección coincide
+        """
+        buscado = RevisionService.normalizar(encabezado)
+        if not buscado:
+            raise ValueError("El encabezado de la sección está vacío")
+        candidatas = [s for s in secciones if RevisionService.normalizar(s.titulo) == buscado]
+        if not candidatas:
+            candidatas = [s for s in secciones if buscado in RevisionService.normalizar(s.titulo)]
+        if not candidatas:
+            disponibles = ", ".join(s.titulo for s in secciones) or "el documento no tiene encabezados"
+            raise SeccionNoEncontrada(f"Sección no encontrada: {encabezado} (secciones: {disponibles})")
+        return min(candidatas, key=lambda s: (s.nivel, s.inicio))
+
+    @staticmethod
+    def empalmar(contenido: str, seccion: Seccion, texto: str) -> str:
+        """Sustituye las líneas de la sección por `texto`, separado de lo que sigue por una línea en blanco"""
+        lineas = contenido.split("\n")
+        nuevas = texto.strip("\n").split("\n")
+        if seccion.fin < len(lineas):
+            nuevas.append("")
+        return "\n".join(lineas[:seccion.inicio] + nuevas + lineas[seccion.fin:])
+
+    @staticmethod
+    def con_encabezado(encabezado: str, texto: str) -> str:
+        """Texto generado con el encabezado original (mismo título y nivel) en su primera línea"""
+        texto = texto.strip()
+        primera, _, resto = texto.partition("\n")
+        if primera.lstrip().startswith("#"):
+            texto = resto.lstrip("\n")
+        return f"{encabezado}\n\n{texto}"
+
+    @staticmethod
+    async def _generar(spec: GeneradorSpec, system_prompt: str, user_prompt: str, tokens_actuales: int) -> Dict[str, Any]:
+        """
+        Llamada a IAService con max_tokens según la longitud de la sección
+        actual (aprendido por generador); si sale truncada se repite una vez
+        con el techo del generador
+        """
+        clave = f"{spec.tipo}/revision"
+        techo = spec.max_tokens_techo or 2 * spec.max_tokens
+        por_defecto = min(techo, max(512, math.ceil(2 * tokens_actuales / 64) * 64))
+        max_tokens = estimador_tokens.max_tokens(clave, tokens_actuales, por_defecto, techo)
+        while True:
+            resultado = await ia_service.generate(
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                max_tokens=max_tokens,
+                temperature=spec.temperature,
+                # Histograma de latencia propio: una sección no dura lo que el documento
+                generador=clave,
+                prioridad=spec.prioridad,
+                salida_estimada=estimador_tokens.salida(clave, tokens_actuales, max_tokens)
+            )
+            await estimador_tokens.observar(clave, tokens_actuales, (system_prompt, user_prompt), resultado)
+            if not resultado.get("truncado"):
+                return resultado
+            if max_tokens >= techo:
+                raise RevisionConflicto(f"La sección no cabe en {techo} tokens de salida")
+            max_tokens = techo
+
+    async def regenerar_seccion(
+        self,
+        trabajo_id: str,
+        encabezado: str,
+        instrucciones: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Regenera una sección del documento de un trabajo completado y guarda
+        el documento con la sección nueva
+
+        El prompt de sistema lleva la petición original y el documento entero.
+        Cada revisión cambia el documento, así que no se reutiliza de la caché
+        de prompts entre revisiones: solo lo lee la repetición por truncado.
+
+        Returns:
+            None si el trabajo no existe; si no, la sección nueva, el documento
+            completo y el uso de tokens de la llamada
+
+        Raises:
+            ValueError: El encabezado está vacío
+            SeccionNoEncontrada: La sección no existe en el documento
+            RevisionConflicto: El trabajo no tiene documento, la sección no cabe
+                o el documento cambió mientras se regeneraba
+        """
+        trabajo = await asyncio.to_thread(trabajo_service.store.obtener, trabajo_id)
+        if trabajo is None:
+            return None
+        anterior = trabajo["resultado"] or {}
+        if trabajo["estado"] != "completado" or not anterior.get("contenido"):
+            raise RevisionConflicto(f"El trabajo no tiene un documento que revisar ({trabajo['estado']})")
+
+        spec = generador_service.obtener(trabajo["tipo"])
+        contenido = anterior["contenido"].replace("\r\n", "\n")
+        seccion = self.buscar(secciones_markdown(contenido), encabezado)
+        lineas = contenido.split("\n")
+        linea_encabezado = lineas[seccion.inicio].strip()
+        actual = "\n".join(lineas[seccion.inicio:seccion.fin])
+
+        try:
+            datos = spec.request_model.model_validate(trabajo["payload"])
+        except ValidationError as e:
+            raise RevisionConflicto(f"La petición del trabajo ya no es válida para {spec.nombre}: {e.error_count()} errores")
+        contexto = PLANTILLA_REVISION_CONTEXTO.renderizar(ContextoRevision(
+            peticion=generador_service.construir_prompt(spec, datos),
+            documento=contenido
+        ))
+        system_prompt = f"{spec.system_prompt}\n\n{contexto}" if spec.system_prompt else contexto
+        user_prompt = PLANTILLA_REVISION_SECCION.renderizar(PeticionRevision(
+            titulo=seccion.titulo,
+            encabezado=linea_encabezado,
+            indicaciones=f"\nIndicaciones del docente: {instrucciones.strip()}\n" if instrucciones and instrucciones.strip() else ""
+        ))
+
+        print(f"   ✏️  Regenerando la sección \"{seccion.titulo}\" del trabajo {trabajo_id}")
+        resultado = await self._generar(spec, system_prompt, user_prompt, contar_tokens(actual))
+
+        nueva = self.con_encabezado(linea_encabezado, resultado["contenido"])
+        revisado = {
+            **anterior,
+            "contenido": self.empalmar(contenido, seccion, nueva),
+            "revisiones": anterior.get("revisiones", []) + [{
+                "seccion": seccion.titulo,
+                "output_tokens": resultado.get("output_tokens"),
+                "instante": time.time()
+            }]
+        }
+        if not await asyncio.to_thread(trabajo_service.store.reemplazar_resultado, trabajo_id, anterior, revisado):
+            raise RevisionConflicto("El documento ha cambiado mientras se regeneraba la sección; vuelve a intentarlo")
+
+        return {
+            "trabajo_id": trabajo_id,
+            "seccion": seccion.titulo,
+            "contenido_seccion": nueva,
+            "contenido": revisado["contenido"],
+            "proveedor": resultado.get("proveedor"),
+            "modelo": resultado.get("modelo"),
+            "input_tokens": resultado.get("input_tokens"),
+            "output_tokens": resultado.get("output_tokens"),
+            "cache_read_input_tokens": resultado.get("cache_read_input_tokens"),
+            "tiempo_generacion": resultado.get("tiempo_generacion")
+        }
+
+
+# Instancia global del servicio
+revision_service = RevisionService()
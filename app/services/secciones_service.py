@@ -0,0 +1,230 @@
+"""
+Servicio de Generación por Secciones
+Documentos largos en dos fases: un guion corto y después cada apartado en una
+llamada independiente, en paralelo, unidos en el orden del documento. La
+latencia pasa a ser la del guion más la del apartado más largo, y la
+longitud total deja de estar limitada por el max_tokens de una sola llamada.
+"""
+import asyncio
+import time
+from collections import Counter
+from typing import Dict, Any, List, NamedTuple, AsyncIterator, Optional, Tuple
+from pydantic import BaseModel
+from config import settings
+from app.prompts.plantillas import DocumentoPorSecciones, SeccionDocumento
+from app.services.trazas import trazador
+from app.services.ia_service import ia_service
+from app.services.tokens import estimador_tokens
+
+# Campos de uso que se suman entre el guion y los apartados
+_SUMABLES = (
+    "tokens_usados",
+    "input_tokens",
+    "output_tokens",
+    "cache_read_input_tokens",
+    "cache_creation_input_tokens"
+)
+
+
+class PeticionSeccion(NamedTuple):
+    """Campos de la plantilla de un apartado"""
+    clave: str
+    titulo: str
+    puntos: str
+
+
+class SeccionesService:
+    """Generación por apartados de los generadores que declaran `secciones`"""
+
+    @staticmethod
+    def prompt_seccion(documento: DocumentoPorSecciones, seccion: SeccionDocumento) -> str:
+        """Prompt de usuario de un apartado (el guion va en el prompt de sistema)"""
+        return documento.seccion.renderizar(PeticionSeccion(
+            clave=seccion.clave,
+            titulo=seccion.titulo,
+            puntos="\n".join(f"- {punto}" for punto in seccion.puntos) or "- Lo propio del apartado"
+        ))
+
+    @staticmethod
+    def con_encabezado(seccion: SeccionDocumento, texto: str) -> str:
+        """Texto del apartado empezando por su encabezado Markdown"""
+        texto = texto.strip()
+        if texto.startswith("#"):
+            return texto
+        return f"## {seccion.encabezado}\n\n{texto}"
+
+    @staticmethod
+    async def _llamar(
+        spec,
+        system_prompt: str,
+        user_prompt: str,
+        clave: str,
+        por_defecto: int,
+        primer_token: Optional[asyncio.Event] = None
+    ) -> Dict[str, Any]:
+        """
+        Una llamada a IAService con el max_tokens aprendido para `clave`; si
+        sale truncada se repite una vez con el techo (el doble del declarado)
+
+        Con `primer_token` la llamada va en streaming y lo señala al llegar el
+        primer fragmento: el proveedor ya ha escrito entonces el prompt de
+        sistema en su caché. También se señala si falla, para no bloquear al resto.
+        """
+        techo = 2 * por_defecto
+        max_tokens = estimador_tokens.max_tokens(clave, None, por_defecto, techo)
+        try:
+            while True:
+                argumentos = dict(
+                    system_prompt=system_prompt,
+                    user_prompt=user_prompt,
+                    max_tokens=max_tokens,
+                    temperature=spec.temperature,
+                    # Cada llamada con su propio histograma de latencia (hedging)
+                    generador=clave,
+                    prioridad=spec.prioridad,
+                    salida_estimada=estimador_tokens.salida(clave, None, max_tokens)
+                )
+                if primer_token is not None and not primer_token.is_set():
+                    resultado = await SeccionesService._transmitir(argumentos, primer_token)
+                else:
+                    resultado = await ia_service.generate(**argumentos)
+                await estimador_tokens.observar(clave, None, (system_prompt, user_prompt), resultado)
+                if not resultado.get("truncado") or max_tokens >= techo:
+                    return resultado
+                print(f"   ✂️  {clave} truncado con {max_tokens} tokens, se repite con {techo}")
+                max_tokens = techo
+        finally:
+            if primer_token is not None:
+                primer_token.set()
+
+    @staticmethod
+    async def _transmitir(argumentos: Dict[str, Any], primer_token: asyncio.Event) -> Dict[str, Any]:
+        """IAService.generate_stream recogido en un resultado como el de `generate`"""
+        partes = []
+        resumen: Dict[str, Any] = {}
+        async for evento in ia_service.generate_stream(**argumentos):
+            if evento["evento"] == "delta":
+                partes.append(evento["texto"])
+                primer_token.set()
+            elif evento["evento"] == "fin":
+                resumen = {k: v for k, v in evento.items() if k != "evento"}
+        return {"contenido": "".join(partes), **resumen}
+
+    @staticmethod
+    def combinar(
+        guion: Dict[str, Any],
+        apartados: List[Dict[str, Any]],
+        secciones: Tuple[SeccionDocumento, ...]
+    ) -> Dict[str, Any]:
+        """
+        Resumen de uso del documento: tokens sumados, truncado o respaldo si lo
+        está algún apartado
+
+        El proveedor y el modelo son los que redactaron más apartados. Si el
+        failover mezcló proveedores, "por_seccion" dice cuál hizo cada llamada.
+        """
+        llamadas = [guion] + apartados
+        usados = [(llamada.get("proveedor"), llamada.get("modelo")) for llamada in llamadas]
+        proveedor, modelo = Counter(usados[1:] or usados).most_common(1)[0][0]
+        combinado = {"proveedor": proveedor, "modelo": modelo}
+        if len(set(usados)) > 1:
+            claves = ["guion"] + [seccion.clave for seccion in secciones]
+            combinado["por_seccion"] = {
+                clave: {"proveedor": usado[0], "modelo": usado[1]}
+                for clave, usado in zip(claves, usados)
+            }
+        for campo in _SUMABLES:
+            valores = [llamada[campo] for llamada in llamadas if llamada.get(campo) is not None]
+            combinado[campo] = sum(valores) if valores else None
+        combinado.update(
+            truncado=any(apartado.get("truncado") for apartado in apartados),
+            respaldo=any(llamada.get("respaldo") for llamada in llamadas),
+            secciones=len(apartados),
+            tiempo_guion=guion.get("tiempo_generacion")
+        )
+        return combinado
+
+    async def generar_stream(self, spec, datos: BaseModel) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Genera el documento de `spec.secciones` y emite cada apartado como un
+        delta, en orden, en cuanto están listos él y los anteriores
+
+        Los apartados comparten un prompt de sistema con el contexto
+        (instrucciones + DATOS) y el guion, que supera el mínimo cacheable del
+        proveedor. El primer apartado sale solo y el resto espera a su primer
+        fragmento, cuando el proveedor ya tiene ese prefijo en su caché y
+        todos lo leen de ella.
+        """
+        documento: DocumentoPorSecciones = spec.secciones
+        inicio = time.time()
+        contexto = documento.contexto.renderizar(datos)
+
+        with trazador.span("guion", **{"docentia.generador": spec.tipo}):
+            guion = await self._llamar(
+                spec,
+                contexto,
+                documento.guion.renderizar(datos),
+                f"{spec.tipo}/guion",
+                documento.max_tokens_guion
+            )
+
+        system_prompt = documento.sistema_secciones(contexto, guion["contenido"])
+        semaforo = asyncio.Semaphore(settings.SECCIONES_MAX_CONCURRENCIA)
+        primer_token = asyncio.Event()
+
+        async def generar_apartado(seccion: SeccionDocumento, primero: bool) -> Dict[str, Any]:
+            if not primero:
+                await primer_token.wait()
+            async with semaforo:
+                with trazador.span("seccion", **{"docentia.generador": spec.tipo, "docentia.seccion": seccion.clave}):
+                    return await self._llamar(
+                        spec,
+                        system_prompt,
+                        self.prompt_seccion(documento, seccion),
+                        f"{spec.tipo}/{seccion.clave}",
+                        seccion.max_tokens,
+                        primer_token if primero else None
+                    )
+
+        print(f"   🧩 {len(documento.secciones)} apartados en paralelo tras el primer token del primero "
+              f"(guion en {time.time() - inicio:.2f}s)")
+        tareas = [
+            asyncio.create_task(generar_apartado(seccion, indice == 0))
+            for indice, seccion in enumerate(documento.secciones)
+        ]
+        apartados = []
+        primer_apartado = None
+        try:
+            for indice, (seccion, tarea) in enumerate(zip(documento.secciones, tareas)):
+                apartado = await tarea
+                apartados.append(apartado)
+                if primer_apartado is None:
+                    primer_apartado = time.time() - inicio
+                separador = "\n\n" if indice else ""
+                yield {"evento": "delta", "texto": separador + self.con_encabezado(seccion, apartado["contenido"])}
+        finally:
+            # Si falla un apartado o el cliente se desconecta no seguimos generando
+            for tarea in tareas:
+                tarea.cancel()
+
+        yield {
+            "evento": "fin",
+            **self.combinar(guion, apartados, documento.secciones),
+            "tiempo_generacion": time.time() - inicio,
+            "tiempo_primer_token": primer_apartado
+        }
+
+    async def generar(self, spec, datos: BaseModel) -> Dict[str, Any]:
+        """Documento completo (mismo formato que IAService.generate)"""
+        partes = []
+        resumen: Dict[str, Any] = {}
+        async for evento in self.generar_stream(spec, datos):
+            if evento["evento"] == "delta":
+                partes.append(evento["texto"])
+            else:
+                resumen = {k: v for k, v in evento.items() if k != "evento"}
+        return {"contenido": "".join(partes), **resumen}
+
+
+# Instancia global del servicio
+secciones_service = SeccionesService()
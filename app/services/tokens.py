@@ -0,0 +1,275 @@
+"""
+Estimación de Tokens y Longitud de Salida
+Cuenta tokens en local (sin tokenizador del proveedor ni red) y aprende, por
+generador, cuántos tokens de salida produce una petición según su parámetro
+de longitud (num_preguntas, num_sesiones...). Con eso se elige el max_tokens
+de cada llamada: suficiente para no truncar y sin reservar de más contra el
+presupuesto de tokens por minuto del proveedor.
+"""
+import asyncio
+import math
+import re
+import sqlite3
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple
+from config import settings
+
+# Trozos de hasta 4 letras, 3 cifras o 2 signos (markdown incluido), y saltos de línea
+_TROZOS = re.compile(r"[^\W\d_]{1,4}|\d{1,3}|[^\w\s]{1,2}|\n+")
+
+# Una salida truncada mide al menos lo que llegó: se registra con este factor
+FACTOR_TRUNCADO = 1.5
+
+# Sin muestras de un generador se espera esta fracción de su max_tokens (que lleva margen)
+FRACCION_SALIDA_SIN_MUESTRAS = 0.5
+
+
+@lru_cache(maxsize=256)
+def contar_tokens(texto: Optional[str]) -> int:
+    """
+    Tokens aproximados de un texto, imitando un tokenizador BPE
+
+    Cada trozo de hasta 4 letras, 3 cifras o 2 signos cuenta como un token, y
+    cada letra con tilde o eñe medio más (los vocabularios entrenados sobre
+    todo en inglés las trocean). El espacio antes de una palabra va con ella.
+    Se memoriza: los prompts de sistema y el de usuario de cada llamada se
+    cuentan varias veces (limitador y calibración).
+    """
+    if not texto:
+        return 0
+    return len(_TROZOS.findall(texto)) + (len(texto.encode("utf-8")) - len(texto)) // 2
+
+
+class ModeloSalida:
+    """
+    Tokens de salida de un generador: salida ≈ a + b·x por mínimos cuadrados,
+    con x el parámetro de longitud de la petición (sin parámetro, b = 0).
+
+    El límite propuesto es la predicción más el percentil de los residuos, y
+    un margen relativo. Se recalcula solo cuando llegan muestras nuevas.
+    """
+
+    def __init__(self, ventana: int = 500):
+        self.muestras: deque = deque(maxlen=ventana)   # (x, tokens_salida, truncado)
+        self.truncadas = 0
+        self._ajuste: Optional[Tuple[float, float, List[float]]] = None
+
+    def registrar(self, x: float, tokens: int, truncado: bool = False):
+        self.muestras.append((x, tokens * FACTOR_TRUNCADO if truncado else tokens, truncado))
+        self.truncadas += truncado
+        self._ajuste = None
+
+    def ajustar(self) -> Tuple[float, float, List[float]]:
+        """(a, b, residuos ordenados)"""
+        if self._ajuste is None:
+            n = len(self.muestras)
+            media_x = sum(m[0] for m in self.muestras) / n
+            media_y = sum(m[1] for m in self.muestras) / n
+            varianza = sum((m[0] - media_x) ** 2 for m in self.muestras)
+            b = sum((m[0] - media_x) * (m[1] - media_y) for m in self.muestras) / varianza if varianza else 0.0
+            b = max(b, 0.0)  # más preguntas o sesiones nunca acortan el documento
+            a = media_y - b * media_x
+            residuos = sorted(m[1] - (a + b * m[0]) for m in self.muestras)
+            self._ajuste = (a, b, residuos)
+        return self._ajuste
+
+    def predecir(self, x: float, percentil: float) -> Tuple[float, float]:
+        """(salida esperada, salida en el percentil pedido) para la petición"""
+        a, b, residuos = self.ajustar()
+        esperado = a + b * x
+        posicion = min(len(residuos) - 1, int(round(percentil / 100 * (len(residuos) - 1))))
+        return esperado, esperado + max(residuos[posicion], 0.0)
+
+    def resumen(self) -> Dict[str, Any]:
+        if not self.muestras:
+            return {"muestras": 0}
+        a, b, residuos = self.ajustar()
+        return {
+            "muestras": len(self.muestras),
+            "truncadas": self.truncadas,
+            "base": round(a, 1),
+            "por_unidad": round(b, 1),
+            "residuo_p95": round(residuos[min(len(residuos) - 1, int(0.95 * (len(residuos) - 1) + 0.5))], 1)
+        }
+
+
+class EstimadorTokens:
+    """
+    Tokens de entrada calibrados y max_tokens adaptado por generador
+
+    Las observaciones (tokens de salida reales que devuelve IAService) se
+    guardan en SQLite para que un worker nuevo arranque con el modelo ya
+    ajustado. La calibración de entrada compara `contar_tokens` con los
+    tokens de entrada que factura el proveedor.
+    """
+
+    def __init__(
+        self,
+        ruta: str = "",
+        activo: bool = True,
+        min_muestras: int = 20,
+        percentil: float = 95,
+        margen: float = 0.15,
+        ventana: int = 500
+    ):
+        self.ruta = ruta
+        self.activo = activo
+        self.min_muestras = min_muestras
+        self.percentil = percentil
+        self.margen = margen
+        self.ventana = ventana
+        self.modelos: Dict[str, ModeloSalida] = {}
+        # Cociente tokens facturados / contados en local, por proveedor: cada
+        # uno tiene su tokenizador
+        self.calibracion: Dict[str, float] = {}
+        self.calibraciones: Dict[str, int] = {}
+        self.reservado_ahorrado = 0
+        self._preparada = False
+
+    def _preparar(self, conn: sqlite3.Connection):
+        """Crea la tabla en la primera conexión (en un hilo), no al importar"""
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS observaciones (
+                generador TEXT NOT NULL,
+                parametro REAL NOT NULL,
+                tokens_salida INTEGER NOT NULL,
+                truncado INTEGER NOT NULL DEFAULT 0,
+                instante REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_observaciones ON observaciones(generador, instante)")
+        self._preparada = True
+
+    @contextmanager
+    def _conectar(self):
+        conn = sqlite3.connect(self.ruta, timeout=30, isolation_level=None)
+        try:
+            if not self._preparada:
+                self._preparar(conn)
+            yield conn
+        finally:
+            conn.close()
+
+    def _modelo(self, generador: str) -> ModeloSalida:
+        if generador not in self.modelos:
+            self.modelos[generador] = ModeloSalida(self.ventana)
+        return self.modelos[generador]
+
+    def cargar(self):
+        """Carga las últimas `ventana` observaciones de cada generador"""
+        if not self.ruta:
+            return
+        with self._conectar() as conn:
+            filas = conn.execute("""
+                SELECT generador, parametro, tokens_salida, truncado FROM (
+                    SELECT *, ROW_NUMBER() OVER (PARTITION BY generador ORDER BY instante DESC) AS orden
+                    FROM observaciones
+                ) WHERE orden <= ? ORDER BY instante
+            """, (self.ventana,)).fetchall()
+        for generador, parametro, tokens, truncado in filas:
+            self._modelo(generador).registrar(parametro, tokens, bool(truncado))
+        if filas:
+            print(f"📏 Modelo de longitud: {len(filas)} observaciones de {len(self.modelos)} generadores")
+
+    async def iniciar(self):
+        await asyncio.to_thread(self.cargar)
+
+    def entrada(self, *textos: str, proveedor: Optional[str] = None) -> int:
+        """Tokens de entrada estimados (con la calibración aprendida del proveedor)"""
+        return int(sum(contar_tokens(texto) for texto in textos) * self.calibracion.get(proveedor, 1.0)) + 1
+
+    def calibrar(self, estimados: int, reales: Optional[int], proveedor: Optional[str] = None):
+        """Media móvil del cociente tokens facturados / tokens contados en local del proveedor"""
+        if not reales or estimados <= 0:
+            return
+        cociente = min(max(reales / estimados, 0.5), 2.0)
+        self.calibraciones[proveedor] = self.calibraciones.get(proveedor, 0) + 1
+        peso = max(0.05, 1 / self.calibraciones[proveedor])
+        actual = self.calibracion.get(proveedor, 1.0)
+        self.calibracion[proveedor] = actual + (cociente - actual) * peso
+
+    def max_tokens(self, generador: str, parametro: Optional[float], por_defecto: int, techo: int) -> int:
+        """
+        max_tokens para una petición
+
+        Sin muestras suficientes (o desactivado) devuelve `por_defecto`, el valor
+        declarado del generador. Con ellas, el percentil de la predicción más el
+        margen, redondeado a 64 y entre 256 y `techo`.
+        """
+        modelo = self.modelos.get(generador)
+        if not self.activo or modelo is None or len(modelo.muestras) < self.min_muestras:
+            return por_defecto
+        _, alto = modelo.predecir(parametro or 0.0, self.percentil)
+        elegido = min(techo, max(256, math.ceil(alto * (1 + self.margen) / 64) * 64))
+        self.reservado_ahorrado += max(por_defecto - elegido, 0)
+        return elegido
+
+    def salida(self, generador: str, parametro: Optional[float], max_tokens: int) -> int:
+        """
+        Tokens de salida esperados de una petición (la predicción, sin percentil
+        ni margen), que es lo que el limitador reserva contra el presupuesto por
+        minuto hasta conocer el uso real. Nunca más que `max_tokens`.
+        """
+        modelo = self.modelos.get(generador)
+        if modelo is None or len(modelo.muestras) < self.min_muestras:
+            return math.ceil(max_tokens * FRACCION_SALIDA_SIN_MUESTRAS)
+        esperado, _ = modelo.predecir(parametro or 0.0, self.percentil)
+        return min(max_tokens, max(1, round(esperado)))
+
+    async def registrar(self, generador: str, parametro: Optional[float], resultado: Dict[str, Any]):
+        """Añade los tokens de salida reales de una generación al modelo (y al SQLite)"""
+        tokens = resultado.get("output_tokens")
+        if not tokens:
+            return
+        parametro = parametro or 0.0
+        truncado = bool(resultado.get("truncado"))
+        self._modelo(generador).registrar(parametro, tokens, truncado)
+        if self.ruta:
+            await asyncio.to_thread(self._guardar, generador, parametro, tokens, truncado)
+
+    async def observar(self, generador: str, parametro: Optional[float], entrada: Tuple[str, ...], resultado: Dict[str, Any]):
+        """
+        Calibración de entrada y modelo de salida con el uso real de una llamada
+
+        `entrada` son los textos enviados (sistema y usuario). Las respuestas
+        de respaldo no cuentan: no las ha escrito el modelo.
+        """
+        if resultado.get("respaldo"):
+            return
+        self.calibrar(
+            sum(contar_tokens(texto) for texto in entrada),
+            (resultado.get("input_tokens") or 0)
+            + (resultado.get("cache_read_input_tokens") or 0)
+            + (resultado.get("cache_creation_input_tokens") or 0),
+            resultado.get("proveedor")
+        )
+        await self.registrar(generador, parametro, resultado)
+
+    def _guardar(self, generador: str, parametro: float, tokens: int, truncado: bool):
+        with self._conectar() as conn:
+            conn.execute(
+                "INSERT INTO observaciones (generador, parametro, tokens_salida, truncado, instante) VALUES (?, ?, ?, ?, ?)",
+                (generador, parametro, tokens, int(truncado), time.time())
+            )
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return {
+            "activo": self.activo,
+            "calibracion_entrada": {proveedor: round(cociente, 3) for proveedor, cociente in self.calibracion.items()},
+            "tokens_reserva_ahorrados": self.reservado_ahorrado,
+            "generadores": {generador: modelo.resumen() for generador, modelo in self.modelos.items()}
+        }
+
+
+# Instancia global
+estimador_tokens = EstimadorTokens(
+    settings.TOKENS_DB_RUTA,
+    settings.TOKENS_ADAPTATIVOS,
+    settings.TOKENS_MIN_MUESTRAS,
+    settings.TOKENS_PERCENTIL,
+    settings.TOKENS_MARGEN
+)
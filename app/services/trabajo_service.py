@@ -0,0 +1,306 @@
+"""
+Servicio de Trabajos en Segundo Plano
+Cola persistente (SQLite) para generaciones largas: se encolan con un POST,
+las procesa un pool de workers y se consultan por id. La cola sobrevive a
+reinicios y la comparten todos los workers de uvicorn que usen la misma base
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List
+from config import settings
+from app.services.generador_service import generador_service
+from app.services.trazas import trazador
+
+
+class TrabajoStore:
+    """
+    Almacén SQLite de trabajos
+
+    Estados: pendiente -> en_curso -> completado | error | cancelado
+    """
+
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._preparada = False
+
+    def _preparar(self, conn: sqlite3.Connection):
+        """Crea la tabla en la primera conexión (en un hilo), no al importar"""
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS trabajos (
+                id TEXT PRIMARY KEY,
+                tipo TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                force_regenerate INTEGER NOT NULL DEFAULT 0,
+                estado TEXT NOT NULL,
+                resultado TEXT,
+                error TEXT,
+                worker TEXT,
+                creado REAL NOT NULL,
+                iniciado REAL,
+                terminado REAL,
+                latido REAL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_trabajos_estado ON trabajos(estado, creado)")
+        self._preparada = True
+
+    @contextmanager
+    def _conectar(self):
+        """Conexión de corta duración: confirma la transacción y se cierra al salir"""
+        conn = sqlite3.connect(self.ruta, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            if not self._preparada:
+                self._preparar(conn)
+            yield conn
+        finally:
+            conn.close()
+
+    def crear(self, tipo: str, payload: Dict[str, Any], force_regenerate: bool = False) -> str:
+        trabajo_id = uuid.uuid4().hex
+        with self._conectar() as conn:
+            conn.execute(
+                "INSERT INTO trabajos (id, tipo, payload, force_regenerate, estado, creado) VALUES (?, ?, ?, ?, 'pendiente', ?)",
+                (trabajo_id, tipo, json.dumps(payload, ensure_ascii=False), int(force_regenerate), time.time())
+            )
+        return trabajo_id
+
+    def obtener(self, trabajo_id: str) -> Optional[Dict[str, Any]]:
+        with self._conectar() as conn:
+            fila = conn.execute("SELECT * FROM trabajos WHERE id = ?", (trabajo_id,)).fetchone()
+        if fila is None:
+            return None
+        trabajo = dict(fila)
+        trabajo["payload"] = json.loads(trabajo["payload"])
+        trabajo["resultado"] = json.loads(trabajo["resultado"]) if trabajo["resultado"] else None
+        trabajo["force_regenerate"] = bool(trabajo["force_regenerate"])
+        return trabajo
+
+    def reclamar(self, worker: str, max_en_curso: int) -> Optional[Dict[str, Any]]:
+        """
+        Marca como en curso el trabajo pendiente más antiguo, de forma atómica
+        entre procesos, respetando el máximo global de trabajos en curso
+        """
+        ahora = time.time()
+        with self._conectar() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                en_curso = conn.execute("SELECT COUNT(*) FROM trabajos WHERE estado = 'en_curso'").fetchone()[0]
+                fila = None
+                if en_curso < max_en_curso:
+                    fila = conn.execute(
+                        "SELECT id FROM trabajos WHERE estado = 'pendiente' ORDER BY creado LIMIT 1"
+                    ).fetchone()
+                if fila is not None:
+                    conn.execute(
+                        "UPDATE trabajos SET estado = 'en_curso', worker = ?, iniciado = ?, latido = ? WHERE id = ?",
+                        (worker, ahora, ahora, fila["id"])
+                    )
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        return self.obtener(fila["id"]) if fila is not None else None
+
+    def latir(self, trabajo_id: str) -> str:
+        """Renueva el latido de un trabajo en curso y devuelve su estado actual"""
+        with self._conectar() as conn:
+            conn.execute(
+                "UPDATE trabajos SET latido = ? WHERE id = ? AND estado = 'en_curso'",
+                (time.time(), trabajo_id)
+            )
+            return conn.execute("SELECT estado FROM trabajos WHERE id = ?", (trabajo_id,)).fetchone()[0]
+
+    def terminar(self, trabajo_id: str, estado: str, resultado: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        """Cierra un trabajo en curso (no pisa una cancelación previa)"""
+        with self._conectar() as conn:
+            conn.execute(
+                "UPDATE trabajos SET estado = ?, resultado = ?, error = ?, terminado = ? WHERE id = ? AND estado = 'en_curso'",
+                (estado, json.dumps(resultado, ensure_ascii=False) if resultado is not None else None,
+                 error, time.time(), trabajo_id)
+            )
+
+    def reemplazar_resultado(self, trabajo_id: str, anterior: Dict[str, Any], resultado: Dict[str, Any]) -> bool:
+        """
+        Sustituye el resultado de un trabajo completado si sigue siendo
+        `anterior`; False si otra petición lo cambió entretanto
+        """
+        with self._conectar() as conn:
+            cursor = conn.execute(
+                "UPDATE trabajos SET resultado = ? WHERE id = ? AND estado = 'completado' AND resultado = ?",
+                (json.dumps(resultado, ensure_ascii=False), trabajo_id, json.dumps(anterior, ensure_ascii=False))
+            )
+            return cursor.rowcount > 0
+
+    def cancelar(self, trabajo_id: str) -> bool:
+        """Cancela un trabajo pendiente o en curso; False si ya había terminado"""
+        with self._conectar() as conn:
+            cursor = conn.execute(
+                "UPDATE trabajos SET estado = 'cancelado', terminado = ? WHERE id = ? AND estado IN ('pendiente', 'en_curso')",
+                (time.time(), trabajo_id)
+            )
+            return cursor.rowcount > 0
+
+    def reencolar_huerfanos(self, timeout_latido: float) -> int:
+        """Devuelve a pendiente los trabajos en curso cuyo worker dejó de latir (reinicio o caída)"""
+        with self._conectar() as conn:
+            cursor = conn.execute(
+                "UPDATE trabajos SET estado = 'pendiente', worker = NULL, iniciado = NULL "
+                "WHERE estado = 'en_curso' AND latido < ?",
+                (time.time() - timeout_latido,)
+            )
+            return cursor.rowcount
+
+    def contar(self) -> Dict[str, int]:
+        with self._conectar() as conn:
+            filas = conn.execute("SELECT estado, COUNT(*) FROM trabajos GROUP BY estado").fetchall()
+        return {estado: total for estado, total in filas}
+
+
+class TrabajoService:
+    """Pool de workers asíncronos que procesa la cola de trabajos"""
+
+    def __init__(self, store: TrabajoStore):
+        self.store = store
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self._workers: List[asyncio.Task] = []
+        self._reencolador: Optional[asyncio.Task] = None
+        self._en_ejecucion: Dict[str, asyncio.Task] = {}
+
+    async def encolar(self, tipo: str, payload: Dict[str, Any], force_regenerate: bool = False) -> str:
+        """Añade un trabajo a la cola y devuelve su id"""
+        generador_service.obtener(tipo)
+        return await asyncio.to_thread(self.store.crear, tipo, payload, force_regenerate)
+
+    async def obtener(self, trabajo_id: str) -> Optional[Dict[str, Any]]:
+        trabajo = await asyncio.to_thread(self.store.obtener, trabajo_id)
+        if trabajo is not None:
+            trabajo.pop("payload")
+            trabajo.pop("latido")
+        return trabajo
+
+    async def cancelar(self, trabajo_id: str) -> bool:
+        """
+        Cancela un trabajo; si corre en este proceso se interrumpe de inmediato
+
+        Si otra petición idéntica espera la misma generación (coalescedor) la
+        llamada al proveedor sigue para ella; solo se corta si no espera nadie más.
+        """
+        cancelado = await asyncio.to_thread(self.store.cancelar, trabajo_id)
+        tarea = self._en_ejecucion.get(trabajo_id)
+        if cancelado and tarea is not None:
+            tarea.cancel()
+        return cancelado
+
+    def iniciar(self):
+        """Arranca los workers (llamar desde el arranque de la app)"""
+        if self._workers:
+            return
+        for _ in range(settings.TRABAJOS_WORKERS):
+            self._workers.append(asyncio.create_task(self._bucle_worker()))
+        if settings.TRABAJOS_WORKERS:
+            self._reencolador = asyncio.create_task(self._bucle_huerfanos())
+        print(f"  ✅ Cola de trabajos: {settings.TRABAJOS_WORKERS} workers ({self.worker_id})")
+
+    async def detener(self):
+        """Detiene los workers; los trabajos interrumpidos se reencolan por latido"""
+        tareas = self._workers + ([self._reencolador] if self._reencolador else [])
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+        self._workers.clear()
+        self._reencolador = None
+
+    async def _bucle_huerfanos(self):
+        """
+        Reencola los trabajos huérfanos una vez por TRABAJOS_TIMEOUT_LATIDO (no
+        antes pueden estarlo), fuera del sondeo: así el UPDATE no compite por
+        el bloqueo de escritura con cada `reclamar` de cada worker
+        """
+        while True:
+            try:
+                reencolados = await asyncio.to_thread(self.store.reencolar_huerfanos, settings.TRABAJOS_TIMEOUT_LATIDO)
+                if reencolados:
+                    print(f"   ♻️  {reencolados} trabajos huérfanos de vuelta a la cola")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"   ❌ Error reencolando trabajos huérfanos: {e}")
+            await asyncio.sleep(settings.TRABAJOS_TIMEOUT_LATIDO)
+
+    async def _bucle_worker(self):
+        while True:
+            try:
+                trabajo = await asyncio.to_thread(
+                    self.store.reclamar, self.worker_id, settings.TRABAJOS_MAX_EN_CURSO
+                )
+                if trabajo is None:
+                    await asyncio.sleep(settings.TRABAJOS_INTERVALO_SONDEO)
+                    continue
+                await self._procesar(trabajo)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"   ❌ Error en worker de trabajos: {e}")
+                await asyncio.sleep(settings.TRABAJOS_INTERVALO_SONDEO)
+
+    async def _procesar(self, trabajo: Dict[str, Any]):
+        trabajo_id = trabajo["id"]
+        try:
+            spec = generador_service.obtener(trabajo["tipo"])
+            datos = spec.request_model.model_validate(trabajo["payload"])
+        except Exception as e:
+            # Generador retirado o petición que ya no valida: si quedara en
+            # curso se reencolaría para siempre
+            await asyncio.to_thread(self.store.terminar, trabajo_id, "error", None, str(e))
+            return
+        # Cada trabajo es su propia traza: la petición que lo encoló ya terminó
+        with trazador.traza(f"trabajo {spec.tipo}", trabajo_id, **{"docentia.generador": spec.tipo}):
+            if trabajo.get("creado") and trabajo.get("iniciado"):
+                trazador.registrar(espera_cola_ms=(trabajo["iniciado"] - trabajo["creado"]) * 1000)
+            tarea = asyncio.create_task(generador_service.generar(
+                spec.tipo,
+                datos,
+                trabajo["force_regenerate"]
+            ))
+            self._en_ejecucion[trabajo_id] = tarea
+
+            try:
+                # Latido periódico; también detecta cancelaciones hechas desde otro proceso
+                while not tarea.done():
+                    await asyncio.wait({tarea}, timeout=settings.TRABAJOS_TIMEOUT_LATIDO / 3)
+                    if not tarea.done():
+                        estado = await asyncio.to_thread(self.store.latir, trabajo_id)
+                        if estado == "cancelado":
+                            tarea.cancel()
+
+                resultado = await tarea
+                await asyncio.to_thread(self.store.terminar, trabajo_id, "completado", resultado)
+            except asyncio.CancelledError:
+                if not tarea.done():
+                    # Se detiene el worker: el trabajo queda en curso y se reencolará
+                    tarea.cancel()
+                    raise
+            except Exception as e:
+                await asyncio.to_thread(self.store.terminar, trabajo_id, "error", None, str(e))
+            finally:
+                self._en_ejecucion.pop(trabajo_id, None)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return {
+            "worker": self.worker_id,
+            "workers": len(self._workers),
+            "en_ejecucion": len(self._en_ejecucion),
+            "max_en_curso": settings.TRABAJOS_MAX_EN_CURSO,
+            "por_estado": self.store.contar()
+        }
+
+
+# Instancia global del servicio
+trabajo_service = TrabajoService(TrabajoStore(settings.TRABAJOS_DB_RUTA))
@@ -0,0 +1,139 @@
+"""
+Transporte HTTP con los Proveedores de IA
+Un único cliente httpx de larga vida, con pool de conexiones, keep-alive y
+HTTP/2, que comparten los SDK de Anthropic y OpenAI. Al arrancar se abren
+conexiones con cada proveedor para que la primera generación no pague el
+handshake TCP + TLS.
+"""
+import asyncio
+import threading
+from typing import Dict, Any, List
+from config import settings
+
+
+def _h2_disponible() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class TransporteHTTP:
+    """
+    Pool de conexiones compartido por todos los clientes de proveedor.
+
+    El cliente se crea la primera vez que se pide (httpx se importa entonces,
+    junto con el primer SDK) y vive hasta que se apaga la app, que lo cierra
+    con `cerrar`: los SDK guardan la referencia, así que no se recrea.
+    """
+
+    def __init__(
+        self,
+        max_conexiones: int = 100,
+        max_keepalive: int = 32,
+        keepalive_segundos: float = 120,
+        http2: bool = True,
+        timeout_conexion: float = 5,
+        timeout_lectura: float = 300,
+        timeout_pool: float = 30
+    ):
+        self.max_conexiones = max_conexiones
+        self.max_keepalive = max_keepalive
+        self.keepalive_segundos = keepalive_segundos
+        self.http2 = http2
+        self.timeout_conexion = timeout_conexion
+        self.timeout_lectura = timeout_lectura
+        self.timeout_pool = timeout_pool
+        self._cliente = None
+        self._timeout = None
+        self._lock = threading.Lock()
+        self.precalentadas: Dict[str, int] = {}
+
+    @property
+    def timeout(self):
+        """httpx.Timeout para los SDK (también lo aplican por petición)"""
+        if self._timeout is None:
+            import httpx
+            self._timeout = httpx.Timeout(
+                self.timeout_lectura, connect=self.timeout_conexion, write=self.timeout_lectura, pool=self.timeout_pool
+            )
+        return self._timeout
+
+    @property
+    def cliente(self):
+        """httpx.AsyncClient compartido (para el parámetro http_client de los SDK)"""
+        if self._cliente is None:
+            with self._lock:
+                if self._cliente is None:
+                    import httpx
+                    if self.http2 and not _h2_disponible():
+                        print("⚠️ HTTP2_ACTIVO sin el paquete h2 instalado: se usa HTTP/1.1")
+                        self.http2 = False
+                    self._cliente = httpx.AsyncClient(
+                        limits=httpx.Limits(
+                            max_connections=self.max_conexiones,
+                            max_keepalive_connections=self.max_keepalive,
+                            keepalive_expiry=self.keepalive_segundos
+                        ),
+                        timeout=self.timeout,
+                        http2=self.http2,
+                        follow_redirects=True
+                    )
+        return self._cliente
+
+    async def precalentar(self, urls: List[str], conexiones: int = 2):
+        """
+        Abre conexiones con cada proveedor antes de la primera generación
+
+        Cualquier respuesta (también un 404) deja la conexión en el pool. Se
+        abren `conexiones` en paralelo: con HTTP/2 el pool las reduce a una
+        multiplexada, pero si el servidor solo habla HTTP/1.1 hacen falta
+        todas. Un fallo solo se avisa: el arranque no depende de la red.
+        """
+        if conexiones <= 0 or not urls:
+            return
+
+        import httpx
+
+        async def abrir(url: str):
+            try:
+                await self.cliente.head(url, timeout=self.timeout_conexion)
+                return True
+            except httpx.HTTPError:
+                return False
+
+        for url in dict.fromkeys(urls):
+            resultados = await asyncio.gather(*(abrir(url) for _ in range(conexiones)))
+            self.precalentadas[url] = sum(resultados)
+            if not any(resultados):
+                print(f"  ⚠️ No se pudo precalentar la conexión con {url}")
+        print(f"🔌 Conexiones precalentadas: {self.precalentadas} ({'HTTP/2 si el servidor lo admite' if self.http2 else 'HTTP/1.1'})")
+
+    async def cerrar(self):
+        """Cierra las conexiones del pool (al apagar la app)"""
+        if self._cliente is not None:
+            await self._cliente.aclose()
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return {
+            "http2": self.http2,
+            "max_conexiones": self.max_conexiones,
+            "max_keepalive": self.max_keepalive,
+            "keepalive_segundos": self.keepalive_segundos,
+            "timeout_conexion": self.timeout_conexion,
+            "timeout_lectura": self.timeout_lectura,
+            "precalentadas": self.precalentadas
+        }
+
+
+# Instancia global
+transporte = TransporteHTTP(
+    settings.HTTP_MAX_CONEXIONES,
+    settings.HTTP_MAX_KEEPALIVE,
+    settings.HTTP_KEEPALIVE_SEGUNDOS,
+    settings.HTTP2_ACTIVO,
+    settings.HTTP_TIMEOUT_CONEXION,
+    settings.HTTP_TIMEOUT_LECTURA,
+    settings.HTTP_TIMEOUT_POOL
+)
@@ -0,0 +1,297 @@
+"""
+Trazas de Peticiones
+Spans compatibles con OpenTelemetry (exportados como OTLP/JSON a un fichero
+local) y una línea de log JSON por petición con el desglose de latencia:
+espera en cola, construcción del prompt, primer token, llamada al proveedor,
+exportación y tokens
+"""
+import asyncio
+import json
+import os
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, List, Iterator
+from config import settings
+
+# Tipos de span de OpenTelemetry (SpanKind)
+INTERNO = 1
+SERVIDOR = 2
+CLIENTE = 3
+
+_ESTADO_ERROR = 2
+
+
+def _valor_otlp(valor: Any) -> Dict[str, Any]:
+    """AnyValue de OTLP/JSON (los enteros de 64 bits van como texto)"""
+    if isinstance(valor, bool):
+        return {"boolValue": valor}
+    if isinstance(valor, int):
+        return {"intValue": str(valor)}
+    if isinstance(valor, float):
+        return {"doubleValue": valor}
+    return {"stringValue": str(valor)}
+
+
+class Span:
+    """Operación con inicio, fin, atributos y padre dentro de una traza"""
+
+    __slots__ = ("traza", "nombre", "span_id", "padre_id", "tipo", "inicio", "fin", "atributos", "error")
+
+    def __init__(self, traza: "Traza", nombre: str, padre_id: Optional[str], tipo: int, atributos: Dict[str, Any]):
+        self.traza = traza
+        self.nombre = nombre
+        self.span_id = secrets.token_hex(8)
+        self.padre_id = padre_id
+        self.tipo = tipo
+        self.inicio = time.time_ns()
+        self.fin: Optional[int] = None
+        self.atributos = atributos
+        self.error: Optional[str] = None
+
+    def atributo(self, clave: str, valor: Any):
+        if valor is not None:
+            self.atributos[clave] = valor
+
+    @property
+    def duracion_ms(self) -> float:
+        return ((self.fin or time.time_ns()) - self.inicio) / 1e6
+
+    def otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.traza.trace_id,
+            "spanId": self.span_id,
+            "name": self.nombre,
+            "kind": self.tipo,
+            "startTimeUnixNano": str(self.inicio),
+            "endTimeUnixNano": str(self.fin or time.time_ns()),
+            "attributes": [{"key": k, "value": _valor_otlp(v)} for k, v in self.atributos.items()],
+            "status": {"code": _ESTADO_ERROR, "message": self.error} if self.error else {}
+        }
+        if self.padre_id:
+            span["parentSpanId"] = self.padre_id
+        return span
+
+
+class Traza:
+    """Una petición: sus spans y el resumen de métricas que acumulan"""
+
+    def __init__(self, request_id: str):
+        self.trace_id = secrets.token_hex(16)
+        self.request_id = request_id
+        self.spans: List[Span] = []
+        self.metricas: Dict[str, float] = {}
+        self.cerrada = False
+
+
+class ExportadorArchivo:
+    """
+    Escribe los spans como OTLP/JSON, una línea por traza (el formato que lee
+    el receptor otlpjsonfile del OpenTelemetry Collector)
+
+    `exportar` solo encola los spans: la serialización y la escritura se
+    hacen por lotes en el pool de hilos, sin bloquear el event loop. Fuera de
+    un event loop se escribe en el momento.
+    """
+
+    def __init__(self, ruta: str, servicio: str):
+        self.ruta = ruta
+        self.servicio = servicio
+        self._pendientes: List[List[Span]] = []
+        self._lock = threading.Lock()
+        self._lock_archivo = threading.Lock()
+        self._volcado: Optional[asyncio.Task] = None
+
+    def exportar(self, spans: List[Span]):
+        if not spans:
+            return
+        with self._lock:
+            self._pendientes.append(spans)
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self.volcar()
+            return
+        self._programar()
+
+    def _programar(self):
+        """Lanza un volcado en segundo plano si no hay ya uno en curso"""
+        if self._volcado is not None and not self._volcado.done():
+            return
+        self._volcado = asyncio.get_running_loop().create_task(asyncio.to_thread(self.volcar))
+        self._volcado.add_done_callback(self._al_terminar_volcado)
+
+    def _al_terminar_volcado(self, _tarea: asyncio.Task):
+        # Lo que llegó mientras terminaba el hilo se vuelca en otra tanda
+        if self._pendientes:
+            self._programar()
+
+    def volcar(self):
+        """Escribe en el fichero todo lo pendiente. Bloqueante"""
+        with self._lock_archivo:
+            with self._lock:
+                pendientes, self._pendientes = self._pendientes, []
+            if not pendientes:
+                return
+            lineas = [self._linea(spans) for spans in pendientes]
+            try:
+                with open(self.ruta, "a", encoding="utf-8") as archivo:
+                    archivo.write("".join(lineas))
+            except OSError as e:
+                print(f"⚠️ No se pudieron escribir {len(lineas)} trazas en {self.ruta}: {e}")
+
+    async def cerrar(self):
+        """Espera al volcado en curso y escribe lo que quede (al apagar)"""
+        if self._volcado is not None:
+            await asyncio.gather(self._volcado, return_exceptions=True)
+        await asyncio.to_thread(self.volcar)
+
+    def _linea(self, spans: List[Span]) -> str:
+        return json.dumps({
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": {"stringValue": self.servicio}},
+                    {"key": "process.pid", "value": {"intValue": str(os.getpid())}}
+                ]},
+                "scopeSpans": [{"scope": {"name": "docentia"}, "spans": [s.otlp() for s in spans]}]
+            }]
+        }, ensure_ascii=False) + "\n"
+
+
+class Trazador:
+    """Crea trazas y spans en el contexto de la petición en curso (contextvars)"""
+
+    def __init__(self, activo: bool = True, exportador: Optional[ExportadorArchivo] = None, log_json: bool = True):
+        self.activo = activo
+        self.exportador = exportador
+        self.log_json = log_json
+        self._traza: ContextVar[Optional[Traza]] = ContextVar("traza", default=None)
+        self._span: ContextVar[Optional[Span]] = ContextVar("span", default=None)
+
+    def traza_actual(self) -> Optional[Traza]:
+        return self._traza.get()
+
+    @contextmanager
+    def traza(self, nombre: str, request_id: Optional[str] = None, **atributos) -> Iterator[Optional[Span]]:
+        """
+        Span raíz de una petición. Al cerrarse exporta sus spans y emite la
+        línea de log JSON con el resumen
+        """
+        if not self.activo:
+            yield None
+            return
+        traza = Traza(request_id or secrets.token_hex(8))
+        token_traza = self._traza.set(traza)
+        try:
+            with self.span(nombre, tipo=SERVIDOR, **atributos) as raiz:
+                yield raiz
+        finally:
+            self._traza.reset(token_traza)
+            traza.cerrada = True
+            if self.exportador:
+                self.exportador.exportar(traza.spans)
+            if self.log_json:
+                self._log(traza, raiz)
+
+    @contextmanager
+    def span(self, nombre: str, tipo: int = INTERNO, **atributos) -> Iterator[Optional[Span]]:
+        """Span hijo del span actual; fuera de una petición no hace nada"""
+        traza = self._traza.get()
+        if traza is None:
+            yield None
+            return
+        padre = self._span.get()
+        span = Span(traza, nombre, padre.span_id if padre else None, tipo, atributos)
+        token = self._span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self._span.reset(token)
+            span.fin = time.time_ns()
+            if traza.cerrada:
+                # Termina después de la petición (p.ej. un hedge cancelado): se exporta suelto
+                if self.exportador:
+                    self.exportador.exportar([span])
+            else:
+                traza.spans.append(span)
+
+    def registrar(self, **metricas: float):
+        """Suma métricas al resumen de la petición en curso"""
+        traza = self._traza.get()
+        if traza is None:
+            return
+        for clave, valor in metricas.items():
+            if valor is not None:
+                traza.metricas[clave] = traza.metricas.get(clave, 0) + valor
+
+    def fijar(self, **metricas: float):
+        """Fija métricas del resumen que no se acumulan (p.ej. el primer token)"""
+        traza = self._traza.get()
+        if traza is None:
+            return
+        traza.metricas.update({k: v for k, v in metricas.items() if v is not None})
+
+    async def cerrar(self):
+        """Vuelca los spans pendientes del exportador (al apagar)"""
+        if self.exportador:
+            await self.exportador.cerrar()
+
+    def _log(self, traza: Traza, raiz: Span):
+        registro = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(raiz.inicio / 1e9)) + "Z",
+            "evento": "peticion",
+            "request_id": traza.request_id,
+            "trace_id": traza.trace_id,
+            **raiz.atributos,
+            "duracion_ms": round(raiz.duracion_ms, 1),
+            **{k: round(v, 1) if isinstance(v, float) else v for k, v in traza.metricas.items()}
+        }
+        if raiz.error:
+            registro["error"] = raiz.error
+        print(json.dumps(registro, ensure_ascii=False), flush=True)
+
+
+class MiddlewareTrazas:
+    """
+    Middleware ASGI: abre la traza de cada petición HTTP y devuelve su id en
+    X-Request-ID. La traza se cierra al terminar de enviar el cuerpo, así que
+    en SSE y descargas incluye el streaming completo
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        # Los scrapes de /metrics no se trazan: solo añadirían ruido al log
+        if scope["type"] != "http" or not trazador.activo or scope["path"] == "/metrics":
+            await self.app(scope, receive, send)
+            return
+
+        cabeceras = dict(scope.get("headers") or [])
+        request_id = cabeceras.get(b"x-request-id", b"").decode("latin-1")[:64] or secrets.token_hex(8)
+
+        with trazador.traza(
+            f"{scope['method']} {scope['path']}",
+            request_id,
+            **{"http.method": scope["method"], "http.target": scope["path"]}
+        ) as raiz:
+            async def enviar(mensaje):
+                if mensaje["type"] == "http.response.start":
+                    raiz.atributo("http.status_code", mensaje["status"])
+                    mensaje["headers"] = [*mensaje.get("headers", []), (b"x-request-id", request_id.encode("latin-1"))]
+                await send(mensaje)
+
+            await self.app(scope, receive, enviar)
+
+
+# Instancia global
+trazador = Trazador(
+    settings.TRAZAS_ACTIVAS,
+    ExportadorArchivo(settings.TRAZAS_ARCHIVO, settings.APP_NAME) if settings.TRAZAS_ARCHIVO else None,
+    settings.TRAZAS_LOG_JSON
+)
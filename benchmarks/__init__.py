@@ -0,0 +1,12 @@
+"""
+Benchmarks de DocentIA
+Pruebas de carga y rendimiento que se ejecutan en local contra un LLM simulado
+
+    fake_llm_server     LLM simulado (Anthropic y OpenAI) con latencia, ritmo y errores
+    carga_mixta         Mezcla realista de /generar/* con p50/p95/p99, ritmo y memoria
+    micro               Microbenchmarks de prompts, claves de caché y exportación
+    conexiones_http     Handshakes TCP + TLS por petición según el cliente HTTP
+    arranque            Coste de importación por módulo y de calentar cada proveedor
+    secciones           Programación didáctica en una llamada frente a apartados en paralelo
+    resultados          Percentiles y líneas base JSON (--guardar / --comparar)
+"""
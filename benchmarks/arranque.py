@@ -0,0 +1,156 @@
+"""
+Benchmark de arranque en frío: tiempo de `import main` y coste de importación
+de cada módulo relevante (python -X importtime), cada medida en un proceso
+nuevo. Mide además lo que tarda `ia_service.calentar()` en cargar el SDK de
+cada proveedor y abrir sus conexiones contra el LLM simulado. Uso:
+
+    python -m benchmarks.arranque --repeticiones 5
+    python -m benchmarks.arranque --guardar
+    python -m benchmarks.arranque --comparar
+
+Un módulo que no aparece en la tabla no se importa al arrancar (los SDK de
+los proveedores deberían estar ahí solo tras calentar).
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, Any, List, Optional
+
+from benchmarks.fake_llm_server import arrancar_en_hilo
+from benchmarks import resultados
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos de terceros a seguir; los de app.* se siguen todos
+MODULOS = (
+    "main", "config", "fastapi", "pydantic", "prometheus_client", "httpx",
+    "anthropic", "openai", "google.generativeai", "reportlab", "docx"
+)
+
+_LINEA = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+_IMPORTAR = """
+import time
+inicio = time.perf_counter()
+import main
+print(time.perf_counter() - inicio)
+"""
+
+_CALENTAR = """
+import asyncio, json, time
+inicio = time.perf_counter()
+import main
+importado = time.perf_counter() - inicio
+datos = asyncio.run(main.ia_service.calentar({proveedor!r}))
+datos["import_main"] = importado
+print(json.dumps(datos))
+"""
+
+
+def _entorno(extra: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Entorno del proceso hijo: sin trazas en disco ni precalentado automático"""
+    entorno = dict(os.environ)
+    entorno.setdefault("ANTHROPIC_API_KEY", "sk-ant-fake")
+    entorno.update({"TRAZAS_ARCHIVO": "", "TRAZAS_LOG_JSON": "false", "PYTHONPATH": RAIZ})
+    entorno.update(extra or {})
+    return entorno
+
+
+def _ejecutar(codigo: str, importtime: bool = False, extra: Optional[Dict[str, str]] = None) -> subprocess.CompletedProcess:
+    argumentos = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", codigo]
+    return subprocess.run(argumentos, cwd=RAIZ, env=_entorno(extra), capture_output=True, text=True, check=True)
+
+
+def analizar_importtime(salida: str) -> Dict[str, Dict[str, float]]:
+    """{módulo: {"propio_ms", "acumulado_ms"}} de la salida de -X importtime (primera importación)"""
+    modulos = {}
+    for linea in salida.splitlines():
+        coincidencia = _LINEA.match(linea)
+        if not coincidencia:
+            continue
+        propio, acumulado, _, nombre = coincidencia.groups()
+        if nombre in MODULOS or nombre.startswith("app."):
+            modulos.setdefault(nombre, {"propio_ms": int(propio) / 1000, "acumulado_ms": int(acumulado) / 1000})
+    return modulos
+
+
+def medir_importacion(repeticiones: int) -> Dict[str, Any]:
+    """Mediana del tiempo de `import main` y del coste de cada módulo en `repeticiones` procesos"""
+    tiempos: List[float] = []
+    por_modulo: Dict[str, List[Dict[str, float]]] = {}
+    for _ in range(repeticiones):
+        proceso = _ejecutar(_IMPORTAR, importtime=True)
+        tiempos.append(float(proceso.stdout.strip().splitlines()[-1]))
+        for nombre, coste in analizar_importtime(proceso.stderr).items():
+            por_modulo.setdefault(nombre, []).append(coste)
+
+    modulos = {
+        nombre: {
+            "propio_ms": round(statistics.median(c["propio_ms"] for c in costes), 2),
+            "acumulado_ms": round(statistics.median(c["acumulado_ms"] for c in costes), 2)
+        }
+        for nombre, costes in por_modulo.items()
+    }
+    # -X importtime infla los tiempos: el total se toma del reloj del propio proceso
+    return {"import_main_ms": round(statistics.median(tiempos) * 1000, 1), "modulos": modulos}
+
+
+def medir_calentado(proveedor: str, url: str) -> Dict[str, Any]:
+    """Carga del SDK y conexiones de un proveedor en un proceso recién arrancado"""
+    extra = {
+        "ANTHROPIC_BASE_URL": url,
+        "OPENAI_BASE_URL": f"{url}/v1",
+        "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "sk-fake"),
+        "GOOGLE_API_KEY": os.environ.get("GOOGLE_API_KEY", "fake")
+    }
+    proceso = _ejecutar(_CALENTAR.format(proveedor=proveedor), extra=extra)
+    datos = json.loads(proceso.stdout.strip().splitlines()[-1])
+    return {
+        "inicializado": datos["inicializado"],
+        "import_main_ms": round(datos["import_main"] * 1000, 1),
+        "calentar_ms": round(datos["segundos"] * 1000, 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de arranque en frío")
+    parser.add_argument("--repeticiones", type=int, default=5, help="Procesos por medida (se toma la mediana)")
+    parser.add_argument("--proveedores", nargs="*", default=["claude", "openai"], help="Proveedores a calentar")
+    parser.add_argument("--guardar", action="store_true", help="Guarda el resultado como línea base")
+    parser.add_argument("--comparar", action="store_true", help="Compara con la línea base guardada")
+    parser.add_argument("--tolerancia", type=float, default=0.20)
+    parser.add_argument("--nombre", default="arranque", help="Nombre de la línea base")
+    args = parser.parse_args()
+
+    importacion = medir_importacion(args.repeticiones)
+    print(f"import main: {importacion['import_main_ms']:.1f} ms (mediana de {args.repeticiones} procesos)\n")
+    print(f"{'módulo':<42} {'acumulado ms':>13} {'propio ms':>10}")
+    for nombre, coste in sorted(importacion["modulos"].items(), key=lambda m: -m[1]["acumulado_ms"]):
+        print(f"{nombre:<42} {coste['acumulado_ms']:>13.1f} {coste['propio_ms']:>10.1f}")
+    ausentes = [m for m in MODULOS if m not in importacion["modulos"]]
+    if ausentes:
+        print(f"\nNo importados al arrancar: {', '.join(ausentes)}")
+
+    medidas: Dict[str, Any] = {"importacion": importacion}
+    if args.proveedores:
+        url = arrancar_en_hilo(0.0)
+        print(f"\n{'proveedor':<12} {'calentar ms':>12} {'inicializado':>13}")
+        medidas["calentar"] = {}
+        for proveedor in args.proveedores:
+            datos = medir_calentado(proveedor, url)
+            medidas["calentar"][proveedor] = {"calentar_ms": datos["calentar_ms"]}
+            print(f"{proveedor:<12} {datos['calentar_ms']:>12.1f} {'sí' if datos['inicializado'] else 'no':>13}")
+
+    parametros = {"repeticiones": args.repeticiones, "proveedores": args.proveedores}
+    regresiones = resultados.comparar(args.nombre, medidas, args.tolerancia) if args.comparar else 0
+    if args.guardar:
+        print(f"\n💾 Línea base guardada en {resultados.guardar(args.nombre, medidas, parametros)}")
+    sys.exit(1 if regresiones else 0)
+
+
+if __name__ == "__main__":
+    main()
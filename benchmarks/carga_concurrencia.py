@@ -0,0 +1,63 @@
+"""
+Benchmark de carga: peticiones/s de /generar/boton-emergencia según la concurrencia
+Ejecuta la app en proceso contra el LLM simulado. Uso:
+
+    python -m benchmarks.carga_concurrencia --latencia 1.0 --peticiones 32
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.fake_llm_server import arrancar_en_hilo
+
+PAYLOAD = {
+    "nivel": "Primaria",
+    "curso": "3º",
+    "asignatura": "Matemáticas",
+    "situacion": "Falta el profesor titular",
+    "duracion": "45 minutos"
+}
+
+
+async def medir(cliente, concurrencia: int, peticiones: int) -> float:
+    """Lanza `peticiones` con `concurrencia` simultáneas y devuelve peticiones/s"""
+    semaforo = asyncio.Semaphore(concurrencia)
+
+    async def una():
+        async with semaforo:
+            respuesta = await cliente.post("/generar/boton-emergencia", json=PAYLOAD)
+            respuesta.raise_for_status()
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(una() for _ in range(peticiones)))
+    return peticiones / (time.perf_counter() - inicio)
+
+
+async def main(latencia: float, peticiones: int, niveles: list[int]):
+    import httpx
+    from main import app
+
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=None) as cliente:
+        print(f"Latencia simulada del LLM: {latencia:.2f}s | peticiones por nivel: {peticiones}")
+        print(f"{'concurrencia':>12} {'req/s':>8} {'ideal':>8}")
+        for concurrencia in niveles:
+            rps = await medir(cliente, concurrencia, peticiones)
+            print(f"{concurrencia:>12} {rps:>8.2f} {concurrencia / latencia:>8.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de concurrencia de generadores")
+    parser.add_argument("--latencia", type=float, default=1.0)
+    parser.add_argument("--peticiones", type=int, default=32)
+    parser.add_argument("--niveles", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    # El SDK de Anthropic lee ANTHROPIC_BASE_URL al crear el cliente (al importar main)
+    os.environ["ANTHROPIC_BASE_URL"] = arrancar_en_hilo(args.latencia)
+    os.environ.setdefault("ANTHROPIC_API_KEY", "sk-ant-fake")
+    # Todas las peticiones son iguales: sin caché ni coalescencia, cada una llega al LLM simulado
+    os.environ["CACHE_BACKEND"] = "ninguno"
+    os.environ["COALESCENCIA_ACTIVA"] = "false"
+    asyncio.run(main(args.latencia, args.peticiones, args.niveles))
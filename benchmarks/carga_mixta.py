@@ -0,0 +1,262 @@
+"""
+Prueba de carga con una mezcla realista de generadores /generar/*
+Arranca el backend con uvicorn en un subproceso apuntando al LLM simulado y
+reproduce una secuencia determinista de peticiones (benchmarks.peticiones),
+parte de ellas en streaming. Informa de p50/p95/p99 por generador, del tiempo
+hasta el primer fragmento en los streams, del ritmo, de los errores y de la
+memoria del servidor. Uso:
+
+    python -m benchmarks.carga_mixta --peticiones 300 --concurrencia 32
+    python -m benchmarks.carga_mixta --tokens-por-segundo 80 --tasa-errores 0.05 --guardar
+    python -m benchmarks.carga_mixta --comparar        # frente a la última línea base
+
+Con --url se mide un backend ya arrancado (sin memoria del servidor).
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Any, Optional, List
+
+import httpx
+
+from benchmarks.fake_llm_server import arrancar_en_hilo, puerto_libre
+from benchmarks.peticiones import mezcla
+from benchmarks import resultados
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# Límites de la cuenta real: sin ellos se mide el backend y no el rate limit
+_SIN_LIMITES = {clave: "0" for clave in (
+    "CLAUDE_RPM", "CLAUDE_ITPM", "CLAUDE_OTPM", "OPENAI_RPM", "OPENAI_TPM", "GEMINI_RPM"
+)}
+
+
+def arrancar_backend(url_llm: str, proveedor: str, cache: bool, limites: bool, verboso: bool) -> tuple:
+    """Lanza `uvicorn main:app` con las URLs del LLM simulado; devuelve (proceso, url)"""
+    puerto = puerto_libre()
+    entorno = {
+        **({} if limites else _SIN_LIMITES),
+        **os.environ,
+        "AI_PROVIDER": proveedor,
+        "ANTHROPIC_BASE_URL": url_llm,
+        "ANTHROPIC_API_KEY": "sk-ant-fake",
+        "OPENAI_BASE_URL": f"{url_llm}/v1",
+        "OPENAI_API_KEY": "sk-fake",
+        "CACHE_BACKEND": "memoria" if cache else "ninguno",
+        # Sin trazas en disco ni logs por petición: no son parte de lo que se mide
+        "TRAZAS_ARCHIVO": "",
+        "TRAZAS_LOG_JSON": "false",
+    }
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(puerto), "--log-level", "warning"],
+        cwd=RAIZ,
+        env=entorno,
+        stdout=None if verboso else subprocess.DEVNULL,
+        stderr=None if verboso else subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{puerto}"
+    limite = time.monotonic() + 30
+    while time.monotonic() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError("El backend terminó al arrancar (repite con --verboso)")
+        try:
+            if httpx.get(f"{url}/", timeout=1).status_code == 200:
+                return proceso, url
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    proceso.kill()
+    raise RuntimeError("El backend no respondió en 30 s")
+
+
+def memoria_proceso_mb(pid: int) -> Dict[str, Optional[float]]:
+    """Memoria residente actual y máxima de otro proceso (solo Linux, vía /proc)"""
+    medida = {"rss_mb": None, "rss_max_mb": None}
+    try:
+        with open(f"/proc/{pid}/status") as estado:
+            for linea in estado:
+                if linea.startswith("VmRSS:"):
+                    medida["rss_mb"] = round(int(linea.split()[1]) / 1024, 1)
+                elif linea.startswith("VmHWM:"):
+                    medida["rss_max_mb"] = round(int(linea.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return medida
+
+
+async def una_peticion(cliente: httpx.AsyncClient, tipo: str, cuerpo: dict, stream: bool) -> Dict[str, Any]:
+    """Lanza una petición y devuelve su latencia, estado y primer fragmento (streams)"""
+    inicio = time.perf_counter()
+    medida = {"tipo": tipo, "stream": stream, "primer_fragmento": None}
+    try:
+        if not stream:
+            respuesta = await cliente.post(f"/generar/{tipo}", json=cuerpo)
+            medida["estado"] = respuesta.status_code
+        else:
+            async with cliente.stream(
+                "POST", f"/generar/{tipo}", json=cuerpo, headers={"Accept": "text/event-stream"}
+            ) as respuesta:
+                medida["estado"] = respuesta.status_code
+                async for linea in respuesta.aiter_lines():
+                    if linea == "event: delta" and medida["primer_fragmento"] is None:
+                        medida["primer_fragmento"] = time.perf_counter() - inicio
+                    elif linea == "event: error":
+                        # El error llega dentro del stream, con estado 200
+                        medida["estado"] = "sse_error"
+    except httpx.HTTPError as e:
+        medida["estado"] = type(e).__name__
+    medida["latencia"] = time.perf_counter() - inicio
+    return medida
+
+
+async def ejecutar(
+    url: str,
+    peticiones: list,
+    concurrencia: int,
+    ritmo: float,
+    fraccion_stream: float,
+    semilla: int
+) -> tuple:
+    """
+    Reproduce la mezcla: en bucle cerrado con `concurrencia` clientes o, si
+    se da `ritmo`, en bucle abierto con llegadas de Poisson a ese ritmo
+    """
+    azar = random.Random(semilla + 1)
+    plan = [(tipo, cuerpo, azar.random() < fraccion_stream) for tipo, cuerpo in peticiones]
+    llegadas = [azar.expovariate(ritmo) for _ in plan] if ritmo else []
+    medidas: List[Dict[str, Any]] = []
+    limites = httpx.Limits(max_connections=concurrencia, max_keepalive_connections=concurrencia)
+
+    async with httpx.AsyncClient(base_url=url, timeout=300, limits=limites) as cliente:
+        inicio = time.perf_counter()
+        if ritmo:
+            semaforo = asyncio.Semaphore(concurrencia)
+
+            async def con_limite(tipo, cuerpo, stream):
+                async with semaforo:
+                    medidas.append(await una_peticion(cliente, tipo, cuerpo, stream))
+
+            tareas = []
+            for espera, (tipo, cuerpo, stream) in zip(llegadas, plan):
+                await asyncio.sleep(espera)
+                tareas.append(asyncio.create_task(con_limite(tipo, cuerpo, stream)))
+            await asyncio.gather(*tareas)
+        else:
+            cola = iter(plan)
+
+            async def cliente_bucle():
+                for tipo, cuerpo, stream in cola:
+                    medidas.append(await una_peticion(cliente, tipo, cuerpo, stream))
+
+            await asyncio.gather(*(cliente_bucle() for _ in range(concurrencia)))
+        duracion = time.perf_counter() - inicio
+    return medidas, duracion
+
+
+def informe(medidas: List[Dict[str, Any]], duracion: float) -> Dict[str, Any]:
+    """Resumen global y por generador de las medidas de una ejecución"""
+    correctas = [m for m in medidas if m["estado"] == 200]
+    por_tipo = defaultdict(list)
+    for medida in correctas:
+        por_tipo[medida["tipo"]].append(medida["latencia"])
+    primeros = [m["primer_fragmento"] for m in correctas if m["primer_fragmento"] is not None]
+    return {
+        "global": resultados.resumir([m["latencia"] for m in correctas], duracion),
+        "primer_fragmento": resultados.resumir(primeros),
+        "por_generador": {tipo: resultados.resumir(latencias) for tipo, latencias in sorted(por_tipo.items())},
+        "errores": dict(Counter(str(m["estado"]) for m in medidas if m["estado"] != 200)),
+        "tasa_errores": round(1 - len(correctas) / len(medidas), 4) if medidas else 0.0
+    }
+
+
+def imprimir(resumen: Dict[str, Any]):
+    print(f"\n{'generador':<30} {'n':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for tipo, datos in resumen["por_generador"].items():
+        print(f"{tipo:<30} {datos['n']:>5} {datos['p50_ms']:>9.0f} {datos['p95_ms']:>9.0f} {datos['p99_ms']:>9.0f}")
+    total = resumen["global"]
+    print(f"{'TOTAL':<30} {total['n']:>5} {total['p50_ms']:>9.0f} {total['p95_ms']:>9.0f} {total['p99_ms']:>9.0f}")
+    primero = resumen["primer_fragmento"]
+    if primero["n"]:
+        print(f"{'primer fragmento (streams)':<30} {primero['n']:>5} {primero['p50_ms']:>9.0f} "
+              f"{primero['p95_ms']:>9.0f} {primero['p99_ms']:>9.0f}")
+    print(f"\nRitmo: {total.get('por_segundo', 0):.2f} peticiones correctas/s | "
+          f"errores: {resumen['errores'] or 'ninguno'} ({resumen['tasa_errores']:.1%})")
+    if resumen.get("memoria_servidor", {}).get("rss_max_mb"):
+        memoria = resumen["memoria_servidor"]
+        print(f"Memoria del servidor: {memoria['rss_mb']} MB ahora, {memoria['rss_max_mb']} MB de pico")
+    if resumen.get("llm_simulado"):
+        print(f"LLM simulado: {resumen['llm_simulado']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga con la mezcla de generadores")
+    parser.add_argument("--peticiones", type=int, default=200)
+    parser.add_argument("--concurrencia", type=int, default=16, help="Clientes (o máximo en vuelo con --ritmo)")
+    parser.add_argument("--ritmo", type=float, default=0, help="Peticiones/s en bucle abierto (0 = bucle cerrado)")
+    parser.add_argument("--stream", type=float, default=0.3, help="Fracción de peticiones en streaming")
+    parser.add_argument("--generadores", nargs="+", help="Limita la mezcla a estos generadores")
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--proveedor", choices=["claude", "openai"], default="claude")
+    parser.add_argument("--sin-cache", action="store_true", help="Desactiva la caché de generaciones")
+    parser.add_argument("--con-limites", action="store_true", help="Mantiene los *_RPM/*_TPM del entorno")
+    parser.add_argument("--latencia", type=float, default=1.0, help="Segundos por respuesta del LLM")
+    parser.add_argument("--primer-token", type=float, default=0.2)
+    parser.add_argument("--tokens-por-segundo", type=float, default=0)
+    parser.add_argument("--tasa-errores", type=float, default=0)
+    parser.add_argument("--url", help="Backend ya arrancado (no se lanza uno nuevo)")
+    parser.add_argument("--verboso", action="store_true", help="Muestra la salida del backend")
+    parser.add_argument("--guardar", action="store_true", help="Guarda el resultado como línea base")
+    parser.add_argument("--comparar", action="store_true", help="Compara con la línea base guardada")
+    parser.add_argument("--tolerancia", type=float, default=0.10)
+    parser.add_argument("--nombre", default="carga_mixta", help="Nombre de la línea base")
+    args = parser.parse_args()
+
+    proceso = None
+    url_llm = None
+    if args.url:
+        url = args.url
+    else:
+        url_llm = arrancar_en_hilo(
+            args.latencia,
+            primer_token=args.primer_token,
+            tokens_por_segundo=args.tokens_por_segundo,
+            tasa_errores=args.tasa_errores,
+            semilla=args.semilla
+        )
+        proceso, url = arrancar_backend(
+            url_llm, args.proveedor, not args.sin_cache, args.con_limites, args.verboso
+        )
+
+    try:
+        peticiones = mezcla(args.peticiones, args.semilla, args.generadores)
+        modo = f"{args.ritmo:g} req/s (máx. {args.concurrencia} en vuelo)" if args.ritmo else f"{args.concurrencia} clientes"
+        print(f"{len(peticiones)} peticiones, {modo}, {args.stream:.0%} en streaming, proveedor {args.proveedor}")
+        medidas, duracion = asyncio.run(
+            ejecutar(url, peticiones, args.concurrencia, args.ritmo, args.stream, args.semilla)
+        )
+        resumen = informe(medidas, duracion)
+        if proceso:
+            resumen["memoria_servidor"] = memoria_proceso_mb(proceso.pid)
+        if url_llm:
+            resumen["llm_simulado"] = httpx.get(f"{url_llm}/contadores").json()
+    finally:
+        if proceso:
+            proceso.terminate()
+            proceso.wait(10)
+
+    imprimir(resumen)
+    parametros = {k: v for k, v in vars(args).items() if k not in ("guardar", "comparar", "verboso", "nombre")}
+    regresiones = resultados.comparar(args.nombre, resumen, args.tolerancia) if args.comparar else 0
+    if args.guardar:
+        print(f"\n💾 Línea base guardada en {resultados.guardar(args.nombre, resumen, parametros)}")
+    sys.exit(1 if regresiones else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Benchmark de conexiones con el proveedor: coste del handshake TCP + TLS por
+petición con un cliente nuevo por llamada, con el SDK de Anthropic por
+defecto (keep-alive de 5 s) y con el transporte compartido y precalentado.
+
+Lanza oleadas de peticiones concurrentes contra el LLM simulado servido por
+HTTPS (certificado autofirmado generado con openssl), separadas por una
+pausa mayor que el keep-alive por defecto, como el tráfico real de un
+centro. Uso:
+
+    python -m benchmarks.conexiones_http --concurrencia 16 --oleadas 4 --pausa 6
+
+En localhost el handshake cuesta milisegundos; contra la API real hay que
+sumar ~2 RTT por conexión nueva, así que lo que importa es la columna de
+conexiones abiertas. Uvicorn no habla HTTP/2, así que aquí todo va por
+HTTP/1.1.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Any, List
+
+import httpx
+
+from benchmarks.fake_llm_server import arrancar_en_hilo
+from benchmarks import resultados
+
+
+def certificado_autofirmado(directorio: str) -> tuple:
+    """(certificado, clave) PEM para localhost, generados con openssl"""
+    certificado = os.path.join(directorio, "cert.pem")
+    clave = os.path.join(directorio, "clave.pem")
+    subprocess.run(
+        ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+         "-subj", "/CN=localhost", "-addext", "subjectAltName=DNS:localhost",
+         "-keyout", clave, "-out", certificado],
+        check=True, capture_output=True
+    )
+    return certificado, clave
+
+
+async def escenario(nombre: str, url: str, concurrencia: int, oleadas: int, pausa: float) -> Dict[str, Any]:
+    """Mide las oleadas con una estrategia de cliente y cuenta las conexiones abiertas"""
+    import anthropic
+    from app.services.transporte import TransporteHTTP
+    from config import settings
+
+    compartido = None
+    if nombre == "sdk_por_defecto":
+        compartido = anthropic.AsyncAnthropic(base_url=url, api_key="sk-ant-fake", max_retries=0)
+    elif nombre == "transporte_compartido":
+        transporte = TransporteHTTP(
+            settings.HTTP_MAX_CONEXIONES,
+            max(settings.HTTP_MAX_KEEPALIVE, concurrencia),
+            settings.HTTP_KEEPALIVE_SEGUNDOS,
+            settings.HTTP2_ACTIVO,
+            settings.HTTP_TIMEOUT_CONEXION,
+            settings.HTTP_TIMEOUT_LECTURA,
+            settings.HTTP_TIMEOUT_POOL
+        )
+        compartido = anthropic.AsyncAnthropic(
+            base_url=url, api_key="sk-ant-fake", max_retries=0,
+            http_client=transporte.cliente, timeout=transporte.timeout
+        )
+        await transporte.precalentar([url], concurrencia)
+
+    async def llamar():
+        argumentos = dict(model="fake", max_tokens=16, messages=[{"role": "user", "content": "Hola"}])
+        if compartido:
+            await compartido.messages.create(**argumentos)
+        else:
+            async with anthropic.AsyncAnthropic(base_url=url, api_key="sk-ant-fake", max_retries=0) as cliente:
+                await cliente.messages.create(**argumentos)
+
+    async def medida():
+        inicio = time.perf_counter()
+        await llamar()
+        return time.perf_counter() - inicio
+
+    # Las precalentadas quedan fuera: se abren al arrancar, no en las peticiones.
+    # La consulta final de /contadores abre una conexión propia: se descuenta
+    conexiones_antes = httpx.get(f"{url}/contadores", verify=False).json()["conexiones"]
+    tiempos: List[float] = []
+    primera = []
+    for oleada in range(oleadas):
+        if oleada:
+            await asyncio.sleep(pausa)
+        lote = await asyncio.gather(*(medida() for _ in range(concurrencia)))
+        tiempos.extend(lote)
+        if not primera:
+            primera = list(lote)
+    conexiones = httpx.get(f"{url}/contadores", verify=False).json()["conexiones"] - conexiones_antes - 1
+
+    resumen = resultados.resumir(tiempos)
+    resumen["primera_oleada_p50_ms"] = resultados.resumir(primera)["p50_ms"]
+    resumen["conexiones"] = conexiones
+    return resumen
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de conexiones HTTP con el proveedor")
+    parser.add_argument("--concurrencia", type=int, default=16)
+    parser.add_argument("--oleadas", type=int, default=4)
+    parser.add_argument("--pausa", type=float, default=6.0, help="Segundos entre oleadas (> 5 s de keep-alive por defecto)")
+    parser.add_argument("--latencia", type=float, default=0.02, help="Segundos por respuesta del LLM simulado")
+    parser.add_argument("--guardar", action="store_true", help="Guarda el resultado como línea base")
+    parser.add_argument("--comparar", action="store_true", help="Compara con la línea base guardada")
+    parser.add_argument("--tolerancia", type=float, default=0.15)
+    parser.add_argument("--nombre", default="conexiones_http", help="Nombre de la línea base")
+    args = parser.parse_args()
+
+    os.environ.setdefault("ANTHROPIC_API_KEY", "sk-ant-fake")
+    directorio = tempfile.mkdtemp(prefix="docentia_tls_")
+    certificado = certificado_autofirmado(directorio)
+    # httpx confía en el certificado autofirmado a través de SSL_CERT_FILE
+    os.environ["SSL_CERT_FILE"] = certificado[0]
+    # El servidor simulado mantiene las conexiones ociosas como un proveedor real
+    url = arrancar_en_hilo(args.latencia, certificado=certificado, keepalive=300)
+
+    medidas = {}
+    print(f"{args.oleadas} oleadas de {args.concurrencia} peticiones, {args.pausa:g}s entre oleadas (HTTPS local)\n")
+    print(f"{'estrategia':<24} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'1ª oleada p50':>14} {'conexiones':>11}")
+    for nombre in ("cliente_por_peticion", "sdk_por_defecto", "transporte_compartido"):
+        datos = asyncio.run(escenario(nombre, url, args.concurrencia, args.oleadas, args.pausa))
+        medidas[nombre] = datos
+        print(f"{nombre:<24} {datos['p50_ms']:>8.1f} {datos['p95_ms']:>8.1f} {datos['p99_ms']:>8.1f} "
+              f"{datos['primera_oleada_p50_ms']:>14.1f} {datos['conexiones']:>11}")
+
+    parametros = {k: v for k, v in vars(args).items() if k not in ("guardar", "comparar", "nombre")}
+    regresiones = resultados.comparar(args.nombre, medidas, args.tolerancia) if args.comparar else 0
+    if args.guardar:
+        print(f"\n💾 Línea base guardada en {resultados.guardar(args.nombre, medidas, parametros)}")
+    sys.exit(1 if regresiones else 0)
+
+
+if __name__ == "__main__":
+    main()
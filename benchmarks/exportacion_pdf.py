@@ -0,0 +1,87 @@
+"""
+Benchmark de exportación a PDF: PDFs/s en un solo proceso y a través de
+pdf_service (pool de procesos frente a pool de hilos), junto con el retraso
+que sufre el event loop mientras se maqueta. Uso:
+
+    python -m benchmarks.exportacion_pdf --segundos 5 --concurrencia 8
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.muestras import documento
+
+
+def medir_directo(paginas: int, segundos: float) -> float:
+    """PDFs/s en un solo hilo llamando al servicio"""
+    from app.services.export_service import ExportService
+
+    contenido = documento(paginas)
+    total = 0
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < segundos:
+        ExportService.exportar_pdf(contenido, "Benchmark")
+        total += 1
+    return total / (time.perf_counter() - inicio)
+
+
+async def medir_servicio(paginas: int, segundos: float, concurrencia: int, workers: int):
+    """
+    PDFs/s con `concurrencia` clientes, rechazos 503 y retraso máximo del
+    event loop (un latido cada 10 ms que mide cuánto se retrasa)
+    """
+    from app.services.limitador import ProveedorSaturadoError
+    from app.services.pdf_service import PdfService
+
+    servicio = PdfService(workers=workers, max_cola=concurrencia)
+    servicio.iniciar()
+    contenido = documento(paginas)
+    # Calentamiento: arranque de los procesos fuera de la medida
+    await asyncio.gather(*(servicio.exportar("Calentamiento") for _ in range(max(1, workers))))
+
+    total = rechazos = 0
+    retraso_max = 0.0
+    fin = time.perf_counter() + segundos
+
+    async def cliente():
+        nonlocal total, rechazos
+        while time.perf_counter() < fin:
+            try:
+                await servicio.exportar(contenido, "Benchmark")
+                total += 1
+            except ProveedorSaturadoError:
+                rechazos += 1
+                await asyncio.sleep(0.05)
+
+    async def latido():
+        nonlocal retraso_max
+        while time.perf_counter() < fin:
+            previsto = time.perf_counter() + 0.01
+            await asyncio.sleep(0.01)
+            retraso_max = max(retraso_max, time.perf_counter() - previsto)
+
+    inicio = time.perf_counter()
+    await asyncio.gather(latido(), *(cliente() for _ in range(concurrencia)))
+    duracion = time.perf_counter() - inicio
+    servicio.detener()
+    return total / duracion, rechazos, retraso_max * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de exportación a PDF")
+    parser.add_argument("--segundos", type=float, default=5.0, help="Duración de cada medida")
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--paginas", type=int, nargs="+", default=[2, 40])
+    args = parser.parse_args()
+
+    os.environ.setdefault("ANTHROPIC_API_KEY", "sk-ant-fake")
+    print(f"{'páginas':>8} {'modo':>9} {'PDF/s':>7} {'503':>5} {'retraso loop ms':>16}")
+    for paginas in args.paginas:
+        print(f"{paginas:>8} {'directo':>9} {medir_directo(paginas, args.segundos):>7.1f}")
+        for modo, workers in (("hilos", 0), ("procesos", args.workers)):
+            por_segundo, rechazos, retraso = asyncio.run(
+                medir_servicio(paginas, args.segundos, args.concurrencia, workers)
+            )
+            print(f"{paginas:>8} {modo:>9} {por_segundo:>7.1f} {rechazos:>5} {retraso:>16.1f}")
@@ -0,0 +1,65 @@
+"""
+Benchmark de exportación a Word: exportaciones/s de documentos de 2 y 40 páginas,
+directamente con ExportService y a través de POST /api/exportar/word. Uso:
+
+    python -m benchmarks.exportacion_word --segundos 5 --concurrencia 8
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from benchmarks.muestras import documento
+
+
+def medir_directo(paginas: int, segundos: float) -> float:
+    """Exportaciones/s en un solo hilo llamando al servicio"""
+    from app.services.export_service import export_service
+
+    contenido = documento(paginas)
+    total = 0
+    inicio = time.perf_counter()
+    while time.perf_counter() - inicio < segundos:
+        export_service.exportar_word(contenido, "Benchmark")
+        total += 1
+    return total / (time.perf_counter() - inicio)
+
+
+async def medir_endpoint(paginas: int, segundos: float, concurrencia: int) -> float:
+    """Exportaciones/s por HTTP con `concurrencia` clientes simultáneos"""
+    import httpx
+    from main import app
+
+    cuerpo = {"contenido": documento(paginas), "titulo": "Benchmark"}
+    total = 0
+    transporte = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench", timeout=None) as cliente:
+        fin = time.perf_counter() + segundos
+
+        async def cliente_bucle():
+            nonlocal total
+            while time.perf_counter() < fin:
+                respuesta = await cliente.post("/api/exportar/word", json=cuerpo)
+                respuesta.raise_for_status()
+                total += 1
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente_bucle() for _ in range(concurrencia)))
+        return total / (time.perf_counter() - inicio)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de exportación a Word")
+    parser.add_argument("--segundos", type=float, default=5.0, help="Duración de cada medida")
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--paginas", type=int, nargs="+", default=[2, 40])
+    args = parser.parse_args()
+
+    os.environ.setdefault("ANTHROPIC_API_KEY", "sk-ant-fake")
+    # El cuerpo es siempre el mismo: con la caché de exportaciones solo se mediría la primera
+    os.environ["EXPORT_CACHE_ACTIVA"] = "false"
+    print(f"{'páginas':>8} {'directo/s':>10} {'endpoint/s':>11}")
+    for paginas in args.paginas:
+        directo = medir_directo(paginas, args.segundos)
+        endpoint = asyncio.run(medir_endpoint(paginas, args.segundos, args.concurrencia))
+        print(f"{paginas:>8} {directo:>10.1f} {endpoint:>11.1f}")
@@ -0,0 +1,356 @@
+"""
+Servidor LLM simulado
+Imita la API de mensajes de Anthropic y la de chat completions de OpenAI
+(normal y streaming SSE) para poder medir el backend sin red ni coste. La
+latencia, el ritmo de tokens y los errores inyectados son configurables y
+deterministas (misma semilla, misma secuencia de errores). Uso:
+
+    python -m benchmarks.fake_llm_server --puerto 8765 --latencia 2.0
+    python -m benchmarks.fake_llm_server --tokens-por-segundo 60 --tasa-errores 0.05 --semilla 1
+"""
+import argparse
+import asyncio
+import json
+import random
+import socket
+import threading
+import time
+import uuid
+from typing import Optional, Tuple
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse, JSONResponse
+
+# Cuerpo de error de cada código inyectable, en el formato de cada API
+_ERRORES_ANTHROPIC = {
+    429: "rate_limit_error",
+    500: "api_error",
+    529: "overloaded_error",
+}
+_ERRORES_OPENAI = {
+    429: "rate_limit_exceeded",
+    500: "server_error",
+    503: "server_error",
+}
+
+
+def _sse(evento: str, datos: dict) -> str:
+    return f"event: {evento}\ndata: {json.dumps(datos)}\n\n"
+
+
+def _datos(datos) -> str:
+    return f"data: {datos if isinstance(datos, str) else json.dumps(datos)}\n\n"
+
+
+def _tokens_entrada(*textos) -> int:
+    """Aproximación de la API real: ~4 caracteres por token"""
+    return max(1, sum(len(t) for t in textos) // 4)
+
+
+def crear_app(
+    latencia: float = 1.0,
+    texto: str = "Contenido simulado. " * 50,
+    primer_token: float = 0.2,
+    rpm: int = 0,
+    tokens_por_segundo: float = 0,
+    tasa_errores: float = 0,
+    codigos_error: tuple = (500, 529),
+    semilla: int = 0,
+    fraccion_salida: float = 0
+) -> FastAPI:
+    """
+    Crea la app FastAPI del LLM simulado
+
+    Args:
+        latencia: Segundos totales por respuesta (si no se fija tokens_por_segundo)
+        texto: Texto devuelto por el "modelo" (una palabra = un token), recortado a max_tokens
+        primer_token: Segundos hasta el primer token
+        rpm: Peticiones por minuto antes de responder 429 (0 = sin límite), con
+             las cabeceras anthropic-ratelimit-* de la API real
+        tokens_por_segundo: Ritmo de salida; la duración pasa a depender de la longitud
+        tasa_errores: Fracción de peticiones que fallan con uno de `codigos_error`
+        codigos_error: Códigos HTTP a inyectar (429, 500, 503, 529)
+        semilla: Semilla de la secuencia de errores
+        fraccion_salida: Fracción del max_tokens de cada petición que escribe el
+                         "modelo", repitiendo el texto si hace falta (0 = el texto
+                         entero); así nunca se trunca y la longitud sigue al max_tokens
+    """
+    app = FastAPI(title="LLM simulado")
+    palabras = texto.split(" ")
+    prefijos_cacheados = set()
+    peticiones = []
+    azar = random.Random(semilla)
+    app.state.contadores = {"peticiones": 0, "errores_inyectados": 0, "streams": 0, "conexiones": 0}
+    conexiones = set()
+
+    @app.middleware("http")
+    async def contar_conexiones(request: Request, call_next):
+        # Cada puerto de origen distinto es una conexión nueva (y un handshake)
+        conexiones.add((request.client.host, request.client.port))
+        app.state.contadores["conexiones"] = len(conexiones)
+        return await call_next(request)
+
+    def cabeceras_limite() -> dict:
+        """Cabeceras de rate limit; None si se ha superado el RPM"""
+        if not rpm:
+            return {}
+        ahora = time.time()
+        peticiones[:] = [t for t in peticiones if t > ahora - 60]
+        if len(peticiones) >= rpm:
+            return None
+        peticiones.append(ahora)
+        return {
+            "anthropic-ratelimit-requests-limit": str(rpm),
+            "anthropic-ratelimit-requests-remaining": str(rpm - len(peticiones)),
+            "anthropic-ratelimit-requests-reset": time.strftime(
+                "%Y-%m-%dT%H:%M:%SZ", time.gmtime(peticiones[0] + 60)
+            )
+        }
+
+    def error_inyectado() -> int:
+        """Código del error a devolver en esta petición (0 = ninguno)"""
+        app.state.contadores["peticiones"] += 1
+        if tasa_errores and azar.random() < tasa_errores:
+            app.state.contadores["errores_inyectados"] += 1
+            return azar.choice(codigos_error)
+        return 0
+
+    def salida(max_tokens: int) -> list:
+        if fraccion_salida and max_tokens:
+            n = max(1, int(max_tokens * fraccion_salida))
+            return (palabras * (n // len(palabras) + 1))[:n]
+        return palabras[:max(1, min(len(palabras), max_tokens or len(palabras)))]
+
+    def pausa_entre_tokens(n: int) -> float:
+        if tokens_por_segundo:
+            return 1 / tokens_por_segundo
+        return max(latencia - primer_token, 0) / n
+
+    def duracion(n: int) -> float:
+        if tokens_por_segundo:
+            return primer_token + n / tokens_por_segundo
+        return latencia
+
+    async def emitir(trozos: list):
+        """Espera el primer token y luego el ritmo de salida entre trozos"""
+        await asyncio.sleep(primer_token)
+        pausa = pausa_entre_tokens(len(trozos))
+        for i, trozo in enumerate(trozos):
+            if i:
+                await asyncio.sleep(pausa)
+            yield i, trozo + (" " if i < len(trozos) - 1 else "")
+
+    # ---------------- Anthropic ----------------
+
+    def calcular_uso(cuerpo: dict, salida_tokens: int) -> dict:
+        """Uso de tokens, simulando la caché de prompt para bloques con cache_control"""
+        system = cuerpo.get("system")
+        mensajes = [m.get("content") for m in cuerpo.get("messages", [])]
+        uso = {"input_tokens": _tokens_entrada(*(m for m in mensajes if isinstance(m, str))),
+               "output_tokens": salida_tokens,
+               "cache_read_input_tokens": 0, "cache_creation_input_tokens": 0}
+        if isinstance(system, str):
+            uso["input_tokens"] += _tokens_entrada(system)
+        elif isinstance(system, list):
+            for bloque in system:
+                tokens = _tokens_entrada(bloque.get("text", ""))
+                if not bloque.get("cache_control"):
+                    uso["input_tokens"] += tokens
+                elif bloque["text"] in prefijos_cacheados:
+                    uso["cache_read_input_tokens"] += tokens
+                else:
+                    prefijos_cacheados.add(bloque["text"])
+                    uso["cache_creation_input_tokens"] += tokens
+        return uso
+
+    def motivo_fin(trozos: list, truncado: str, completo: str) -> str:
+        """Motivo de parada: el del límite si max_tokens recortó la salida"""
+        return truncado if not fraccion_salida and len(trozos) < len(palabras) else completo
+
+    async def transmitir_anthropic(modelo: str, uso: dict, trozos: list):
+        mensaje = {
+            "id": f"msg_{uuid.uuid4().hex[:24]}", "type": "message", "role": "assistant",
+            "model": modelo, "content": [], "stop_reason": None, "stop_sequence": None,
+            "usage": {**uso, "output_tokens": 0}
+        }
+        yield _sse("message_start", {"type": "message_start", "message": mensaje})
+        yield _sse("content_block_start", {
+            "type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}
+        })
+        async for _, trozo in emitir(trozos):
+            yield _sse("content_block_delta", {
+                "type": "content_block_delta", "index": 0,
+                "delta": {"type": "text_delta", "text": trozo}
+            })
+        yield _sse("content_block_stop", {"type": "content_block_stop", "index": 0})
+        yield _sse("message_delta", {
+            "type": "message_delta", "delta": {"stop_reason": motivo_fin(trozos, "max_tokens", "end_turn"), "stop_sequence": None},
+            "usage": {"output_tokens": uso["output_tokens"]}
+        })
+        yield _sse("message_stop", {"type": "message_stop"})
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        cuerpo = await request.json()
+        cabeceras = cabeceras_limite()
+        if cabeceras is None:
+            return JSONResponse(
+                status_code=429,
+                content={"type": "error", "error": {"type": "rate_limit_error", "message": "Rate limit simulado"}},
+                headers={"retry-after": str(max(1, int(peticiones[0] + 60 - time.time())))}
+            )
+        codigo = error_inyectado()
+        if codigo:
+            return JSONResponse(
+                status_code=codigo,
+                content={"type": "error", "error": {
+                    "type": _ERRORES_ANTHROPIC.get(codigo, "api_error"), "message": "Error simulado"
+                }},
+                headers={"retry-after": "1"} if codigo == 429 else {}
+            )
+        trozos = salida(cuerpo.get("max_tokens"))
+        uso = calcular_uso(cuerpo, len(trozos))
+        modelo = cuerpo.get("model", "fake")
+        if cuerpo.get("stream"):
+            app.state.contadores["streams"] += 1
+            return StreamingResponse(
+                transmitir_anthropic(modelo, uso, trozos), media_type="text/event-stream", headers=cabeceras
+            )
+        await asyncio.sleep(duracion(len(trozos)))
+        return JSONResponse(headers=cabeceras, content={
+            "id": f"msg_{uuid.uuid4().hex[:24]}",
+            "type": "message",
+            "role": "assistant",
+            "model": modelo,
+            "content": [{"type": "text", "text": " ".join(trozos)}],
+            "stop_reason": motivo_fin(trozos, "max_tokens", "end_turn"),
+            "stop_sequence": None,
+            "usage": uso
+        })
+
+    # ---------------- OpenAI ----------------
+
+    async def transmitir_openai(modelo: str, uso: dict, trozos: list, con_uso: bool):
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex[:24]}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": modelo}
+        async for i, trozo in emitir(trozos):
+            delta = {"role": "assistant", "content": trozo} if i == 0 else {"content": trozo}
+            yield _datos({**base, "choices": [{"index": 0, "delta": delta, "finish_reason": None}]})
+        yield _datos({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": motivo_fin(trozos, "length", "stop")}]})
+        if con_uso:
+            yield _datos({**base, "choices": [], "usage": uso})
+        yield _datos("[DONE]")
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        cuerpo = await request.json()
+        codigo = error_inyectado()
+        if codigo:
+            return JSONResponse(
+                status_code=codigo,
+                content={"error": {
+                    "message": "Error simulado", "type": _ERRORES_OPENAI.get(codigo, "server_error"),
+                    "param": None, "code": _ERRORES_OPENAI.get(codigo, "server_error")
+                }},
+                headers={"retry-after": "1"} if codigo == 429 else {}
+            )
+        trozos = salida(cuerpo.get("max_tokens") or cuerpo.get("max_completion_tokens"))
+        entrada = _tokens_entrada(*(m.get("content") or "" for m in cuerpo.get("messages", [])))
+        uso = {"prompt_tokens": entrada, "completion_tokens": len(trozos), "total_tokens": entrada + len(trozos)}
+        modelo = cuerpo.get("model", "fake")
+        if cuerpo.get("stream"):
+            app.state.contadores["streams"] += 1
+            con_uso = bool((cuerpo.get("stream_options") or {}).get("include_usage"))
+            return StreamingResponse(transmitir_openai(modelo, uso, trozos, con_uso), media_type="text/event-stream")
+        await asyncio.sleep(duracion(len(trozos)))
+        return JSONResponse(content={
+            "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": modelo,
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": " ".join(trozos)},
+                "finish_reason": motivo_fin(trozos, "length", "stop")
+            }],
+            "usage": uso
+        })
+
+    @app.get("/contadores")
+    async def contadores():
+        """Peticiones recibidas y errores inyectados (para los informes de carga)"""
+        return app.state.contadores
+
+    return app
+
+
+def puerto_libre() -> int:
+    """Devuelve un puerto TCP libre en localhost"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def arrancar_en_hilo(
+    latencia: float = 1.0,
+    puerto: int = 0,
+    rpm: int = 0,
+    certificado: Optional[Tuple[str, str]] = None,
+    keepalive: int = 5,
+    **opciones
+) -> str:
+    """
+    Arranca el servidor simulado en un hilo en segundo plano
+
+    Args:
+        certificado: (certificado, clave) PEM para servir HTTPS
+        keepalive: Segundos que el servidor mantiene una conexión ociosa
+        opciones: Resto de argumentos de `crear_app` (tokens_por_segundo, tasa_errores...)
+
+    Returns:
+        URL base del servidor (para ANTHROPIC_BASE_URL; OPENAI_BASE_URL es esta más /v1)
+    """
+    puerto = puerto or puerto_libre()
+    config = uvicorn.Config(
+        crear_app(latencia, rpm=rpm, **opciones),
+        host="127.0.0.1",
+        port=puerto,
+        log_level="warning",
+        timeout_keep_alive=keepalive,
+        ssl_certfile=certificado[0] if certificado else None,
+        ssl_keyfile=certificado[1] if certificado else None
+    )
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"{'https' if certificado else 'http'}://{'localhost' if certificado else '127.0.0.1'}:{puerto}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LLM simulado compatible con Anthropic y OpenAI")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--latencia", type=float, default=1.0, help="Segundos por respuesta")
+    parser.add_argument("--primer-token", type=float, default=0.2, help="Segundos hasta el primer token")
+    parser.add_argument("--tokens-por-segundo", type=float, default=0, help="Ritmo de salida (0 = usar --latencia)")
+    parser.add_argument("--rpm", type=int, default=0, help="Peticiones/min antes de responder 429")
+    parser.add_argument("--tasa-errores", type=float, default=0, help="Fracción de peticiones con error")
+    parser.add_argument("--codigos-error", type=int, nargs="+", default=[500, 529])
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--fraccion-salida", type=float, default=0, help="Fracción de max_tokens que se escribe (0 = texto entero)")
+    args = parser.parse_args()
+    uvicorn.run(
+        crear_app(
+            args.latencia,
+            primer_token=args.primer_token,
+            rpm=args.rpm,
+            tokens_por_segundo=args.tokens_por_segundo,
+            tasa_errores=args.tasa_errores,
+            codigos_error=tuple(args.codigos_error),
+            semilla=args.semilla,
+            fraccion_salida=args.fraccion_salida
+        ),
+        host="127.0.0.1",
+        port=args.puerto
+    )
@@ -0,0 +1,110 @@
+"""
+Microbenchmarks de las piezas síncronas del backend: construcción de prompts
+y claves de caché de cada generador, análisis del Markdown y exportación a
+Word y PDF. Cada operación se repite durante --segundos y se informa de
+p50/p95/p99, operaciones/s y el pico de memoria de una ejecución. Uso:
+
+    python -m benchmarks.micro --segundos 1
+    python -m benchmarks.micro --filtro prompt --guardar
+    python -m benchmarks.micro --comparar
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from typing import Callable, Dict, Any, List, Tuple
+
+from benchmarks.muestras import documento
+from benchmarks.peticiones import GENERADORES, peticion
+from benchmarks import resultados
+
+# Examen con sus tres secciones, para el reparto del ZIP de exámenes
+EXAMEN = documento(2) + """
+## HOJA DE RESPUESTAS
+
+1. ______________________
+2. ______________________
+
+## SOLUCIONES
+
+1. Evaporación, condensación, precipitación y escorrentía.
+2. **Condensación**: el vapor de agua se enfría y forma las nubes.
+"""
+
+
+def operaciones() -> List[Tuple[str, Callable[[], Any]]]:
+    """(nombre, función sin argumentos) de cada operación a medir"""
+    from app.services.export_service import ExportService
+    from app.services.generador_service import generador_service
+    from app.services import markdown_ast
+
+    lista = []
+    azar = random.Random(0)
+    for tipo in GENERADORES:
+        spec = generador_service.obtener(tipo)
+        datos = spec.request_model(**peticion(tipo, azar))
+        lista.append((f"prompt.{tipo}", lambda spec=spec, datos=datos: generador_service.construir_prompt(spec, datos)))
+        lista.append((f"clave_cache.{tipo}", lambda spec=spec, datos=datos: generador_service.clave_cache(spec, datos)))
+
+    for paginas in (2, 40):
+        contenido = documento(paginas)
+        lista.append((f"markdown.{paginas}p", lambda c=contenido: markdown_ast.analizar_markdown(c)))
+        lista.append((f"word.{paginas}p", lambda c=contenido: ExportService.exportar_word(c, "Benchmark")))
+        lista.append((f"pdf.{paginas}p", lambda c=contenido: ExportService.exportar_pdf(c, "Benchmark")))
+    lista.append(("examen.secciones", lambda: ExportService.secciones_examen(EXAMEN)))
+    return lista
+
+
+def medir(funcion: Callable[[], Any], segundos: float, minimo: int = 5) -> Dict[str, Any]:
+    """Repite la operación durante `segundos` (al menos `minimo` veces) y resume los tiempos"""
+    funcion()  # calentamiento: importaciones perezosas, plantillas y fuentes
+    with resultados.medir_memoria() as memoria:
+        funcion()
+
+    tiempos = []
+    inicio = time.perf_counter()
+    while len(tiempos) < minimo or time.perf_counter() - inicio < segundos:
+        antes = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - antes)
+    resumen = resultados.resumir(tiempos, sum(tiempos))
+    resumen["memoria_pico_mb"] = memoria["pico_mb"]
+    return resumen
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks de prompts y exportación")
+    parser.add_argument("--segundos", type=float, default=1.0, help="Duración de cada operación")
+    parser.add_argument("--filtro", nargs="+", help="Solo las operaciones que contengan alguno de estos textos")
+    parser.add_argument("--guardar", action="store_true", help="Guarda el resultado como línea base")
+    parser.add_argument("--comparar", action="store_true", help="Compara con la línea base guardada")
+    parser.add_argument("--tolerancia", type=float, default=0.15)
+    parser.add_argument("--nombre", default="micro", help="Nombre de la línea base")
+    args = parser.parse_args()
+
+    # Los servicios se crean al importar: sin clave real, sin trazas en disco
+    os.environ.setdefault("ANTHROPIC_API_KEY", "sk-ant-fake")
+    os.environ["TRAZAS_ARCHIVO"] = ""
+    os.environ["TRAZAS_LOG_JSON"] = "false"
+
+    medidas = {}
+    print(f"{'operación':<42} {'p50 µs':>10} {'p95 µs':>10} {'p99 µs':>10} {'op/s':>10} {'mem MB':>7}")
+    for nombre, funcion in operaciones():
+        if args.filtro and not any(f in nombre for f in args.filtro):
+            continue
+        datos = medir(funcion, args.segundos)
+        medidas[nombre] = datos
+        print(f"{nombre:<42} {datos['p50_ms'] * 1000:>10.1f} {datos['p95_ms'] * 1000:>10.1f} "
+              f"{datos['p99_ms'] * 1000:>10.1f} {datos['por_segundo']:>10.1f} {datos['memoria_pico_mb']:>7.2f}")
+    print(f"\nMemoria residente máxima del proceso: {resultados.memoria_maxima_mb()} MB")
+
+    parametros = {"segundos": args.segundos, "filtro": args.filtro}
+    regresiones = resultados.comparar(args.nombre, medidas, args.tolerancia) if args.comparar else 0
+    if args.guardar:
+        print(f"\n💾 Línea base guardada en {resultados.guardar(args.nombre, medidas, parametros)}")
+    sys.exit(1 if regresiones else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Documentos Markdown de muestra para los benchmarks de exportación
+Imitan la salida real de los generadores: encabezados, listas anidadas,
+negritas, cursivas y las tablas de rúbricas y exámenes
+"""
+
+BLOQUE = """## {n}. SESIÓN {n}: El ciclo del agua en nuestro entorno
+
+**Objetivo:** Comprender las fases del ciclo del agua y relacionarlas con el clima de Extremadura.
+*Duración:* 50 minutos | **Agrupamiento:** equipos de 4
+
+### Desarrollo
+
+1. **Activación (10 min):** lluvia de ideas sobre de dónde viene el agua del grifo.
+2. **Explicación (15 min):** evaporación, condensación, precipitación y escorrentía.
+   - Uso de la pizarra digital con un esquema *interactivo*.
+   - Preguntas de comprobación a cada equipo.
+3. **Práctica (20 min):** experimento del ciclo del agua en una bolsa de plástico.
+4. **Cierre (5 min):** ticket de salida con **tres palabras clave**.
+
+### Atención a la diversidad
+
+- Alumnado con dificultades lectoras: pictogramas de cada fase.
+  - Apoyo entre iguales en el equipo.
+- Alumnado con altas capacidades: investigar el ciclo del agua en Marte.
+
+### Rúbrica de la sesión
+
+| Criterio | Insuficiente (1-4) | Suficiente (5-6) | Notable (7-8) | Sobresaliente (9-10) |
+|---|---|---|---|---|
+| Identifica las fases | No identifica ninguna | Identifica dos fases | Identifica todas | Explica todas con ejemplos |
+| Trabajo en equipo | No participa | Participa si se le pide | Participa activamente | Lidera y ayuda a los demás |
+| Vocabulario | No usa términos | Usa algunos términos | Usa términos correctos | Usa términos con precisión |
+
+> Recuerda: el agua no se crea ni se destruye, **solo cambia de estado**.
+
+```
+Material: bolsa zip, rotulador, agua, colorante azul, cinta adhesiva
+```
+
+"""
+
+
+def documento(paginas: int) -> str:
+    """Documento Markdown de aproximadamente `paginas` páginas A4"""
+    cabecera = "# Unidad Didáctica: El Agua\n\n**Curso:** 3º de Primaria | **Área:** Ciencias de la Naturaleza\n\n"
+    return cabecera + "".join(BLOQUE.format(n=n + 1) for n in range(paginas))
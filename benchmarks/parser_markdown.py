@@ -0,0 +1,81 @@
+"""
+Benchmark del paso Markdown -> cuerpo del .docx: compara el analizador por
+líneas anterior (copiado tal cual abajo) con el AST de una sola pasada y la
+escritura del XML en bloque. Uso:
+
+    python -m benchmarks.parser_markdown --repeticiones 20
+"""
+import argparse
+import os
+import re
+import time
+
+from docx import Document
+
+from benchmarks.muestras import documento
+
+
+def procesar_markdown_anterior(doc: Document, contenido: str):
+    """ExportService._procesar_markdown antes del AST (referencia)"""
+    lineas = contenido.split('\n')
+    i = 0
+
+    while i < len(lineas):
+        linea = lineas[i].strip()
+
+        if not linea:
+            i += 1
+            continue
+
+        if linea.startswith('# '):
+            doc.add_heading(linea[2:], level=1)
+        elif linea.startswith('## '):
+            doc.add_heading(linea[3:], level=2)
+        elif linea.startswith('### '):
+            doc.add_heading(linea[4:], level=3)
+        elif linea.startswith('- ') or linea.startswith('* '):
+            doc.add_paragraph(linea[2:], style='List Bullet')
+        elif re.match(r'^\d+\.', linea):
+            texto = re.sub(r'^\d+\.\s*', '', linea)
+            doc.add_paragraph(texto, style='List Number')
+        elif '**' in linea:
+            p = doc.add_paragraph()
+            partes = re.split(r'\*\*(.+?)\*\*', linea)
+            for idx, parte in enumerate(partes):
+                if idx % 2 == 0:
+                    p.add_run(parte)
+                else:
+                    p.add_run(parte).bold = True
+        else:
+            doc.add_paragraph(linea)
+
+        i += 1
+
+
+def medir(procesar, contenido: str, repeticiones: int) -> float:
+    """Milisegundos por documento (mediana); el Document vacío no se cuenta"""
+    tiempos = []
+    for _ in range(repeticiones):
+        doc = Document()
+        inicio = time.perf_counter()
+        procesar(doc, contenido)
+        tiempos.append(time.perf_counter() - inicio)
+    tiempos.sort()
+    return tiempos[len(tiempos) // 2] * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del analizador de Markdown")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--paginas", type=int, nargs="+", default=[2, 40])
+    args = parser.parse_args()
+
+    os.environ.setdefault("ANTHROPIC_API_KEY", "sk-ant-fake")
+    from app.services.export_service import ExportService
+
+    print(f"{'páginas':>8} {'anterior ms':>12} {'AST ms':>8} {'mejora':>7}")
+    for paginas in args.paginas:
+        contenido = documento(paginas)
+        anterior = medir(procesar_markdown_anterior, contenido, args.repeticiones)
+        nuevo = medir(ExportService._procesar_markdown, contenido, args.repeticiones)
+        print(f"{paginas:>8} {anterior:>12.1f} {nuevo:>8.1f} {anterior / nuevo:>6.1f}x")
@@ -0,0 +1,91 @@
+"""
+Peticiones de muestra de los generadores /generar/* para las pruebas de carga
+Cada generador tiene un cuerpo base y un peso en la mezcla: los generadores
+rápidos del frontend dominan el tráfico real y las programaciones son raras.
+Los campos variables se eligen de pequeños repertorios con una semilla, así
+que una misma mezcla repite las mismas peticiones (y los mismos aciertos de
+caché) en cada ejecución.
+"""
+import random
+from typing import Dict, Any, List, Tuple
+
+CURSOS = [
+    ("Primaria", "3º de Primaria"),
+    ("Primaria", "5º de Primaria"),
+    ("ESO", "1º ESO"),
+    ("ESO", "3º ESO"),
+    ("Bachillerato", "1º Bachillerato"),
+]
+ASIGNATURAS = ["Matemáticas", "Lengua Castellana y Literatura", "Ciencias de la Naturaleza",
+               "Geografía e Historia", "Inglés"]
+TEMAS = ["El ciclo del agua", "Las fracciones", "La Edad Media", "El sustantivo y sus clases",
+         "Ecuaciones de primer grado", "Los ecosistemas", "La Reconquista", "El presente simple"]
+
+# tipo -> (peso, cuerpo base); los campos nivel/curso/asignatura/tema se rellenan al azar
+GENERADORES: Dict[str, Tuple[int, Dict[str, Any]]] = {
+    "boton-emergencia": (20, {
+        "situacion": "Falta el profesor titular y hay que cubrir la sesión",
+        "duracion": "45 minutos"
+    }),
+    "ideas": (15, {"tipo_actividad": "Actividad práctica o juego"}),
+    "examen": (10, {"tipo_preguntas": "Mixto", "num_preguntas": 10}),
+    "rubrica": (10, {"actividad": "Exposición oral en grupo", "niveles_logro": 4}),
+    "problemas-matematicas": (8, {"num_problemas": 8, "dificultad": "Media", "con_soluciones": True}),
+    "informe-familia": (8, {
+        "nombre_alumno": "Ana García",
+        "aspectos_positivos": "Participa activamente y ayuda a sus compañeros",
+        "aspectos_mejora": "Necesita mejorar la atención en los problemas largos",
+        "tono": "Cercano"
+    }),
+    "unidad-didactica": (6, {"num_sesiones": 8, "trimestre": "Segundo"}),
+    "situacion-aprendizaje": (5, {"duracion_sesiones": 6, "competencias_clave": ["CCL", "CD", "CPSAA"]}),
+    "adaptacion-curricular": (4, {
+        "tipo_adaptacion": "ACI",
+        "necesidad": "TDAH con dificultades de organización",
+        "medidas": ["Instrucciones por pasos", "Tiempo adicional"]
+    }),
+    "examen-lomloe": (4, {"tipo_examen": "Mixto", "dificultad": "Media", "duracion": "50 minutos"}),
+    "rubrica-lomloe": (3, {"tipo_evaluacion": "Proyecto"}),
+    "unidad-didactica-lomloe": (3, {"caracteristicas_grupo": "Grupo de 25 alumnos, 2 ACNEAE"}),
+    "situacion-aprendizaje-lomloe": (2, {
+        "contexto": "Organizar una visita virtual a un museo",
+        "metodologia": "Aprendizaje basado en proyectos",
+        "duracion_sesiones": 8,
+        "competencias_clave": ["CCL", "CD", "CCEC"]
+    }),
+    "programacion-didactica": (2, {"centro": "IES Santa Eulalia (Mérida)", "curso_academico": "2025-2026"}),
+}
+
+# Campos que no existen en todos los modelos: se añaden solo si el generador los usa
+_CAMPOS_TEMA = {
+    "titulo": ("unidad-didactica",),
+    "tema": ("examen", "problemas-matematicas", "situacion-aprendizaje", "ideas", "examen-lomloe",
+             "rubrica-lomloe", "unidad-didactica-lomloe"),
+}
+_SIN_ASIGNATURA = ("problemas-matematicas",)
+
+
+def peticion(tipo: str, azar: random.Random) -> Dict[str, Any]:
+    """Cuerpo de una petición a /generar/{tipo} con campos elegidos al azar"""
+    _, base = GENERADORES[tipo]
+    nivel, curso = azar.choice(CURSOS)
+    cuerpo = {"nivel": nivel, "curso": curso, **base}
+    if tipo not in _SIN_ASIGNATURA:
+        cuerpo["asignatura"] = azar.choice(ASIGNATURAS)
+    for campo, tipos in _CAMPOS_TEMA.items():
+        if tipo in tipos:
+            cuerpo[campo] = azar.choice(TEMAS)
+    return cuerpo
+
+
+def mezcla(total: int, semilla: int = 0, tipos: List[str] = None) -> List[Tuple[str, Dict[str, Any]]]:
+    """
+    Secuencia determinista de `total` peticiones (tipo, cuerpo) según los pesos
+
+    Args:
+        tipos: Restringe la mezcla a estos generadores (por defecto, todos)
+    """
+    azar = random.Random(semilla)
+    tipos = tipos or list(GENERADORES)
+    pesos = [GENERADORES[tipo][0] for tipo in tipos]
+    return [(tipo, peticion(tipo, azar)) for tipo in azar.choices(tipos, weights=pesos, k=total)]
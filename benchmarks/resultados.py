@@ -0,0 +1,154 @@
+"""
+Resultados de los benchmarks
+Percentiles, memoria y líneas base en JSON para detectar regresiones entre
+versiones. Las líneas base se guardan en benchmarks/lineas_base/<nombre>.json
+y solo son comparables en la misma máquina.
+"""
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Dict, Any, Optional, List, Iterator
+
+DIRECTORIO_LINEAS_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lineas_base")
+
+# Métricas en las que más es mejor; en el resto (latencias, memoria) menos es mejor
+_MAS_ES_MEJOR = ("por_segundo", "rps")
+
+
+def percentil(ordenadas: List[float], p: float) -> float:
+    """Percentil por interpolación lineal de una lista ya ordenada"""
+    if not ordenadas:
+        return 0.0
+    posicion = (len(ordenadas) - 1) * p / 100
+    inferior = int(posicion)
+    superior = min(inferior + 1, len(ordenadas) - 1)
+    return ordenadas[inferior] + (ordenadas[superior] - ordenadas[inferior]) * (posicion - inferior)
+
+
+def resumir(segundos: List[float], duracion: Optional[float] = None) -> Dict[str, float]:
+    """p50/p95/p99 y máximo en milisegundos, y el ritmo si se da la duración total"""
+    ordenadas = sorted(segundos)
+    resumen = {
+        "n": len(ordenadas),
+        "p50_ms": round(percentil(ordenadas, 50) * 1000, 4),
+        "p95_ms": round(percentil(ordenadas, 95) * 1000, 4),
+        "p99_ms": round(percentil(ordenadas, 99) * 1000, 4),
+        "max_ms": round(ordenadas[-1] * 1000, 4) if ordenadas else 0.0
+    }
+    if duracion:
+        resumen["por_segundo"] = round(len(ordenadas) / duracion, 2)
+    return resumen
+
+
+def memoria_maxima_mb() -> float:
+    """Pico de memoria residente del proceso (ru_maxrss: KB en Linux, bytes en macOS)"""
+    maximo = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(maximo / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+@contextmanager
+def medir_memoria() -> Iterator[Dict[str, float]]:
+    """Pico de memoria de Python reservada dentro del bloque (tracemalloc), en MB"""
+    medida = {}
+    ya_activo = tracemalloc.is_tracing()
+    if not ya_activo:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    try:
+        yield medida
+    finally:
+        medida["pico_mb"] = round((tracemalloc.get_traced_memory()[1] - base) / (1024 * 1024), 2)
+        if not ya_activo:
+            tracemalloc.stop()
+
+
+def _entorno() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count()
+    }
+
+
+def guardar(nombre: str, resultados: Dict[str, Any], parametros: Dict[str, Any], ruta: Optional[str] = None) -> str:
+    """Guarda los resultados como línea base y devuelve la ruta del fichero"""
+    ruta = ruta or os.path.join(DIRECTORIO_LINEAS_BASE, f"{nombre}.json")
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        json.dump(
+            {"benchmark": nombre, "entorno": _entorno(), "parametros": parametros, "resultados": resultados},
+            archivo, ensure_ascii=False, indent=2
+        )
+    return ruta
+
+
+def _aplanar(datos: Dict[str, Any], prefijo: str = "") -> Dict[str, float]:
+    planos = {}
+    for clave, valor in datos.items():
+        nombre = f"{prefijo}{clave}"
+        if isinstance(valor, dict):
+            planos.update(_aplanar(valor, f"{nombre}."))
+        elif isinstance(valor, (int, float)) and not isinstance(valor, bool):
+            planos[nombre] = valor
+    return planos
+
+
+def comparar(
+    nombre: str,
+    resultados: Dict[str, Any],
+    tolerancia: float = 0.10,
+    ruta: Optional[str] = None,
+    ignorar: tuple = ("errores.", "llm_simulado.", "max_ms")
+) -> int:
+    """
+    Compara con la línea base guardada e imprime las diferencias
+
+    Args:
+        ignorar: Métricas que no se comparan (contadores informativos y máximos, muy ruidosos)
+
+    Returns:
+        Número de regresiones mayores que `tolerancia` (0 si no hay línea base)
+    """
+    ruta = ruta or os.path.join(DIRECTORIO_LINEAS_BASE, f"{nombre}.json")
+    if not os.path.exists(ruta):
+        print(f"⚠️ Sin línea base en {ruta} (guárdala con --guardar)")
+        return 0
+    with open(ruta, encoding="utf-8") as archivo:
+        base = json.load(archivo)
+
+    anteriores = _aplanar(base["resultados"])
+    actuales = _aplanar(resultados)
+    regresiones = 0
+    print(f"\nComparación con la línea base ({base['entorno'].get('commit') or 'sin commit'}, "
+          f"{base['entorno']['fecha']}), tolerancia {tolerancia:.0%}")
+    print(f"{'métrica':<48} {'base':>10} {'actual':>10} {'cambio':>8}")
+    for metrica, actual in actuales.items():
+        anterior = anteriores.get(metrica)
+        if not anterior or metrica.endswith(".n") or any(i in metrica for i in ignorar):
+            continue
+        cambio = (actual - anterior) / anterior
+        peor = -cambio if metrica.rsplit(".", 1)[-1] in _MAS_ES_MEJOR else cambio
+        marca = ""
+        if peor > tolerancia:
+            regresiones += 1
+            marca = " ❌"
+        elif peor < -tolerancia:
+            marca = " ✅"
+        print(f"{metrica:<48} {anterior:>10.2f} {actual:>10.2f} {cambio:>+7.1%}{marca}")
+    print(f"{regresiones} regresiones")
+    return regresiones
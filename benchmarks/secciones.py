@@ -0,0 +1,126 @@
+"""
+Benchmark de la generación por secciones: la programación didáctica en una
+sola llamada frente a guion + apartados en paralelo, contra el LLM simulado
+con un ritmo de salida fijo (la duración de cada llamada depende de cuántos
+tokens escribe). Informa del tiempo total, del tiempo hasta el primer
+fragmento y de los tokens de salida y de caché de prompt. Uso:
+
+    python -m benchmarks.secciones --repeticiones 3
+    python -m benchmarks.secciones --tokens-por-segundo 80 --guardar
+    python -m benchmarks.secciones --comparar
+
+Cada llamada escribe el 80% de su max_tokens declarado (sin adaptativo), así
+que ninguna se trunca y la longitud de cada apartado sigue a su presupuesto.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import Dict, Any, List
+
+from benchmarks.fake_llm_server import arrancar_en_hilo
+from benchmarks import resultados
+
+PETICION = {
+    "nivel": "ESO",
+    "curso": "2º ESO",
+    "asignatura": "Matemáticas",
+    "centro": "IES Norba Caesarina (Cáceres)",
+    "curso_academico": "2025-2026"
+}
+
+
+def _configurar_entorno(url: str):
+    """Backend en proceso contra el LLM simulado, sin caché ni límites por minuto"""
+    os.environ.update({
+        "AI_PROVIDER": "claude",
+        "ANTHROPIC_BASE_URL": url,
+        "ANTHROPIC_API_KEY": "sk-ant-fake",
+        "CACHE_BACKEND": "ninguno",
+        "CLAUDE_RPM": "0",
+        "CLAUDE_ITPM": "0",
+        "CLAUDE_OTPM": "0",
+        "TOKENS_ADAPTATIVOS": "false",
+        "TOKENS_DB_RUTA": "",
+        "PRECALENTAR_AL_ARRANCAR": "false",
+        "TRAZAS_ARCHIVO": "",
+        "TRAZAS_LOG_JSON": "false"
+    })
+
+
+async def medir(por_secciones: bool, repeticiones: int) -> Dict[str, Any]:
+    """Mediana de `repeticiones` programaciones generadas en streaming en un modo"""
+    from config import settings
+    from app.models.generadores import ProgramacionDidacticaRequest
+    from app.services.generador_service import generador_service
+
+    settings.GENERACION_POR_SECCIONES = por_secciones
+    datos = ProgramacionDidacticaRequest(**PETICION)
+    totales: List[float] = []
+    primeros: List[float] = []
+    fin: Dict[str, Any] = {}
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        primero = None
+        async for evento in generador_service.generar_stream("programacion-didactica", datos, True):
+            if evento["evento"] == "delta" and primero is None:
+                primero = time.perf_counter() - inicio
+            elif evento["evento"] == "fin":
+                fin = evento
+        totales.append(time.perf_counter() - inicio)
+        primeros.append(primero or 0.0)
+    return {
+        "total_s": round(statistics.median(totales), 3),
+        "primer_fragmento_s": round(statistics.median(primeros), 3),
+        "tokens_salida": fin.get("output_tokens"),
+        "tokens_cache_leidos": fin.get("cache_read_input_tokens"),
+        "truncado": bool(fin.get("truncado"))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Programación didáctica: una llamada frente a secciones en paralelo")
+    parser.add_argument("--repeticiones", type=int, default=3, help="Documentos por modo (se toma la mediana)")
+    parser.add_argument("--tokens-por-segundo", type=float, default=400, help="Ritmo de salida del LLM simulado")
+    parser.add_argument("--guardar", action="store_true", help="Guarda el resultado como línea base")
+    parser.add_argument("--comparar", action="store_true", help="Compara con la línea base guardada")
+    parser.add_argument("--tolerancia", type=float, default=0.20)
+    parser.add_argument("--nombre", default="secciones", help="Nombre de la línea base")
+    args = parser.parse_args()
+
+    url = arrancar_en_hilo(
+        0.0,
+        primer_token=0.3,
+        fraccion_salida=0.8,
+        tokens_por_segundo=args.tokens_por_segundo
+    )
+    _configurar_entorno(url)
+
+    async def ejecutar() -> Dict[str, Any]:
+        return {
+            "una_llamada": await medir(False, args.repeticiones),
+            "secciones": await medir(True, args.repeticiones)
+        }
+
+    medidas = asyncio.run(ejecutar())
+    print(f"\n{'modo':<13} {'total s':>9} {'1er fragmento s':>16} {'tokens salida':>14} {'caché leída':>12} {'truncado':>9}")
+    for modo, medida in medidas.items():
+        print(
+            f"{modo:<13} {medida['total_s']:>9.2f} {medida['primer_fragmento_s']:>16.2f} "
+            f"{medida['tokens_salida'] or 0:>14} {medida['tokens_cache_leidos'] or 0:>12} "
+            f"{'sí' if medida['truncado'] else 'no':>9}"
+        )
+    aceleracion = medidas["una_llamada"]["total_s"] / max(medidas["secciones"]["total_s"], 1e-9)
+    print(f"\nAceleración del tiempo total: x{aceleracion:.1f}")
+
+    parametros = {"repeticiones": args.repeticiones, "tokens_por_segundo": args.tokens_por_segundo}
+    regresiones = resultados.comparar(args.nombre, medidas, args.tolerancia) if args.comparar else 0
+    if args.guardar:
+        print(f"\n💾 Línea base guardada en {resultados.guardar(args.nombre, medidas, parametros)}")
+    sys.exit(1 if regresiones else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -38,6 +38,7 @@ class Settings(BaseSettings):
     # Claude (Anthropic)
     ANTHROPIC_API_KEY: str = os.getenv("ANTHROPIC_API_KEY", "")
     CLAUDE_MODEL: str = os.getenv("CLAUDE_MODEL", "claude-sonnet-4-20250514")
+    CLAUDE_PROMPT_CACHE: bool = os.getenv("CLAUDE_PROMPT_CACHE", "true").lower() == "true"
     
     # OpenAI
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
@@ -47,6 +48,118 @@ class Settings(BaseSettings):
     GOOGLE_API_KEY: str = os.getenv("GOOGLE_API_KEY", "")
     GEMINI_MODEL: str = os.getenv("GEMINI_MODEL", "gemini-pro")
     
+    # Failover: si el proveedor falla o tarda se prueba el siguiente inicializado
+    FAILOVER_ACTIVO: bool = os.getenv("FAILOVER_ACTIVO", "true").lower() == "true"
+    FAILOVER_ORDEN: List[str] = [p.strip() for p in os.getenv("FAILOVER_ORDEN", "claude,openai,gemini").split(",") if p.strip()]
+    TIMEOUT_PROVEEDOR_SEGUNDOS: float = float(os.getenv("TIMEOUT_PROVEEDOR_SEGUNDOS", 120))
+    ENFRIAMIENTO_PROVEEDOR_SEGUNDOS: float = float(os.getenv("ENFRIAMIENTO_PROVEEDOR_SEGUNDOS", 30))
+    
+    # Hedging: lanza el siguiente proveedor si el primero supera su percentil de latencia
+    HEDGING_ACTIVO: bool = os.getenv("HEDGING_ACTIVO", "false").lower() == "true"
+    HEDGING_PERCENTIL: float = float(os.getenv("HEDGING_PERCENTIL", 95))
+    HEDGING_MIN_MUESTRAS: int = int(os.getenv("HEDGING_MIN_MUESTRAS", 20))
+    
+    # Conexiones HTTP con los proveedores: un pool compartido por Claude y OpenAI
+    HTTP_MAX_CONEXIONES: int = int(os.getenv("HTTP_MAX_CONEXIONES", 100))
+    HTTP_MAX_KEEPALIVE: int = int(os.getenv("HTTP_MAX_KEEPALIVE", 32))
+    # Segundos que una conexión ociosa sigue abierta (httpx cierra a los 5 por defecto)
+    HTTP_KEEPALIVE_SEGUNDOS: float = float(os.getenv("HTTP_KEEPALIVE_SEGUNDOS", 120))
+    # HTTP/2 si está instalado h2 (multiplexa las peticiones sobre una conexión)
+    HTTP2_ACTIVO: bool = os.getenv("HTTP2_ACTIVO", "true").lower() == "true"
+    HTTP_TIMEOUT_CONEXION: float = float(os.getenv("HTTP_TIMEOUT_CONEXION", 5))
+    # Entre bytes recibidos: una respuesta sin streaming llega entera al final
+    HTTP_TIMEOUT_LECTURA: float = float(os.getenv("HTTP_TIMEOUT_LECTURA", 300))
+    # Espera máxima por una conexión libre del pool
+    HTTP_TIMEOUT_POOL: float = float(os.getenv("HTTP_TIMEOUT_POOL", 30))
+    # Conexiones que se abren por proveedor al arrancar (0 = sin precalentar)
+    HTTP_CONEXIONES_PRECALENTADAS: int = int(os.getenv("HTTP_CONEXIONES_PRECALENTADAS", 2))
+    # Crear el cliente del proveedor activo al arrancar, en segundo plano (false =
+    # en la primera generación o al llamar a /warmup)
+    PRECALENTAR_AL_ARRANCAR: bool = os.getenv("PRECALENTAR_AL_ARRANCAR", "true").lower() == "true"
+    
+    # Rate limit por proveedor (por minuto; 0 = sin límite). Se ajustan solos
+    # con las cabeceras de rate limit que devuelve cada proveedor
+    CLAUDE_RPM: int = int(os.getenv("CLAUDE_RPM", 50))
+    CLAUDE_ITPM: int = int(os.getenv("CLAUDE_ITPM", 30000))
+    CLAUDE_OTPM: int = int(os.getenv("CLAUDE_OTPM", 8000))
+    OPENAI_RPM: int = int(os.getenv("OPENAI_RPM", 500))
+    OPENAI_TPM: int = int(os.getenv("OPENAI_TPM", 30000))
+    GEMINI_RPM: int = int(os.getenv("GEMINI_RPM", 60))
+    
+    # Reintentos de 429/503/529 con backoff exponencial y jitter
+    REINTENTOS_MAX: int = int(os.getenv("REINTENTOS_MAX", 3))
+    REINTENTOS_BACKOFF_BASE: float = float(os.getenv("REINTENTOS_BACKOFF_BASE", 1.0))
+    REINTENTOS_BACKOFF_MAX: float = float(os.getenv("REINTENTOS_BACKOFF_MAX", 30))
+    # Espera máxima por presupuesto antes de responder 429 al cliente
+    LIMITE_ESPERA_MAX_SEGUNDOS: float = float(os.getenv("LIMITE_ESPERA_MAX_SEGUNDOS", 30))
+    
+    # Cola por prioridad: cada punto de prioridad equivale a llegar N segundos más tarde
+    COLA_SEGUNDOS_POR_PRIORIDAD: float = float(os.getenv("COLA_SEGUNDOS_POR_PRIORIDAD", 2.0))
+    
+    # === RENDIMIENTO ===
+    # Máximo de generaciones simultáneas contra el proveedor de IA (por worker)
+    MAX_GENERACIONES_CONCURRENTES: int = int(os.getenv("MAX_GENERACIONES_CONCURRENTES", 16))
+    
+    # Generaciones simultáneas dentro de un lote (p.ej. informes de toda una clase)
+    LOTE_MAX_CONCURRENCIA: int = int(os.getenv("LOTE_MAX_CONCURRENCIA", 8))
+    
+    # Peticiones idénticas simultáneas comparten una sola llamada a la IA
+    COALESCENCIA_ACTIVA: bool = os.getenv("COALESCENCIA_ACTIVA", "true").lower() == "true"
+    
+    # Caché de generaciones: memoria, sqlite o ninguno
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "memoria")
+    CACHE_TTL_SEGUNDOS: int = int(os.getenv("CACHE_TTL_SEGUNDOS", 7 * 24 * 3600))
+    CACHE_MAX_ENTRADAS: int = int(os.getenv("CACHE_MAX_ENTRADAS", 1000))
+    CACHE_SQLITE_RUTA: str = os.getenv("CACHE_SQLITE_RUTA", "docentia_cache.sqlite3")
+    
+    # Cola de trabajos en segundo plano (compartida entre workers vía SQLite)
+    TRABAJOS_DB_RUTA: str = os.getenv("TRABAJOS_DB_RUTA", "docentia_trabajos.sqlite3")
+    TRABAJOS_WORKERS: int = int(os.getenv("TRABAJOS_WORKERS", 4))
+    TRABAJOS_MAX_EN_CURSO: int = int(os.getenv("TRABAJOS_MAX_EN_CURSO", 8))
+    TRABAJOS_INTERVALO_SONDEO: float = float(os.getenv("TRABAJOS_INTERVALO_SONDEO", 1.0))
+    TRABAJOS_TIMEOUT_LATIDO: float = float(os.getenv("TRABAJOS_TIMEOUT_LATIDO", 60))
+    
+    # max_tokens por petición a partir de los tokens de salida reales de cada
+    # generador (observaciones en SQLite; vacío = solo en memoria del worker)
+    TOKENS_ADAPTATIVOS: bool = os.getenv("TOKENS_ADAPTATIVOS", "true").lower() == "true"
+    TOKENS_DB_RUTA: str = os.getenv("TOKENS_DB_RUTA", "docentia_tokens.sqlite3")
+    # Muestras de un generador antes de dejar su max_tokens declarado
+    TOKENS_MIN_MUESTRAS: int = int(os.getenv("TOKENS_MIN_MUESTRAS", 20))
+    # Percentil de la longitud observada que debe caber, más un margen relativo
+    TOKENS_PERCENTIL: float = float(os.getenv("TOKENS_PERCENTIL", 95))
+    TOKENS_MARGEN: float = float(os.getenv("TOKENS_MARGEN", 0.15))
+    
+    # Documentos largos (programación didáctica) apartado a apartado: un guion
+    # y después una llamada por apartado en paralelo, unidas en orden
+    GENERACION_POR_SECCIONES: bool = os.getenv("GENERACION_POR_SECCIONES", "false").lower() == "true"
+    SECCIONES_MAX_CONCURRENCIA: int = int(os.getenv("SECCIONES_MAX_CONCURRENCIA", 9))
+    
+    # === TRAZAS ===
+    # Spans por petición (OTLP/JSON en TRAZAS_ARCHIVO; vacío = sin fichero)
+    TRAZAS_ACTIVAS: bool = os.getenv("TRAZAS_ACTIVAS", "true").lower() == "true"
+    TRAZAS_ARCHIVO: str = os.getenv("TRAZAS_ARCHIVO", "docentia_trazas.jsonl")
+    # Una línea JSON por petición con el desglose de latencia y tokens
+    TRAZAS_LOG_JSON: bool = os.getenv("TRAZAS_LOG_JSON", "true").lower() == "true"
+    
+    # === EXPORTACIÓN ===
+    # Plantillas Word por centro (<dir>/<centro>.docx), compiladas una vez y en LRU
+    PLANTILLAS_DOCX_DIR: str = os.getenv("PLANTILLAS_DOCX_DIR", "plantillas_docx")
+    PLANTILLAS_DOCX_CACHE_MAX: int = int(os.getenv("PLANTILLAS_DOCX_CACHE_MAX", 16))
+    # Logo para la cabecera de la plantilla base (vacío = sin logo)
+    EXPORT_LOGO_RUTA: str = os.getenv("EXPORT_LOGO_RUTA", "")
+    # PDF: reportlab (Python puro) o libreoffice (si está instalado)
+    PDF_MOTOR: str = os.getenv("PDF_MOTOR", "reportlab")
+    PDF_LIBREOFFICE: str = os.getenv("PDF_LIBREOFFICE", "soffice")
+    # Procesos dedicados a maquetar PDF (0 = pool de hilos del servidor)
+    PDF_WORKERS: int = int(os.getenv("PDF_WORKERS", 2))
+    # Exportaciones PDF en curso + en espera antes de responder 503
+    PDF_COLA_MAX: int = int(os.getenv("PDF_COLA_MAX", 16))
+    # Caché de exportaciones por hash del contenido (memoria + disco, acotadas por tamaño)
+    EXPORT_CACHE_ACTIVA: bool = os.getenv("EXPORT_CACHE_ACTIVA", "true").lower() == "true"
+    EXPORT_CACHE_DIR: str = os.getenv("EXPORT_CACHE_DIR", "docentia_exportaciones")
+    EXPORT_CACHE_MEMORIA_MB: int = int(os.getenv("EXPORT_CACHE_MEMORIA_MB", 64))
+    EXPORT_CACHE_DISCO_MB: int = int(os.getenv("EXPORT_CACHE_DISCO_MB", 512))
+    
     def validate_api_keys(self):
         """Valida que al menos una API key esté configurada"""
         if self.AI_PROVIDER == "claude" and not self.ANTHROPIC_API_KEY:
@@ -73,10 +186,12 @@ class Settings(BaseSettings):
 # Instancia global de configuración
 settings = Settings()
 
-# Validar configuración al iniciar
-try:
-    settings.validate_api_keys()
-    print(f"✅ Configuración válida - Proveedor: {settings.AI_PROVIDER}")
-except ValueError as e:
-    print(f"⚠️ Advertencia: {e}")
-    print("   Por favor configura tu API key en el archivo .env")
+
+def comprobar_configuracion():
+    """Valida la configuración al arrancar el servidor (no al importar)"""
+    try:
+        settings.validate_api_keys()
+        print(f"✅ Configuración válida - Proveedor: {settings.AI_PROVIDER}")
+    except ValueError as e:
+        print(f"⚠️ Advertencia: {e}")
+        print("   Por favor configura tu API key en el archivo .env")
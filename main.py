@@ -1,17 +1,72 @@
 """
 DocentIA Backend - Endpoints para Generadores
-FastAPI + Anthropic Claude API
+FastAPI + IAService (Claude, OpenAI o Gemini)
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from anthropic import Anthropic
-import os
-from typing import Optional
+from fastapi.responses import StreamingResponse, Response
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, ValidationError
+import asyncio
+import json
+import math
+import time
+from urllib.parse import quote
+from contextlib import asynccontextmanager
+from typing import Optional, Callable, Awaitable
+from config import settings, comprobar_configuracion
+from app.services.ia_service import ia_service
+from app.services.cache_service import cache_service
+from app.services.generador_service import generador_service, GeneradorSpec
+from app.services.lote_service import lote_service
+from app.services.trabajo_service import trabajo_service
+from app.services.revision_service import revision_service, RevisionConflicto, SeccionNoEncontrada
+from app.services.limitador import ProveedorSaturadoError, ServicioSaturadoError
+from app.services.export_service import export_service
+from app.services.pdf_service import pdf_service
+from app.services.paquete_service import paquete_service
+from app.services.cache_exportacion_service import cache_exportacion_service
+from app.services.trazas import trazador, MiddlewareTrazas
+from app.services.transporte import transporte
+from app.services.tokens import estimador_tokens
+from app.services import metricas
+from app.prompts import registro_plantillas
+from app.models.requests import (
+    InformeFamiliaLoteRequest,
+    ExportarWordRequest,
+    ExportarPdfRequest,
+    ExportarExamenRequest,
+    RegenerarSeccionRequest
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Carga el modelo de longitud de salida, arranca y detiene los workers de la
+    cola de trabajos y el pool de PDF, y crea en segundo plano el cliente del
+    proveedor activo con sus conexiones. Al apagar cierra esas conexiones y
+    vuelca las trazas pendientes
+    """
+    comprobar_configuracion()
+    await estimador_tokens.iniciar()
+    trabajo_service.iniciar()
+    pdf_service.iniciar()
+    precalentado = None
+    if settings.PRECALENTAR_AL_ARRANCAR:
+        precalentado = asyncio.create_task(ia_service.calentar())
+    yield
+    if precalentado:
+        precalentado.cancel()
+    await trabajo_service.detener()
+    pdf_service.detener()
+    await transporte.cerrar()
+    await trazador.cerrar()
+
 
 # Inicializar FastAPI
-app = FastAPI(title="DocentIA API", version="1.0.0")
+app = FastAPI(title="DocentIA API", version="1.0.0", lifespan=lifespan)
 
 # CORS - Permitir frontend
 app.add_middleware(
@@ -28,76 +83,63 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "Retry-After", "Content-Disposition", "ETag"]
 )
 
-# Inicializar Claude
-client = Anthropic(api_key=os.environ.get("ANTHROPIC_API_KEY"))
+# Traza por petición (X-Request-ID, spans OTLP/JSON y log JSON con el desglose)
+app.add_middleware(MiddlewareTrazas)
 
 # ============================================
-# MODELOS DE DATOS
+# ERRORES DE SATURACIÓN (PROVEEDORES DE IA Y EXPORTACIÓN)
 # ============================================
 
-class BotonEmergenciaRequest(BaseModel):
-    nivel: str
-    curso: str
-    asignatura: str
-    situacion: str
-    duracion: str
-
-class ExamenRequest(BaseModel):
-    nivel: str
-    curso: str
-    asignatura: str
-    tema: str
-    tipo_preguntas: str
-    num_preguntas: int
-
-class ProblemasMatematicasRequest(BaseModel):
-    nivel: str
-    curso: str
-    tema: str
-    num_problemas: int
-    dificultad: str
-    con_soluciones: bool = True
-
-class RubricaRequest(BaseModel):
-    nivel: str
-    curso: str
-    asignatura: str
-    actividad: str
-    criterios: Optional[list[str]] = None
-    niveles_logro: int = 4  # Insuficiente, Suficiente, Notable, Sobresaliente
-
-class UnidadDidacticaRequest(BaseModel):
-    nivel: str
-    curso: str
-    asignatura: str
-    titulo: str
-    num_sesiones: int
-    trimestre: str
-
-class SituacionAprendizajeRequest(BaseModel):
-    nivel: str
-    curso: str
-    asignatura: str
-    tema: str
-    duracion_sesiones: int
-    competencias_clave: Optional[list[str]] = None
-
-class ProgramacionDidacticaRequest(BaseModel):
-    nivel: str
-    curso: str
-    asignatura: str
-    centro: str
-    curso_academico: str
-
-class AdaptacionCurricularRequest(BaseModel):
-    nivel: str
-    curso: str
-    asignatura: str
-    tipo_adaptacion: str  # ACI, ACIS, Enriquecimiento
-    necesidad: str
-    medidas: Optional[list[str]] = None
+def _error_saturado(e: ServicioSaturadoError) -> HTTPException:
+    """429 (límite) o 503 (sobrecarga) con Retry-After en lugar de un 500 genérico"""
+    return HTTPException(
+        status_code=e.status_code,
+        detail=str(e),
+        headers={"Retry-After": str(max(1, math.ceil(e.reintentar_en)))}
+    )
+
+# ============================================
+# STREAMING (SSE)
+# ============================================
+
+def _quiere_stream(request: Request) -> bool:
+    """Indica si el cliente pide la respuesta como server-sent events"""
+    return "text/event-stream" in request.headers.get("accept", "")
+
+
+def _evento_sse(evento: str, datos: dict) -> str:
+    """Formatea un evento SSE"""
+    return f"event: {evento}\ndata: {json.dumps(datos, ensure_ascii=False)}\n\n"
+
+
+def _streaming_sse(eventos) -> StreamingResponse:
+    """Respuesta SSE sin buffering intermedio (proxies incluidos)"""
+    return StreamingResponse(
+        eventos,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def _respuesta_sse(spec: GeneradorSpec, datos: BaseModel, force_regenerate: bool = False) -> StreamingResponse:
+    """
+    Variante streaming de un generador (Accept: text/event-stream).
+    Eventos: inicio (metadatos) -> delta* (texto) -> fin (uso y tiempos) | error
+    """
+    async def eventos():
+        yield _evento_sse("inicio", generador_service.metadatos(spec, datos))
+        try:
+            async for evento in generador_service.generar_stream(spec.tipo, datos, force_regenerate):
+                yield _evento_sse(evento.pop("evento"), evento)
+        except ProveedorSaturadoError as e:
+            yield _evento_sse("error", {"detail": str(e), "status_code": e.status_code, "reintentar_en": e.reintentar_en})
+        except Exception as e:
+            yield _evento_sse("error", {"detail": str(e)})
+    
+    return _streaming_sse(eventos())
 
 # ============================================
 # ENDPOINT: HEALTH CHECK
@@ -108,637 +150,432 @@ def health_check():
     return {
         "app": "DocentIA",
         "status": "online",
-        "provider": "claude",
+        "provider": settings.AI_PROVIDER,
         "version": "1.0.0",
-        "endpoints": [
-            "/generar/boton-emergencia",
-            "/generar/examen",
-            "/generar/problemas-matematicas",
-            "/generar/rubrica",
-            "/generar/unidad-didactica",
-            "/generar/situacion-aprendizaje",
-            "/generar/programacion-didactica",
-            "/generar/adaptacion-curricular"
-        ]
+        "endpoints": [f"/generar/{spec.tipo}" for spec in generador_service.listar()]
     }
 
 # ============================================
-# ENDPOINT: BOTÓN DE EMERGENCIA
+# ENDPOINTS: GENERADORES (uno por tipo registrado)
 # ============================================
 
-@app.post("/generar/boton-emergencia")
-async def generar_boton_emergencia(datos: BotonEmergenciaRequest):
+def _crear_endpoint_generador(spec: GeneradorSpec):
+    """Crea el endpoint POST /generar/{tipo} de un generador del registro"""
+    
+    async def endpoint(datos: spec.request_model, request: Request, force_regenerate: bool = False):
+        try:
+            if _quiere_stream(request):
+                return _respuesta_sse(spec, datos, force_regenerate)
+            
+            resultado = await generador_service.generar(spec.tipo, datos, force_regenerate)
+            
+            return {
+                "success": True,
+                "resultado": resultado["contenido"],
+                **generador_service.metadatos(spec, datos)
+            }
+            
+        except ProveedorSaturadoError as e:
+            raise _error_saturado(e)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al generar {spec.nombre}: {str(e)}")
+    
+    endpoint.__name__ = f"generar_{spec.tipo.replace('-', '_')}"
+    endpoint.__doc__ = spec.descripcion
+    return endpoint
+
+
+for _spec in generador_service.listar():
+    app.post(f"/generar/{_spec.tipo}")(_crear_endpoint_generador(_spec))
+
+
+@app.get("/generadores")
+def listar_generadores():
     """
-    Genera una actividad de emergencia para situaciones imprevistas.
-    30 segundos de generación.
+    Generadores registrados con su configuración.
     """
-    
-    try:
-        # Construir prompt para Claude
-        prompt = f"""Eres un asistente experto en educación española que ayuda a docentes de Extremadura.
-
-TAREA: Generar una actividad de emergencia completa para la siguiente situación:
-
-DATOS:
-- Nivel: {datos.nivel}
-- Curso: {datos.curso}
-- Asignatura: {datos.asignatura}
-- Situación urgente: {datos.situacion}
-- Duración: {datos.duracion}
-
-INSTRUCCIONES:
-1. Crea una actividad COMPLETA lista para usar INMEDIATAMENTE
-2. Debe ser apropiada para {datos.curso} de {datos.nivel}
-3. Duración exacta: {datos.duracion}
-4. Incluye:
-   - Título de la actividad
-   - Objetivos de aprendizaje (2-3)
-   - Desarrollo paso a paso (con tiempos)
-   - Materiales necesarios
-   - Criterios de evaluación
-5. Cumple con LOMLOE 2024
-6. Formato claro y profesional
-7. Debe resolver la situación: {datos.situacion}
-
-GENERA LA ACTIVIDAD:"""
-
-        # Llamar a Claude
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=2000,
-            temperature=0.7,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
-        
-        contenido = message.content[0].text
-        
-        return {
-            "success": True,
-            "resultado": contenido,
-            "nivel": datos.nivel,
-            "curso": datos.curso,
-            "asignatura": datos.asignatura,
-            "tipo": "boton-emergencia"
+    return [
+        {
+            "tipo": spec.tipo,
+            "ruta": f"/generar/{spec.tipo}",
+            "descripcion": spec.descripcion,
+            "max_tokens": spec.max_tokens,
+            "temperature": spec.temperature,
+            "system_prompt": bool(spec.system_prompt),
+            "prompt_version": generador_service.version_prompt(spec),
+            "parametro_longitud": spec.parametro_longitud,
+            "secciones": spec.secciones.descripcion()["secciones"] if generador_service.por_secciones(spec) else None,
+            "peticion": spec.request_model.__name__
         }
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al generar actividad: {str(e)}")
+        for spec in generador_service.listar()
+    ]
+
+
+@app.get("/plantillas")
+def listar_plantillas():
+    """
+    Plantillas de prompt con su versión (hash del contenido), sus campos y
+    los tokens estimados de la parte estática y de la variable.
+    """
+    return registro_plantillas.listar()
 
 # ============================================
-# ENDPOINT: EXÁMENES
+# ENDPOINT: INFORMES A FAMILIAS POR LOTES
 # ============================================
 
-@app.post("/generar/examen")
-async def generar_examen(datos: ExamenRequest):
+@app.post("/generar/informes-familia/lote")
+async def generar_informes_familia_lote(
+    lote: InformeFamiliaLoteRequest,
+    force_regenerate: bool = False,
+    modo: str = "directo"
+):
     """
-    Genera un examen profesional con criterios de evaluación y rúbricas.
+    Genera los informes a familias de toda una clase.
+    
+    - modo=directo: SSE con un evento "informe" por alumno según terminan
+      (en paralelo, LOTE_MAX_CONCURRENCIA) y un evento "fin" con el resumen y los fallidos.
+    - modo=batch: envía el lote a la Message Batches API de Anthropic y devuelve
+      su batch_id para consultar los resultados más tarde.
     """
+    if modo == "batch":
+        try:
+            return await lote_service.crear_batch_informes(lote)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error al crear el lote: {str(e)}")
     
+    if modo != "directo":
+        raise HTTPException(status_code=400, detail=f"Modo no soportado: {modo}")
+    
+    async def eventos():
+        yield _evento_sse("inicio", {"total": len(lote.alumnos), "tipo": "informes-familia"})
+        async for evento in lote_service.generar_informes(lote, force_regenerate):
+            yield _evento_sse(evento.pop("evento"), evento)
+    
+    return _streaming_sse(eventos())
+
+
+@app.get("/generar/informes-familia/lote/{batch_id}")
+async def obtener_informes_familia_lote(batch_id: str):
+    """
+    Estado de un lote enviado con modo=batch; incluye los informes cuando ha terminado.
+    """
     try:
-        # Construir prompt para Claude
-        prompt = f"""Eres un experto en evaluación educativa española que crea exámenes para docentes.
-
-TAREA: Generar un examen completo para:
-
-DATOS:
-- Nivel: {datos.nivel}
-- Curso: {datos.curso}
-- Asignatura: {datos.asignatura}
-- Tema: {datos.tema}
-- Tipo de preguntas: {datos.tipo_preguntas}
-- Número de preguntas: {datos.num_preguntas}
-
-INSTRUCCIONES:
-1. Crea un examen PROFESIONAL listo para imprimir
-2. Apropiado para {datos.curso} de {datos.nivel}
-3. Incluye:
-   - Encabezado (nombre, fecha, curso)
-   - {datos.num_preguntas} preguntas de tipo {datos.tipo_preguntas}
-   - Criterios de evaluación por pregunta
-   - Puntuación total (sobre 10)
-   - Rúbrica de corrección
-4. Cumple con criterios LOMLOE 2024
-5. Formato claro y profesional
-6. Dificultad progresiva (fácil → media → difícil)
-
-Si tipo es "test": 4 opciones por pregunta (A, B, C, D)
-Si tipo es "desarrollo": preguntas abiertas con criterios detallados
-Si tipo es "mixto": combina ambos tipos
-
-GENERA EL EXAMEN:"""
-
-        # Llamar a Claude
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=3000,
-            temperature=0.6,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
-        
-        contenido = message.content[0].text
-        
-        return {
-            "success": True,
-            "resultado": contenido,
-            "nivel": datos.nivel,
-            "curso": datos.curso,
-            "asignatura": datos.asignatura,
-            "tema": datos.tema,
-            "tipo": "examen"
-        }
-        
+        return await lote_service.obtener_batch_informes(batch_id)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al generar examen: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error al consultar el lote: {str(e)}")
 
 # ============================================
-# ENDPOINT: PROBLEMAS MATEMÁTICAS
+# ENDPOINTS: TRABAJOS EN SEGUNDO PLANO
 # ============================================
 
-@app.post("/generar/problemas-matematicas")
-async def generar_problemas_matematicas(datos: ProblemasMatematicasRequest):
+@app.post("/trabajos/{tipo}", status_code=202)
+async def crear_trabajo(tipo: str, datos: dict, force_regenerate: bool = False):
     """
-    Genera problemas de matemáticas adaptados a nivel con soluciones paso a paso.
+    Encola la generación de cualquier generador registrado y devuelve su trabajo_id
+    al instante (para generaciones largas que superan los timeouts del proxy).
+    
+    El cuerpo es el mismo que el de POST /generar/{tipo}.
     """
+    try:
+        spec = generador_service.obtener(tipo)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     
     try:
-        # Construir prompt para Claude
-        prompt = f"""Eres un profesor experto en matemáticas que crea problemas para docentes españoles.
-
-TAREA: Generar problemas de matemáticas para:
-
-DATOS:
-- Nivel: {datos.nivel}
-- Curso: {datos.curso}
-- Tema: {datos.tema}
-- Número de problemas: {datos.num_problemas}
-- Dificultad: {datos.dificultad}
-- Con soluciones: {'Sí' if datos.con_soluciones else 'No'}
-
-INSTRUCCIONES:
-1. Crea {datos.num_problemas} problemas de dificultad {datos.dificultad}
-2. Apropiados para {datos.curso} de {datos.nivel}
-3. Tema específico: {datos.tema}
-4. Cada problema debe incluir:
-   - Enunciado claro y contextualizado
-   - Datos necesarios
-   - Pregunta específica
-   {"- Solución paso a paso con explicaciones" if datos.con_soluciones else ""}
-   {"- Resultado final" if datos.con_soluciones else ""}
-5. Contextos variados (vida real, cotidianos, interesantes para alumnos)
-6. Cumple con currículo LOMLOE 2024
-7. Formato claro y profesional
-
-GENERA LOS PROBLEMAS:"""
-
-        # Llamar a Claude
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=2500,
-            temperature=0.7,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
-        
-        contenido = message.content[0].text
-        
-        return {
-            "success": True,
-            "resultado": contenido,
-            "nivel": datos.nivel,
-            "curso": datos.curso,
-            "tema": datos.tema,
-            "num_problemas": datos.num_problemas,
-            "tipo": "problemas-matematicas"
-        }
-        
+        peticion = spec.request_model.model_validate(datos)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+    
+    try:
+        trabajo_id = await trabajo_service.encolar(tipo, peticion.model_dump(), force_regenerate)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al generar problemas: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error al encolar el trabajo: {str(e)}")
+    
+    return {"trabajo_id": trabajo_id, "estado": "pendiente", "tipo": tipo}
 
-# ============================================
-# ENDPOINT: RÚBRICAS DE EVALUACIÓN
-# ============================================
 
-@app.post("/generar/rubrica")
-async def generar_rubrica(datos: RubricaRequest):
+@app.get("/trabajos/{trabajo_id}")
+async def obtener_trabajo(trabajo_id: str):
     """
-    Genera una rúbrica de evaluación profesional con niveles de logro.
+    Estado de un trabajo (pendiente, en_curso, completado, error o cancelado);
+    incluye el resultado cuando ha terminado.
     """
+    trabajo = await trabajo_service.obtener(trabajo_id)
+    if trabajo is None:
+        raise HTTPException(status_code=404, detail=f"Trabajo no encontrado: {trabajo_id}")
+    return trabajo
+
+
+@app.delete("/trabajos/{trabajo_id}")
+async def cancelar_trabajo(trabajo_id: str):
+    """
+    Cancela un trabajo pendiente o en curso.
+    """
+    if not await trabajo_service.cancelar(trabajo_id):
+        trabajo = await trabajo_service.obtener(trabajo_id)
+        if trabajo is None:
+            raise HTTPException(status_code=404, detail=f"Trabajo no encontrado: {trabajo_id}")
+        raise HTTPException(status_code=409, detail=f"El trabajo ya ha terminado ({trabajo['estado']})")
+    return {"trabajo_id": trabajo_id, "estado": "cancelado"}
+
+
+@app.post("/trabajos/{trabajo_id}/secciones")
+async def regenerar_seccion(trabajo_id: str, peticion: RegenerarSeccionRequest):
+    """
+    Regenera una sola sección del documento de un trabajo completado (p.ej.
+    "EVALUACIÓN" de una unidad didáctica) y la sustituye en el documento
+    guardado; el resto se conserva y viaja como contexto.
     
+    Devuelve la sección nueva y el documento completo actualizado. Un
+    encabezado vacío (solo numeración o signos) responde 422.
+    """
     try:
-        criterios_texto = ""
-        if datos.criterios and len(datos.criterios) > 0:
-            criterios_texto = f"\nCriterios específicos a evaluar:\n" + "\n".join([f"- {c}" for c in datos.criterios])
-        
-        prompt = f"""Eres un experto en evaluación educativa española que crea rúbricas profesionales.
-
-TAREA: Generar una rúbrica de evaluación completa para:
-
-DATOS:
-- Nivel: {datos.nivel}
-- Curso: {datos.curso}
-- Asignatura: {datos.asignatura}
-- Actividad/Tarea: {datos.actividad}
-- Niveles de logro: {datos.niveles_logro}
-{criterios_texto}
-
-INSTRUCCIONES:
-1. Crea una rúbrica PROFESIONAL lista para usar
-2. Apropiada para {datos.curso} de {datos.nivel}
-3. Incluye:
-   - Título de la rúbrica
-   - Criterios de evaluación (mínimo 5)
-   - {datos.niveles_logro} niveles de logro para cada criterio
-   - Descriptores claros y específicos por nivel
-   - Puntuación asociada a cada nivel
-   - Ponderación de criterios
-4. Niveles típicos: Insuficiente, Suficiente, Notable, Sobresaliente
-5. Cumple con LOMLOE 2024
-6. Formato tabla clara y profesional
-7. Incluye instrucciones de uso
-
-GENERA LA RÚBRICA:"""
-
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=2500,
-            temperature=0.5,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
+        resultado = await revision_service.regenerar_seccion(
+            trabajo_id, peticion.encabezado, peticion.instrucciones
         )
-        
-        contenido = message.content[0].text
-        
-        return {
-            "success": True,
-            "resultado": contenido,
-            "nivel": datos.nivel,
-            "curso": datos.curso,
-            "asignatura": datos.asignatura,
-            "tipo": "rubrica"
-        }
-        
+    except SeccionNoEncontrada as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except RevisionConflicto as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ProveedorSaturadoError as e:
+        raise _error_saturado(e)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al generar rúbrica: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error al regenerar la sección: {str(e)}")
+    
+    if resultado is None:
+        raise HTTPException(status_code=404, detail=f"Trabajo no encontrado: {trabajo_id}")
+    return resultado
+
+
+@app.get("/trabajos")
+async def estadisticas_trabajos():
+    """
+    Workers de este proceso y número de trabajos por estado.
+    """
+    return await asyncio.to_thread(trabajo_service.estadisticas)
 
 # ============================================
-# ENDPOINT: UNIDADES DIDÁCTICAS
+# ENDPOINTS: EXPORTAR A WORD Y PDF
 # ============================================
 
-@app.post("/generar/unidad-didactica")
-async def generar_unidad_didactica(datos: UnidadDidacticaRequest):
+MIME_DOCX = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+
+def _cabeceras_descarga(titulo: str, extension: str, etag: Optional[str] = None) -> dict:
+    """Content-Disposition y caché HTTP de una descarga"""
+    nombre = export_service.nombre_archivo(titulo, extension)
+    cabeceras = {
+        "Content-Disposition": f"attachment; filename=\"{nombre}\"; filename*=UTF-8''{quote(f'{titulo}.{extension}')}",
+        "Cache-Control": "no-store"
+    }
+    if etag:
+        # El cliente puede guardarla y enviar If-None-Match para no volver a descargarla
+        cabeceras["ETag"] = etag
+        cabeceras["Cache-Control"] = "private, no-cache"
+    return cabeceras
+
+
+def _descarga(
+    contenido: bytes,
+    media_type: str,
+    titulo: str,
+    extension: str,
+    etag: Optional[str] = None
+) -> StreamingResponse:
+    """Descarga de un fichero generado en memoria, en bloques de 64 KB"""
+    def bloques():
+        for inicio in range(0, len(contenido), 64 * 1024):
+            yield contenido[inicio:inicio + 64 * 1024]
+    
+    return StreamingResponse(
+        bloques(),
+        media_type=media_type,
+        headers={"Content-Length": str(len(contenido)), **_cabeceras_descarga(titulo, extension, etag)}
+    )
+
+
+def _etag_coincide(if_none_match: Optional[str], etag: str) -> bool:
+    """Compara la cabecera If-None-Match (lista, débil o *) con el ETag"""
+    if not if_none_match:
+        return False
+    etiquetas = [e.strip().removeprefix("W/") for e in if_none_match.split(",")]
+    return "*" in etiquetas or etag in etiquetas
+
+
+async def _exportacion_cacheada(
+    request: Request,
+    clave: str,
+    media_type: str,
+    titulo: str,
+    extension: str,
+    exportar: Callable[[], Awaitable[bytes]]
+) -> Response:
     """
-    Genera una unidad didáctica completa con todas las sesiones.
+    Sirve una exportación desde la caché por contenido o la genera
+    
+    La clave es también el ETag. Un POST no se revalida con 304 (RFC 9110
+    §13.1.2): si If-None-Match coincide responde 412 sin cuerpo y el cliente
+    conserva la copia que ya tiene.
     """
+    etag = f'"{clave}"'
+    if _etag_coincide(request.headers.get("if-none-match"), etag):
+        cache_exportacion_service.precondiciones_fallidas += 1
+        return Response(status_code=412, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
     
+    cacheado, nivel = await run_in_threadpool(cache_exportacion_service.obtener, clave, extension)
+    trazador.fijar(exportacion_cache=nivel)
+    if cacheado is not None:
+        return _descarga(cacheado, media_type, titulo, extension, etag)
+    
+    with trazador.span(f"exportar {extension}", **{"docentia.formato": extension}):
+        inicio = time.perf_counter()
+        contenido = await exportar()
+        duracion = time.perf_counter() - inicio
+        trazador.registrar(exportacion_ms=duracion * 1000)
+        metricas.EXPORTACION_SEGUNDOS.labels(extension).observe(duracion)
+    await run_in_threadpool(cache_exportacion_service.guardar, clave, extension, contenido)
+    return _descarga(contenido, media_type, titulo, extension, etag)
+
+
+@app.post("/api/exportar/word")
+async def exportar_word(datos: ExportarWordRequest, request: Request):
+    """
+    Convierte el Markdown generado en un .docx y lo devuelve como descarga.
+    
+    La conversión se hace en memoria y en el pool de hilos, así que no
+    bloquea el event loop. Las descargas repetidas del mismo documento salen
+    de la caché de exportaciones (o responden 412 si el cliente ya lo tiene).
+    """
     try:
-        prompt = f"""Eres un experto en programación didáctica española que crea unidades completas.
-
-TAREA: Generar una unidad didáctica completa para:
-
-DATOS:
-- Nivel: {datos.nivel}
-- Curso: {datos.curso}
-- Asignatura: {datos.asignatura}
-- Título: {datos.titulo}
-- Número de sesiones: {datos.num_sesiones}
-- Trimestre: {datos.trimestre}
-
-INSTRUCCIONES:
-1. Crea una unidad didáctica COMPLETA lista para implementar
-2. Apropiada para {datos.curso} de {datos.nivel}
-3. Incluye:
-   - Justificación y contextualización
-   - Objetivos didácticos (5-7)
-   - Competencias clave LOMLOE
-   - Saberes básicos / Contenidos
-   - Metodología
-   - Temporalización ({datos.num_sesiones} sesiones detalladas)
-   - Recursos y materiales
-   - Evaluación (criterios, instrumentos)
-   - Atención a la diversidad
-   - Bibliografía
-4. Cada sesión debe incluir:
-   - Objetivos específicos
-   - Actividades (inicio, desarrollo, cierre)
-   - Tiempo estimado
-   - Recursos necesarios
-5. Cumple con LOMLOE 2024 y currículo de Extremadura
-6. Formato profesional y estructurado
-
-GENERA LA UNIDAD DIDÁCTICA:"""
-
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=4000,
-            temperature=0.6,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
+        version = await run_in_threadpool(export_service.version_word, datos.plantilla)
+        clave = cache_exportacion_service.clave("docx", datos.contenido, datos.titulo, datos.metadatos, version)
+        return await _exportacion_cacheada(
+            request, clave, MIME_DOCX, datos.titulo, "docx",
+            lambda: run_in_threadpool(
+                export_service.exportar_word, datos.contenido, datos.titulo, datos.metadatos, datos.plantilla
+            )
         )
-        
-        contenido = message.content[0].text
-        
-        return {
-            "success": True,
-            "resultado": contenido,
-            "nivel": datos.nivel,
-            "curso": datos.curso,
-            "asignatura": datos.asignatura,
-            "titulo": datos.titulo,
-            "tipo": "unidad-didactica"
-        }
-        
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al generar unidad didáctica: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error al exportar a Word: {str(e)}")
 
-# ============================================
-# ENDPOINT: SITUACIONES DE APRENDIZAJE
-# ============================================
 
-@app.post("/generar/situacion-aprendizaje")
-async def generar_situacion_aprendizaje(datos: SituacionAprendizajeRequest):
-    """
-    Genera una situación de aprendizaje competencial completa.
+@app.post("/api/exportar/pdf")
+async def exportar_pdf(datos: ExportarPdfRequest, request: Request):
     """
+    Convierte el Markdown generado en un PDF listo para imprimir.
     
+    La maquetación se hace en el pool de procesos de pdf_service; si su cola
+    está llena responde 503 con Retry-After. Usa la caché de exportaciones
+    igual que Word.
+    """
     try:
-        competencias_texto = ""
-        if datos.competencias_clave and len(datos.competencias_clave) > 0:
-            competencias_texto = f"\nCompetencias clave a trabajar:\n" + "\n".join([f"- {c}" for c in datos.competencias_clave])
-        
-        prompt = f"""Eres un experto en diseño de situaciones de aprendizaje competenciales según LOMLOE.
-
-TAREA: Generar una situación de aprendizaje completa para:
-
-DATOS:
-- Nivel: {datos.nivel}
-- Curso: {datos.curso}
-- Asignatura: {datos.asignatura}
-- Tema/Reto: {datos.tema}
-- Duración: {datos.duracion_sesiones} sesiones
-{competencias_texto}
-
-INSTRUCCIONES:
-1. Crea una situación de aprendizaje COMPETENCIAL completa
-2. Apropiada para {datos.curso} de {datos.nivel}
-3. Debe incluir:
-   - Identificación de la SA
-   - Justificación (¿Por qué es relevante?)
-   - Descripción del reto/problema
-   - Objetivos de aprendizaje
-   - Competencias específicas y clave
-   - Saberes básicos
-   - Metodología (ABP, cooperativo, etc.)
-   - Secuencia didáctica ({datos.duracion_sesiones} sesiones detalladas)
-   - Producto final
-   - Evaluación (criterios, instrumentos, rúbrica)
-   - Recursos y materiales
-   - Atención a la diversidad
-4. Debe ser contextualizada, significativa y motivadora
-5. Enfoque competencial (aprender haciendo)
-6. Cumple con LOMLOE 2024
-7. Formato profesional
-
-GENERA LA SITUACIÓN DE APRENDIZAJE:"""
-
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=3500,
-            temperature=0.7,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
+        clave = cache_exportacion_service.clave(
+            "pdf", datos.contenido, datos.titulo, datos.metadatos, export_service.version_pdf()
         )
-        
-        contenido = message.content[0].text
-        
-        return {
-            "success": True,
-            "resultado": contenido,
-            "nivel": datos.nivel,
-            "curso": datos.curso,
-            "asignatura": datos.asignatura,
-            "tema": datos.tema,
-            "tipo": "situacion-aprendizaje"
-        }
-        
+        return await _exportacion_cacheada(
+            request, clave, "application/pdf", datos.titulo, "pdf",
+            lambda: pdf_service.exportar(datos.contenido, datos.titulo, datos.metadatos)
+        )
+    except ServicioSaturadoError as e:
+        raise _error_saturado(e)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al generar situación de aprendizaje: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error al exportar a PDF: {str(e)}")
 
-# ============================================
-# ENDPOINT: PROGRAMACIONES DIDÁCTICAS
-# ============================================
 
-@app.post("/generar/programacion-didactica")
-async def generar_programacion_didactica(datos: ProgramacionDidacticaRequest):
-    """
-    Genera una programación didáctica anual completa.
+@app.post("/api/exportar/examen")
+async def exportar_examen(datos: ExportarExamenRequest):
     """
+    Paquete ZIP con el examen, la hoja de respuestas y las soluciones como
+    ficheros separados (Word y/o PDF), listos para imprimir.
     
+    Las secciones se exportan en paralelo; si falla alguna se responde con
+    ese error (503 si la exportación está saturada) antes de enviar nada, y
+    después el contenedor ZIP se envía fichero a fichero.
+    """
     try:
-        prompt = f"""Eres un experto en programación didáctica española que crea programaciones anuales completas.
-
-TAREA: Generar una programación didáctica anual para:
-
-DATOS:
-- Nivel: {datos.nivel}
-- Curso: {datos.curso}
-- Asignatura: {datos.asignatura}
-- Centro educativo: {datos.centro}
-- Curso académico: {datos.curso_academico}
-
-INSTRUCCIONES:
-1. Crea una programación didáctica COMPLETA para el curso completo
-2. Apropiada para {datos.curso} de {datos.nivel}
-3. Debe incluir:
-   
-   A. INTRODUCCIÓN Y CONTEXTUALIZACIÓN
-   - Características del centro ({datos.centro})
-   - Características del alumnado
-   - Marco legal (LOMLOE, LOE, decretos autonómicos)
-   
-   B. OBJETIVOS
-   - Objetivos de etapa
-   - Objetivos de la asignatura
-   - Contribución a competencias clave
-   
-   C. COMPETENCIAS
-   - Competencias clave (CCL, CP, STEM, CD, CPSAA, CC, CE, CCEC)
-   - Competencias específicas de la asignatura
-   - Descriptores operativos
-   
-   D. SABERES BÁSICOS / CONTENIDOS
-   - Organizados por trimestres
-   - Bloques temáticos
-   - Secuenciación y temporalización
-   
-   E. UNIDADES DIDÁCTICAS
-   - Mínimo 9 unidades (3 por trimestre)
-   - Título, temporalización, objetivos
-   
-   F. METODOLOGÍA
-   - Principios metodológicos
-   - Estrategias didácticas
-   - Organización espacios y tiempos
-   - Materiales y recursos
-   
-   G. EVALUACIÓN
-   - Criterios de evaluación
-   - Instrumentos de evaluación
-   - Criterios de calificación
-   - Recuperación
-   
-   H. ATENCIÓN A LA DIVERSIDAD
-   - Medidas ordinarias
-   - Medidas específicas
-   - Adaptaciones
-   
-   I. ACTIVIDADES COMPLEMENTARIAS
-   
-4. Cumple con LOMLOE 2024 y Decreto de Extremadura
-5. Formato profesional y estructurado
-6. Listo para entregar a inspección
-
-GENERA LA PROGRAMACIÓN DIDÁCTICA:"""
-
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=4096,
-            temperature=0.5,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
+        zip_examen = await paquete_service.examen_zip(
+            datos.contenido, datos.titulo, datos.metadatos, datos.plantilla, tuple(dict.fromkeys(datos.formatos))
         )
-        
-        contenido = message.content[0].text
-        
-        return {
-            "success": True,
-            "resultado": contenido,
-            "nivel": datos.nivel,
-            "curso": datos.curso,
-            "asignatura": datos.asignatura,
-            "centro": datos.centro,
-            "tipo": "programacion-didactica"
-        }
-        
+    except ServicioSaturadoError as e:
+        raise _error_saturado(e)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al generar programación didáctica: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error al exportar el examen: {str(e)}")
+    
+    return StreamingResponse(
+        zip_examen,
+        media_type="application/zip",
+        headers=_cabeceras_descarga(datos.titulo, "zip")
+    )
 
 # ============================================
-# ENDPOINT: ADAPTACIONES CURRICULARES
+# ENDPOINT: ESTADO DE LA IA
 # ============================================
 
-@app.post("/generar/adaptacion-curricular")
-async def generar_adaptacion_curricular(datos: AdaptacionCurricularRequest):
+@app.get("/estado/ia")
+def estado_ia():
     """
-    Genera una adaptación curricular individualizada.
+    Estado de los proveedores de IA y tasa de aciertos de la caché de prompt por generador.
     """
+    return ia_service.get_status()
+
+# ============================================
+# ENDPOINT: WARMUP
+# ============================================
+
+@app.get("/warmup")
+async def warmup():
+    """
+    Carga el SDK del proveedor activo y abre sus conexiones (para el health
+    check de despliegues serverless o autoescalados). Idempotente.
+    """
+    return await ia_service.calentar()
+
+# ============================================
+# ENDPOINT: ESTADÍSTICAS DE CACHÉ
+# ============================================
+
+@app.get("/cache/estadisticas")
+def estadisticas_cache():
+    """
+    Aciertos/fallos de la caché de generaciones (usa ?force_regenerate=true para omitirla).
+    """
+    return cache_service.estadisticas()
+
+
+@app.get("/exportar/estadisticas")
+def estadisticas_exportacion():
+    """
+    Estado del pool de exportación PDF y de la caché de exportaciones.
+    """
+    return {
+        "pdf": pdf_service.estadisticas(),
+        "cache": cache_exportacion_service.estadisticas()
+    }
+
+
+@app.get("/tokens/estadisticas")
+def estadisticas_tokens():
+    """
+    Modelo de longitud de salida por generador (base, tokens por unidad del
+    parámetro, truncadas) y calibración del contador local de tokens por proveedor.
+    """
+    return estimador_tokens.estadisticas()
+
+# ============================================
+# ENDPOINT: MÉTRICAS DE PROMETHEUS
+# ============================================
+
+@app.get("/metrics")
+def metricas_prometheus():
+    """
+    Métricas en formato Prometheus: latencia por generador y proveedor,
+    generaciones en curso, tokens y aciertos de caché.
     
-    try:
-        medidas_texto = ""
-        if datos.medidas and len(datos.medidas) > 0:
-            medidas_texto = f"\nMedidas específicas a considerar:\n" + "\n".join([f"- {m}" for m in datos.medidas])
-        
-        prompt = f"""Eres un experto en atención a la diversidad que crea adaptaciones curriculares.
-
-TAREA: Generar una adaptación curricular para:
-
-DATOS:
-- Nivel: {datos.nivel}
-- Curso: {datos.curso}
-- Asignatura: {datos.asignatura}
-- Tipo de adaptación: {datos.tipo_adaptacion}
-- Necesidad específica: {datos.necesidad}
-{medidas_texto}
-
-INSTRUCCIONES:
-1. Crea una adaptación curricular COMPLETA y profesional
-2. Apropiada para {datos.curso} de {datos.nivel}
-3. Debe incluir:
-   
-   A. DATOS DE IDENTIFICACIÓN
-   - Alumno/a (datos anónimos)
-   - Curso y grupo
-   - Asignatura
-   - Tipo de adaptación: {datos.tipo_adaptacion}
-   
-   B. INFORMACIÓN RELEVANTE
-   - Necesidad específica: {datos.necesidad}
-   - Nivel de competencia curricular
-   - Estilo de aprendizaje
-   - Intereses y motivación
-   
-   C. OBJETIVOS
-   - Objetivos generales adaptados
-   - Objetivos específicos
-   - Priorización de objetivos
-   
-   D. COMPETENCIAS
-   - Competencias a desarrollar
-   - Nivel de logro esperado
-   
-   E. CONTENIDOS
-   - Contenidos priorizados
-   - Contenidos modificados
-   - Contenidos ampliados (si enriquecimiento)
-   
-   F. METODOLOGÍA
-   - Estrategias específicas
-   - Recursos adaptados
-   - Apoyo necesario
-   - Organización del aula
-   
-   G. EVALUACIÓN
-   - Criterios de evaluación adaptados
-   - Instrumentos específicos
-   - Procedimientos
-   
-   H. MEDIDAS Y RECURSOS
-   - Medidas organizativas
-   - Recursos personales
-   - Recursos materiales
-   - Apoyos necesarios
-   
-   I. COLABORACIÓN CON LA FAMILIA
-   
-   J. SEGUIMIENTO Y REVISIÓN
-   
-4. Cumple con normativa de atención a la diversidad
-5. Formato profesional
-6. Lenguaje claro y específico
-
-GENERA LA ADAPTACIÓN CURRICULAR:"""
-
-        message = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=3500,
-            temperature=0.6,
-            messages=[
-                {"role": "user", "content": prompt}
-            ]
-        )
-        
-        contenido = message.content[0].text
-        
-        return {
-            "success": True,
-            "resultado": contenido,
-            "nivel": datos.nivel,
-            "curso": datos.curso,
-            "asignatura": datos.asignatura,
-            "tipo_adaptacion": datos.tipo_adaptacion,
-            "tipo": "adaptacion-curricular"
-        }
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error al generar adaptación curricular: {str(e)}")
+    Con PROMETHEUS_MULTIPROC_DIR agrega todos los workers de uvicorn.
+    """
+    return Response(metricas.exposicion(), media_type=metricas.CONTENT_TYPE_LATEST)
 
 # ============================================
 # ENDPOINT DE PRUEBA
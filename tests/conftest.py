@@ -0,0 +1,24 @@
+"""
+Configuración común de las pruebas: sin bases de datos ni archivos en el
+directorio del proyecto, sin workers de trabajos y sin precalentamiento
+(las variables se fijan antes de que ningún módulo importe `config`)
+"""
+import os
+import tempfile
+
+_TEMPORAL = tempfile.mkdtemp(prefix="docentia-tests-")
+
+os.environ.update({
+    "AI_PROVIDER": "claude",
+    "ANTHROPIC_API_KEY": "",
+    "OPENAI_API_KEY": "",
+    "GOOGLE_API_KEY": "",
+    "CACHE_BACKEND": "memoria",
+    "TOKENS_DB_RUTA": "",
+    "TRABAJOS_DB_RUTA": os.path.join(_TEMPORAL, "trabajos.sqlite3"),
+    "TRABAJOS_WORKERS": "0",
+    "EXPORT_CACHE_DIR": os.path.join(_TEMPORAL, "exportaciones"),
+    "PRECALENTAR_AL_ARRANCAR": "false",
+    "TRAZAS_ARCHIVO": "",
+    "TRAZAS_LOG_JSON": "false"
+})
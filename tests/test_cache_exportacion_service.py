@@ -0,0 +1,52 @@
+"""
+Pruebas de la caché de exportaciones y de su uso en las rutas de descarga
+"""
+import os
+
+from fastapi.testclient import TestClient
+
+from app.services.cache_exportacion_service import CacheExportacionService, cache_exportacion_service
+
+
+def _cache(tmp_path, memoria: int = 1024) -> CacheExportacionService:
+    return CacheExportacionService(str(tmp_path / "exportaciones"), memoria, 1024 * 1024)
+
+
+def test_acierto_en_memoria(tmp_path):
+    cache = _cache(tmp_path)
+    cache.guardar("a" * 64, "docx", b"docx")
+    assert cache.obtener("a" * 64, "docx") == (b"docx", "memoria")
+    assert cache.obtener("b" * 64, "docx") == (None, "fallo")
+
+
+def test_acierto_en_disco_devuelve_los_bytes(tmp_path):
+    """Regresión: se devolvía la ruta y otro worker podía borrarla antes de enviarla"""
+    cache = _cache(tmp_path, memoria=0)
+    cache.guardar("a" * 64, "pdf", b"%PDF-1.7")
+    datos, nivel = cache.obtener("a" * 64, "pdf")
+    assert (datos, nivel) == (b"%PDF-1.7", "disco")
+    # El desalojo de otro worker ya no afecta a una respuesta en curso
+    os.remove(cache._ruta("a" * 64, "pdf"))
+    assert datos == b"%PDF-1.7"
+    assert cache.obtener("a" * 64, "pdf") == (None, "fallo")
+
+
+def test_post_con_if_none_match_responde_412():
+    """Regresión: un POST respondía 304, que solo vale para GET y HEAD"""
+    from main import app
+
+    cliente = TestClient(app)
+    cache_exportacion_service.limpiar()
+    peticion = {"contenido": "# Unidad 1\n\nTexto", "titulo": "Unidad 1"}
+    primera = cliente.post("/api/exportar/word", json=peticion)
+    assert primera.status_code == 200
+    etag = primera.headers["etag"]
+
+    repetida = cliente.post("/api/exportar/word", json=peticion, headers={"If-None-Match": etag})
+    assert repetida.status_code == 412
+    assert repetida.content == b""
+    assert repetida.headers["etag"] == etag
+
+    sin_condicion = cliente.post("/api/exportar/word", json=peticion)
+    assert sin_condicion.status_code == 200
+    assert sin_condicion.content == primera.content
@@ -0,0 +1,63 @@
+"""
+Pruebas de los backends de caché y de la normalización de la clave
+"""
+import pytest
+
+from app.services.cache_service import CacheBackend, CacheService, MemoriaLRUCache, SQLiteCache
+
+
+def test_backend_incompleto_no_se_puede_instanciar():
+    class SinLen(CacheBackend):
+        def obtener(self, clave):
+            return None
+
+        def guardar(self, clave, valor):
+            pass
+
+        def limpiar(self):
+            pass
+
+    with pytest.raises(TypeError):
+        SinLen()
+
+
+def test_memoria_lru_expulsa_la_menos_usada():
+    cache = MemoriaLRUCache(ttl_segundos=60, max_entradas=2)
+    cache.guardar("a", {"contenido": "A"})
+    cache.guardar("b", {"contenido": "B"})
+    assert cache.obtener("a") == {"contenido": "A"}
+    cache.guardar("c", {"contenido": "C"})
+    assert cache.obtener("b") is None
+    assert len(cache) == 2
+
+
+def test_sqlite_guarda_y_limpia(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"), ttl_segundos=60, max_entradas=10)
+    cache.guardar("clave", {"contenido": "texto"})
+    assert cache.obtener("clave") == {"contenido": "texto"}
+    cache.limpiar()
+    assert len(cache) == 0
+
+
+def test_sqlite_no_abre_la_base_al_crearse(tmp_path):
+    ruta = tmp_path / "cache.sqlite3"
+    cache = SQLiteCache(str(ruta), ttl_segundos=60, max_entradas=10)
+    assert not ruta.exists()
+    cache.guardar("clave", {"contenido": "x"})
+    assert cache.obtener("clave") == {"contenido": "x"}
+
+
+def test_normalizar_solo_ignora_mayusculas_en_campos_cerrados():
+    """Regresión: "ESO" y "eso" son el mismo nivel, pero dos temas distintos no"""
+    normalizado = CacheService.normalizar({
+        "nivel": "  ESO ",
+        "competencias": ["CCL", "STEM"],
+        "tema": "El  Cid\n y  la Reconquista",
+        "alumnos": [{"tono": "Formal", "nombre": "Ana"}]
+    })
+    assert normalizado == {
+        "nivel": "eso",
+        "competencias": ["CCL", "STEM"],
+        "tema": "El Cid y la Reconquista",
+        "alumnos": [{"tono": "formal", "nombre": "Ana"}]
+    }
@@ -0,0 +1,132 @@
+"""
+Pruebas del coalescedor: streams compartidos y llamadas single-flight
+"""
+import asyncio
+
+import pytest
+
+from app.services.coalescedor import CoalescedorPeticiones, TransmisionCompartida
+
+
+async def _fuente(textos, pausa: float = 0.0):
+    for texto in textos:
+        await asyncio.sleep(pausa)
+        yield {"evento": "delta", "texto": texto}
+    yield {"evento": "fin"}
+
+
+def test_suscriptor_tardio_recibe_el_prefijo():
+    async def escenario():
+        transmision = TransmisionCompartida(_fuente(["a", "b", "c"], pausa=0.01))
+        primero = transmision.suscribir()
+        assert (await primero.__anext__())["texto"] == "a"
+        tardio = [evento async for evento in transmision.suscribir()]
+        resto = [evento async for evento in primero]
+        return tardio, resto
+
+    tardio, resto = asyncio.run(escenario())
+    assert [e.get("texto") for e in tardio] == ["a", "b", "c", None]
+    assert resto[-1]["evento"] == "fin"
+
+
+def test_error_de_la_fuente_llega_a_todos():
+    async def fallida():
+        yield {"evento": "delta", "texto": "a"}
+        raise ValueError("proveedor caído")
+
+    async def escenario():
+        transmision = TransmisionCompartida(fallida())
+        return [evento async for evento in transmision.suscribir()]
+
+    with pytest.raises(ValueError):
+        asyncio.run(escenario())
+
+
+def test_transmision_abandonada_no_admite_nuevos_suscriptores():
+    """Regresión: quien llegaba tras cancelarse recibía un prefijo sin "fin" ni error"""
+    coalescedor = CoalescedorPeticiones()
+    fuentes = []
+
+    def crear_fuente():
+        fuentes.append(len(fuentes))
+        return _fuente(["uno", "dos", "tres"], pausa=0.01)
+
+    async def escenario():
+        primero = coalescedor.transmitir("clave", crear_fuente)
+        await primero.__anext__()
+        await primero.aclose()
+        # Llega una petición idéntica antes de que termine la cancelación
+        return [evento async for evento in coalescedor.transmitir("clave", crear_fuente)]
+
+    eventos = asyncio.run(escenario())
+    assert len(fuentes) == 2
+    assert [e.get("texto") for e in eventos] == ["uno", "dos", "tres", None]
+    assert eventos[-1]["evento"] == "fin"
+
+
+def test_transmision_cancelada_termina_con_error():
+    async def escenario():
+        transmision = TransmisionCompartida(_fuente(["a", "b"], pausa=0.01))
+        suscripcion = transmision.suscribir()
+        await suscripcion.__anext__()
+        await suscripcion.aclose()
+        with pytest.raises(RuntimeError):
+            [evento async for evento in transmision.suscribir()]
+
+    asyncio.run(escenario())
+
+
+def test_ejecutar_comparte_una_llamada():
+    coalescedor = CoalescedorPeticiones()
+    llamadas = []
+
+    async def generar():
+        llamadas.append(1)
+        await asyncio.sleep(0.01)
+        return {"contenido": "x"}
+
+    async def escenario():
+        return await asyncio.gather(*(coalescedor.ejecutar("clave", generar) for _ in range(5)))
+
+    resultados = asyncio.run(escenario())
+    assert len(llamadas) == 1
+    assert all(resultado == {"contenido": "x"} for resultado in resultados)
+    assert coalescedor.esperas_coalescidas == 4
+
+
+def test_ejecutar_cancela_la_llamada_cuando_no_espera_nadie():
+    coalescedor = CoalescedorPeticiones()
+    cancelada = asyncio.Event()
+
+    async def generar():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelada.set()
+            raise
+
+    async def escenario():
+        unica = asyncio.create_task(coalescedor.ejecutar("clave", generar))
+        await asyncio.sleep(0.01)
+        unica.cancel()
+        await asyncio.wait_for(cancelada.wait(), 1)
+        return coalescedor.estadisticas()["en_vuelo"]
+
+    assert asyncio.run(escenario()) == 0
+
+
+def test_ejecutar_sigue_para_las_demas_esperas():
+    coalescedor = CoalescedorPeticiones()
+
+    async def generar():
+        await asyncio.sleep(0.05)
+        return {"contenido": "x"}
+
+    async def escenario():
+        primera = asyncio.create_task(coalescedor.ejecutar("clave", generar))
+        segunda = asyncio.create_task(coalescedor.ejecutar("clave", generar))
+        await asyncio.sleep(0.01)
+        primera.cancel()
+        return await segunda
+
+    assert asyncio.run(escenario()) == {"contenido": "x"}
@@ -0,0 +1,85 @@
+"""
+Pruebas del enrutador: failover y hedging por proveedor y generador
+"""
+import asyncio
+
+from app.services.enrutador import EnrutadorProveedores, HistogramaLatencia
+from app.services.limitador import LimitadorPeticiones
+
+
+def _enrutador(**opciones) -> EnrutadorProveedores:
+    return EnrutadorProveedores(orden=["claude", "openai"], hedging=True, min_muestras_hedging=3, **opciones)
+
+
+def test_percentil_del_histograma():
+    histograma = HistogramaLatencia()
+    for segundos in range(1, 101):
+        histograma.registrar(segundos)
+    assert histograma.percentil(50) == 51
+    assert histograma.percentil(95) == 95
+    assert HistogramaLatencia().percentil(95) is None
+
+
+def test_retardo_de_hedging_por_generador():
+    """Regresión: un histograma por proveedor mezclaba documentos largos y cortos"""
+    enrutador = _enrutador()
+    for _ in range(5):
+        enrutador.registrar_latencia("claude", 40.0, "programacion-didactica")
+        enrutador.registrar_latencia("claude", 2.0, "boton-emergencia")
+    assert enrutador.retardo_hedging("claude", "programacion-didactica") == 40.0
+    assert enrutador.retardo_hedging("claude", "boton-emergencia") == 2.0
+    assert enrutador.retardo_hedging("claude", "examen") is None
+
+
+def test_failover_al_siguiente_proveedor():
+    enrutador = _enrutador()
+
+    async def llamar(proveedor):
+        if proveedor == "claude":
+            raise Exception("caído")
+        return {"proveedor": proveedor, "contenido": "x"}
+
+    resultado = asyncio.run(enrutador.ejecutar("claude", ["claude", "openai"], llamar, "examen"))
+    assert resultado["proveedor"] == "openai"
+    assert resultado["respaldo"] is True
+    assert enrutador.candidatos("claude", ["claude", "openai"]) == ["openai", "claude"]
+
+
+def test_hedging_gana_el_mas_rapido():
+    enrutador = _enrutador()
+    for _ in range(3):
+        enrutador.registrar_latencia("claude", 0.01, "examen")
+
+    async def llamar(proveedor):
+        await asyncio.sleep(1 if proveedor == "claude" else 0.01)
+        return {"proveedor": proveedor}
+
+    resultado = asyncio.run(enrutador.ejecutar("claude", ["claude", "openai"], llamar, "examen"))
+    assert resultado["proveedor"] == "openai"
+    assert enrutador.hedges_ganados == 1
+
+
+def test_timeout_cuenta_desde_la_admision():
+    """La espera por presupuesto no consume el timeout de la llamada"""
+    limitador = LimitadorPeticiones(
+        limites={"claude": (1, 0, 0)},
+        segundos_por_prioridad=10,
+        max_reintentos=0,
+        backoff_base=0.1,
+        backoff_max=1,
+        espera_max=5,
+        timeout=0.2
+    )
+    limitador.proveedores["claude"].VENTANA = 0.3
+
+    async def llamar():
+        await asyncio.sleep(0.05)
+        return "ok"
+
+    async def escenario():
+        # La segunda espera ~0.3s a que la primera salga de la ventana de RPM
+        return await asyncio.gather(*(
+            limitador.ejecutar("claude", llamar, 5, 10, 10, uso=lambda r: (10, 10)) for _ in range(2)
+        ))
+
+    assert asyncio.run(escenario()) == ["ok", "ok"]
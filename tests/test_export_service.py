@@ -0,0 +1,94 @@
+"""
+Pruebas de la exportación a Word y de la división del examen en secciones
+"""
+import io
+import zipfile
+
+from docx import Document
+from docx.oxml.ns import qn
+
+from app.services.export_service import ExportService, PlantillaDocx, _seccion_examen, _xml_cuerpo
+from app.services.markdown_ast import Encabezado, Fragmento, Parrafo, analizar_markdown
+
+# styleId de Word en español para algunos estilos integrados
+_IDS_ESPAÑOL = {
+    "heading 1": "Ttulo1",
+    "heading 2": "Ttulo2",
+    "list bullet": "Listaconvietas",
+    "title": "Puesto",
+    "table grid": "Tablaconcuadrcula"
+}
+
+
+def _documento_xml(docx: bytes) -> str:
+    with zipfile.ZipFile(io.BytesIO(docx)) as paquete:
+        return paquete.read("word/document.xml").decode("utf-8")
+
+
+def _plantilla_en_español(tmp_path) -> str:
+    doc = Document()
+    for estilo in doc.styles.element.findall(qn("w:style")):
+        nombre = estilo.find(qn("w:name")).get(qn("w:val")).lower()
+        if nombre in _IDS_ESPAÑOL:
+            estilo.set(qn("w:styleId"), _IDS_ESPAÑOL[nombre])
+    ruta = tmp_path / "ies-norba.docx"
+    doc.save(ruta)
+    return str(ruta)
+
+
+MARKDOWN = "# Unidad 3\n\n## Actividades\n\n- Lectura\n\n| A | B |\n|---|---|\n| 1 | 2 |"
+
+
+def test_plantilla_base_usa_los_estilos_integrados():
+    plantilla = PlantillaDocx(Document())
+    assert plantilla.estilos == {}
+    documento = _documento_xml(plantilla.renderizar(_xml_cuerpo(analizar_markdown(MARKDOWN)), "Título", "DocentIA"))
+    for estilo in ("Title", "Heading1", "Heading2", "ListBullet"):
+        assert f'<w:pStyle w:val="{estilo}"/>' in documento
+    assert '<w:tblStyle w:val="TableGrid"/>' in documento
+
+
+def test_plantilla_en_otro_idioma_resuelve_los_estilos_por_nombre(tmp_path):
+    """Regresión: los styleId fijos no existen en las plantillas de Word en español"""
+    plantilla = PlantillaDocx.desde_fichero(_plantilla_en_español(tmp_path))
+    assert plantilla.estilos["Heading1"] == "Ttulo1"
+    documento = _documento_xml(plantilla.renderizar(_xml_cuerpo(analizar_markdown(MARKDOWN)), "Título", "DocentIA"))
+    for estilo in ("Puesto", "Ttulo1", "Ttulo2", "Listaconvietas"):
+        assert f'<w:pStyle w:val="{estilo}"/>' in documento
+    assert '<w:tblStyle w:val="Tablaconcuadrcula"/>' in documento
+    assert 'w:val="Heading1"' not in documento
+    # El documento sigue abriéndose con python-docx y con los estilos aplicados
+    abierto = Document(io.BytesIO(plantilla.renderizar(_xml_cuerpo(analizar_markdown(MARKDOWN)), "Título", "DocentIA")))
+    assert abierto.paragraphs[1].style.name.lower() == "heading 1"
+
+
+def test_secciones_del_examen():
+    contenido = "\n".join([
+        "# Examen de Matemáticas",
+        "## PARTE 1: Preguntas",
+        "### Pregunta 2: Resolución de problemas",
+        "Resuelve el problema.",
+        "**Solución de la pregunta 2 en el anexo**",
+        "## PARTE 5: HOJA DE RESPUESTAS (Para tipo test)",
+        "1. [ ]",
+        "**📝 Soluciones:**",
+        "1. b"
+    ])
+    secciones = ExportService.secciones_examen(contenido)
+    assert [nombre for nombre, _ in secciones] == ["examen", "hoja_respuestas", "soluciones"]
+    examen = secciones[0][1]
+    assert len(examen) == 5
+
+
+def test_titulos_que_no_abren_seccion():
+    """Regresión: "Resolución" contiene SOLUCION y abría las soluciones a mitad del examen"""
+    for titulo in ("Pregunta 2: Resolución de problemas", "Soluciones de la ecuación", "Disoluciones"):
+        assert _seccion_examen(Encabezado(3, (Fragmento(titulo),))) is None
+    for titulo, seccion in (
+        ("PARTE 6: SOLUCIONES (Para el profesor)", "soluciones"),
+        ("Solucionario", "soluciones"),
+        ("5. Hoja de respuestas", "hoja_respuestas")
+    ):
+        assert _seccion_examen(Encabezado(2, (Fragmento(titulo),))) == seccion
+    # Un párrafo normal no abre sección aunque diga "Soluciones"
+    assert _seccion_examen(Parrafo((Fragmento("Soluciones"),))) is None
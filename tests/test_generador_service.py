@@ -0,0 +1,55 @@
+"""
+Pruebas del max_tokens adaptativo de GeneradorService: repetición si se
+trunca y sin bajar del declarado en streaming
+"""
+import asyncio
+
+import pytest
+
+from app.models.generadores import BotonEmergenciaRequest
+from app.services.generador_service import generador_service
+from app.services.ia_service import ia_service
+from app.services.tokens import estimador_tokens
+
+DATOS = BotonEmergenciaRequest(
+    nivel="Primaria", curso="3º", asignatura="Matemáticas", situacion="Falta el titular", duracion="45 minutos"
+)
+
+
+@pytest.fixture
+def llamadas(monkeypatch):
+    """max_tokens de cada llamada al proveedor, con el adaptativo fijado en 512"""
+    registro = []
+
+    async def generate(**argumentos):
+        registro.append(argumentos["max_tokens"])
+        return {"contenido": "x", "proveedor": "claude", "modelo": "m", "truncado": argumentos["max_tokens"] < 4000}
+
+    async def generate_stream(**argumentos):
+        registro.append(argumentos["max_tokens"])
+        yield {"evento": "delta", "texto": "x"}
+        yield {"evento": "fin", "proveedor": "claude", "modelo": "m"}
+
+    async def observar(*_):
+        pass
+
+    monkeypatch.setattr(ia_service, "generate", generate)
+    monkeypatch.setattr(ia_service, "generate_stream", generate_stream)
+    monkeypatch.setattr(estimador_tokens, "observar", observar)
+    monkeypatch.setattr(estimador_tokens, "max_tokens", lambda *_: 512)
+    return registro
+
+
+def test_salida_truncada_se_repite_con_el_techo(llamadas):
+    """Regresión: el adaptativo (por debajo del declarado) truncaba sin reintento"""
+    resultado = asyncio.run(generador_service.generar("boton-emergencia", DATOS, force_regenerate=True))
+    assert llamadas == [512, 4000]
+    assert resultado["truncado"] is False
+
+
+def test_stream_no_baja_del_declarado(llamadas):
+    async def consumir():
+        return [e async for e in generador_service.generar_stream("boton-emergencia", DATOS, force_regenerate=True)]
+
+    asyncio.run(consumir())
+    assert llamadas == [2000]
@@ -0,0 +1,139 @@
+"""
+Pruebas del streaming de IAService con clientes simulados: la reserva del
+limitador se liquida también cuando el cliente corta el stream
+"""
+import asyncio
+import threading
+from types import SimpleNamespace
+
+from app.services.ia_service import IAService
+from app.services.proveedores import FabricaProveedores
+
+FRAGMENTOS = ["Unidad ", "didáctica ", "de ", "fracciones"]
+
+
+class _StreamClaude:
+    """Context manager de `messages.stream` del SDK de Anthropic"""
+
+    def __init__(self):
+        self.response = SimpleNamespace(headers={})
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @property
+    async def text_stream(self):
+        for fragmento in FRAGMENTOS:
+            await asyncio.sleep(0)
+            yield fragmento
+
+    async def get_final_message(self):
+        uso = SimpleNamespace(
+            input_tokens=120,
+            output_tokens=7,
+            cache_read_input_tokens=0,
+            cache_creation_input_tokens=0
+        )
+        return SimpleNamespace(usage=uso, stop_reason="end_turn")
+
+
+class _RespuestaGemini:
+    usage_metadata = SimpleNamespace(prompt_token_count=80, candidates_token_count=6)
+    candidates = []
+
+    async def __aiter__(self):
+        for fragmento in FRAGMENTOS:
+            yield SimpleNamespace(text=fragmento)
+
+
+class _ModeloGemini:
+    def __init__(self, **_):
+        pass
+
+    async def generate_content_async(self, prompt, stream=False):
+        return _RespuestaGemini()
+
+
+def _servicio() -> IAService:
+    servicio = IAService()
+    servicio.proveedores = FabricaProveedores({
+        "claude": ("Claude", lambda: True, lambda: SimpleNamespace(
+            messages=SimpleNamespace(stream=lambda **_: _StreamClaude())
+        )),
+        "gemini": ("Gemini", lambda: True, lambda: SimpleNamespace(GenerativeModel=_ModeloGemini))
+    })
+    return servicio
+
+
+def _reservas(servicio: IAService, proveedor: str) -> list:
+    return list(servicio.limitador.proveedores[proveedor]._uso)
+
+
+def test_stream_cortado_libera_la_reserva_de_salida():
+    servicio = _servicio()
+
+    async def cortar():
+        stream = servicio._stream_claude("sistema", "usuario", 4096, 0.7)
+        assert (await stream.__anext__())["evento"] == "delta"
+        await stream.aclose()
+
+    asyncio.run(cortar())
+    [reserva] = _reservas(servicio, "claude")
+    # Se factura lo emitido (un fragmento), no los 4096 reservados al admitir
+    assert 0 < reserva[2] < 10
+
+
+def test_stream_completo_ajusta_al_uso_real():
+    servicio = _servicio()
+
+    async def consumir():
+        return [evento async for evento in servicio._stream_claude("sistema", "usuario", 4096, 0.7)]
+
+    eventos = asyncio.run(consumir())
+    assert eventos[-1]["evento"] == "fin"
+    [reserva] = _reservas(servicio, "claude")
+    assert reserva[1:] == [120, 7]
+
+
+def test_fin_de_gemini_informa_de_los_tokens_de_entrada():
+    servicio = _servicio()
+
+    async def consumir():
+        return [evento async for evento in servicio._stream_gemini("sistema", "usuario", 1024, 0.7)]
+
+    fin = asyncio.run(consumir())[-1]
+    assert fin["input_tokens"] == 80
+    assert fin["output_tokens"] == 6
+    assert fin["tokens_usados"] == 86
+    [reserva] = _reservas(servicio, "gemini")
+    assert reserva[1:] == [80, 6]
+
+
+def test_el_cliente_se_crea_fuera_del_event_loop():
+    """Regresión: el primer uso importaba el SDK dentro del event loop"""
+    hilos = []
+    servicio = IAService()
+    servicio.proveedores = FabricaProveedores({
+        "claude": ("Claude", lambda: True, lambda: hilos.append(threading.current_thread()) or object())
+    })
+
+    async def pedir_dos_veces():
+        return await servicio.cliente("claude"), await servicio.cliente("claude")
+
+    primero, segundo = asyncio.run(pedir_dos_veces())
+    assert primero is segundo
+    assert len(hilos) == 1 and hilos[0] is not threading.main_thread()
+
+
+def test_la_coalescencia_distingue_mayusculas_y_saltos_de_linea():
+    """Regresión: dos documentos que solo diferían en mayúsculas compartían llamada"""
+    servicio = IAService()
+    claves = {
+        servicio._clave_coalescencia("claude", sistema, "usuario", 1024, 0.7)
+        for sistema in ("DOCUMENTO:\n# Unidad", "documento:\n# unidad", "DOCUMENTO: # Unidad")
+    }
+    assert len(claves) == 3
+    assert servicio._clave_coalescencia("claude", "a", "b", 1024, 0.7) == servicio._clave_coalescencia("claude", "a", "b", 1024, 0.7)
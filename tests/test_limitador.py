@@ -0,0 +1,105 @@
+"""
+Pruebas del limitador: cola justa por prioridad y presupuesto por minuto
+"""
+import asyncio
+
+import pytest
+
+from app.services.limitador import ColaJusta, LimitadorProveedor, ProveedorSaturadoError, segundos_hasta
+from app.services.tokens import EstimadorTokens, FRACCION_SALIDA_SIN_MUESTRAS
+
+
+def _limitador(rpm=0, itpm=0, otpm=0, espera_max=30) -> LimitadorProveedor:
+    return LimitadorProveedor("claude", rpm, itpm, otpm, segundos_por_prioridad=10, espera_max=espera_max)
+
+
+def test_cola_justa_atiende_por_prioridad():
+    async def escenario():
+        cola = ColaJusta(segundos_por_prioridad=10)
+        libre = asyncio.Event()
+        orden = []
+
+        async def pedir(nombre, prioridad):
+            await cola.esperar_turno(prioridad, lambda: 0 if libre.is_set() else float("inf"), lambda: orden.append(nombre))
+
+        tareas = [asyncio.create_task(pedir("larga", 9))]
+        await asyncio.sleep(0.01)
+        tareas.append(asyncio.create_task(pedir("urgente", 0)))
+        await asyncio.sleep(0.01)
+        libre.set()
+        await cola.avisar()
+        await asyncio.gather(*tareas)
+        return orden
+
+    assert asyncio.run(escenario()) == ["urgente", "larga"]
+
+
+def test_cola_justa_sin_inanicion():
+    """Una petición larga que lleva esperando más de su desplazamiento pasa delante de una urgente nueva"""
+    async def escenario():
+        cola = ColaJusta(segundos_por_prioridad=0.01)
+        libre = asyncio.Event()
+        orden = []
+
+        async def pedir(nombre, prioridad):
+            await cola.esperar_turno(prioridad, lambda: 0 if libre.is_set() else float("inf"), lambda: orden.append(nombre))
+
+        tareas = [asyncio.create_task(pedir("larga", 5))]
+        await asyncio.sleep(0.1)
+        tareas.append(asyncio.create_task(pedir("urgente", 0)))
+        await asyncio.sleep(0.01)
+        libre.set()
+        await cola.avisar()
+        await asyncio.gather(*tareas)
+        return orden
+
+    assert asyncio.run(escenario()) == ["larga", "urgente"]
+
+
+def test_reserva_mayor_que_el_presupuesto_se_limita():
+    """Regresión: una reserva de 8192 con OTPM 8000 no se admitía nunca con la ventana ocupada"""
+    limitador = _limitador(otpm=8000)
+
+    async def escenario():
+        return await limitador.admitir(5, 100, 8192)
+
+    reserva = asyncio.run(escenario())
+    assert reserva[2] == 8000
+
+
+def test_presupuesto_agotado_falla_si_la_espera_supera_el_maximo():
+    limitador = _limitador(otpm=1000, espera_max=1)
+
+    async def escenario():
+        await limitador.admitir(5, 10, 900)
+        await limitador.admitir(5, 10, 900)
+
+    with pytest.raises(ProveedorSaturadoError):
+        asyncio.run(escenario())
+
+
+def test_ajustar_libera_presupuesto():
+    limitador = _limitador(otpm=1000, espera_max=1)
+
+    async def escenario():
+        reserva = await limitador.admitir(5, 10, 900)
+        limitador.ajustar(reserva, 10, 100)
+        return await limitador.admitir(5, 10, 800)
+
+    assert asyncio.run(escenario())[2] == 800
+
+
+def test_salida_estimada_del_generador():
+    estimador = EstimadorTokens(min_muestras=3)
+    assert estimador.salida("examen", 10, 4000) == 4000 * FRACCION_SALIDA_SIN_MUESTRAS
+    for preguntas, tokens in ((5, 600), (10, 1100), (20, 2100)):
+        estimador._modelo("examen").registrar(preguntas, tokens)
+    assert estimador.salida("examen", 10, 4000) == 1100
+    assert estimador.salida("examen", 100, 4000) == 4000
+
+
+def test_segundos_hasta():
+    assert segundos_hasta("30") == 30
+    assert segundos_hasta("1m30s") == 90
+    assert segundos_hasta("250ms") == pytest.approx(0.25)
+    assert segundos_hasta(None) == 1.0
@@ -0,0 +1,105 @@
+"""
+Pruebas del analizador de Markdown
+"""
+from app.services.markdown_ast import (
+    CODIGO, CURSIVA, NEGRITA,
+    Cita, Codigo, Elemento, Encabezado, Fragmento, Parrafo, Separador, Tabla,
+    analizar_inline, analizar_markdown, secciones_markdown, texto_plano
+)
+
+
+def test_inline_sin_formato():
+    assert analizar_inline("Texto normal") == (Fragmento("Texto normal"),)
+    assert analizar_inline("") == ()
+
+
+def test_inline_negrita_cursiva_y_codigo():
+    assert analizar_inline("Una **palabra** y *otra* con `x = 1`") == (
+        Fragmento("Una "),
+        Fragmento("palabra", NEGRITA),
+        Fragmento(" y "),
+        Fragmento("otra", CURSIVA),
+        Fragmento(" con "),
+        Fragmento("x = 1", CODIGO)
+    )
+    assert analizar_inline("***ambas***") == (Fragmento("ambas", NEGRITA | CURSIVA),)
+
+
+def test_inline_anidado_y_asteriscos_sueltos():
+    assert analizar_inline("**Nota: *importante* siempre**") == (
+        Fragmento("Nota: ", NEGRITA),
+        Fragmento("importante", NEGRITA | CURSIVA),
+        Fragmento(" siempre", NEGRITA)
+    )
+    # Un producto no es cursiva
+    assert texto_plano(analizar_inline("3 * 4 = 12")) == "3 * 4 = 12"
+    assert texto_plano(analizar_inline("nombre_de_variable")) == "nombre_de_variable"
+
+
+def test_bloques():
+    bloques = analizar_markdown("\n".join([
+        "# Examen de **Matemáticas** #",
+        "",
+        "Instrucciones generales.",
+        "---",
+        "> Lee con atención",
+        "```python",
+        "# no es un encabezado",
+        "```"
+    ]))
+    assert bloques == [
+        Encabezado(1, (Fragmento("Examen de "), Fragmento("Matemáticas", NEGRITA))),
+        Parrafo((Fragmento("Instrucciones generales."),)),
+        Separador(),
+        Cita((Fragmento("Lee con atención"),)),
+        Codigo("python", "# no es un encabezado")
+    ]
+
+
+def test_listas_anidadas():
+    bloques = analizar_markdown("- Uno\n  - Uno.a\n    1. Paso\n- Dos")
+    assert [(b.ordenada, b.nivel, b.marcador) for b in bloques] == [
+        (False, 0, "-"), (False, 1, "-"), (True, 2, "1."), (False, 0, "-")
+    ]
+    assert all(isinstance(b, Elemento) for b in bloques)
+
+
+def test_tabla_normaliza_columnas():
+    [tabla] = analizar_markdown("| Criterio | Peso |\n|---|:---:|\n| Examen | 60% |\n| Tareas |")
+    assert isinstance(tabla, Tabla)
+    assert [texto_plano(c) for c in tabla.cabecera] == ["Criterio", "Peso"]
+    assert tabla.filas[1] == ((Fragmento("Tareas"),), ())
+
+
+def test_tabla_sin_separadora_son_parrafos():
+    bloques = analizar_markdown("| a | b |\n| c | d |")
+    assert [type(b) for b in bloques] == [Parrafo, Parrafo]
+
+
+def test_saltos_windows():
+    assert analizar_markdown("## Título\r\nTexto") == [
+        Encabezado(2, (Fragmento("Título"),)),
+        Parrafo((Fragmento("Texto"),))
+    ]
+
+
+def test_secciones_markdown():
+    contenido = "\n".join([
+        "# Programación",          # 0
+        "Intro",                   # 1
+        "## 1. Objetivos",         # 2
+        "Texto",                   # 3
+        "### 1.1 Etapa",           # 4
+        "```",                     # 5
+        "## dentro de código",     # 6
+        "```",                     # 7
+        "## 2. **Evaluación**",    # 8
+        "Criterios"                # 9
+    ])
+    secciones = secciones_markdown(contenido)
+    assert [(s.nivel, s.titulo, s.inicio, s.fin) for s in secciones] == [
+        (1, "Programación", 0, 10),
+        (2, "1. Objetivos", 2, 8),
+        (3, "1.1 Etapa", 4, 8),
+        (2, "2. Evaluación", 8, 10)
+    ]
@@ -0,0 +1,51 @@
+"""
+Pruebas del ZIP del examen
+"""
+import asyncio
+import io
+import zipfile
+
+import pytest
+
+from app.services.paquete_service import paquete_service
+from app.services.pdf_service import ExportacionSaturadaError, pdf_service
+
+EXAMEN = "\n".join([
+    "# Examen",
+    "1. ¿Cuánto es 2 + 2?",
+    "## HOJA DE RESPUESTAS",
+    "1. ____",
+    "## SOLUCIONES",
+    "1. 4"
+])
+
+
+async def _descargar(**opciones) -> bytes:
+    iterador = await paquete_service.examen_zip(EXAMEN, "Examen", **opciones)
+    return b"".join([parte async for parte in iterador])
+
+
+def test_zip_con_todas_las_partes():
+    datos = asyncio.run(_descargar(formatos=("docx", "pdf")))
+    with zipfile.ZipFile(io.BytesIO(datos)) as paquete:
+        assert paquete.namelist() == [
+            "01_examen.docx", "01_examen.pdf",
+            "02_hoja_de_respuestas.docx", "02_hoja_de_respuestas.pdf",
+            "03_soluciones.docx", "03_soluciones.pdf"
+        ]
+        assert paquete.testzip() is None
+
+
+def test_fallo_de_una_parte_antes_del_primer_byte(monkeypatch):
+    """Regresión: un fallo después del primer fichero daba un 200 con un ZIP truncado"""
+    original = pdf_service.exportar_bloques
+
+    async def exportar_bloques(bloques, titulo, metadatos=None):
+        if titulo.startswith("Soluciones"):
+            await asyncio.sleep(0.05)
+            raise ExportacionSaturadaError(3)
+        return await original(bloques, titulo, metadatos)
+
+    monkeypatch.setattr(pdf_service, "exportar_bloques", exportar_bloques)
+    with pytest.raises(ExportacionSaturadaError):
+        asyncio.run(paquete_service.examen_zip(EXAMEN, "Examen", formatos=("docx", "pdf")))
@@ -0,0 +1,25 @@
+"""
+Pruebas del servicio de exportación a PDF (sin pool de procesos)
+"""
+import asyncio
+
+import pytest
+
+from app.services.limitador import ProveedorSaturadoError, ServicioSaturadoError
+from app.services.pdf_service import ExportacionSaturadaError, PdfService
+
+
+def test_exporta_en_el_pool_de_hilos():
+    pdf = asyncio.run(PdfService(workers=0).exportar("# Examen\n\nPregunta 1", "Examen"))
+    assert pdf.startswith(b"%PDF")
+
+
+def test_cola_llena_rechaza_con_error_de_exportacion():
+    servicio = PdfService(workers=0, max_cola=0)
+    with pytest.raises(ExportacionSaturadaError) as error:
+        asyncio.run(servicio.exportar("# Examen", "Examen"))
+    assert isinstance(error.value, ServicioSaturadoError)
+    # No es un error de proveedor de IA: no entra en sus reintentos ni en el failover
+    assert not isinstance(error.value, ProveedorSaturadoError)
+    assert error.value.status_code == 503
+    assert servicio.rechazadas == 1
@@ -0,0 +1,86 @@
+"""
+Pruebas de las plantillas de prompt compiladas
+"""
+from typing import List, Optional
+
+import pytest
+from pydantic import BaseModel
+
+from app.prompts.plantillas import PlantillaPrompt, RegistroPlantillas, lista_markdown
+from app.services.generador_service import generador_service
+
+
+class _Peticion(BaseModel):
+    tema: str
+    num_preguntas: int = 10
+    objetivos: Optional[List[str]] = None
+
+
+def _plantilla(**opciones) -> PlantillaPrompt:
+    return PlantillaPrompt(
+        "prueba",
+        "TEMA: {tema}\nPREGUNTAS: {num_preguntas:>3}{objetivos}",
+        prefijo="Instrucciones fijas.\n",
+        sistema="Eres un docente.",
+        valores=lambda datos: {"objetivos": lista_markdown("Objetivos", datos.objetivos)},
+        **opciones
+    )
+
+
+def test_renderiza_prefijo_y_sufijo():
+    plantilla = _plantilla()
+    assert plantilla.campos == ("tema", "num_preguntas", "objetivos")
+    assert plantilla(_Peticion(tema="Fracciones")) == "Instrucciones fijas.\nTEMA: Fracciones\nPREGUNTAS:  10"
+    assert plantilla.renderizar(_Peticion(tema="Fracciones", objetivos=["Sumar", "Restar"])).endswith(
+        "\nObjetivos:\n- Sumar\n- Restar"
+    )
+    assert plantilla.estatico == "Eres un docente.Instrucciones fijas.\n"
+
+
+def test_los_derivados_tienen_prioridad_sobre_la_peticion():
+    plantilla = PlantillaPrompt("prueba", "{tema}", valores=lambda datos: {"tema": datos.tema.upper()})
+    assert plantilla(_Peticion(tema="fracciones")) == "FRACCIONES"
+
+
+def test_campos_no_validos():
+    with pytest.raises(ValueError, match="prefijo"):
+        PlantillaPrompt("prueba", "{tema}", prefijo="Tema: {tema}")
+    with pytest.raises(ValueError, match="Conversión"):
+        PlantillaPrompt("prueba", "{tema!r}")
+    with pytest.raises(ValueError, match="no válido"):
+        PlantillaPrompt("prueba", "{datos.tema}")
+    # Las llaves dobles son texto literal
+    assert PlantillaPrompt("prueba", "{{json}} {tema}")(_Peticion(tema="x")) == "{json} x"
+
+
+def test_la_version_depende_solo_del_texto():
+    assert _plantilla().version == _plantilla().version
+    assert PlantillaPrompt("a", "{tema}").version == PlantillaPrompt("b", "{tema}").version
+    versiones = {
+        PlantillaPrompt("prueba", "{tema}").version,
+        PlantillaPrompt("prueba", "{tema}", prefijo="x").version,
+        PlantillaPrompt("prueba", "{tema}", sistema="x").version,
+        PlantillaPrompt("prueba", "Tema: {tema}").version
+    }
+    assert len(versiones) == 4
+
+
+def test_registro():
+    registro = RegistroPlantillas()
+    plantilla = registro.registrar(_plantilla())
+    assert registro.obtener("prueba") is plantilla
+    assert registro.versiones() == {"prueba": plantilla.version}
+    [descripcion] = registro.listar()
+    assert descripcion["campos"] == ["tema", "num_preguntas", "objetivos"]
+    assert descripcion["tokens_sistema"] > 0
+    with pytest.raises(ValueError, match="ya registrada"):
+        registro.registrar(_plantilla())
+    with pytest.raises(ValueError, match="no encontrada"):
+        registro.obtener("otra")
+
+
+def test_los_campos_de_cada_generador_existen():
+    """Cada campo del sufijo sale de la petición o de los valores derivados"""
+    for spec in generador_service.listar():
+        ausentes = set(spec.plantilla.campos) - set(spec.request_model.model_fields)
+        assert not ausentes or spec.plantilla.valores is not None, (spec.tipo, ausentes)
@@ -0,0 +1,96 @@
+"""
+Pruebas de la revisión de secciones: búsqueda por encabezado y empalme
+"""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services.generador_service import generador_service
+from app.services.ia_service import ia_service
+from app.services.markdown_ast import secciones_markdown
+from app.services.revision_service import RevisionService, SeccionNoEncontrada
+from app.services.tokens import estimador_tokens
+from app.services.trabajo_service import trabajo_service
+
+DOCUMENTO = "\n".join([
+    "# Unidad 3: Fracciones",
+    "Introducción",
+    "## 1. Objetivos",
+    "- Sumar fracciones",
+    "## 7. 📊 Evaluación",
+    "### 7.1 Criterios de evaluación",
+    "Criterios",
+    "## 8. Atención a la diversidad",
+    "Medidas"
+])
+
+
+def _buscar(encabezado: str):
+    return RevisionService.buscar(secciones_markdown(DOCUMENTO), encabezado)
+
+
+def test_buscar_ignora_numeracion_tildes_y_emojis():
+    assert _buscar("EVALUACIÓN").titulo == "7. 📊 Evaluación"
+    assert _buscar("atencion a la diversidad").inicio == 7
+    # Sin coincidencia exacta, la de mayor rango que lo contiene
+    assert _buscar("criterios").titulo == "7.1 Criterios de evaluación"
+    assert _buscar("Fracciones").nivel == 1
+
+
+def test_buscar_errores():
+    with pytest.raises(SeccionNoEncontrada, match="Objetivos"):
+        _buscar("Metodología")
+    with pytest.raises(ValueError, match="vacío") as error:
+        _buscar("📊 ***")
+    assert not isinstance(error.value, SeccionNoEncontrada)
+
+
+def test_empalmar_conserva_el_resto():
+    seccion = _buscar("Evaluación")
+    nuevo = RevisionService.empalmar(DOCUMENTO, seccion, "## 7. Evaluación\n\nNueva\n\n")
+    assert nuevo.split("\n")[:4] == DOCUMENTO.split("\n")[:4]
+    assert "## 7. Evaluación\n\nNueva\n\n## 8. Atención a la diversidad\nMedidas" in nuevo
+    assert "Criterios" not in nuevo
+    # La última sección no deja una línea en blanco al final
+    ultima = RevisionService.empalmar(DOCUMENTO, _buscar("diversidad"), "## 8. Diversidad\nOtras")
+    assert ultima.endswith("## 8. Diversidad\nOtras")
+
+
+def test_con_encabezado_sustituye_el_del_modelo():
+    assert RevisionService.con_encabezado("## 7. Evaluación", "# Evaluación\n\nTexto") == "## 7. Evaluación\n\nTexto"
+    assert RevisionService.con_encabezado("## 7. Evaluación", "Texto") == "## 7. Evaluación\n\nTexto"
+
+
+def test_ruta_distingue_encabezado_vacio_y_seccion_inexistente():
+    """Regresión: un encabezado vacío respondía 404 como una sección que no existe"""
+    from main import app
+
+    tipo = generador_service.listar()[0].tipo
+    trabajo_id = trabajo_service.store.crear(tipo, {})
+    assert trabajo_service.store.reclamar("worker-prueba", max_en_curso=8)["id"] == trabajo_id
+    trabajo_service.store.terminar(trabajo_id, "completado", {"contenido": DOCUMENTO})
+
+    cliente = TestClient(app)
+    ruta = f"/trabajos/{trabajo_id}/secciones"
+    assert cliente.post(ruta, json={"encabezado": "***"}).status_code == 422
+    assert cliente.post(ruta, json={"encabezado": "Metodología"}).status_code == 404
+    assert cliente.post("/trabajos/no-existe/secciones", json={"encabezado": "Evaluación"}).status_code == 404
+
+
+def test_generar_usa_la_clave_de_revision(monkeypatch):
+    """Regresión: la revisión compartía el histograma de latencia del documento completo"""
+    generadores = []
+
+    async def generate(generador, **_):
+        generadores.append(generador)
+        return {"contenido": "Texto", "proveedor": "claude", "modelo": "m"}
+
+    async def observar(*_):
+        pass
+
+    monkeypatch.setattr(ia_service, "generate", generate)
+    monkeypatch.setattr(estimador_tokens, "observar", observar)
+    spec = generador_service.listar()[0]
+    asyncio.run(RevisionService._generar(spec, "sistema", "usuario", 300))
+    assert generadores == [f"{spec.tipo}/revision"]
@@ -0,0 +1,103 @@
+"""
+Pruebas de la generación por secciones: orden de las llamadas, prefijo
+común y resumen del documento
+"""
+import asyncio
+from types import SimpleNamespace
+
+from pydantic import BaseModel
+
+from app.prompts.plantillas import DocumentoPorSecciones, PlantillaPrompt, SeccionDocumento
+from app.services.ia_service import ia_service
+from app.services.secciones_service import SeccionesService, secciones_service
+from app.services.tokens import estimador_tokens
+
+SECCIONES = (SeccionDocumento("A", "Introducción"), SeccionDocumento("B", "Objetivos"), SeccionDocumento("C", "Evaluación"))
+
+
+def _llamada(proveedor: str, modelo: str, tokens: int, **extra) -> dict:
+    return {"proveedor": proveedor, "modelo": modelo, "tokens_usados": tokens, "output_tokens": tokens, **extra}
+
+
+def test_un_solo_proveedor():
+    guion = _llamada("claude", "sonnet", 100, tiempo_generacion=1.5)
+    resumen = SeccionesService.combinar(guion, [_llamada("claude", "sonnet", 200)] * 3, SECCIONES)
+    assert (resumen["proveedor"], resumen["modelo"]) == ("claude", "sonnet")
+    assert "por_seccion" not in resumen
+    assert resumen["tokens_usados"] == 700
+    assert resumen["cache_read_input_tokens"] is None
+    assert resumen["tiempo_guion"] == 1.5
+    assert resumen["secciones"] == 3
+
+
+def test_failover_mezcla_proveedores():
+    """Regresión: se informaba solo del proveedor del primer apartado"""
+    apartados = [
+        _llamada("openai", "gpt", 200, respaldo=True),
+        _llamada("claude", "sonnet", 200),
+        _llamada("claude", "sonnet", 200, truncado=True)
+    ]
+    resumen = SeccionesService.combinar(_llamada("claude", "sonnet", 100), apartados, SECCIONES)
+    assert (resumen["proveedor"], resumen["modelo"]) == ("claude", "sonnet")
+    assert resumen["por_seccion"] == {
+        "guion": {"proveedor": "claude", "modelo": "sonnet"},
+        "A": {"proveedor": "openai", "modelo": "gpt"},
+        "B": {"proveedor": "claude", "modelo": "sonnet"},
+        "C": {"proveedor": "claude", "modelo": "sonnet"}
+    }
+    assert resumen["respaldo"] and resumen["truncado"]
+
+
+class _Peticion(BaseModel):
+    tema: str
+
+
+DOCUMENTO = DocumentoPorSecciones(
+    contexto=PlantillaPrompt("contexto", "TEMA: {tema}", prefijo="Instrucciones.\n"),
+    guion=PlantillaPrompt("guion", "GENERA EL GUION:"),
+    seccion=PlantillaPrompt("seccion", "Apartado {clave}. {titulo}:\n{puntos}"),
+    secciones=SECCIONES,
+    titulo_guion="GUION"
+)
+
+
+def test_el_primer_apartado_va_solo_y_todos_comparten_el_guion(monkeypatch):
+    """Regresión: todos los apartados salían a la vez sin caché escrita y sin el guion en el prefijo"""
+    eventos = []
+    sistemas = {}
+
+    async def generate(system_prompt, user_prompt, generador, **_):
+        eventos.append(generador)
+        sistemas[generador] = system_prompt
+        contenido = "ESQUEMA" if generador.endswith("/guion") else f"Texto de {generador}"
+        return {"contenido": contenido, "proveedor": "claude", "modelo": "m", "tokens_usados": 10}
+
+    async def generate_stream(system_prompt, user_prompt, generador, **_):
+        eventos.append(generador)
+        sistemas[generador] = system_prompt
+        # El resto no debe arrancar mientras el primero espera su primer token
+        for _ in range(5):
+            await asyncio.sleep(0)
+        eventos.append("primer token")
+        yield {"evento": "delta", "texto": "Texto "}
+        yield {"evento": "delta", "texto": f"de {generador}"}
+        yield {"evento": "fin", "proveedor": "claude", "modelo": "m", "tokens_usados": 10}
+
+    async def observar(*_):
+        pass
+
+    monkeypatch.setattr(ia_service, "generate", generate)
+    monkeypatch.setattr(ia_service, "generate_stream", generate_stream)
+    monkeypatch.setattr(estimador_tokens, "observar", observar)
+    spec = SimpleNamespace(tipo="doc", temperature=0.7, prioridad=5, secciones=DOCUMENTO)
+
+    async def consumir():
+        return [e async for e in secciones_service.generar_stream(spec, _Peticion(tema="Fracciones"))]
+
+    *deltas, fin = asyncio.run(consumir())
+    assert eventos[:3] == ["doc/guion", "doc/A", "primer token"]
+    assert sorted(eventos[3:]) == ["doc/B", "doc/C"]
+    assert sistemas["doc/guion"] == "Instrucciones.\nTEMA: Fracciones"
+    assert {sistemas[f"doc/{s.clave}"] for s in SECCIONES} == {"Instrucciones.\nTEMA: Fracciones\n\nGUION:\nESQUEMA"}
+    assert [d["texto"].strip().splitlines()[-1] for d in deltas] == ["Texto de doc/A", "Texto de doc/B", "Texto de doc/C"]
+    assert fin["tokens_usados"] == 40
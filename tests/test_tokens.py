@@ -0,0 +1,96 @@
+"""
+Pruebas del estimador de tokens: modelo de longitud de salida, límites,
+calibración de entrada y persistencia en SQLite
+"""
+import asyncio
+
+import pytest
+
+from app.services.tokens import FACTOR_TRUNCADO, EstimadorTokens, ModeloSalida, contar_tokens
+
+
+def test_las_observaciones_sobreviven_a_un_worker_nuevo(tmp_path):
+    ruta = tmp_path / "tokens.sqlite3"
+    estimador = EstimadorTokens(str(ruta), min_muestras=2)
+    # La base no se abre al crear la instancia global, sino al usarla
+    assert not ruta.exists()
+
+    async def registrar():
+        for tokens in (900, 1100):
+            await estimador.registrar("examen", 10, {"output_tokens": tokens})
+
+    asyncio.run(registrar())
+    nuevo = EstimadorTokens(str(ruta), min_muestras=2)
+    asyncio.run(nuevo.iniciar())
+    assert len(nuevo.modelos["examen"].muestras) == 2
+    assert nuevo.salida("examen", 10, 4096) == 1000
+
+
+def _modelo(puntos, truncadas=()) -> ModeloSalida:
+    modelo = ModeloSalida()
+    for indice, (x, tokens) in enumerate(puntos):
+        modelo.registrar(x, tokens, indice in truncadas)
+    return modelo
+
+
+def test_minimos_cuadrados():
+    a, b, residuos = _modelo([(x, 200 + 100 * x) for x in range(1, 11)]).ajustar()
+    assert a == pytest.approx(200)
+    assert b == pytest.approx(100)
+    assert residuos == pytest.approx([0.0] * 10)
+
+
+def test_la_pendiente_nunca_es_negativa():
+    """Más preguntas o sesiones nunca acortan el documento"""
+    a, b, _ = _modelo([(x, 2000 - 50 * x) for x in range(1, 11)]).ajustar()
+    assert b == 0.0
+    assert a == pytest.approx(sum(2000 - 50 * x for x in range(1, 11)) / 10)
+
+
+def test_las_truncadas_pesan_un_50_por_ciento_mas():
+    modelo = _modelo([(0, 1000), (0, 1000)], truncadas={1})
+    assert [tokens for _, tokens, _ in modelo.muestras] == [1000, 1000 * FACTOR_TRUNCADO]
+    assert modelo.truncadas == 1
+    assert modelo.predecir(0, 50)[0] == pytest.approx(1250)
+
+
+def _estimador(tokens, min_muestras: int = 20) -> EstimadorTokens:
+    estimador = EstimadorTokens(min_muestras=min_muestras, margen=0.15)
+    for valor in tokens:
+        estimador._modelo("examen").registrar(0, valor)
+    return estimador
+
+
+def test_max_tokens_sin_muestras_suficientes_usa_el_declarado():
+    estimador = _estimador([1000] * 19)
+    assert estimador.max_tokens("examen", None, 3000, 6000) == 3000
+    assert estimador.salida("examen", None, 3000) == 1500
+    assert EstimadorTokens(activo=False).max_tokens("examen", None, 3000, 6000) == 3000
+
+
+def test_max_tokens_con_muestras():
+    estimador = _estimador([1000] * 20)
+    # 1000 × 1.15 = 1150, redondeado a 64
+    assert estimador.max_tokens("examen", None, 3000, 6000) == 1152
+    assert estimador.reservado_ahorrado == 3000 - 1152
+    assert estimador.salida("examen", None, 3000) == 1000
+
+
+def test_max_tokens_entre_256_y_el_techo():
+    assert _estimador([50] * 20).max_tokens("examen", None, 3000, 6000) == 256
+    assert _estimador([9000] * 20).max_tokens("examen", None, 3000, 6000) == 6000
+    # La salida reservada nunca supera el max_tokens de la llamada
+    assert _estimador([9000] * 20).salida("examen", None, 4000) == 4000
+
+
+def test_calibracion_por_proveedor():
+    """Regresión: un único cociente mezclaba los tokenizadores de los tres proveedores"""
+    estimador = EstimadorTokens()
+    estimador.calibrar(100, 120, "claude")
+    estimador.calibrar(100, 90, "gemini")
+    estimador.calibrar(100, 500, "openai")
+    assert estimador.calibracion == {"claude": 1.2, "gemini": 0.9, "openai": 2.0}
+    base = contar_tokens("Unidad didáctica de fracciones")
+    assert estimador.entrada("Unidad didáctica de fracciones", proveedor="claude") == int(base * 1.2) + 1
+    assert estimador.entrada("Unidad didáctica de fracciones", proveedor="otro") == base + 1
+    assert estimador.estadisticas()["calibracion_entrada"]["gemini"] == 0.9
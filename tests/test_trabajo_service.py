@@ -0,0 +1,88 @@
+"""
+Pruebas del almacén de trabajos (SQLite)
+"""
+import asyncio
+import time
+
+import pytest
+
+from app.services.trabajo_service import TrabajoService, TrabajoStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TrabajoStore(str(tmp_path / "trabajos.sqlite3"))
+
+
+def test_reclamar_en_orden_de_llegada(store):
+    primero = store.crear("examen", {"tema": "fracciones"})
+    store.crear("examen", {"tema": "decimales"})
+    trabajo = store.reclamar("worker-1", max_en_curso=8)
+    assert trabajo["id"] == primero
+    assert trabajo["estado"] == "en_curso"
+    assert trabajo["payload"] == {"tema": "fracciones"}
+
+
+def test_reclamar_respeta_el_maximo_en_curso(store):
+    store.crear("examen", {})
+    store.crear("examen", {})
+    assert store.reclamar("worker-1", max_en_curso=1) is not None
+    assert store.reclamar("worker-2", max_en_curso=1) is None
+
+
+def test_terminar_no_pisa_una_cancelacion(store):
+    trabajo_id = store.crear("examen", {})
+    store.reclamar("worker-1", max_en_curso=8)
+    assert store.cancelar(trabajo_id)
+    assert store.latir(trabajo_id) == "cancelado"
+    store.terminar(trabajo_id, "completado", {"contenido": "x"})
+    assert store.obtener(trabajo_id)["estado"] == "cancelado"
+    assert not store.cancelar(trabajo_id)
+
+
+def test_reencolar_huerfanos(store):
+    trabajo_id = store.crear("examen", {})
+    store.reclamar("worker-1", max_en_curso=8)
+    assert store.reencolar_huerfanos(timeout_latido=60) == 0
+    time.sleep(0.02)
+    assert store.reencolar_huerfanos(timeout_latido=0.01) == 1
+    trabajo = store.obtener(trabajo_id)
+    assert trabajo["estado"] == "pendiente"
+    assert trabajo["worker"] is None
+
+
+def test_reemplazar_resultado_compara_el_anterior(store):
+    trabajo_id = store.crear("examen", {})
+    store.reclamar("worker-1", max_en_curso=8)
+    anterior = {"contenido": "# Examen\n\nv1"}
+    store.terminar(trabajo_id, "completado", anterior)
+    revisado = {"contenido": "# Examen\n\nv2"}
+    assert store.reemplazar_resultado(trabajo_id, anterior, revisado)
+    # Una segunda revisión hecha sobre la versión antigua pierde
+    assert not store.reemplazar_resultado(trabajo_id, anterior, {"contenido": "otra"})
+    assert store.obtener(trabajo_id)["resultado"] == revisado
+    assert store.contar() == {"completado": 1}
+
+
+def test_el_almacen_no_abre_la_base_al_crearse(tmp_path):
+    """Regresión: la tabla se creaba al importar el módulo, dentro del event loop"""
+    ruta = tmp_path / "trabajos.sqlite3"
+    store = TrabajoStore(str(ruta))
+    assert not ruta.exists()
+    assert store.contar() == {}
+    assert ruta.exists()
+
+
+@pytest.mark.parametrize("tipo, payload", [
+    ("generador-retirado", {}),
+    ("boton-emergencia", {"nivel": "Primaria"})
+])
+def test_trabajo_invalido_termina_con_error(store, tipo, payload):
+    """Regresión: quedaba en curso y el reencolado lo repetía para siempre"""
+    trabajo_id = store.crear(tipo, payload)
+    trabajo = store.reclamar("worker-1", max_en_curso=8)
+    asyncio.run(TrabajoService(store)._procesar(trabajo))
+    terminado = store.obtener(trabajo_id)
+    assert terminado["estado"] == "error"
+    assert terminado["error"]
+    assert store.reencolar_huerfanos(timeout_latido=0) == 0
@@ -0,0 +1,23 @@
+"""
+Pruebas del transporte HTTP compartido con los proveedores
+"""
+import asyncio
+
+from app.services.transporte import TransporteHTTP
+
+
+def test_cerrar_sin_cliente_no_lo_crea():
+    transporte = TransporteHTTP()
+    asyncio.run(transporte.cerrar())
+    assert transporte._cliente is None
+
+
+def test_cerrar_cierra_el_pool():
+    transporte = TransporteHTTP(http2=False)
+
+    async def usar_y_cerrar():
+        cliente = transporte.cliente
+        await transporte.cerrar()
+        return cliente
+
+    assert asyncio.run(usar_y_cerrar()).is_closed
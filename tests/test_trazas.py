@@ -0,0 +1,51 @@
+"""
+Pruebas de las trazas: el exportador no escribe en el event loop
+"""
+import asyncio
+import json
+
+from app.services import trazas
+from app.services.trazas import ExportadorArchivo, Trazador
+
+
+def _lineas(ruta) -> list:
+    return [json.loads(linea) for linea in ruta.read_text(encoding="utf-8").splitlines()]
+
+
+def test_exportar_en_el_event_loop_no_escribe_en_el_momento(tmp_path, monkeypatch):
+    """Regresión: cada petición abría y escribía el fichero dentro del event loop"""
+    ruta = tmp_path / "trazas.jsonl"
+    trazador = Trazador(exportador=ExportadorArchivo(str(ruta), "docentia"), log_json=False)
+    hilos = []
+    a_hilo = asyncio.to_thread
+
+    def contar(funcion, *args):
+        hilos.append(funcion.__name__)
+        return a_hilo(funcion, *args)
+
+    monkeypatch.setattr(trazas.asyncio, "to_thread", contar)
+
+    async def peticiones():
+        for numero in range(3):
+            with trazador.traza("GET /health", f"peticion-{numero}"):
+                with trazador.span("hijo"):
+                    pass
+        # Nada se ha escrito todavía: el volcado espera a que el loop ceda
+        assert not ruta.exists()
+        await trazador.cerrar()
+
+    asyncio.run(peticiones())
+    assert set(hilos) == {"volcar"}
+    lineas = _lineas(ruta)
+    assert len(lineas) == 3
+    spans = lineas[0]["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert [s["name"] for s in spans] == ["hijo", "GET /health"]
+
+
+def test_fuera_del_event_loop_escribe_en_el_momento(tmp_path):
+    ruta = tmp_path / "trazas.jsonl"
+    exportador = ExportadorArchivo(str(ruta), "docentia")
+    trazador = Trazador(exportador=exportador, log_json=False)
+    with trazador.traza("trabajo"):
+        pass
+    assert len(_lineas(ruta)) == 1